@@ -1,4 +1,5 @@
 from django.contrib import admin
+from backend.pagination import ApproximateCountPaginator
 from .models import WebsiteEvent
 
 
@@ -8,3 +9,7 @@ class WebsiteEventAdmin(admin.ModelAdmin):
     list_filter = ("event_type", "created_at")
     search_fields = ("path", "session_id", "user__email")
     readonly_fields = ("created_at",)
+    list_select_related = ("user",)
+    # The events table grows without bound; avoid COUNT(*) on every changelist page
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,18 @@
+"""CSV rows for the website event report (exports/reports.py)."""
+import json
+
+from backend.csv_export import EXPORT_CHUNK_SIZE
+
+EVENT_EXPORT_HEADER = ['id', 'created_at', 'event_type', 'path', 'user_id', 'session_id', 'user_agent', 'extra']
+
+
+def event_export_rows(queryset):
+    """One row per WebsiteEvent in `queryset`, oldest first; `extra` is written as JSON."""
+    events = queryset.order_by('created_at', 'id').values_list(
+        'id', 'created_at', 'event_type', 'path', 'user_id', 'session_id', 'user_agent', 'extra'
+    )
+    for event_id, created_at, event_type, path, user_id, session_id, user_agent, extra in events.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            event_id, created_at.isoformat(), event_type, path, user_id or '', session_id or '',
+            user_agent or '', json.dumps(extra, separators=(',', ':')) if extra is not None else '',
+        ]
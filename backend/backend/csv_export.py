@@ -0,0 +1,38 @@
+# Streaming CSV responses for admin exports
+"""
+Build CSV downloads row by row instead of in a StringIO, so an export of any
+size holds one chunk of rows in memory and starts sending bytes immediately.
+
+    def rows():
+        for product in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield [product.id, product.name]
+
+    return streaming_csv_response('products.csv', ['id', 'name'], rows())
+"""
+import csv
+
+from django.http import StreamingHttpResponse
+
+# Rows fetched per database round trip by export querysets
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer: write() hands the formatted line back."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def streaming_csv_response(filename, header, rows):
+    """StreamingHttpResponse that renders `rows` (an iterable of lists) lazily."""
+    response = StreamingHttpResponse(csv_lines(header, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
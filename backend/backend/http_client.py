@@ -0,0 +1,32 @@
+# backend/http_client.py
+"""
+Pooled HTTP client for calls to external services from async views.
+
+An httpx.AsyncClient keeps connections (and their TLS sessions) open between
+calls, but it belongs to the event loop it is used on. One client is kept per
+running loop: under an ASGI server that is one per process, shared by every
+in-flight request, with at most HTTP_CLIENT_MAX_CONNECTIONS sockets open.
+"""
+import asyncio
+import weakref
+
+import httpx
+from django.conf import settings
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def async_client() -> httpx.AsyncClient:
+    """The pooled client of the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=getattr(settings, 'HTTP_CLIENT_TIMEOUT', 30),
+            limits=httpx.Limits(
+                max_connections=getattr(settings, 'HTTP_CLIENT_MAX_CONNECTIONS', 200),
+                max_keepalive_connections=getattr(settings, 'HTTP_CLIENT_MAX_KEEPALIVE', 50),
+            ),
+        )
+        _clients[loop] = client
+    return client
@@ -0,0 +1,264 @@
+# Prometheus metrics for the /metrics endpoint
+"""
+Application metrics in the Prometheus exposition format.
+
+Request latency, per-request database work, cache hit rates, reservation outcomes,
+drop waiting room admissions and external API calls are recorded where they happen (MetricsMiddleware and the
+helpers below). Job queue depth is read from the database at scrape time.
+
+Under gunicorn every worker process keeps its own counters. Set the
+PROMETHEUS_MULTIPROC_DIR environment variable to an empty, writable directory
+(before the app starts) and the workers write their samples there, which
+metrics_view() merges into one set of series. gunicorn.conf.py clears the
+directory on startup and drops the files of workers that exit.
+"""
+import hmac
+import os
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.cache import never_cache
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Request latency by route', ['method', 'route'], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'Requests by route and status class', ['method', 'route', 'status'],
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries per request', ['route'], buckets=QUERY_COUNT_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    'http_request_db_seconds', 'Database time per request', ['route'], buckets=LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result'],
+)
+RESERVATIONS = Counter(
+    'inventory_reservations_total', 'Order reservation attempts by result', ['result'],
+)
+RESERVATION_SECONDS = Histogram(
+    'inventory_reservation_duration_seconds', 'Time to reserve stock for an order', buckets=LATENCY_BUCKETS,
+)
+EXTERNAL_SECONDS = Histogram(
+    'external_request_duration_seconds', 'Calls to external services', ['service', 'operation'],
+    buckets=LATENCY_BUCKETS,
+)
+EXTERNAL_ERRORS = Counter(
+    'external_request_errors_total', 'Failed calls to external services', ['service', 'operation'],
+)
+WAITING_ROOM = Counter(
+    'drop_waiting_room_total', 'Drop waiting room joins, admissions and refused checkouts', ['result'],
+)
+JOB_RUNS = Counter(
+    'job_runs_total', 'Finished background job attempts by outcome', ['task', 'outcome'],
+)
+JOB_SECONDS = Histogram(
+    'job_duration_seconds', 'Background job attempt duration', ['task'],
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 1800),
+)
+
+
+def route_of(request):
+    """The URL pattern that handled the request, so labels stay bounded (no ids or slugs)."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    route = match.route.replace('^', '').replace('$', '') if match.route else ''
+    return route or match.view_name or 'unknown'
+
+
+class QueryTimer:
+    """Database execute_wrapper counting queries and their total time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status and database work per route. Keep it first in
+    MIDDLEWARE so the measurement covers the whole stack. Runs natively in
+    both modes, so async views (orders/async_views.py) don't tie up a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            time_queries(stack, timer)
+            response = self.get_response(request)
+        self.record(request, response, timer, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        # The ORM runs on the request's sync_to_async thread, so the timer wraps that thread's connections
+        stack = ExitStack()
+        await sync_to_async(time_queries)(stack, timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.record(request, response, timer, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def record(request, response, timer, duration):
+        route = route_of(request)
+        # FetchFromCacheMiddleware leaves _cache_update_cache False when it served the response
+        if request.method in ('GET', 'HEAD') and hasattr(request, '_cache_update_cache'):
+            record_cache('page', hits=int(not request._cache_update_cache), misses=int(request._cache_update_cache))
+        HTTP_REQUEST_SECONDS.labels(request.method, route).observe(duration)
+        HTTP_REQUESTS.labels(request.method, route, f'{response.status_code // 100}xx').inc()
+        DB_QUERIES.labels(route).observe(timer.count)
+        DB_SECONDS.labels(route).observe(timer.seconds)
+
+
+def time_queries(stack, timer):
+    """Wrap the current thread's database connections with `timer` until `stack` closes."""
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(timer))
+
+
+def record_cache(cache, hits=0, misses=0):
+    if hits:
+        CACHE_REQUESTS.labels(cache, 'hit').inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache, 'miss').inc(misses)
+
+
+def record_reservation(success, seconds):
+    RESERVATIONS.labels('success' if success else 'failed').inc()
+    RESERVATION_SECONDS.observe(seconds)
+
+
+def record_waiting_room(result):
+    WAITING_ROOM.labels(result).inc()
+
+
+def record_job(task, outcome, seconds):
+    JOB_RUNS.labels(task, outcome).inc()
+    JOB_SECONDS.labels(task).observe(seconds)
+
+
+class ExternalCall:
+    def __init__(self):
+        self.failed = False
+
+    def status(self, status_code):
+        """Count an HTTP error response as a failed call."""
+        if status_code >= 400:
+            self.failed = True
+
+    def fail(self):
+        self.failed = True
+
+
+@contextmanager
+def observe_external(service, operation):
+    """
+    Time a call to an external service. Exceptions, call.status(code >= 400) and
+    call.fail() count as errors:
+
+        with observe_external('paypro', 'payment_status') as call:
+            response = requests.get(...)
+            call.status(response.status_code)
+    """
+    call = ExternalCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call.failed = True
+        raise
+    finally:
+        EXTERNAL_SECONDS.labels(service, operation).observe(time.perf_counter() - started)
+        if call.failed:
+            EXTERNAL_ERRORS.labels(service, operation).inc()
+
+
+class QueueDepthCollector:
+    """Queued and running work, read from the database on each scrape."""
+
+    def collect(self):
+        from django.db.models import Count
+        from exports.models import ExportJob
+        from jobs.models import Job
+        from outbox.models import OutboundEmail
+
+        jobs = GaugeMetricFamily('job_queue_depth', 'Background jobs by task and status', labels=['task', 'status'])
+        counts = Job.objects.filter(status__in=['queued', 'running']).values_list('task', 'status').annotate(n=Count('id'))
+        for task, status, n in counts.order_by():
+            jobs.add_metric([task, status], n)
+        yield jobs
+
+        outbox = GaugeMetricFamily('outbox_emails', 'Outbound emails waiting or in flight', labels=['status'])
+        for status, n in OutboundEmail.objects.filter(status__in=['pending', 'sending']).values_list('status').annotate(n=Count('id')).order_by():
+            outbox.add_metric([status], n)
+        yield outbox
+
+        yield GaugeMetricFamily(
+            'export_jobs_pending', 'Report exports waiting for a worker',
+            value=ExportJob.objects.filter(status='pending').count(),
+        )
+
+
+def metrics_allowed(request):
+    """
+    Bearer METRICS_TOKEN when configured. Without one, only METRICS_ALLOWED_IPS under
+    DEBUG: behind a reverse proxy every request arrives from the proxy's address, so
+    the allowlist alone would open the endpoint to anyone.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        return hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', '').encode(), f'Bearer {token}'.encode())
+    if not settings.DEBUG:
+        return False
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+
+
+@never_cache
+def metrics_view(request):
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    queue_registry = CollectorRegistry()
+    queue_registry.register(QueueDepthCollector())
+
+    return HttpResponse(generate_latest(registry) + generate_latest(queue_registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,241 @@
+# Shared pagination classes for large listings
+"""
+Keyset (cursor) pagination with a page-number fallback.
+
+Deep OFFSET pages get slower the further you go and every page-number request
+also pays for a COUNT(*). KeysetPagination seeks directly to the last row seen
+using the indexed ordering columns, so page 500 costs the same as page 1.
+
+Cursor mode is opt-in so existing clients keep working:
+    ?cursor=            first keyset page
+    ?cursor=<token>     page after/before the encoded position
+    ?page=N             classic page-number pagination (default)
+    ?total=approx       estimated total from the planner instead of COUNT(*)
+    ?total=exact        exact total (COUNT(*)) in cursor mode
+"""
+import base64
+import json
+from collections import OrderedDict
+from functools import cached_property
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Return a cheap row estimate for a queryset.
+
+    On PostgreSQL an unfiltered queryset reads pg_class.reltuples and a filtered
+    one reads the planner's row estimate from EXPLAIN. Other databases (and
+    tables that were never analyzed) fall back to an exact COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            if row and row[0] is not None and row[0] >= 0:
+                return int(row[0])
+        else:
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+    return queryset.count()
+
+
+class ApproximateCountPaginator(Paginator):
+    """Django paginator that uses estimate_count() instead of COUNT(*)."""
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Keyset pagination over the queryset's ordering plus a primary key tiebreaker.
+
+    Views can set `keyset_ordering` (e.g. ('-created_at', '-pk')) as the default
+    order; an ordering applied by OrderingFilter takes precedence. Orderings that
+    cannot be expressed as a keyset (related lookups, nullable columns) are served
+    with page-number pagination instead.
+    """
+    cursor_query_param = 'cursor'
+    total_query_param = 'total'
+    default_keyset_ordering = ('-created_at', '-pk')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keyset_mode = False
+        self.count = None
+        total_mode = request.query_params.get(self.total_query_param)
+
+        if self.cursor_query_param in request.query_params:
+            ordering = self.get_keyset_ordering(queryset, view)
+            fields = self.resolve_fields(queryset.model, ordering)
+            if fields is not None:
+                self.keyset_mode = True
+                return self.paginate_keyset(queryset, request, ordering, fields, total_mode)
+
+        if total_mode == 'approx':
+            self.django_paginator_class = ApproximateCountPaginator
+        page = super().paginate_queryset(queryset, request, view)
+        if page is not None:
+            self.count = self.page.paginator.count
+        return page
+
+    # ------------------------------------------------------------------ ordering
+
+    def get_keyset_ordering(self, queryset, view):
+        ordering = list(queryset.query.order_by) or list(
+            getattr(view, 'keyset_ordering', None) or self.default_keyset_ordering
+        )
+        ordering = [o for o in ordering if isinstance(o, str) and o.lstrip('-') != '?']
+        pk_names = {'pk', queryset.model._meta.pk.name}
+        if not any(o.lstrip('-') in pk_names for o in ordering):
+            descending = ordering[0].startswith('-') if ordering else True
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    @staticmethod
+    def resolve_fields(model, ordering):
+        """Map ordering names to concrete, non-null model fields (or None)."""
+        fields = []
+        for name in ordering:
+            name = name.lstrip('-')
+            if '__' in name:
+                return None
+            field = model._meta.pk if name == 'pk' else None
+            if field is None:
+                try:
+                    field = model._meta.get_field(name)
+                except Exception:
+                    return None
+            if not getattr(field, 'concrete', False) or field.null:
+                return None
+            fields.append(field)
+        return fields
+
+    # ------------------------------------------------------------------ keyset
+
+    def paginate_keyset(self, queryset, request, ordering, fields, total_mode):
+        self.page_size = self.get_page_size(request)
+        self.ordering = ordering
+        self.fields = fields
+
+        position, reverse = self.decode_cursor(request)
+        if total_mode == 'approx':
+            self.count = estimate_count(queryset)
+        elif total_mode == 'exact':
+            self.count = queryset.count()
+
+        order = [self._flip(o) for o in ordering] if reverse else list(ordering)
+        queryset = queryset.order_by(*order)
+        if position is not None:
+            queryset = queryset.filter(self.build_keyset_filter(order, fields, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page_rows = rows
+        return rows
+
+    @staticmethod
+    def _flip(order):
+        return order[1:] if order.startswith('-') else f'-{order}'
+
+    @staticmethod
+    def build_keyset_filter(order, fields, position):
+        """(a, b) after (x, y)  ==>  a > x OR (a = x AND b > y), per direction."""
+        condition = Q()
+        equal_prefix = Q()
+        for name, field, value in zip(order, fields, position):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            column = field.attname if name.lstrip('-') != 'pk' else 'pk'
+            condition |= equal_prefix & Q(**{f'{column}__{lookup}': value})
+            equal_prefix &= Q(**{column: value})
+        return condition
+
+    def row_position(self, row):
+        values = []
+        for field in self.fields:
+            value = getattr(row, field.attname)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return values
+
+    def encode_cursor(self, row, reverse):
+        payload = {'p': self.row_position(row)}
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode())
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, token.decode().rstrip('='))
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            raw = payload['p']
+            if len(raw) != len(self.fields):
+                raise ValueError('cursor does not match ordering')
+            position = [field.to_python(value) for field, value in zip(self.fields, raw)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(payload.get('r'))
+
+    # ------------------------------------------------------------------ output
+
+    def get_next_link(self):
+        if not self.keyset_mode:
+            return super().get_next_link()
+        if not self.has_next or not self.page_rows:
+            return None
+        return self.encode_cursor(self.page_rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset_mode:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page_rows:
+            return None
+        return self.encode_cursor(self.page_rows[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset_mode:
+            return super().get_paginated_response(data)
+        payload = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
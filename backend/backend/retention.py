@@ -0,0 +1,199 @@
+# Data retention policies and the chunked purge engine
+"""
+Retention engine for tables that only ever grow.
+
+Each RetentionPolicy names a model, the rows that are eligible (filters) and the
+timestamp column whose age decides expiry. purge() deletes eligible rows in bounded
+chunks, walking the timestamp index oldest first, committing each chunk on its own
+and sleeping between chunks. That keeps locks short and gives replicas time to
+catch up instead of one long DELETE.
+
+Retention periods (days) can be overridden per policy with the DATA_RETENTION_DAYS
+setting, e.g. {'guest_carts': 14}. Run with `python manage.py purge_stale_data`.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionPolicy:
+    """Rows of `model` matching `filters` whose `timestamp_field` is older than `days`."""
+
+    def __init__(self, name, model, timestamp_field, days, filters=None, description=''):
+        self.name = name
+        self.model_label = model
+        self.timestamp_field = timestamp_field
+        self.default_days = days
+        self.filters = filters or Q()
+        self.description = description
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def days(self):
+        return getattr(settings, 'DATA_RETENTION_DAYS', {}).get(self.name, self.default_days)
+
+    def cutoff(self, now=None):
+        return (now or timezone.now()) - timedelta(days=self.days)
+
+    def queryset(self, now=None):
+        """Eligible rows, oldest first, in the order the timestamp index returns them."""
+        return (
+            self.model._base_manager
+            .filter(self.filters, **{f'{self.timestamp_field}__lt': self.cutoff(now)})
+            .order_by(self.timestamp_field, 'pk')
+        )
+
+
+POLICIES = [
+    RetentionPolicy(
+        'guest_carts', 'carts.Cart', 'updated_at', 30,
+        filters=Q(user__isnull=True),
+        description='Guest carts untouched for the retention period (their items cascade)',
+    ),
+    RetentionPolicy(
+        # Reservations live for minutes, so created_at is as good as the settle time
+        'settled_reservations', 'orders.InventoryReservation', 'created_at', 90,
+        filters=Q(is_active=False) & (Q(fulfilled_at__isnull=False) | Q(cancelled_at__isnull=False)),
+        description='Fulfilled or cancelled inventory reservations',
+    ),
+    RetentionPolicy(
+        'read_notifications', 'notifications_app.Notification', 'created_at', 90,
+        filters=Q(is_read=True),
+        description='Notifications the user has already read',
+    ),
+    RetentionPolicy(
+        'stale_notifications', 'notifications_app.Notification', 'created_at', 365,
+        description='Any notification older than the retention period',
+    ),
+    RetentionPolicy(
+        # History older than this is answered from daily inventory snapshots
+        'inventory_movements', 'orders.InventoryMovement', 'created_at', 365,
+        description='Inventory ledger entries',
+    ),
+    RetentionPolicy(
+        'inventory_snapshots', 'orders.InventorySnapshot', 'taken_at', 730,
+        description='Periodic inventory stock snapshots',
+    ),
+    RetentionPolicy(
+        'outbound_emails', 'outbox.OutboundEmail', 'updated_at', 30,
+        filters=Q(status__in=['sent', 'failed']),
+        description='Delivered or permanently failed outbox emails',
+    ),
+    RetentionPolicy(
+        # Only the job rows; artifacts are deleted by run_export_jobs when they expire
+        'export_jobs', 'exports.ExportJob', 'created_at', 90,
+        filters=Q(status__in=['expired', 'failed']),
+        description='Expired or failed report export jobs',
+    ),
+    RetentionPolicy(
+        'finished_jobs', 'jobs.Job', 'finished_at', 14,
+        filters=Q(status__in=['succeeded', 'failed', 'cancelled']),
+        description='Finished background jobs (aggregates stay in job metrics)',
+    ),
+    RetentionPolicy(
+        'job_metrics', 'jobs.JobMetric', 'bucket', 180,
+        description='Hourly background job metrics',
+    ),
+]
+
+
+def get_policies(names=None):
+    """Policies by name, all of them when names is empty. Unknown names raise KeyError."""
+    if not names:
+        return list(POLICIES)
+    by_name = {policy.name: policy for policy in POLICIES}
+    return [by_name[name] for name in names]
+
+
+def average_row_bytes(model):
+    """
+    Average on-disk bytes per row (table, indexes and TOAST) from the planner statistics,
+    or None where that is unavailable (non-PostgreSQL, never-analyzed tables).
+    """
+    connection = connections[model._base_manager.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_total_relation_size(c.oid), c.reltuples FROM pg_class c WHERE c.oid = %s::regclass",
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if not row or not row[1] or row[1] <= 0:
+        return None
+    return row[0] / row[1]
+
+
+class PurgeResult:
+    """Outcome of purging one policy."""
+
+    def __init__(self, policy, dry_run=False):
+        self.policy = policy
+        self.dry_run = dry_run
+        self.rows = {}        # model label -> rows deleted (cascades included)
+        self.chunks = 0
+        self.elapsed = 0.0
+        self._row_bytes = {}
+
+    @property
+    def total_rows(self):
+        return sum(self.rows.values())
+
+    @property
+    def bytes_reclaimed(self):
+        """Estimated bytes freed for reuse, or None if no estimate is available."""
+        estimates = [self._row_bytes.get(label) for label in self.rows if self.rows[label]]
+        if not estimates or any(estimate is None for estimate in estimates):
+            return None
+        return int(sum(self.rows[label] * self._row_bytes[label] for label in self.rows if self.rows[label]))
+
+    def add(self, counts):
+        for label, count in counts.items():
+            if label not in self._row_bytes:
+                self._row_bytes[label] = average_row_bytes(apps.get_model(label))
+            self.rows[label] = self.rows.get(label, 0) + count
+
+
+def purge(policy, chunk_size=1000, pause=0.5, dry_run=False, max_chunks=None, now=None):
+    """
+    Delete the rows `policy` makes eligible, `chunk_size` at a time, sleeping `pause`
+    seconds between chunks. Each chunk selects primary keys from the timestamp index
+    and deletes them in its own transaction. dry_run only counts eligible rows.
+    """
+    result = PurgeResult(policy, dry_run=dry_run)
+    started = time.monotonic()
+    queryset = policy.queryset(now)
+
+    if dry_run:
+        result.add({policy.model._meta.label: queryset.count()})
+        result.elapsed = time.monotonic() - started
+        return result
+
+    model = policy.model
+    while max_chunks is None or result.chunks < max_chunks:
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            break
+        with transaction.atomic(using=queryset.db):
+            _, counts = model._base_manager.filter(pk__in=pks).delete()
+        result.add(counts)
+        result.chunks += 1
+        logger.info(f"Retention {policy.name}: chunk {result.chunks} deleted {sum(counts.values())} rows")
+        if len(pks) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    result.elapsed = time.monotonic() - started
+    return result
@@ -40,7 +40,7 @@ if not DEBUG:
     SECURE_CONTENT_TYPE_NOSNIFF = True
     SECURE_HSTS_INCLUDE_SUBDOMAINS = True
     SECURE_HSTS_SECONDS = 31536000  # 1 year
-    SECURE_REDIRECT_EXEMPT = []
+    SECURE_REDIRECT_EXEMPT = [r'^metrics$']  # Scraped over plain HTTP from inside the network
     SECURE_SSL_REDIRECT = True
     SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
     USE_TLS = True
@@ -84,11 +84,16 @@ INSTALLED_APPS = [
     'notifications_app.apps.NotificationsAppConfig',
     'languages.apps.LanguagesConfig',  # Language management app
     'analytics.apps.AnalyticsConfig',  # Site analytics (events & dashboard)
+    'exports.apps.ExportsConfig',  # Background report exports
+    'outbox.apps.OutboxConfig',  # Transactional email outbox
+    'jobs.apps.JobsConfig',  # Background job runner (`manage.py run_jobs`)
     # 'bootstrap5', # For Django Bootstrap 5 integration
     # ... other apps (drops, carts, orders, notifications_app)
 ]
 
 MIDDLEWARE = [
+    'backend.metrics.MetricsMiddleware',  # Prometheus request metrics; first so it times the whole stack
+    'backend.sql_profiler.SQLProfilerMiddleware',  # Opt-in per-request SQL profiling (header or sampling)
     'corsheaders.middleware.CorsMiddleware', # Should be high, but after SecurityMiddleware if it has implications
     'django.middleware.security.SecurityMiddleware',
     'django.middleware.cache.UpdateCacheMiddleware',  # Cache middleware for better performance
@@ -203,7 +208,7 @@ AUTH_USER_MODEL = 'users.User'
 # Django REST Framework Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.token_claims.ClaimsJWTAuthentication',  # JWTAuthentication without the per-request user query
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -253,8 +258,18 @@ SIMPLE_JWT = {
     # Token validation
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+
+    # Tokens carry the auth flags ClaimsJWTAuthentication reads (users/authentication.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'users.authentication.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.authentication.ClaimsTokenRefreshSerializer',
 }
 
+# Token-claims user for JWT requests (users/authentication.py). Claims are trusted
+# while the token's auth version is current; a change reaches every worker within
+# JWT_CLAIMS_LOCAL_SECONDS. Set JWT_CLAIMS_AUTH=False to load the user row per request.
+JWT_CLAIMS_AUTH = os.getenv('JWT_CLAIMS_AUTH', 'True').lower() in ('true', '1', 'yes')
+JWT_CLAIMS_LOCAL_SECONDS = int(os.getenv('JWT_CLAIMS_LOCAL_SECONDS', '5'))
+
 
 # CORS Settings - Updated to handle both www and non-www domains
 # For development, allow localhost and 127.0.0.1 on port 3000
@@ -290,6 +305,7 @@ CORS_ALLOWED_HEADERS = [
     'range',
     'pragma',
     'expires',
+    'x-checkout-token',  # Drop waiting room (drops/waiting_room.py)
 ]
 
 
@@ -369,6 +385,17 @@ DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@malikli.com')
 # Resend API Configuration (for direct API usage if needed)
 RESEND_API_KEY = os.getenv('RESEND_API_KEY', '')
 
+# Transactional email outbox (outbox/, `manage.py send_queued_emails`).
+# Provider by dotted path; empty picks the Resend batch API when RESEND_API_KEY is
+# set and EMAIL_BACKEND otherwise. 'outbox.providers.FakeProvider' records instead of sending.
+EMAIL_OUTBOX_PROVIDER = os.getenv('EMAIL_OUTBOX_PROVIDER', '')
+EMAIL_OUTBOX_BATCH_SIZE = 100  # Resend accepts at most 100 emails per batch request
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = 30  # Doubles per attempt...
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = 60 * 60  # ...up to an hour
+EMAIL_OUTBOX_RATE_LIMIT = 2  # Provider calls per second per worker (Resend's default API limit)
+EMAIL_OUTBOX_REDACT_CATEGORIES = ['waitlist_welcome']  # Bodies with passwords are blanked once sent
+
 # Email settings for better deliverability
 EMAIL_TIMEOUT = 30
 EMAIL_SSL_KEYFILE = None
@@ -467,7 +494,8 @@ LOGGING = {
 # Cache configuration
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache' if os.getenv('REDIS_URL') else 'django.core.cache.backends.locmem.LocMemCache',
+        # django-redis (its CLIENT_CLASS below), which also exposes the raw client (backend/sql_profiler.py)
+        'BACKEND': 'django_redis.cache.RedisCache' if os.getenv('REDIS_URL') else 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': os.getenv('REDIS_URL', 'locmem://'),
         'TIMEOUT': 300,  # 5 minutes default timeout
         'OPTIONS': {
@@ -488,6 +516,59 @@ if os.getenv('REDIS_URL'):
     SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
     SESSION_CACHE_ALIAS = 'default'
 
+# Guest cart storage: 'database' (Cart rows) or 'cache' (see carts/guest_store.py).
+# Cache-resident carts are only written to the database at login merge or checkout;
+# use 'cache' with Redis, since LocMemCache is not shared between worker processes.
+GUEST_CART_STORAGE = os.getenv('GUEST_CART_STORAGE', 'database')
+GUEST_CART_CACHE_ALIAS = 'default'
+GUEST_CART_TTL = int(os.getenv('GUEST_CART_TTL', str(60 * 60 * 24 * 7)))  # 7 days since last change
+
+# Seconds a stock snapshot served by inventory/check-stock/ may be reused (orders/inventory.py)
+INVENTORY_SNAPSHOT_CACHE_SECONDS = int(os.getenv('INVENTORY_SNAPSHOT_CACHE_SECONDS', '5'))
+# Seconds the inventory dashboard figures may be reused; any stock change drops them sooner
+INVENTORY_STATS_CACHE_SECONDS = int(os.getenv('INVENTORY_STATS_CACHE_SECONDS', '30'))
+
+# Drop launches (drops/launch.py): public drop payloads are cached for
+# DROP_PAYLOAD_CACHE_SECONDS and re-rendered by the drops.launch job for drops that
+# are live or start within DROP_PREWARM_MINUTES; browsers and the page cache may
+# reuse them for DROP_PAGE_CACHE_SECONDS.
+DROP_PAYLOAD_CACHE_SECONDS = int(os.getenv('DROP_PAYLOAD_CACHE_SECONDS', '120'))
+DROP_PREWARM_MINUTES = int(os.getenv('DROP_PREWARM_MINUTES', '15'))
+DROP_PAGE_CACHE_SECONDS = int(os.getenv('DROP_PAGE_CACHE_SECONDS', '5'))
+# Waiting room (drops/waiting_room.py) for drops with admission_rate_per_minute set:
+# places admitted at once when the drop starts (and unused admissions kept at most),
+# and how long a checkout token stays valid
+DROP_ADMISSION_BURST = int(os.getenv('DROP_ADMISSION_BURST', '20'))
+DROP_CHECKOUT_TOKEN_SECONDS = int(os.getenv('DROP_CHECKOUT_TOKEN_SECONDS', '900'))
+
+# Prometheus /metrics (backend/metrics.py). With METRICS_TOKEN set, scrapers must
+# send `Authorization: Bearer <token>`; without it the endpoint is closed unless DEBUG
+# is on, and then only METRICS_ALLOWED_IPS may scrape (REMOTE_ADDR, so not behind a proxy).
+# Under gunicorn also set PROMETHEUS_MULTIPROC_DIR so all workers' samples are merged.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+
+# SQL profiler (backend/sql_profiler.py). Requests are profiled when they send
+# `X-SQL-Profile: <SQL_PROFILER_TOKEN>` (any value under DEBUG without a token) or
+# are sampled; admins read the newest profiles at /api/v1/admin/sql-profiles/.
+# SQL_PROFILER_STRICT_REPEATS > 0 raises when one query repeats more than that in a request.
+SQL_PROFILER_TOKEN = os.getenv('SQL_PROFILER_TOKEN', '')
+SQL_PROFILER_SAMPLE_RATE = float(os.getenv('SQL_PROFILER_SAMPLE_RATE', '0'))
+SQL_PROFILER_BUFFER_SIZE = int(os.getenv('SQL_PROFILER_BUFFER_SIZE', '200'))
+SQL_PROFILER_STRICT_REPEATS = int(os.getenv('SQL_PROFILER_STRICT_REPEATS', '0'))
+
+# Retention periods in days for `manage.py purge_stale_data`, overriding the
+# defaults in backend/retention.py (guest_carts, settled_reservations,
+# read_notifications, stale_notifications, inventory_movements,
+# inventory_snapshots, outbound_emails, export_jobs, finished_jobs, job_metrics)
+DATA_RETENTION_DAYS = {}
+
+# Background report exports (exports/runner.py, `manage.py run_export_jobs`).
+# Artifacts are deleted this many seconds after they finish; a running job that
+# reports no progress for EXPORT_JOB_STALE_SECONDS is handed to another worker.
+EXPORT_ARTIFACT_TTL = int(os.getenv('EXPORT_ARTIFACT_TTL', str(60 * 60 * 24)))  # 24 hours
+EXPORT_JOB_STALE_SECONDS = 15 * 60
+
 # Database optimization settings
 if 'default' in DATABASES:
     DATABASES['default']['CONN_MAX_AGE'] = 600  # Connection pooling - reuse connections for 10 minutes
@@ -529,6 +610,15 @@ EUR_TO_BYN_FALLBACK_RATE = os.getenv('EUR_TO_BYN_FALLBACK_RATE', '3.8')
 EXCHANGE_RATE_API_KEY = os.getenv('EXCHANGE_RATE_API_KEY', None)
 CURRENCY_CACHE_TIMEOUT = int(os.getenv('CURRENCY_CACHE_TIMEOUT', '36000'))  # 10 hours
 
+# Async payment and currency views (orders/async_views.py), mounted instead of the
+# sync DRF views when ASYNC_VIEWS is on; backend/asgi.py turns it on, so deploy
+# with an ASGI server (e.g. gunicorn -k uvicorn.workers.UvicornWorker backend.asgi:application).
+# Their PayPro and rate API calls share one pooled client per process (backend/http_client.py).
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False').lower() in ('true', '1', 'yes')
+HTTP_CLIENT_TIMEOUT = int(os.getenv('HTTP_CLIENT_TIMEOUT', '30'))
+HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv('HTTP_CLIENT_MAX_CONNECTIONS', '200'))
+HTTP_CLIENT_MAX_KEEPALIVE = int(os.getenv('HTTP_CLIENT_MAX_KEEPALIVE', '50'))
+
 # ============================================================================
 # END PAYPRO CONFIGURATION
 # ============================================================================
@@ -0,0 +1,296 @@
+# Per-request SQL profiling and N+1 detection
+"""
+Opt-in SQL profiler.
+
+SQLProfilerMiddleware profiles a request when:
+
+- it carries an `X-SQL-Profile` header matching SQL_PROFILER_TOKEN (any value
+  when DEBUG is on and no token is configured), or
+- it is picked by SQL_PROFILER_SAMPLE_RATE (0.0 - 1.0, default off).
+
+A profile holds the query count, total DB time and the most repeated query
+fingerprints, each with the project call sites that issued it. Profiles go to a
+ring buffer in the default cache (the newest SQL_PROFILER_BUFFER_SIZE are kept,
+shared by all workers when the cache is Redis) and can be read by admins at
+GET /api/v1/admin/sql-profiles/. A profiled response carries X-SQL-Queries and
+X-SQL-Time-Ms headers.
+
+Strict mode: with SQL_PROFILER_STRICT_REPEATS = N, every request is checked and
+one that runs the same fingerprint more than N times raises RepeatedQueryError,
+which the test client re-raises - use it with override_settings in tests to keep
+N+1s from coming back.
+"""
+import hmac
+import json
+import random
+import re
+import sys
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+from django.views.decorators.cache import never_cache
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.fields import Field
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+
+from backend import metrics
+from backend.metrics import route_of
+
+BUFFER_KEY = 'sql_profiler:profiles'
+TOP_FINGERPRINTS = 10
+CALL_SITE_DEPTH = 3
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+class RepeatedQueryError(Exception):
+    """A query fingerprint ran more often in one request than SQL_PROFILER_STRICT_REPEATS allows."""
+
+
+def fingerprint(sql):
+    """The query with literals and IN-list lengths removed, so repeats of one N+1 compare equal."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _project_root():
+    return str(settings.BASE_DIR)
+
+
+# Execute wrappers sit between the query and the code that issued it
+_WRAPPER_FILES = {__file__, metrics.__file__}
+
+
+def call_site(root):
+    """
+    Where the query came from: the serializer field being rendered (N+1s mostly
+    start in DRF's attribute lookups) and the innermost project frames.
+    """
+    frames = []
+    field_site = None
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < CALL_SITE_DEPTH:
+        filename = frame.f_code.co_filename
+        if filename.startswith(root) and 'site-packages' not in filename:
+            if filename not in _WRAPPER_FILES:
+                frames.append(f'{filename[len(root) + 1:]}:{frame.f_lineno} in {frame.f_code.co_name}')
+        elif field_site is None and 'rest_framework' in filename:
+            field = frame.f_locals.get('self')
+            if isinstance(field, Field) and field.parent is not None:
+                field_site = f'{type(field.parent).__name__}.{field.field_name}'
+        frame = frame.f_back
+    if field_site:
+        frames.insert(0, field_site)
+    return ' < '.join(frames) or 'unknown'
+
+
+class QueryProfile:
+    """Database execute_wrapper collecting per-fingerprint counts, time and call sites."""
+
+    def __init__(self):
+        self.root = _project_root()
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            key = fingerprint(sql)
+            entry = self.fingerprints.get(key)
+            if entry is None:
+                entry = self.fingerprints[key] = {'count': 0, 'seconds': 0.0, 'sql': sql, 'call_sites': Counter()}
+            entry['count'] += 1
+            entry['seconds'] += elapsed
+            entry['call_sites'][call_site(self.root)] += 1
+
+    def top(self, limit=TOP_FINGERPRINTS):
+        ranked = sorted(self.fingerprints.items(), key=lambda item: (-item[1]['count'], -item[1]['seconds']))
+        return [
+            {
+                'fingerprint': key,
+                'count': entry['count'],
+                'ms': round(entry['seconds'] * 1000, 2),
+                'sql': entry['sql'][:2000],
+                'call_sites': dict(entry['call_sites'].most_common(5)),
+            }
+            for key, entry in ranked[:limit]
+        ]
+
+    def worst_repeat(self):
+        if not self.fingerprints:
+            return None, 0
+        key, entry = max(self.fingerprints.items(), key=lambda item: item[1]['count'])
+        return key, entry['count']
+
+
+def should_profile(request):
+    header = request.META.get('HTTP_X_SQL_PROFILE')
+    if header:
+        token = getattr(settings, 'SQL_PROFILER_TOKEN', '')
+        if (token and hmac.compare_digest(header.encode(), token.encode())) or (not token and settings.DEBUG):
+            return True
+    rate = getattr(settings, 'SQL_PROFILER_SAMPLE_RATE', 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def redis_client():
+    """The raw Redis client behind the default cache (django-redis), or None for other backends."""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except (ImportError, NotImplementedError):
+        return None
+
+
+def store_profile(profile):
+    """
+    Push onto the ring buffer, dropping the oldest entries beyond SQL_PROFILER_BUFFER_SIZE.
+    On Redis this is one LPUSH + LTRIM transaction, so concurrent workers never drop
+    each other's profiles; other caches (LocMem, per process) rewrite the whole list.
+    """
+    size = getattr(settings, 'SQL_PROFILER_BUFFER_SIZE', 200)
+    client = redis_client()
+    if client is not None:
+        key = cache.make_key(BUFFER_KEY)
+        pipe = client.pipeline()
+        pipe.lpush(key, json.dumps(profile))
+        pipe.ltrim(key, 0, size - 1)
+        pipe.execute()
+        return
+    profiles = cache.get(BUFFER_KEY) or []
+    profiles.insert(0, profile)
+    cache.set(BUFFER_KEY, profiles[:size], None)
+
+
+def load_profiles():
+    """The buffered profiles, newest first."""
+    client = redis_client()
+    if client is not None:
+        return [json.loads(item) for item in client.lrange(cache.make_key(BUFFER_KEY), 0, -1)]
+    return cache.get(BUFFER_KEY) or []
+
+
+class SQLProfilerMiddleware:
+    """
+    Profiles sampled or requested requests (see module docstring). Place it right
+    after MetricsMiddleware so middleware queries (sessions, auth) are included.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        strict = getattr(settings, 'SQL_PROFILER_STRICT_REPEATS', 0)
+        record = should_profile(request)
+        if not (record or strict):
+            return self.get_response(request)
+
+        profile = QueryProfile()
+        started = time.perf_counter()
+        with connections['default'].execute_wrapper(profile):
+            response = self.get_response(request)
+        return self.finish(request, response, profile, time.perf_counter() - started, record, strict)
+
+    async def __acall__(self, request):
+        strict = getattr(settings, 'SQL_PROFILER_STRICT_REPEATS', 0)
+        record = should_profile(request)
+        if not (record or strict):
+            return await self.get_response(request)
+
+        profile = QueryProfile()
+        started = time.perf_counter()
+        # The ORM runs on the request's sync_to_async thread; profile that thread's connection
+        stack = ExitStack()
+        await sync_to_async(lambda: stack.enter_context(connections['default'].execute_wrapper(profile)))()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return await sync_to_async(self.finish)(request, response, profile, time.perf_counter() - started, record, strict)
+
+    @staticmethod
+    def finish(request, response, profile, duration, record, strict):
+        if record:
+            profile_id = uuid.uuid4().hex[:12]
+            store_profile({
+                'id': profile_id,
+                'at': timezone.now().isoformat(),
+                'method': request.method,
+                'path': request.get_full_path()[:500],
+                'route': route_of(request),
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+                'queries': profile.count,
+                'db_ms': round(profile.seconds * 1000, 2),
+                'top': profile.top(),
+            })
+            response['X-SQL-Profile'] = profile_id
+            response['X-SQL-Queries'] = str(profile.count)
+            response['X-SQL-Time-Ms'] = f'{profile.seconds * 1000:.1f}'
+
+        if strict:
+            key, repeats = profile.worst_repeat()
+            if repeats > strict:
+                sites = profile.fingerprints[key]['call_sites'].most_common(3)
+                raise RepeatedQueryError(
+                    f"{request.method} {request.path} ran the same query {repeats} times "
+                    f"(limit {strict}): {key[:300]} - from {sites}"
+                )
+        return response
+
+
+@never_cache
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def sql_profiles(request):
+    """
+    GET lists recorded profiles, newest first (?route= and ?min_queries= filter,
+    ?id= returns one). DELETE empties the buffer.
+    """
+    if request.method == 'DELETE':
+        cache.delete(BUFFER_KEY)
+        return Response(status=204)
+
+    profiles = load_profiles()
+    profile_id = request.query_params.get('id')
+    if profile_id:
+        match = next((p for p in profiles if p['id'] == profile_id), None)
+        if match is None:
+            return Response({'error': 'Profile not found'}, status=404)
+        return Response(match)
+
+    route = request.query_params.get('route')
+    if route:
+        profiles = [p for p in profiles if route in p['route']]
+    try:
+        min_queries = int(request.query_params.get('min_queries', 0))
+    except ValueError:
+        return Response({'error': 'min_queries must be an integer'}, status=400)
+    profiles = [p for p in profiles if p['queries'] >= min_queries]
+    return Response({'count': len(profiles), 'results': profiles})
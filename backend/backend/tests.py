@@ -0,0 +1,205 @@
+import base64
+import json
+from decimal import Decimal
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from benchmarks.fixtures import seed
+from jobs.models import Job
+from orders.models import Order
+from .pagination import KeysetPagination, estimate_count
+from .sql_profiler import BUFFER_KEY, RepeatedQueryError, SQLProfilerMiddleware, fingerprint, load_profiles, store_profile
+
+class ListRedis:
+    """The list commands of a Redis client, kept in memory; counts executed pipelines."""
+
+    def __init__(self):
+        self.lists = {}
+        self.transactions = 0
+        self.queued = []
+
+    def pipeline(self):
+        return self
+
+    def lpush(self, key, value):
+        self.queued.append(lambda: self.lists.setdefault(key, []).insert(0, value))
+
+    def ltrim(self, key, start, end):
+        self.queued.append(lambda: self.lists.__setitem__(key, self.lists.get(key, [])[start:end + 1]))
+
+    def execute(self):
+        for command in self.queued:
+            command()
+        self.queued = []
+        self.transactions += 1
+
+    def lrange(self, key, start, end):
+        return [value.encode() for value in self.lists.get(key, [])]
+
+
+# The site-wide page cache would answer repeated requests without running the view
+VIEW_MIDDLEWARE = [m for m in settings.MIDDLEWARE if not m.startswith('django.middleware.cache.')]
+
+
+def token(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def cursor_of(link):
+    return parse_qs(urlparse(link).query)['cursor'][0]
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        orders = [
+            Order.objects.create(subtotal_amount=Decimal('5.00'), total_amount=Decimal('5.00'))
+            for _ in range(5)
+        ]
+        # Three orders share a timestamp, so the pk decides their order
+        Order.objects.filter(pk__in=[order.pk for order in orders[:3]]).update(created_at=timezone.now())
+        self.expected = list(Order.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+    def paginate(self, **query):
+        paginator = KeysetPagination()
+        paginator.page_size = 2
+        request = Request(APIRequestFactory().get('/api/v1/admin/orders/', query))
+        rows = paginator.paginate_queryset(Order.objects.all(), request)
+        return paginator, [row.pk for row in rows]
+
+    def test_cursor_pages_cover_every_row_once_in_order(self):
+        paginator, seen = self.paginate(cursor='')
+        pages = [seen]
+        while paginator.get_next_link():
+            paginator, rows = self.paginate(cursor=cursor_of(paginator.get_next_link()))
+            pages.append(rows)
+        self.assertEqual([pk for page in pages for pk in page], self.expected)
+        self.assertEqual(len(pages), 3)
+
+        paginator, _ = self.paginate(cursor=cursor_of(self.paginate(cursor='')[0].get_next_link()))
+        previous, rows = self.paginate(cursor=cursor_of(paginator.get_previous_link()))
+        self.assertEqual(rows, pages[0])
+        self.assertIsNone(previous.get_previous_link())
+
+    def test_cursor_round_trips_the_row_position(self):
+        paginator, _ = self.paginate(cursor='')
+        row = paginator.page_rows[-1]
+        paginator.request = Request(APIRequestFactory().get('/', {'cursor': cursor_of(paginator.encode_cursor(row, reverse=True))}))
+        position, reverse = paginator.decode_cursor(paginator.request)
+        self.assertEqual(position, [row.created_at, row.pk])
+        self.assertTrue(reverse)
+
+    def test_page_numbers_and_invalid_cursors_through_the_view(self):
+        admin = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='pass1234')
+        self.client.force_authenticate(admin)
+        url = reverse('admin-order-list')
+
+        page = self.client.get(url, {'page': 1})
+        self.assertEqual(page.data['count'], 5)
+        self.assertEqual(len(page.data['results']), 5)
+
+        # Garbage, a position for another ordering, and a value the field can't parse
+        for cursor in ('not-base64!', token({'p': [1]}), token({'p': ['not-a-date', 1]})):
+            self.assertEqual(self.client.get(url, {'cursor': cursor}).status_code, 404, cursor)
+
+    def test_estimate_count_is_exact_off_postgres(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('PostgreSQL reads the planner estimate')
+        self.assertEqual(estimate_count(Order.objects.all()), 5)
+        self.assertEqual(estimate_count(Order.objects.filter(pk=self.expected[0])), 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, DEBUG=True, METRICS_TOKEN='', METRICS_ALLOWED_IPS=['127.0.0.1'])
+class MetricsEndpointTests(APITestCase):
+    def test_scrape_reports_requests_and_queue_depth(self):
+        Job.objects.create(task='orders.expire_reservations', run_at=timezone.now())
+        self.client.get(reverse('category-tree'))
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{', body)
+        self.assertIn('route="api/v1/categories/tree/"', body)
+        self.assertIn('job_queue_depth{status="queued",task="orders.expire_reservations"} 1.0', body)
+
+    def test_scrape_is_restricted(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 403)
+        with self.settings(DEBUG=False):
+            # Without a token the allowlist only applies under DEBUG
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with self.settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cre').status_code, 403)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret', REMOTE_ADDR='10.0.0.5')
+            self.assertEqual(response.status_code, 200)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, MIDDLEWARE=VIEW_MIDDLEWARE, SQL_PROFILER_TOKEN='profile-me')
+class SQLProfilerTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_profiled_request_lands_in_admin_buffer(self):
+        self.assertNotIn('X-SQL-Profile', self.client.get(reverse('drop-list')))  # Not sampled, no header
+        self.assertNotIn('X-SQL-Profile', self.client.get(reverse('drop-list'), HTTP_X_SQL_PROFILE='profile-m'))
+
+        response = self.client.get(reverse('drop-list'), HTTP_X_SQL_PROFILE='profile-me')
+        profile_id = response['X-SQL-Profile']
+        self.assertGreater(int(response['X-SQL-Queries']), 0)
+
+        self.client.force_authenticate(self.data.admin)
+        listing = self.client.get(reverse('admin-sql-profiles')).json()
+        self.assertEqual(listing['count'], 1)
+        profile = self.client.get(reverse('admin-sql-profiles'), {'id': profile_id}).json()
+        self.assertEqual(profile['route'], 'api/v1/drops/')
+        worst = profile['top'][0]
+        self.assertGreater(worst['count'], 1)
+        self.assertTrue(worst['call_sites'])
+
+        self.client.force_authenticate(self.data.customer)
+        self.assertEqual(self.client.get(reverse('admin-sql-profiles')).status_code, 403)
+
+    @override_settings(SQL_PROFILER_BUFFER_SIZE=2)
+    def test_redis_buffer_is_pushed_and_trimmed_in_one_transaction(self):
+        redis = ListRedis()
+        with patch('backend.sql_profiler.redis_client', return_value=redis):
+            for n in range(3):
+                store_profile({'id': str(n)})
+            self.assertEqual([p['id'] for p in load_profiles()], ['2', '1'])
+        self.assertEqual(redis.transactions, 3)
+        self.assertEqual(list(redis.lists), [cache.make_key(BUFFER_KEY)])
+
+    def test_strict_mode_raises_on_repeated_fingerprint(self):
+        User = get_user_model()
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 5 AND name = 'x' AND k IN (%s, %s)"),
+            fingerprint("SELECT * FROM t WHERE id = 12 AND name = 'y' AND k IN (%s)"),
+        )
+
+        def n_plus_one(request):
+            for user in (self.data.admin, self.data.customer):
+                User.objects.filter(pk=user.pk).exists()
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        with self.settings(SQL_PROFILER_STRICT_REPEATS=2):
+            SQLProfilerMiddleware(n_plus_one)(request)
+        with self.settings(SQL_PROFILER_STRICT_REPEATS=1):
+            with self.assertRaises(RepeatedQueryError):
+                SQLProfilerMiddleware(n_plus_one)(request)
@@ -20,8 +20,13 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from backend.metrics import metrics_view
+from backend.sql_profiler import sql_profiles
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),  # Prometheus scrape endpoint (backend/metrics.py)
+    path('api/v1/admin/sql-profiles/', sql_profiles, name='admin-sql-profiles'),  # backend/sql_profiler.py
     path('api/v1/auth/', include('users.urls')),  # Legacy /auth/ prefix for auth endpoints
     path('api/v1/users/', include('users.urls')),  # Added to satisfy frontend calls to /users/
     path('api/v1/', include('products.urls')), # Your products app URLs (root for products and categories)
@@ -31,6 +36,7 @@ urlpatterns = [
     path('api/v1/', include('notifications_app.urls')), # Uncomment when notifications app is ready
     path('api/v1/', include('languages.urls')), # Language management API
     path('api/v1/', include('analytics.urls')), # Analytics (events + dashboard)
+    path('api/v1/', include('exports.urls')),   # Background report exports (admin)
 ]
 
 # Only add this in development for serving media files locally
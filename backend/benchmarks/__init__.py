@@ -0,0 +1,13 @@
+"""
+Query-count / latency / memory regression benchmarks for the hot API endpoints.
+
+Seeds a realistic catalog (products with variants, images and translations, drops,
+carts, orders, analytics events) and measures each endpoint against the budgets in
+benchmarks/budgets.py. Runs on whatever DATABASE_URL points at (SQLite by default).
+
+Usage:
+    python manage.py test benchmarks                     # run the suite
+    BENCHMARK_SCALE=3 python manage.py test benchmarks   # 3x fixture volume
+    BENCHMARK_TIME_FACTOR=2 python manage.py test benchmarks   # relax time budgets on slow machines
+    python manage.py test --exclude-tag=benchmark        # everything else
+"""
@@ -0,0 +1,39 @@
+# benchmarks/budgets.py
+"""
+Per-endpoint budgets, measured on one warm request.
+
+queries  - ceiling on SQL statements. List endpoints are paginated or fixed-size in the
+           fixtures, so the count does not grow with BENCHMARK_SCALE and any new N+1
+           shows up immediately.
+ms       - wall-time ceiling in milliseconds (multiplied by BENCHMARK_TIME_FACTOR). Wall time
+           depends on the machine, so it is only asserted with BENCHMARK_ENFORCE_TIME=True
+           (e.g. on a dedicated CI runner); queries and peak_kb are always asserted.
+peak_kb  - tracemalloc peak for the request, in KiB
+
+These started as ratchets just above the measured baseline (drop_list still
+carries a known N+1). Tighten a budget in the same commit that
+makes an endpoint cheaper; never raise one to make a regression pass.
+
+BENCHMARK_REPORT=True logs a table of the measured values after the run.
+"""
+import os
+
+TIME_FACTOR = float(os.getenv('BENCHMARK_TIME_FACTOR', '1'))
+ENFORCE_TIME = os.getenv('BENCHMARK_ENFORCE_TIME', 'False').lower() in ('true', '1', 'yes')
+REPORT = os.getenv('BENCHMARK_REPORT', 'False').lower() in ('true', '1', 'yes')
+
+BUDGETS = {
+    'product_list':        {'queries': 55,   'ms': 500,  'peak_kb': 3500},
+    'product_detail':      {'queries': 12,   'ms': 200,  'peak_kb': 500},
+    'category_tree':       {'queries': 2,    'ms': 50,   'peak_kb': 200},
+    'drop_list':           {'queries': 1930, 'ms': 5000, 'peak_kb': 6000},
+    'drop_active':         {'queries': 0,    'ms': 100,  'peak_kb': 3500},
+    'cart_retrieve':       {'queries': 6,    'ms': 150,  'peak_kb': 500},
+    'cart_retrieve_expanded': {'queries': 45, 'ms': 400, 'peak_kb': 2200},
+    'cart_sync':           {'queries': 12,   'ms': 200,  'peak_kb': 600},
+    'stock_check':         {'queries': 2,    'ms': 150,  'peak_kb': 1000},
+    'product_export':      {'queries': 2,    'ms': 300,  'peak_kb': 600},
+    'order_list':          {'queries': 3,    'ms': 150,  'peak_kb': 500},
+    'checkout':            {'queries': 115,  'ms': 800,  'peak_kb': 800},
+    'analytics_dashboard': {'queries': 25,   'ms': 300,  'peak_kb': 400},
+}
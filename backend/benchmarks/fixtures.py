@@ -0,0 +1,170 @@
+# benchmarks/fixtures.py
+"""Bulk fixture seeding for the benchmark suite (bulk_create only, no per-row saves)."""
+import os
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from analytics.models import WebsiteEvent
+from carts.models import Cart, CartItem
+from drops.models import Drop, DropProduct
+from orders.models import Order, OrderItem, ShippingMethod
+from products.models import (
+    Category, CategoryTranslation, Color, Product, ProductImage,
+    ProductTranslation, ProductVariant, Size
+)
+from users.models import Address
+
+SCALE = max(1, int(os.getenv('BENCHMARK_SCALE', '1')))
+
+PRODUCTS = 200 * SCALE
+SIZES = ['S', 'M', 'L', 'XL']
+COLORS = [('Black', '#000000'), ('White', '#FFFFFF')]
+IMAGES_PER_PRODUCT = 2
+LANGUAGES = ['ru', 'en']
+DROPS = 3
+DROP_PRODUCTS_PER_DROP = 20
+ORDERS = 50 * SCALE
+ITEMS_PER_ORDER = 3
+CART_ITEMS = 10
+EVENTS = 1000 * SCALE
+
+
+class BenchmarkData:
+    """Handles to the seeded objects that the benchmark tests need."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def seed():
+    User = get_user_model()
+    admin = User.objects.create_superuser(username='bench-admin', email='bench-admin@example.com', password='bench-pass')
+    customer = User.objects.create_user(username='bench-customer', email='bench-customer@example.com', password='bench-pass')
+    address = Address.objects.create(
+        user=customer, address_type='shipping', recipient_name='Bench Customer',
+        street_address='1 Main St', city='Minsk', state_province='Minsk',
+        postal_code='220000', country_code='BY',
+    )
+    shipping_method = ShippingMethod.objects.create(name='Courier', cost=Decimal('5.00'))
+
+    # Category tree: 4 roots x 3 children
+    roots = [Category.objects.create(name=f'Bench Root {i}') for i in range(4)]
+    leaves = [
+        Category.objects.create(name=f'Bench Leaf {i}-{j}', parent_category=root)
+        for i, root in enumerate(roots) for j in range(3)
+    ]
+    CategoryTranslation.objects.bulk_create([
+        CategoryTranslation(category=category, language_code=lang, name=f'{category.name} [{lang}]')
+        for category in roots + leaves for lang in LANGUAGES
+    ])
+
+    sizes = Size.objects.bulk_create([Size(name=f'Bench {name}', display_order=i) for i, name in enumerate(SIZES)])
+    colors = Color.objects.bulk_create([
+        Color(name=f'Bench {name}', hex_code=code, display_order=i) for i, (name, code) in enumerate(COLORS)
+    ])
+
+    products = Product.objects.bulk_create([
+        Product(
+            name=f'Bench Product {i}', slug=f'bench-product-{i}', sku_prefix=f'BP{i:05d}',
+            description='Benchmark product description. ' * 5,
+            category=leaves[i % len(leaves)], base_price=Decimal('19.99') + i % 50,
+            tags=['bench', f'tag{i % 10}'],
+        )
+        for i in range(PRODUCTS)
+    ])
+    # SQLite and PostgreSQL both return primary keys from bulk_create
+    ProductTranslation.objects.bulk_create([
+        ProductTranslation(product=product, language_code=lang, name=f'{product.name} [{lang}]', description='...')
+        for product in products for lang in LANGUAGES
+    ])
+    ProductImage.objects.bulk_create([
+        ProductImage(
+            product=product, image=f'product_images/{product.slug}/{n}.webp',
+            display_order=n, is_primary=(n == 0),
+        )
+        for product in products for n in range(IMAGES_PER_PRODUCT)
+    ])
+    variants = ProductVariant.objects.bulk_create([
+        ProductVariant(
+            product=product, size=size, color=color,
+            sku_suffix=f'-{size.name[-2:].strip()}-{color.name[-5:]}',
+            stock_quantity=50, low_stock_threshold=5,
+        )
+        for product in products for size in sizes for color in colors
+    ])
+
+    now = timezone.now()
+    drops = [
+        Drop.objects.create(
+            name=f'Bench Drop {i}', status='active', is_public=True,
+            start_datetime=now - timedelta(days=1), end_datetime=now + timedelta(days=7),
+        )
+        for i in range(DROPS)
+    ]
+    drop_products = DropProduct.objects.bulk_create([
+        DropProduct(
+            drop=drop, product=products[d * DROP_PRODUCTS_PER_DROP + i],
+            variant=variants[(d * DROP_PRODUCTS_PER_DROP + i) * len(SIZES) * len(COLORS)],
+            drop_price=Decimal('29.99'), initial_stock_quantity=100, current_stock_quantity=100,
+        )
+        for d, drop in enumerate(drops) for i in range(DROP_PRODUCTS_PER_DROP)
+    ])
+
+    cart = Cart.objects.create(user=customer)
+    fill_cart(cart, variants, drop_products)
+
+    orders = []
+    for i in range(ORDERS):
+        orders.append(Order(
+            order_number=f'BENCH-{i:06d}', user=customer, shipping_address=address,
+            billing_address=address, shipping_method=shipping_method, shipping_cost=Decimal('5.00'),
+            subtotal_amount=Decimal('90.00'), total_amount=Decimal('95.00'),
+        ))
+    orders = Order.objects.bulk_create(orders)
+    order_items = []
+    for i, order in enumerate(orders):
+        for n in range(ITEMS_PER_ORDER):
+            if n == 0:
+                drop_product = drop_products[(i + n) % len(drop_products)]
+                order_items.append(OrderItem(
+                    order=order, drop_product=drop_product,
+                    product_name_snapshot=drop_product.product.name, sku_snapshot=drop_product.product.sku_prefix,
+                    quantity=1, price_per_unit=drop_product.drop_price, subtotal=drop_product.drop_price,
+                ))
+            else:
+                variant = variants[(i * ITEMS_PER_ORDER + n) % len(variants)]
+                order_items.append(OrderItem(
+                    order=order, product_id=variant.product_id, product_variant_id=variant.id,
+                    product_slug=variant.product.slug, color='Black', size='M',
+                    product_name_snapshot=variant.product.name, sku_snapshot=f'{variant.product.sku_prefix}{variant.sku_suffix}',
+                    quantity=1, price_per_unit=Decimal('30.00'), subtotal=Decimal('30.00'),
+                ))
+    OrderItem.objects.bulk_create(order_items)
+
+    WebsiteEvent.objects.bulk_create([
+        WebsiteEvent(event_type='click', path=f'/products/bench-product-{i % PRODUCTS}')
+        for i in range(EVENTS)
+    ])
+
+    return BenchmarkData(
+        admin=admin, customer=customer, address=address, shipping_method=shipping_method,
+        categories=roots + leaves, products=products, variants=variants, drops=drops,
+        drop_products=drop_products, cart=cart, orders=orders,
+    )
+
+
+def fill_cart(cart, variants, drop_products, count=CART_ITEMS):
+    """Half regular variants, half drop products."""
+    half = count // 2
+    CartItem.objects.bulk_create(
+        [
+            CartItem(cart=cart, product_variant=variants[i * 7], quantity=1, color='Black', size='M')
+            for i in range(half)
+        ] + [
+            CartItem(cart=cart, drop_product=drop_products[i], quantity=1)
+            for i in range(count - half)
+        ]
+    )
@@ -0,0 +1,174 @@
+# benchmarks/tests.py
+import gc
+import logging
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from carts.models import Cart
+from .budgets import BUDGETS, ENFORCE_TIME, REPORT, TIME_FACTOR
+from .fixtures import fill_cart, seed
+
+logger = logging.getLogger(__name__)
+
+RESULTS = []
+
+# The site-wide page cache would answer the measured (warm) request without running the view
+VIEW_MIDDLEWARE = [m for m in settings.MIDDLEWARE if not m.startswith('django.middleware.cache.')]
+
+
+@tag('benchmark')
+@override_settings(SECURE_SSL_REDIRECT=False, MIDDLEWARE=VIEW_MIDDLEWARE)
+class EndpointBudgetTests(APITestCase):
+    """Each test performs one warm request and fails if it exceeds its budget."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if REPORT and RESULTS:
+            lines = [f"{'endpoint':<22}{'queries':>9}{'ms':>10}{'peak KiB':>11}   ({connection.vendor})"]
+            for name, queries, ms, peak_kb in RESULTS:
+                budget = BUDGETS[name]
+                lines.append(
+                    f"{name:<22}{queries:>4}/{budget['queries']:<4}{ms:>10.1f}{peak_kb:>11.0f}"
+                )
+            logger.info('\n'.join(lines))
+
+    def measure(self, name, request, prepare=None):
+        """
+        Run `request` (a zero-arg callable) three times: a warm-up, a pass under query
+        capture and a timer, and a pass under tracemalloc (kept separate because
+        tracemalloc slows execution). `prepare` resets state before each pass and is
+        not measured.
+        """
+        if prepare:
+            prepare()
+        request()
+        if prepare:
+            prepare()
+        gc.collect()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = request()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        # Read now: the next request's request_started signal resets the query log
+        captured_queries = captured.captured_queries
+
+        if prepare:
+            prepare()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            request()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(response.status_code, 300, response.data if hasattr(response, 'data') else response.content)
+        queries, peak_kb = len(captured_queries), peak / 1024
+        RESULTS.append((name, queries, elapsed_ms, peak_kb))
+
+        budget = BUDGETS[name]
+        sql = '\n'.join(q['sql'][:200] for q in captured_queries[:50])
+        self.assertLessEqual(queries, budget['queries'], f"{name}: {queries} queries\n{sql}")
+        if ENFORCE_TIME:
+            self.assertLessEqual(elapsed_ms, budget['ms'] * TIME_FACTOR, f"{name}: {elapsed_ms:.1f} ms")
+        self.assertLessEqual(peak_kb, budget['peak_kb'], f"{name}: {peak_kb:.0f} KiB peak")
+        return response
+
+    def test_product_list(self):
+        self.measure('product_list', lambda: self.client.get(reverse('product-list')))
+
+    def test_product_detail(self):
+        slug = self.data.products[0].slug
+        self.measure('product_detail', lambda: self.client.get(reverse('product-detail', kwargs={'slug': slug})))
+
+    def test_category_tree(self):
+        self.measure('category_tree', lambda: self.client.get(reverse('category-tree')))
+
+    def test_drop_list(self):
+        self.measure('drop_list', lambda: self.client.get(reverse('drop-list')))
+
+    def test_drop_active(self):
+        # Served from the pre-rendered payload (drops/launch.py) the warm-up request leaves behind
+        self.measure('drop_active', lambda: self.client.get(reverse('drop-active-drops')))
+
+    def test_cart_retrieve(self):
+        self.client.force_authenticate(self.data.customer)
+        response = self.measure('cart_retrieve', lambda: self.client.get(reverse('cart-retrieve-my-cart')))
+        line = response.data['items'][0]
+        self.assertIn('product_name', line)
+        self.assertNotIn('product_variant_details', line)
+
+    def test_cart_retrieve_expanded(self):
+        self.client.force_authenticate(self.data.customer)
+        url = reverse('cart-retrieve-my-cart') + '?expand=details'
+        response = self.measure('cart_retrieve_expanded', lambda: self.client.get(url))
+        self.assertIn('product_variant_details', response.data['items'][0])
+
+    def test_cart_sync(self):
+        self.client.force_authenticate(self.data.customer)
+        items = [{'product_variant_id': v.id, 'quantity': 2} for v in self.data.variants[:5]]
+        items += [{'drop_product_id': dp.id, 'quantity': 1} for dp in self.data.drop_products[:5]]
+        self.measure(
+            'cart_sync',
+            lambda: self.client.post(reverse('cart-sync-cart'), {'items': items}, format='json'),
+        )
+
+    def test_stock_check(self):
+        items = [{'type': 'variant', 'id': v.id, 'quantity': 1} for v in self.data.variants[:200]]
+        items += [{'type': 'drop_product', 'id': dp.id, 'quantity': 1} for dp in self.data.drop_products[:100]]
+        response = self.measure(
+            'stock_check',
+            lambda: self.client.post(reverse('check-stock-availability'), {'items': items}, format='json'),
+            prepare=cache.clear,  # Measure the cold path; warm snapshots cost no queries
+        )
+        self.assertEqual(response.data['total_items_checked'], len(items))
+
+    def test_product_export(self):
+        self.client.force_authenticate(self.data.admin)
+
+        def export():
+            response = self.client.get(reverse('product-export-csv'))
+            response.data = b''.join(response.streaming_content)  # Streaming: consume inside the measurement
+            return response
+
+        response = self.measure('product_export', export)
+        self.assertEqual(response.data.count(b'\n'), len(self.data.products) + 1)
+
+    def test_order_list(self):
+        self.client.force_authenticate(self.data.customer)
+        self.measure('order_list', lambda: self.client.get(reverse('order-list')))
+
+    def test_checkout(self):
+        self.client.force_authenticate(self.data.customer)
+
+        def prepare():
+            Cart.objects.filter(user=self.data.customer).delete()
+            self.checkout_cart = Cart.objects.create(user=self.data.customer)
+            fill_cart(self.checkout_cart, self.data.variants, self.data.drop_products)
+
+        def checkout():
+            payload = {
+                'cart_id': str(self.checkout_cart.cart_id),
+                'shipping_address_id': self.data.address.id,
+                'shipping_method_id': self.data.shipping_method.id,
+            }
+            return self.client.post(reverse('create-order'), payload, format='json')
+
+        self.measure('checkout', checkout, prepare=prepare)
+
+    def test_analytics_dashboard(self):
+        self.client.force_authenticate(self.data.admin)
+        self.measure('analytics_dashboard', lambda: self.client.get(reverse('analytics-dashboard')))
@@ -15,7 +15,7 @@ class CartAdmin(admin.ModelAdmin):
     list_filter = ('user', 'created_at', 'updated_at')
     search_fields = ('cart_id', 'user__username', 'user__email')
     inlines = [CartItemInline]
-    readonly_fields = ('cart_id', 'created_at', 'updated_at')
+    readonly_fields = ('cart_id', 'item_count', 'subtotal', 'created_at', 'updated_at')
 
     def cart_id_short(self, obj):
         return str(obj.cart_id)[:8]
@@ -26,12 +26,14 @@ class CartAdmin(admin.ModelAdmin):
     user_display.short_description = 'User'
 
     def total_items_admin(self, obj):
-        return obj.total_items # Uses the property
+        return obj.item_count # Denormalized column
     total_items_admin.short_description = 'Total Items'
+    total_items_admin.admin_order_field = 'item_count'
 
     def subtotal_admin(self, obj):
-        return obj.subtotal # Uses the property
+        return obj.subtotal # Denormalized column
     subtotal_admin.short_description = 'Subtotal'
+    subtotal_admin.admin_order_field = 'subtotal'
 
 
 @admin.register(CartItem)
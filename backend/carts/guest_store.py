@@ -0,0 +1,265 @@
+# carts/guest_store.py
+"""
+Cache-resident guest carts.
+
+With GUEST_CART_STORAGE = 'cache', anonymous carts live in the cache (Redis when
+REDIS_URL is set, LocMemCache otherwise) as one compact record per cart that expires
+GUEST_CART_TTL seconds after its last change. Nothing is written to the carts tables
+until the cart is merged into a user's cart at login or checked out
+(GuestCartStore.persist). The default, 'database', keeps guest carts as Cart rows.
+
+Record layout, keyed by cart id:
+    {'c': created, 'u': updated, 'n': next line id,
+     'l': [[line id, drop_product_id, product_variant_id, quantity, color, color_code, size, added], ...]}
+Timestamps are integer epoch seconds.
+"""
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from backend.metrics import record_cache
+from drops.models import DropProduct
+from products.models import ProductVariant
+from .models import Cart, CartItem
+from .sync import CartSyncManager, line_key
+
+LINE_FIELDS = ('id', 'drop_product_id', 'product_variant_id', 'quantity', 'color', 'color_code', 'size', 'added')
+
+
+def _now():
+    return int(timezone.now().timestamp())
+
+
+def _datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def set_cart_items(cart, items):
+    """Put `items` in cart's prefetch cache, as a completed prefetch_related would."""
+    queryset = CartItem.objects.none()
+    queryset._result_cache = list(items)
+    queryset._prefetch_done = True
+    cart._prefetched_objects_cache = {'items': queryset}
+    return cart
+
+
+class GuestCart:
+    """
+    An anonymous cart held in the cache. Lines are plain dicts (see LINE_FIELDS);
+    as_cart() turns the cart into unsaved Cart/CartItem instances for serialization.
+    """
+    user = None
+    user_id = None
+
+    def __init__(self, cart_id=None, record=None):
+        record = record or {}
+        now = _now()
+        self.cart_id = uuid.UUID(str(cart_id)) if cart_id else uuid.uuid4()
+        self.created = record.get('c', now)
+        self.updated = record.get('u', now)
+        self.next_line_id = record.get('n', 1)
+        self.lines = [dict(zip(LINE_FIELDS, row)) for row in record.get('l', [])]
+
+    @property
+    def pk(self):
+        return self.cart_id
+
+    def to_record(self):
+        return {
+            'c': self.created,
+            'u': self.updated,
+            'n': self.next_line_id,
+            'l': [[line[field] for field in LINE_FIELDS] for line in self.lines],
+        }
+
+    # ------------------------------------------------------------------ lines
+
+    @staticmethod
+    def key_of(line):
+        return line_key(line['drop_product_id'], line['product_variant_id'], line['color'], line['size'])
+
+    def get_line(self, line_id):
+        for line in self.lines:
+            if str(line['id']) == str(line_id):
+                return line
+        return None
+
+    def find_line(self, drop_product_id=None, product_variant_id=None, color=None, size=None):
+        key = line_key(drop_product_id, product_variant_id, color, size)
+        for line in self.lines:
+            if self.key_of(line) == key:
+                return line
+        return None
+
+    def add_line(self, drop_product_id=None, product_variant_id=None, quantity=1,
+                 color=None, color_code=None, size=None):
+        line = dict(zip(LINE_FIELDS, (
+            self.next_line_id, drop_product_id, product_variant_id if not drop_product_id else None,
+            quantity, color, color_code, size, _now(),
+        )))
+        self.next_line_id += 1
+        self.lines.append(line)
+        return line
+
+    def remove_line(self, line):
+        self.lines.remove(line)
+
+    def clear(self):
+        self.lines = []
+
+    def sync_lines(self):
+        """Lines in CartSyncManager format, with their DropProduct/ProductVariant loaded."""
+        drop_ids = {line['drop_product_id'] for line in self.lines if line['drop_product_id']}
+        variant_ids = {line['product_variant_id'] for line in self.lines if line['product_variant_id']}
+        drop_products = DropProduct.objects.in_bulk(drop_ids) if drop_ids else {}
+        variants = ProductVariant.objects.in_bulk(variant_ids) if variant_ids else {}
+
+        lines = {}
+        for index, line in enumerate(self.lines):
+            drop_product = drop_products.get(line['drop_product_id'])
+            variant = variants.get(line['product_variant_id'])
+            if drop_product is None and variant is None:
+                continue  # Product was removed while the cart sat in the cache
+            lines[self.key_of(line)] = {
+                'index': index,
+                'item': None,
+                'drop_product': drop_product,
+                'product_variant': variant,
+                'quantity': line['quantity'],
+                'color': line['color'],
+                'color_code': line['color_code'],
+                'size': line['size'],
+            }
+        return lines
+
+    def apply_lines(self, lines, mode=CartSyncManager.REPLACE, cap_to_stock=False):
+        """In-memory counterpart of CartSyncManager.apply; saves the cart to the cache."""
+        existing = {self.key_of(line): line for line in self.lines}
+        created = updated = 0
+        for key, line in lines.items():
+            current = existing.pop(key, None)
+            if current is None:
+                self.add_line(
+                    drop_product_id=line['drop_product'].id if line['drop_product'] else None,
+                    product_variant_id=line['product_variant'].id if line['product_variant'] else None,
+                    quantity=line['quantity'], color=line['color'],
+                    color_code=line['color_code'], size=line['size'],
+                )
+                created += 1
+                continue
+
+            if mode == CartSyncManager.ADD:
+                quantity = current['quantity'] + line['quantity']
+                if cap_to_stock and line['drop_product']:
+                    quantity = min(quantity, line['drop_product'].current_stock_quantity)
+                color_code = current['color_code'] or line['color_code']
+            else:
+                quantity = line['quantity']
+                color_code = line['color_code']
+            if quantity != current['quantity'] or color_code != current['color_code']:
+                current['quantity'] = quantity
+                current['color_code'] = color_code
+                updated += 1
+
+        deleted = 0
+        if mode == CartSyncManager.REPLACE:
+            for line in existing.values():
+                self.remove_line(line)
+            deleted = len(existing)
+        self.save()
+        return {'created': created, 'updated': updated, 'deleted': deleted}
+
+    # ------------------------------------------------------------------ storage
+
+    def save(self):
+        self.updated = _now()
+        GuestCartStore.save(self)
+
+    def delete(self):
+        GuestCartStore.delete(self.cart_id)
+
+    def as_cart(self):
+        """
+        Unsaved Cart with its items already in the prefetch cache. The items only carry
+        foreign key ids; carts.views.load_cart_lines() loads the related objects and totals.
+        """
+        cart = Cart(cart_id=self.cart_id, created_at=_datetime(self.created), updated_at=_datetime(self.updated))
+        items = [
+            CartItem(
+                id=line['id'], cart=cart,
+                drop_product_id=line['drop_product_id'], product_variant_id=line['product_variant_id'],
+                quantity=line['quantity'], color=line['color'], color_code=line['color_code'],
+                size=line['size'], added_at=_datetime(line['added']),
+            )
+            for line in self.lines
+        ]
+        return set_cart_items(cart, items)
+
+
+class GuestCartStore:
+    """
+    Service class for reading and writing cache-resident guest carts
+    """
+    KEY_PREFIX = 'guest_cart'
+
+    @staticmethod
+    def enabled():
+        return getattr(settings, 'GUEST_CART_STORAGE', 'database') == 'cache'
+
+    @staticmethod
+    def cache():
+        return caches[getattr(settings, 'GUEST_CART_CACHE_ALIAS', 'default')]
+
+    @staticmethod
+    def key(cart_id):
+        return f'{GuestCartStore.KEY_PREFIX}:{cart_id}'
+
+    @staticmethod
+    def load(cart_id):
+        """The guest cart with this id, or None if it never existed or has expired."""
+        if not cart_id:
+            return None
+        try:
+            cart_id = uuid.UUID(str(cart_id))
+        except ValueError:
+            return None
+        record = GuestCartStore.cache().get(GuestCartStore.key(cart_id))
+        record_cache('guest_cart', hits=int(record is not None), misses=int(record is None))
+        return GuestCart(cart_id, record) if record is not None else None
+
+    @staticmethod
+    def save(guest_cart):
+        """Write the cart and restart its TTL."""
+        GuestCartStore.cache().set(
+            GuestCartStore.key(guest_cart.cart_id), guest_cart.to_record(),
+            timeout=getattr(settings, 'GUEST_CART_TTL', 60 * 60 * 24 * 7)
+        )
+
+    @staticmethod
+    def delete(cart_id):
+        GuestCartStore.cache().delete(GuestCartStore.key(cart_id))
+
+    @staticmethod
+    def persist(cart_id):
+        """
+        Move a cached guest cart into the database, keeping its cart id, and drop the
+        cache entry once the surrounding transaction commits (a rolled-back checkout
+        leaves the guest cart where it was). Returns the Cart, or None if no such
+        guest cart is cached.
+        """
+        guest_cart = GuestCartStore.load(cart_id)
+        if guest_cart is None:
+            return None
+        try:
+            with transaction.atomic():
+                cart = Cart.objects.create(cart_id=guest_cart.cart_id)
+                CartSyncManager.apply(cart, guest_cart.sync_lines(), CartSyncManager.REPLACE)
+        except IntegrityError:
+            # A concurrent request persisted the same cart first
+            return Cart.objects.filter(cart_id=guest_cart.cart_id).first()
+        transaction.on_commit(guest_cart.delete)
+        return cart
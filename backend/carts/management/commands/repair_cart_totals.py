@@ -0,0 +1,71 @@
+"""
+Django Management Command: Repair Cart Totals
+
+Cart.item_count and Cart.subtotal are denormalized from the cart's lines and kept
+up to date by CartItem.save()/delete(), CartSyncManager and the price signals in
+carts.signals. Writes that bypass those paths (raw SQL, queryset.update() on prices,
+cascaded deletes of products or drop products) can leave them stale. This command
+finds carts whose stored totals differ from their lines and recalculates them.
+
+Usage:
+    python manage.py repair_cart_totals
+    python manage.py repair_cart_totals --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from carts.models import Cart
+
+class Command(BaseCommand):
+    help = 'Recalculate denormalized cart totals that have drifted from their lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted carts without repairing them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of carts to recalculate per UPDATE (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        """Find and repair drifted cart totals."""
+        expected = Cart.totals_expressions()
+        drifted = (
+            Cart.objects
+            .annotate(expected_count=expected['item_count'], expected_subtotal=expected['subtotal'])
+            .exclude(item_count=F('expected_count'), subtotal=F('expected_subtotal'))
+            .order_by('pk')
+        )
+        rows = list(drifted.values_list('pk', 'item_count', 'expected_count', 'subtotal', 'expected_subtotal'))
+
+        if not rows:
+            self.stdout.write(self.style.SUCCESS('All cart totals are consistent'))
+            return
+
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(f'DRY RUN: Would repair {len(rows)} carts')
+            )
+            for pk, item_count, expected_count, subtotal, expected_subtotal in rows[:20]:
+                self.stdout.write(
+                    f'  Cart {pk}: items {item_count} -> {expected_count}, '
+                    f'subtotal {subtotal} -> {expected_subtotal}'
+                )
+            if len(rows) > 20:
+                self.stdout.write(f'  ... and {len(rows) - 20} more')
+            return
+
+        batch_size = max(options['batch_size'], 1)
+        cart_ids = [row[0] for row in rows]
+        repaired = 0
+        for start in range(0, len(cart_ids), batch_size):
+            repaired += Cart.recalculate_totals(cart_ids[start:start + batch_size])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully repaired totals for {repaired} carts')
+        )
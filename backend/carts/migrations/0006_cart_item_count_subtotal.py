@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:22
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def backfill_cart_totals(apps, schema_editor):
+    Cart = apps.get_model('carts', 'Cart')
+    CartItem = apps.get_model('carts', 'CartItem')
+    totals = {}
+    items = CartItem.objects.select_related('product_variant__product', 'drop_product').iterator(chunk_size=2000)
+    for item in items:
+        if item.product_variant_id:
+            unit_price = item.product_variant.product.base_price + item.product_variant.additional_price
+        elif item.drop_product_id:
+            unit_price = item.drop_product.drop_price
+        else:
+            unit_price = Decimal('0.00')
+        count, subtotal = totals.get(item.cart_id, (0, Decimal('0.00')))
+        totals[item.cart_id] = (count + item.quantity, subtotal + item.quantity * unit_price)
+
+    carts = list(Cart.objects.filter(pk__in=totals).only('pk'))
+    for cart in carts:
+        cart.item_count, cart.subtotal = totals[cart.pk]
+    Cart.objects.bulk_update(carts, ['item_count', 'subtotal'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carts', '0005_remove_cartitem_carts_carti_cart_id_f115bd_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carts', '0006_cart_item_count_subtotal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(condition=models.Q(('user__isnull', True)), fields=['updated_at'], name='carts_guest_updated_idx'),
+        ),
+    ]
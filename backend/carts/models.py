@@ -1,6 +1,9 @@
 # carts/models.py
 import uuid
+from decimal import Decimal
 from django.db import models
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Now
 from django.conf import settings # To get AUTH_USER_MODEL
 from drops.models import DropProduct # Items in the cart are specific DropProducts
 from products.models import ProductVariant # For product variant selections
@@ -17,6 +20,18 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     # expires_at = models.DateTimeField(null=True, blank=True) # For auto-clearing old carts
+    # Denormalized totals, recalculated whenever lines or referenced prices change
+    # (see recalculate_totals and carts.signals); repair with `manage.py repair_cart_totals`
+    item_count = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+
+    TOTAL_FIELDS = ['item_count', 'subtotal']
+
+    class Meta:
+        indexes = [
+            # Retention purge walks abandoned guest carts oldest first (backend/retention.py)
+            models.Index(fields=['updated_at'], condition=models.Q(user__isnull=True), name='carts_guest_updated_idx'),
+        ]
 
     def __str__(self):
         if self.user:
@@ -25,11 +40,39 @@ class Cart(models.Model):
 
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.item_count
 
-    @property
-    def subtotal(self):
-        return sum(item.total_price for item in self.items.all())
+    @classmethod
+    def totals_expressions(cls):
+        """Correlated subqueries computing item_count/subtotal from a cart's lines."""
+        lines = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        item_count = lines.annotate(total=Sum('quantity')).values('total')
+        subtotal = lines.annotate(total=Sum(CartItem.line_total_expression())).values('total')
+        return {
+            'item_count': Coalesce(Subquery(item_count), 0),
+            'subtotal': Coalesce(
+                Subquery(subtotal), Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=10, decimal_places=2)
+            ),
+        }
+
+    @classmethod
+    def recalculate_totals(cls, carts, touch=False):
+        """
+        Recompute item_count/subtotal for `carts` (cart ids or a queryset) in a single
+        UPDATE. Returns the number of carts updated. touch=True also bumps updated_at:
+        pass it for line changes, not price changes, since the guest cart retention
+        policy expires carts by updated_at (backend/retention.py).
+        """
+        values = cls.totals_expressions()
+        if touch:
+            values['updated_at'] = Now()
+        return cls.objects.filter(pk__in=carts).update(**values)
+
+    def refresh_totals(self):
+        """Recalculate this cart's totals after its lines changed and reload them onto the instance."""
+        Cart.recalculate_totals([self.pk], touch=True)
+        self.refresh_from_db(fields=self.TOTAL_FIELDS + ['updated_at'])
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
@@ -82,6 +125,29 @@ class CartItem(models.Model):
     def total_price(self):
         return self.quantity * self.unit_price
 
+    @staticmethod
+    def line_total_expression():
+        """SQL equivalent of total_price, for aggregating lines in the database."""
+        money = DecimalField(max_digits=10, decimal_places=2)
+        unit_price = Case(
+            When(product_variant__isnull=False,
+                 then=F('product_variant__product__base_price') + F('product_variant__additional_price')),
+            When(drop_product__isnull=False, then=F('drop_product__drop_price')),
+            default=Value(Decimal('0.00')),
+            output_field=money,
+        )
+        return ExpressionWrapper(F('quantity') * unit_price, output_field=money)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Cart.recalculate_totals([self.cart_id], touch=True)
+
+    def delete(self, *args, **kwargs):
+        cart_id = self.cart_id
+        result = super().delete(*args, **kwargs)
+        Cart.recalculate_totals([cart_id], touch=True)
+        return result
+
     def clean(self):
         from django.core.exceptions import ValidationError
         
@@ -5,9 +5,23 @@ from drops.serializers import DropProductSerializer # To show item details
 from products.serializers import ProductVariantWithProductSerializer # For product variant details with full product info
 
 class CartItemSerializer(serializers.ModelSerializer):
-    # Use simplified serializers for cart items
+    """
+    Cart line projection. By default a line carries only what the cart UI renders
+    (name, image, price, size/color, availability), read from objects loaded up front by
+    carts.views.load_cart_lines() so a cart costs a fixed number of queries.
+    The full nested drop_product_details / product_variant_details are included only
+    when the serializer context has expand=True (?expand=details).
+    """
+    EXPANDED_FIELDS = ('drop_product_details', 'product_variant_details')
+
     drop_product_details = DropProductSerializer(source='drop_product', read_only=True)
     product_variant_details = ProductVariantWithProductSerializer(source='product_variant', read_only=True)
+    product_id = serializers.SerializerMethodField()
+    product_name = serializers.SerializerMethodField()
+    product_slug = serializers.SerializerMethodField()
+    image = serializers.SerializerMethodField()
+    available_quantity = serializers.SerializerMethodField()
+    is_available = serializers.SerializerMethodField()
     unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
@@ -15,10 +29,85 @@ class CartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = [
             'id', 'cart', 'drop_product', 'product_variant', 'quantity', 'color', 'color_code', 'size',
+            'product_id', 'product_name', 'product_slug', 'image', 'available_quantity', 'is_available',
             'drop_product_details', 'product_variant_details', 'unit_price', 'total_price', 'added_at'
         ]
         read_only_fields = ['cart', 'unit_price', 'total_price'] # 'cart' set by context or URL
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('expand'):
+            for name in self.EXPANDED_FIELDS:
+                fields.pop(name, None)
+        return fields
+
+    def _product(self, obj):
+        if obj.drop_product_id:
+            return obj.drop_product.product
+        if obj.product_variant_id:
+            return obj.product_variant.product
+        return None
+
+    def _variant(self, obj):
+        if obj.drop_product_id:
+            return obj.drop_product.variant
+        return obj.product_variant
+
+    def get_product_id(self, obj):
+        product = self._product(obj)
+        return product.id if product else None
+
+    def get_product_name(self, obj):
+        product = self._product(obj)
+        return product.name if product else None
+
+    def get_product_slug(self, obj):
+        product = self._product(obj)
+        return product.slug if product else None
+
+    def get_image(self, obj):
+        variant = self._variant(obj)
+        image = variant.image if variant and variant.image else None
+        if not image:
+            product = self._product(obj)
+            # Prefetched primary-first, see load_cart_lines()
+            images = list(product.images.all()) if product else []
+            image = images[0].image if images else None
+        if not image:
+            return None
+        request = self.context.get('request')
+        return request.build_absolute_uri(image.url) if request else image.url
+
+    def get_available_quantity(self, obj):
+        if obj.drop_product_id:
+            return obj.drop_product.available_quantity
+        if obj.product_variant_id:
+            return obj.product_variant.available_quantity
+        return 0
+
+    def get_is_available(self, obj):
+        if obj.drop_product_id:
+            drop = obj.drop_product.drop
+            if not (drop.is_public and drop.status == 'active'):
+                return False
+        elif obj.product_variant_id:
+            if not obj.product_variant.is_active or obj.product_variant.product.is_archived:
+                return False
+        return self.get_available_quantity(obj) >= obj.quantity
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Fall back to the variant's own size/color when the line didn't store them
+        variant = self._variant(instance)
+        if variant:
+            if not data.get('size') and variant.size:
+                data['size'] = variant.size.name
+            if not data.get('color') and variant.color:
+                data['color'] = variant.color.name
+            if not data.get('color_code') and variant.color:
+                data['color_code'] = variant.color.hex_code
+        return data
+
     def validate(self, data):
         # Ensure either drop_product or product_variant is set, but not both
         drop_product = data.get('drop_product')
@@ -118,61 +207,14 @@ class CartSyncItemSerializer(serializers.Serializer):
             
         return data
 
-    def validate_drop_product_id(self, value):
-        if value is None:
-            return value
-            
-        from drops.models import DropProduct
-        try:
-            dp = DropProduct.objects.get(id=value)
-            if not (dp.drop.is_public and dp.drop.status == 'active'):
-                raise serializers.ValidationError("This product is not currently available in an active drop.")
-            if dp.current_stock_quantity == 0:
-                raise serializers.ValidationError("This product is out of stock.")
-        except DropProduct.DoesNotExist:
-            raise serializers.ValidationError("Drop product not found.")
-        return value
-
-    def validate_product_variant_id(self, value):
-        if value is None:
-            return value
-            
-        from products.models import ProductVariant
-        try:
-            ProductVariant.objects.get(id=value)
-        except ProductVariant.DoesNotExist:
-            raise serializers.ValidationError("Product variant not found.")
-        return value
+    # Existence, drop availability and stock are checked for all items at once
+    # (one query per table) by CartSyncManager.validate_lines, which reports them per item.
 
 class CartSyncSerializer(serializers.Serializer):
     """Serializer for syncing entire cart from frontend localStorage"""
     items = CartSyncItemSerializer(many=True)
     guest_cart_id = serializers.UUIDField(required=False, allow_null=True)
 
-    def validate_items(self, items):
-        """Validate all items and check stock constraints"""
-        from drops.models import DropProduct
-        from products.models import ProductVariant
-        
-        for item_data in items:
-            drop_product_id = item_data.get('drop_product_id')
-            product_variant_id = item_data.get('product_variant_id')
-            
-            if drop_product_id:
-                try:
-                    drop_product = DropProduct.objects.get(id=drop_product_id)
-                    if item_data['quantity'] > drop_product.current_stock_quantity:
-                        raise serializers.ValidationError(
-                            f"Product {drop_product.product.name}: Only {drop_product.current_stock_quantity} items in stock. Requested {item_data['quantity']}."
-                        )
-                except DropProduct.DoesNotExist:
-                    continue  # Already handled by field validation
-            
-            # For product variants, you might want to add stock validation here too
-            # depending on your ProductVariant model structure
-        
-        return items
-
 class CartMergeSerializer(serializers.Serializer):
     """Serializer for merging guest cart with user cart on login"""
     guest_cart_id = serializers.UUIDField()
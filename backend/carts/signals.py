@@ -0,0 +1,48 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from drops.models import DropProduct
+from products.models import Product, ProductVariant
+from .models import Cart
+
+# Fields that feed CartItem.unit_price; saves touching only other fields are ignored
+PRICE_FIELDS = {
+    Product: {'base_price'},
+    ProductVariant: {'additional_price'},
+    DropProduct: {'drop_price'},
+}
+
+# How to reach the carts holding a line for the saved object
+CART_LOOKUPS = {
+    Product: 'items__product_variant__product',
+    ProductVariant: 'items__product_variant',
+    DropProduct: 'items__drop_product',
+}
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_save, sender=DropProduct)
+def price_source_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Keep denormalized cart subtotals in step with price changes"""
+    if created:
+        return  # Nothing can be in a cart yet
+    if update_fields is not None and not PRICE_FIELDS[sender] & set(update_fields):
+        return
+    carts = Cart.objects.filter(**{CART_LOOKUPS[sender]: instance}).values('pk')
+    Cart.recalculate_totals(carts)
+
+
+@receiver(pre_delete, sender=ProductVariant)
+@receiver(pre_delete, sender=DropProduct)
+def line_source_deleting(sender, instance, **kwargs):
+    """Note the carts holding a line for the object: its cascade deletes them without CartItem.delete()"""
+    instance._cart_ids = list(Cart.objects.filter(**{CART_LOOKUPS[sender]: instance}).values_list('pk', flat=True).distinct())
+
+
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_delete, sender=DropProduct)
+def line_source_deleted(sender, instance, **kwargs):
+    """Recompute the totals of the carts that lost lines in the cascade"""
+    cart_ids = getattr(instance, '_cart_ids', None)
+    if cart_ids:
+        Cart.recalculate_totals(cart_ids, touch=True)
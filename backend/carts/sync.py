@@ -0,0 +1,177 @@
+# carts/sync.py
+"""
+Set-based cart line operations.
+
+Sync, merge and bulk-add all reduce to the same steps: fetch every referenced
+DropProduct / ProductVariant with one id__in query per table, validate and coalesce
+the incoming lines in memory, diff them against the cart's existing lines, then write
+the result with one delete, one bulk_update and one bulk_create.
+"""
+from drops.models import DropProduct
+from products.models import ProductVariant
+from .models import Cart, CartItem
+
+
+def line_key(drop_product_id, product_variant_id, color=None, size=None):
+    """Identity of a cart line, mirroring CartItem's unique constraints."""
+    if drop_product_id:
+        return ('drop', drop_product_id, color, size)
+    return ('variant', product_variant_id)
+
+
+class CartSyncManager:
+    """
+    Service class for bulk cart line operations
+    """
+    REPLACE = 'replace'  # The cart ends up with exactly the incoming lines
+    ADD = 'add'          # Incoming quantities are added to matching existing lines
+
+    @staticmethod
+    def validate_lines(items, check_stock=True):
+        """
+        Resolve and validate incoming items (dicts with drop_product_id or
+        product_variant_id, quantity, color, color_code, size).
+        Repeated lines are coalesced by summing their quantities.
+        Returns (lines: dict key -> line, item_errors: list) where each error is
+        {'index', 'code', 'item'} for the item's position in `items`.
+        """
+        drop_ids = {item['drop_product_id'] for item in items if item.get('drop_product_id')}
+        variant_ids = {
+            item['product_variant_id'] for item in items
+            if item.get('product_variant_id') and not item.get('drop_product_id')
+        }
+        drop_products = DropProduct.objects.select_related('drop').in_bulk(drop_ids) if drop_ids else {}
+        variants = ProductVariant.objects.in_bulk(variant_ids) if variant_ids else {}
+
+        lines = {}
+        item_errors = []
+        for index, item in enumerate(items):
+            drop_product = variant = None
+            code = None
+            if item.get('drop_product_id'):
+                drop_product = drop_products.get(item['drop_product_id'])
+                if drop_product is None:
+                    code = 'drop_product_not_found'
+                elif not (drop_product.drop.is_public and drop_product.drop.status == 'active'):
+                    code = 'drop_not_active'
+                elif drop_product.current_stock_quantity == 0:
+                    code = 'out_of_stock'
+            elif item.get('product_variant_id'):
+                variant = variants.get(item['product_variant_id'])
+                if variant is None:
+                    code = 'variant_not_found'
+            else:
+                code = 'missing_reference_id'
+
+            if code:
+                item_errors.append({'index': index, 'code': code, 'item': item})
+                continue
+
+            key = line_key(
+                drop_product.id if drop_product else None,
+                variant.id if variant else None,
+                item.get('color'), item.get('size'),
+            )
+            if key in lines:
+                lines[key]['quantity'] += item['quantity']
+                lines[key]['color_code'] = item.get('color_code') or lines[key]['color_code']
+                continue
+            lines[key] = {
+                'index': index,
+                'item': item,
+                'drop_product': drop_product,
+                'product_variant': variant,
+                'quantity': item['quantity'],
+                'color': item.get('color'),
+                'color_code': item.get('color_code'),
+                'size': item.get('size'),
+            }
+
+        if check_stock:
+            for key, line in list(lines.items()):
+                drop_product = line['drop_product']
+                if drop_product and line['quantity'] > drop_product.current_stock_quantity:
+                    item_errors.append({'index': line['index'], 'code': 'quantity_exceeds_stock', 'item': line['item']})
+                    del lines[key]
+
+        item_errors.sort(key=lambda error: error['index'])
+        return lines, item_errors
+
+    @staticmethod
+    def lines_from_cart(cart):
+        """Lines of an existing cart (e.g. a guest cart being merged), in one query."""
+        if not isinstance(cart, Cart):
+            return cart.sync_lines()  # Cache-resident guest cart, see carts.guest_store
+        lines = {}
+        for index, cart_item in enumerate(cart.items.select_related('drop_product', 'product_variant')):
+            key = line_key(cart_item.drop_product_id, cart_item.product_variant_id, cart_item.color, cart_item.size)
+            lines[key] = {
+                'index': index,
+                'item': None,
+                'drop_product': cart_item.drop_product,
+                'product_variant': cart_item.product_variant,
+                'quantity': cart_item.quantity,
+                'color': cart_item.color,
+                'color_code': cart_item.color_code,
+                'size': cart_item.size,
+            }
+        return lines
+
+    @staticmethod
+    def apply(cart, lines, mode=REPLACE, cap_to_stock=False):
+        """
+        Write `lines` into `cart` with one delete, one bulk_update and one bulk_create,
+        then recalculate the cart's totals.
+        In ADD mode with cap_to_stock, a combined drop line is capped at current stock.
+        Returns counts of created, updated and deleted lines.
+        """
+        if not isinstance(cart, Cart):
+            return cart.apply_lines(lines, mode, cap_to_stock)  # Cache-resident guest cart
+        existing, duplicates = {}, []
+        for cart_item in cart.items.all().order_by('added_at', 'id'):
+            key = line_key(cart_item.drop_product_id, cart_item.product_variant_id, cart_item.color, cart_item.size)
+            if key in existing:
+                duplicates.append(cart_item)  # NULL color/size slips past the unique constraint
+            else:
+                existing[key] = cart_item
+
+        to_create, to_update = [], []
+        for key, line in lines.items():
+            cart_item = existing.pop(key, None)
+            if cart_item is None:
+                to_create.append(CartItem(
+                    cart=cart,
+                    drop_product=line['drop_product'],
+                    product_variant=line['product_variant'],
+                    quantity=line['quantity'],
+                    color=line['color'],
+                    color_code=line['color_code'],
+                    size=line['size'],
+                ))
+                continue
+
+            if mode == CartSyncManager.ADD:
+                quantity = cart_item.quantity + line['quantity']
+                if cap_to_stock and line['drop_product']:
+                    quantity = min(quantity, line['drop_product'].current_stock_quantity)
+                color_code = cart_item.color_code or line['color_code']
+            else:
+                quantity = line['quantity']
+                color_code = line['color_code']
+            if quantity != cart_item.quantity or color_code != cart_item.color_code:
+                cart_item.quantity = quantity
+                cart_item.color_code = color_code
+                to_update.append(cart_item)
+
+        deleted = 0
+        stale = list(existing.values()) + duplicates if mode == CartSyncManager.REPLACE else []
+        if stale:
+            deleted, _ = CartItem.objects.filter(pk__in=[cart_item.pk for cart_item in stale]).delete()
+        if to_update:
+            CartItem.objects.bulk_update(to_update, ['quantity', 'color_code'])
+        if to_create:
+            CartItem.objects.bulk_create(to_create)
+        # Bulk writes bypass CartItem.save(), so refresh the denormalized totals once
+        cart.refresh_totals()
+
+        return {'created': len(to_create), 'updated': len(to_update), 'deleted': deleted}
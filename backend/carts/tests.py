@@ -1,3 +1,209 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from backend.retention import get_policies, purge
+from drops.models import Drop, DropProduct
+from orders.models import Order, ShippingMethod
+from products.models import Product, ProductVariant
+from users.models import Address
+from .guest_store import GuestCart, GuestCartStore
+from .models import Cart, CartItem
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CartSyncMergeTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='shopper', email='shopper@example.com', password='pass1234')
+        product = Product.objects.create(name='Tee', base_price=Decimal('20.00'))
+        self.variants = [
+            ProductVariant.objects.create(product=product, sku_suffix=f'-{n}', stock_quantity=10)
+            for n in range(3)
+        ]
+        now = timezone.now()
+        drop = Drop.objects.create(
+            name='Launch', status='active', is_public=True,
+            start_datetime=now - timedelta(days=1), end_datetime=now + timedelta(days=1),
+        )
+        self.drop_product = DropProduct.objects.create(
+            drop=drop, product=product, variant=self.variants[0], drop_price=Decimal('15.00'),
+            initial_stock_quantity=5, current_stock_quantity=5,
+        )
+
+    def test_sync_replaces_lines_and_reports_item_errors(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product_variant=self.variants[0], quantity=1)
+        CartItem.objects.create(cart=cart, product_variant=self.variants[1], quantity=4)
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(reverse('cart-sync-cart'), {'items': [
+            {'product_variant_id': self.variants[1].id, 'quantity': 2},
+            {'product_variant_id': self.variants[2].id, 'quantity': 1},
+            {'drop_product_id': self.drop_product.id, 'quantity': 9},
+            {'product_variant_id': 999999, 'quantity': 1},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [(e['index'], e['code']) for e in response.data['item_errors']],
+            [(2, 'quantity_exceeds_stock'), (3, 'variant_not_found')]
+        )
+        lines = dict(cart.items.values_list('product_variant_id', 'quantity'))
+        self.assertEqual(lines, {self.variants[1].id: 2, self.variants[2].id: 1})
+
+    def test_merge_combines_quantities_capped_at_drop_stock(self):
+        user_cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=user_cart, drop_product=self.drop_product, quantity=3)
+        guest_cart = Cart.objects.create()
+        CartItem.objects.create(cart=guest_cart, drop_product=self.drop_product, quantity=4)
+        CartItem.objects.create(cart=guest_cart, product_variant=self.variants[2], quantity=2)
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(reverse('cart-merge-guest-cart'), {
+            'guest_cart_id': str(guest_cart.cart_id), 'merge_strategy': 'merge'
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Cart.objects.filter(cart_id=guest_cart.cart_id).exists())
+        self.assertEqual(user_cart.items.get(drop_product=self.drop_product).quantity, 5)
+        self.assertEqual(user_cart.items.get(product_variant=self.variants[2]).quantity, 2)
+
+    def test_totals_follow_line_and_price_changes(self):
+        cart = Cart.objects.create(user=self.user)
+        item = CartItem.objects.create(cart=cart, product_variant=self.variants[1], quantity=2)
+        CartItem.objects.create(cart=cart, drop_product=self.drop_product, quantity=1)
+        cart.refresh_from_db()
+        self.assertEqual((cart.item_count, cart.subtotal), (3, Decimal('55.00')))
+
+        self.drop_product.drop_price = Decimal('10.00')
+        self.drop_product.save()
+        item.delete()
+        cart.refresh_from_db()
+        self.assertEqual((cart.item_count, cart.subtotal), (1, Decimal('10.00')))
+
+    def test_totals_follow_lines_deleted_by_cascade(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product_variant=self.variants[1], quantity=2)
+        CartItem.objects.create(cart=cart, product_variant=self.variants[2], quantity=1)
+        CartItem.objects.create(cart=cart, drop_product=self.drop_product, quantity=1)
+
+        self.variants[1].delete()
+        cart.refresh_from_db()
+        self.assertEqual((cart.item_count, cart.subtotal), (2, Decimal('35.00')))
+
+        self.variants[2].product.delete()  # Takes the variants and the drop product with it
+        cart.refresh_from_db()
+        self.assertEqual((cart.item_count, cart.subtotal), (0, Decimal('0.00')))
+
+    def test_repair_cart_totals_fixes_drift(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product_variant=self.variants[0], quantity=3)
+        Cart.objects.filter(pk=cart.pk).update(item_count=0, subtotal=Decimal('0.00'))
+
+        call_command('repair_cart_totals', '--dry-run', stdout=StringIO())
+        cart.refresh_from_db()
+        self.assertEqual(cart.item_count, 0)
+
+        call_command('repair_cart_totals', stdout=StringIO())
+        cart.refresh_from_db()
+        self.assertEqual((cart.item_count, cart.subtotal), (3, Decimal('60.00')))
+
+    @override_settings(GUEST_CART_STORAGE='cache')
+    def test_cached_guest_cart_is_persisted_only_at_login_merge(self):
+        response = self.client.get(reverse('cart-retrieve-my-cart'))
+        cart_id = response.data['cart_id']
+        response = self.client.post(reverse('cart-add-item', args=[cart_id]), {
+            'drop_product_id': self.drop_product.id, 'quantity': 2
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['total_items'], response.data['subtotal']), (2, '30.00'))
+        self.assertFalse(Cart.objects.exists())
+        self.assertIsNotNone(GuestCartStore.load(cart_id))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('cart-merge-guest-cart'), {
+            'guest_cart_id': cart_id, 'merge_strategy': 'merge'
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Cart.objects.get(user=self.user).items.get().quantity, 2)
+        self.assertIsNone(GuestCartStore.load(cart_id))
+
+    @override_settings(GUEST_CART_STORAGE='cache')
+    def test_persist_moves_cached_guest_cart_into_database(self):
+        guest_cart = GuestCart()
+        guest_cart.add_line(product_variant_id=self.variants[1].id, quantity=3)
+        guest_cart.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cart = GuestCartStore.persist(guest_cart.cart_id)
+
+        self.assertEqual(cart.cart_id, guest_cart.cart_id)
+        self.assertEqual((cart.item_count, cart.subtotal), (3, Decimal('60.00')))
+        self.assertIsNone(GuestCartStore.load(guest_cart.cart_id))
+
+    @override_settings(GUEST_CART_STORAGE='cache')
+    def test_checkout_persists_cached_guest_cart_only_with_the_order(self):
+        address = Address.objects.create(
+            user=self.user, address_type='shipping', recipient_name='Shopper', street_address='1 Main St',
+            city='Minsk', state_province='Minsk', postal_code='220000', country_code='BY',
+        )
+        shipping = ShippingMethod.objects.create(name='Courier', cost=Decimal('5.00'))
+        guest_cart = GuestCart()
+        line = guest_cart.add_line(product_variant_id=self.variants[1].id, quantity=11)
+        guest_cart.save()
+        self.client.force_authenticate(self.user)
+        payload = {'cart_id': str(guest_cart.cart_id), 'shipping_address_id': address.id, 'shipping_method_id': shipping.id}
+
+        # Validation only reads the cache; the failed checkout rolls the persisted cart back
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('create-order'), payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Cart.objects.exists())
+        self.assertIsNotNone(GuestCartStore.load(guest_cart.cart_id))
+
+        line['quantity'] = 2
+        guest_cart.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('create-order'), payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Order.objects.get().items.get().quantity, 2)
+        self.assertIsNone(GuestCartStore.load(guest_cart.cart_id))
+
+    def test_purge_guest_carts_deletes_only_abandoned_guest_carts_in_chunks(self):
+        stale = timezone.now() - timedelta(days=60)
+        abandoned = [Cart.objects.create() for _ in range(3)]
+        for cart in abandoned:
+            CartItem.objects.create(cart=cart, product_variant=self.variants[0], quantity=1)
+        recent_guest = Cart.objects.create()
+        user_cart = Cart.objects.create(user=self.user)
+        Cart.objects.filter(pk__in=[c.pk for c in abandoned] + [user_cart.pk]).update(updated_at=stale)
+
+        result = purge(get_policies(['guest_carts'])[0], chunk_size=2, pause=0)
+
+        self.assertEqual(result.chunks, 2)
+        self.assertEqual(result.rows, {'carts.Cart': 3, 'carts.CartItem': 3})
+        self.assertEqual(set(Cart.objects.values_list('pk', flat=True)), {recent_guest.pk, user_cart.pk})
+
+    def test_line_changes_keep_an_old_guest_cart_but_price_changes_do_not(self):
+        stale = timezone.now() - timedelta(days=60)
+        edited, repriced = Cart.objects.create(), Cart.objects.create()
+        CartItem.objects.create(cart=repriced, product_variant=self.variants[1], quantity=1)
+        Cart.objects.filter(pk__in=[edited.pk, repriced.pk]).update(updated_at=stale)
+
+        CartItem.objects.create(cart=edited, product_variant=self.variants[0], quantity=1)
+        self.variants[1].additional_price = Decimal('5.00')
+        self.variants[1].save()
+        repriced.refresh_from_db()
+        self.assertEqual((repriced.subtotal, repriced.updated_at), (Decimal('25.00'), stale))
+
+        purge(get_policies(['guest_carts'])[0], pause=0)
+        self.assertEqual(list(Cart.objects.values_list('pk', flat=True)), [edited.pk])
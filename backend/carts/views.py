@@ -5,16 +5,130 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from .models import Cart, CartItem
 from drops.models import DropProduct
+from .sync import CartSyncManager
+from .guest_store import GuestCart, GuestCartStore, set_cart_items
 from .serializers import (
     CartSerializer, CartItemSerializer, CartItemAddSerializer,
     CartSyncSerializer, CartMergeSerializer, CartSyncItemSerializer
 )
 import uuid
 import logging
+from decimal import Decimal
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from products.models import ProductImage, ProductVariant
 
 logger = logging.getLogger(__name__)
 
+
+# Per line foreign key: (select_related paths, prefetch lookups) relative to the related model
+LINE_RELATIONS = {
+    'drop_product': (
+        ['drop', 'product', 'variant__size', 'variant__color'],
+        ['variant__images'],
+    ),
+    'product_variant': (
+        ['product', 'size', 'color'],
+        ['images'],
+    ),
+}
+EXPANDED_PRODUCT_LOOKUPS = ['category', 'translations', 'variants__size', 'variants__color', 'variants__images']
+
+
+def line_relation_lookups(field, expand=False):
+    """select_related paths and prefetch lookups for one line foreign key, relative to its model."""
+    selects, variant_lookups = LINE_RELATIONS[field]
+    primary_images = ProductImage.objects.order_by('-is_primary', 'display_order', 'id')
+    lookups = [Prefetch('product__images', queryset=primary_images)]
+    if expand:
+        lookups += [f'product__{lookup}' for lookup in EXPANDED_PRODUCT_LOOKUPS] + variant_lookups
+    return selects, lookups
+
+
+def cart_lines_prefetch(expand=False):
+    """
+    Prefetch for Cart.items loading everything CartItemSerializer reads: one query for
+    the lines (with products, variants, sizes, colors and drops joined) and one per
+    image set. expand=True adds what the full nested product serializers need.
+    """
+    select_paths, lookups = [], []
+    for field in LINE_RELATIONS:
+        selects, relation_lookups = line_relation_lookups(field, expand)
+        select_paths += [f'{field}__{path}' for path in selects]
+        for lookup in relation_lookups:
+            if isinstance(lookup, Prefetch):
+                lookups.append(Prefetch(f'{field}__{lookup.prefetch_through}', queryset=lookup.queryset))
+            else:
+                lookups.append(f'{field}__{lookup}')
+    items = CartItem.objects.select_related(*select_paths)
+    return Prefetch('items', queryset=items.prefetch_related(*lookups))
+
+
+def load_cart_lines(cart, expand=False):
+    """(Re)load cart.items with cart_lines_prefetch(), discarding any stale prefetch."""
+    if cart._state.adding:
+        return hydrate_guest_lines(cart, expand)
+    getattr(cart, '_prefetched_objects_cache', {}).pop('items', None)
+    prefetch_related_objects([cart], cart_lines_prefetch(expand))
+    return cart
+
+
+def hydrate_guest_lines(cart, expand=False):
+    """
+    Load the related objects for the unsaved lines of a cache-resident guest cart
+    (GuestCart.as_cart()) with one query per foreign key plus image prefetches, and
+    compute its totals. Lines whose product no longer exists are dropped.
+    """
+    items = list(cart.items.all())
+    for field, model in (('drop_product', DropProduct), ('product_variant', ProductVariant)):
+        ids = {getattr(item, f'{field}_id') for item in items} - {None}
+        if not ids:
+            continue
+        selects, lookups = line_relation_lookups(field, expand)
+        objects = model.objects.select_related(*selects).prefetch_related(*lookups).in_bulk(ids)
+        for item in items:
+            if getattr(item, f'{field}_id') in objects:
+                setattr(item, field, objects[getattr(item, f'{field}_id')])
+            elif getattr(item, f'{field}_id'):
+                setattr(item, f'{field}_id', None)
+    items = [item for item in items if item.drop_product_id or item.product_variant_id]
+    set_cart_items(cart, items)
+    cart.item_count = sum(item.quantity for item in items)
+    cart.subtotal = sum((item.total_price for item in items), Decimal('0.00'))
+    return cart
+
+
+def get_guest_cart(cart_id):
+    """Guest cart with this id from the cache (when enabled) or the database, or None."""
+    if not cart_id:
+        return None
+    if GuestCartStore.enabled():
+        guest_cart = GuestCartStore.load(cart_id)
+        if guest_cart is not None:
+            return guest_cart
+    try:
+        return Cart.objects.get(cart_id=cart_id, user__isnull=True)
+    except Cart.DoesNotExist:
+        return None
+
+
+def new_guest_cart(cart_id=None):
+    """
+    A fresh guest cart; cache-resident carts are only written on their first change.
+    A cache-resident cart keeps the id the client already holds (e.g. from /carts/mine/)
+    unless it is malformed or taken by a database cart.
+    """
+    if GuestCartStore.enabled():
+        try:
+            cart_id = uuid.UUID(str(cart_id)) if cart_id else None
+        except ValueError:
+            cart_id = None
+        if cart_id and Cart.objects.filter(cart_id=cart_id).exists():
+            cart_id = None
+        return GuestCart(cart_id)
+    return Cart.objects.create()
+
+
 def get_or_create_cart(request, cart_id_from_request=None):
     """
     Helper function to retrieve or create a cart.
@@ -29,55 +143,52 @@ def get_or_create_cart(request, cart_id_from_request=None):
         # Authenticated user
         cart, created = Cart.objects.get_or_create(user=user)
         # Basic merge: if a guest_cart_id was provided and user just logged in
-        if cart_id_from_request:
-            try:
-                guest_cart = Cart.objects.get(cart_id=cart_id_from_request, user__isnull=True)
-                # Merge items from guest_cart to user_cart
-                for guest_item in guest_cart.items.all():
-                    user_item, item_created = CartItem.objects.get_or_create(
-                        cart=cart,
-                        drop_product=guest_item.drop_product,
-                        product_variant=guest_item.product_variant,
-                        color=guest_item.color,
-                        color_code=guest_item.color_code,
-                        size=guest_item.size,
-                        defaults={'quantity': guest_item.quantity}
-                    )
-                    if not item_created: # Item already exists, update quantity (or sum)
-                        if guest_item.drop_product:
-                            user_item.quantity = min(user_item.quantity + guest_item.quantity, guest_item.drop_product.current_stock_quantity)
-                        else:
-                            # For regular products, just combine quantities
-                            user_item.quantity = user_item.quantity + guest_item.quantity
-                        # Consider max_per_customer logic here
-                        user_item.save()
-                guest_cart.delete() # Delete guest cart after merging
-            except Cart.DoesNotExist:
-                pass # Guest cart not found or already merged
+        guest_cart = get_guest_cart(cart_id_from_request)
+        if guest_cart is not None:
+            # Merge items from guest_cart to user_cart (drop lines capped at stock)
+            # Consider max_per_customer logic here
+            CartSyncManager.apply(
+                cart, CartSyncManager.lines_from_cart(guest_cart),
+                CartSyncManager.ADD, cap_to_stock=True
+            )
+            guest_cart.delete() # Delete guest cart after merging
         return cart
     else:
         # Guest user
-        if cart_id_from_request:
-            try:
-                return Cart.objects.get(cart_id=cart_id_from_request, user__isnull=True)
-            except Cart.DoesNotExist:
-                pass # Invalid cart_id or it became a user cart, create new
-        return Cart.objects.create() # Creates a new guest cart with a new UUID
+        guest_cart = get_guest_cart(cart_id_from_request)
+        if guest_cart is not None:
+            return guest_cart
+        return new_guest_cart(cart_id_from_request) # Unknown cart_id or it became a user cart, create new
 
 class CartViewSet(mixins.RetrieveModelMixin,
                   # mixins.DestroyModelMixin, # For clearing cart
                   viewsets.GenericViewSet):
-    queryset = Cart.objects.all().prefetch_related(
-        'items__drop_product__product',
-        'items__drop_product__variant',
-        'items__product_variant__product',
-        'items__product_variant__size',
-        'items__product_variant__color'
-    ).select_related('user')
+    queryset = Cart.objects.all().prefetch_related(cart_lines_prefetch()).select_related('user')
     serializer_class = CartSerializer
     permission_classes = [AllowAny] # Anyone can interact with a cart
     lookup_field = 'cart_id' # Use cart_id (UUID) for lookup
 
+    @property
+    def expand_details(self):
+        # ?expand=details brings back the full nested product/variant payload per line
+        return 'details' in self.request.query_params.get('expand', '').split(',')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand'] = self.expand_details
+        return context
+
+    def get_serializer(self, *args, **kwargs):
+        # Every action responds with the whole cart; load its lines in a fixed number of queries
+        if args and isinstance(args[0], GuestCart):
+            args = (args[0].as_cart(),) + args[1:]
+        if args and isinstance(args[0], Cart):
+            load_cart_lines(args[0], expand=self.expand_details)
+            # Actions declaring an input serializer_class (add-item, items/<pk>) still return the cart
+            kwargs.setdefault('context', self.get_serializer_context())
+            return CartSerializer(*args, **kwargs)
+        return super().get_serializer(*args, **kwargs)
+
     def get_object(self):
         """
         Override to use our helper. The 'pk' from URL will be the cart_id.
@@ -123,6 +234,21 @@ class CartViewSet(mixins.RetrieveModelMixin,
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            if isinstance(cart, GuestCart):
+                line = cart.find_line(drop_product_id=drop_product.id, color=color, size=size)
+                if line is None:
+                    cart.add_line(drop_product_id=drop_product.id, quantity=quantity,
+                                  color=color, color_code=color_code, size=size)
+                elif line['quantity'] + quantity > drop_product.current_stock_quantity:
+                    return Response(
+                        {"quantity": f"Cannot add {quantity} more. Total {line['quantity'] + quantity} would exceed stock of {drop_product.current_stock_quantity}."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                else:
+                    line['quantity'] += quantity
+                cart.save()
+                return Response(self.get_serializer(cart).data, status=status.HTTP_200_OK)
+
             # Get or create the cart item with all variant information
             cart_item, created = CartItem.objects.get_or_create(
                 cart=cart,
@@ -142,6 +268,7 @@ class CartViewSet(mixins.RetrieveModelMixin,
                 cart_item.quantity = new_quantity
                 cart_item.save()
 
+            cart.refresh_from_db(fields=Cart.TOTAL_FIELDS) # Totals were recalculated by CartItem.save()
             cart_serializer = self.get_serializer(cart) # Return the whole cart
             return Response(cart_serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -149,6 +276,8 @@ class CartViewSet(mixins.RetrieveModelMixin,
     @action(detail=True, methods=['patch'], url_path='items/(?P<item_pk>[^/.]+)', serializer_class=CartItemSerializer)
     def update_item(self, request, cart_id=None, item_pk=None):
         cart = self.get_object()
+        if isinstance(cart, GuestCart):
+            return self.update_guest_item(cart, item_pk, request.data.get('quantity'))
         try:
             cart_item = CartItem.objects.get(id=item_pk, cart=cart)
         except CartItem.DoesNotExist:
@@ -176,15 +305,44 @@ class CartViewSet(mixins.RetrieveModelMixin,
 
         cart_item.quantity = new_quantity
         cart_item.save()
+        cart.refresh_from_db(fields=Cart.TOTAL_FIELDS)
         cart_serializer = self.get_serializer(cart)
         return Response(cart_serializer.data)
 
+    def update_guest_item(self, cart, item_pk, new_quantity):
+        """update_item for a cache-resident guest cart"""
+        line = cart.get_line(item_pk)
+        if line is None:
+            return Response({"detail": "Cart item not found."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            new_quantity = int(new_quantity)
+        except (TypeError, ValueError):
+            return Response({"quantity": "Invalid quantity format."}, status=status.HTTP_400_BAD_REQUEST)
+        if new_quantity <= 0:
+            return Response({"quantity": "Quantity must be positive. To remove, use delete endpoint or set to 0."}, status=status.HTTP_400_BAD_REQUEST)
+        if line['drop_product_id']:
+            drop_product = DropProduct.objects.filter(id=line['drop_product_id']).first()
+            stock = drop_product.current_stock_quantity if drop_product else 0
+            if new_quantity > stock:
+                return Response({"quantity": f"Only {stock} items in stock."}, status=status.HTTP_400_BAD_REQUEST)
+        line['quantity'] = new_quantity
+        cart.save()
+        return Response(self.get_serializer(cart).data)
+
     @action(detail=True, methods=['delete'], url_path='items/(?P<item_pk>[^/.]+)')
     def remove_item(self, request, cart_id=None, item_pk=None):
         cart = self.get_object()
+        if isinstance(cart, GuestCart):
+            line = cart.get_line(item_pk)
+            if line is None:
+                return Response({"detail": "Cart item not found."}, status=status.HTTP_404_NOT_FOUND)
+            cart.remove_line(line)
+            cart.save()
+            return Response(self.get_serializer(cart).data, status=status.HTTP_200_OK)
         try:
             cart_item = CartItem.objects.get(id=item_pk, cart=cart)
             cart_item.delete()
+            cart.refresh_from_db(fields=Cart.TOTAL_FIELDS)
             cart_serializer = self.get_serializer(cart)
             return Response(cart_serializer.data, status=status.HTTP_200_OK)
         except CartItem.DoesNotExist:
@@ -193,7 +351,12 @@ class CartViewSet(mixins.RetrieveModelMixin,
     @action(detail=True, methods=['delete'], url_path='clear')
     def clear_cart(self, request, cart_id=None):
         cart = self.get_object()
+        if isinstance(cart, GuestCart):
+            cart.clear()
+            cart.save()
+            return Response(self.get_serializer(cart).data, status=status.HTTP_200_OK)
         cart.items.all().delete()
+        cart.refresh_totals() # Queryset deletes bypass CartItem.delete()
         cart_serializer = self.get_serializer(cart)
         return Response(cart_serializer.data, status=status.HTTP_200_OK)
 
@@ -210,6 +373,8 @@ class CartViewSet(mixins.RetrieveModelMixin,
         
         items_data = serializer.validated_data['items']
         guest_cart_id = serializer.validated_data.get('guest_cart_id')
+        # One id__in query per referenced table; bad lines are reported, not fatal
+        lines, item_errors = CartSyncManager.validate_lines(items_data)
         
         try:
             with transaction.atomic():
@@ -218,56 +383,9 @@ class CartViewSet(mixins.RetrieveModelMixin,
                     cart, created = Cart.objects.get_or_create(user=request.user)
                 else:
                     # For guests, use provided cart ID or create new
-                    if guest_cart_id:
-                        try:
-                            cart = Cart.objects.get(cart_id=guest_cart_id, user__isnull=True)
-                        except Cart.DoesNotExist:
-                            cart = Cart.objects.create()
-                    else:
-                        cart = Cart.objects.create()
-                  # Clear existing items and add synced items
-                cart.items.all().delete()
-                
-                item_errors = []
-                for idx, item_data in enumerate(items_data):
-                    drop_product_id = item_data.get('drop_product_id')
-                    product_variant_id = item_data.get('product_variant_id')
-                    try:
-                        if drop_product_id:
-                            try:
-                                drop_product = DropProduct.objects.get(id=drop_product_id)
-                            except DropProduct.DoesNotExist:
-                                raise ValueError('drop_product_not_found')
-                            if item_data['quantity'] > drop_product.current_stock_quantity:
-                                raise ValueError('quantity_exceeds_stock')
-                            CartItem.objects.create(
-                                cart=cart,
-                                drop_product=drop_product,
-                                quantity=item_data['quantity'],
-                                color=item_data.get('color'),
-                                color_code=item_data.get('color_code'),
-                                size=item_data.get('size')
-                            )
-                        elif product_variant_id:
-                            try:
-                                from products.models import ProductVariant
-                                product_variant = ProductVariant.objects.get(id=product_variant_id)
-                            except ProductVariant.DoesNotExist:
-                                raise ValueError('variant_not_found')
-                            CartItem.objects.create(
-                                cart=cart,
-                                product_variant=product_variant,
-                                quantity=item_data['quantity'],
-                                color=item_data.get('color'),
-                                color_code=item_data.get('color_code'),
-                                size=item_data.get('size')
-                            )
-                        else:
-                            raise ValueError('missing_reference_id')
-                    except ValueError as ve:
-                        item_errors.append({'index': idx, 'code': str(ve), 'item': item_data})
-                    except Exception as e_item:
-                        item_errors.append({'index': idx, 'code':'unknown_error', 'detail': str(e_item)})
+                    cart = get_guest_cart(guest_cart_id) or new_guest_cart(guest_cart_id)
+                # Replace the cart's lines with the synced ones in a single diff
+                CartSyncManager.apply(cart, lines, CartSyncManager.REPLACE)
 
                 cart_serializer = self.get_serializer(cart)
                 status_code = status.HTTP_207_MULTI_STATUS if item_errors else status.HTTP_200_OK
@@ -303,52 +421,25 @@ class CartViewSet(mixins.RetrieveModelMixin,
                 user_cart, created = Cart.objects.get_or_create(user=request.user)
                 
                 # Get guest cart
-                try:
-                    guest_cart = Cart.objects.get(cart_id=guest_cart_id, user__isnull=True)
-                except Cart.DoesNotExist:
+                guest_cart = get_guest_cart(guest_cart_id)
+                if guest_cart is None:
                     return Response({
                         'error': 'Guest cart not found'
                     }, status=status.HTTP_404_NOT_FOUND)
                 
                 if merge_strategy == 'replace':
                     # Replace user cart with guest cart
-                    user_cart.items.all().delete()
-                    for guest_item in guest_cart.items.all():
-                        CartItem.objects.create(
-                            cart=user_cart,
-                            drop_product=guest_item.drop_product,
-                            product_variant=guest_item.product_variant,
-                            quantity=guest_item.quantity,
-                            color=guest_item.color,
-                            color_code=guest_item.color_code,
-                            size=guest_item.size
-                        )
+                    CartSyncManager.apply(
+                        user_cart, CartSyncManager.lines_from_cart(guest_cart), CartSyncManager.REPLACE
+                    )
                         
                 elif merge_strategy == 'merge':
-                    # Merge items from guest cart to user cart
-                    for guest_item in guest_cart.items.all():
-                        user_item, item_created = CartItem.objects.get_or_create(
-                            cart=user_cart,
-                            drop_product=guest_item.drop_product,
-                            product_variant=guest_item.product_variant,
-                            color=guest_item.color,
-                            color_code=guest_item.color_code,
-                            size=guest_item.size,
-                            defaults={'quantity': guest_item.quantity}
-                        )
-                        if not item_created:
-                            # Combine quantities but respect stock limits
-                            if guest_item.drop_product:
-                                # For drop products, check stock
-                                new_quantity = min(
-                                    user_item.quantity + guest_item.quantity,
-                                    guest_item.drop_product.current_stock_quantity
-                                )
-                            else:
-                                # For regular products, just combine quantities (no stock limit check for now)
-                                new_quantity = user_item.quantity + guest_item.quantity
-                            user_item.quantity = new_quantity
-                            user_item.save()
+                    # Merge items from guest cart to user cart; drop lines are capped at stock,
+                    # regular products just combine quantities (no stock limit check for now)
+                    CartSyncManager.apply(
+                        user_cart, CartSyncManager.lines_from_cart(guest_cart),
+                        CartSyncManager.ADD, cap_to_stock=True
+                    )
                 
                 # keep_user strategy does nothing - just delete guest cart
                 
@@ -379,47 +470,16 @@ class CartViewSet(mixins.RetrieveModelMixin,
         items_serializer = CartSyncItemSerializer(data=request.data.get('items', []), many=True)
         if not items_serializer.is_valid():
             return Response(items_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        lines, item_errors = CartSyncManager.validate_lines(items_serializer.validated_data, check_stock=False)
+        if item_errors:
+            return Response({
+                'error': 'Some items could not be added',
+                'item_errors': item_errors
+            }, status=status.HTTP_400_BAD_REQUEST)
         try:
             with transaction.atomic():
-                for item_data in items_serializer.validated_data:
-                    drop_product_id = item_data.get('drop_product_id')
-                    product_variant_id = item_data.get('product_variant_id')
-                    
-                    if drop_product_id:
-                        drop_product = DropProduct.objects.get(id=drop_product_id)
-                        
-                        cart_item, created = CartItem.objects.get_or_create(
-                            cart=cart,
-                            drop_product=drop_product,
-                            color=item_data.get('color'),
-                            color_code=item_data.get('color_code'),
-                            size=item_data.get('size'),
-                            defaults={'quantity': item_data['quantity']}
-                        )
-                        
-                        if not created:
-                            # Update quantity if item already exists
-                            new_quantity = min(
-                                cart_item.quantity + item_data['quantity'],
-                                drop_product.current_stock_quantity
-                            )
-                            cart_item.quantity = new_quantity
-                            cart_item.save()
-                    
-                    elif product_variant_id:
-                        from products.models import ProductVariant
-                        product_variant = ProductVariant.objects.get(id=product_variant_id)
-                        
-                        cart_item, created = CartItem.objects.get_or_create(
-                            cart=cart,
-                            product_variant=product_variant,
-                            defaults={'quantity': item_data['quantity']}
-                        )
-                        
-                        if not created:
-                            # Update quantity if item already exists
-                            cart_item.quantity += item_data['quantity']
-                            cart_item.save()
+                # Existing lines get the quantity added (drop lines capped at stock)
+                CartSyncManager.apply(cart, lines, CartSyncManager.ADD, cap_to_stock=True)
                 
                 cart_serializer = self.get_serializer(cart)
                 return Response(cart_serializer.data, status=status.HTTP_200_OK)
@@ -25,6 +25,10 @@ class DropAdmin(admin.ModelAdmin):
         ('Timing & Status', {
             'fields': ('start_datetime', 'end_datetime', 'status', 'is_public')
         }),
+        ('Launch', {
+            'fields': ('admission_rate_per_minute',),
+            'description': 'Status changes on schedule (drops.launch job). Set a rate to send checkout through a waiting room.'
+        }),
     )
 
 @admin.register(DropProduct)
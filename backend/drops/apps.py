@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DropsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'drops'
+
+    def ready(self):
+        import drops.signals
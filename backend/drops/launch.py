@@ -0,0 +1,179 @@
+# drops/launch.py
+"""
+Drop launches: cached payloads and scheduled status changes.
+
+Everyone opens the drop pages in the minutes around Drop.start_datetime, so the
+public drop payloads (active list, upcoming list, detail by slug) are rendered
+once and served from the cache:
+
+- DropPayloads renders each payload with the normal serializers and keeps it for
+  DROP_PAYLOAD_CACHE_SECONDS. Edits to a drop or its products drop the cached
+  copies (drops.signals); stock-only saves (reservations, fulfilment) don't, the
+  live figures come from inventory/check-stock/.
+- DropLaunch.tick() runs every 30 seconds as the drops.launch job. It flips due
+  drops with conditional UPDATEs, so each change happens once however many
+  workers run it, and re-renders the payloads of every drop that is live or
+  starts within DROP_PREWARM_MINUTES before they can expire. A drop saved with a
+  future start also gets a one-off drops.launch job at exactly start_datetime.
+
+Readers never render while a launch is in progress: the first wave of requests
+arrives before the start time and finds warm payloads, and the worker that flips
+the status writes the new ones before it returns.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from backend.metrics import record_cache
+from .models import Drop
+
+logger = logging.getLogger(__name__)
+
+
+class DropPayloads:
+    """
+    Service class for the cached public drop payloads
+    """
+    KEY_PREFIX = 'drop_payload'
+    ACTIVE = 'active'
+    UPCOMING = 'upcoming'
+
+    @staticmethod
+    def key(name):
+        return f'{DropPayloads.KEY_PREFIX}:{name}'
+
+    @staticmethod
+    def detail_key(slug):
+        return DropPayloads.key(f'detail:{slug}')
+
+    @staticmethod
+    def timeout():
+        return getattr(settings, 'DROP_PAYLOAD_CACHE_SECONDS', 120)
+
+    @staticmethod
+    def queryset():
+        return Drop.objects.filter(is_public=True).prefetch_related(
+            'drop_products__product__category',
+            'drop_products__variant'
+        ).order_by('-start_datetime')
+
+    @staticmethod
+    def render_list(status):
+        from .serializers import DropSerializer
+        return DropSerializer(DropPayloads.queryset().filter(status=status), many=True).data
+
+    @staticmethod
+    def render_detail(slug):
+        """The detail payload, or None for a drop that doesn't exist or isn't public."""
+        from .serializers import DropSerializer
+        drop = DropPayloads.queryset().filter(slug=slug).first()
+        return DropSerializer(drop).data if drop else None
+
+    @staticmethod
+    def get_list(status):
+        payload = cache.get(DropPayloads.key(status))
+        record_cache('drop_payload', hits=int(payload is not None), misses=int(payload is None))
+        if payload is None:
+            payload = DropPayloads.render_list(status)
+            cache.set(DropPayloads.key(status), payload, DropPayloads.timeout())
+        return payload
+
+    @staticmethod
+    def get_detail(slug):
+        payload = cache.get(DropPayloads.detail_key(slug))
+        record_cache('drop_payload', hits=int(payload is not None), misses=int(payload is None))
+        if payload is None:
+            payload = DropPayloads.render_detail(slug)
+            if payload is None:
+                return None
+            cache.set(DropPayloads.detail_key(slug), payload, DropPayloads.timeout())
+        return payload
+
+    @staticmethod
+    def warm(slugs=()):
+        """Render the lists and the given drops' detail payloads now, replacing cached copies."""
+        payloads = {
+            DropPayloads.key(DropPayloads.ACTIVE): DropPayloads.render_list(DropPayloads.ACTIVE),
+            DropPayloads.key(DropPayloads.UPCOMING): DropPayloads.render_list(DropPayloads.UPCOMING),
+        }
+        for slug in slugs:
+            detail = DropPayloads.render_detail(slug)
+            if detail is not None:
+                payloads[DropPayloads.detail_key(slug)] = detail
+        cache.set_many(payloads, DropPayloads.timeout())
+        return len(payloads)
+
+    @staticmethod
+    def invalidate(slugs=()):
+        cache.delete_many(
+            [DropPayloads.key(DropPayloads.ACTIVE), DropPayloads.key(DropPayloads.UPCOMING)]
+            + [DropPayloads.detail_key(slug) for slug in slugs]
+        )
+
+
+class DropLaunch:
+    """
+    Service class for moving drops through their schedule
+    """
+
+    @staticmethod
+    def transition(now=None):
+        """
+        Start and end the drops that are due. Returns (started, ended) as lists of
+        slugs; only the worker whose UPDATE changed a row reports it.
+        """
+        now = now or timezone.now()
+        due_start = list(
+            Drop.objects.filter(status='upcoming', start_datetime__lte=now, end_datetime__gt=now)
+            .values_list('pk', 'slug')
+        )
+        started = []
+        for pk, slug in due_start:
+            if Drop.objects.filter(pk=pk, status='upcoming').update(status='active', updated_at=now):
+                started.append(slug)
+
+        due_end = list(
+            Drop.objects.filter(status__in=['upcoming', 'active'], end_datetime__lte=now).values_list('pk', 'slug')
+        )
+        ended = []
+        for pk, slug in due_end:
+            if Drop.objects.filter(pk=pk, status__in=['upcoming', 'active']).update(status='ended', updated_at=now):
+                ended.append(slug)
+
+        if started or ended:
+            logger.info(f"Drop launch: started {started}, ended {ended}")
+        return started, ended
+
+    @staticmethod
+    def launching(now=None):
+        """Slugs of public drops that are live or start within DROP_PREWARM_MINUTES."""
+        now = now or timezone.now()
+        lead = timedelta(minutes=getattr(settings, 'DROP_PREWARM_MINUTES', 15))
+        return list(
+            Drop.objects.filter(is_public=True, end_datetime__gt=now)
+            .filter(Q(status='active') | Q(status='upcoming', start_datetime__lte=now + lead))
+            .values_list('slug', flat=True)
+        )
+
+    @staticmethod
+    def warm_stock(slugs):
+        """Load the stock snapshots check-stock will be asked for right after a start."""
+        from orders.inventory import StockSnapshotCache
+        from .models import DropProduct
+
+        ids = DropProduct.objects.filter(drop__slug__in=slugs).values_list('pk', flat=True)
+        return len(StockSnapshotCache.get_many(StockSnapshotCache.DROP_PRODUCT, ids))
+
+    @staticmethod
+    def tick(now=None):
+        """Flip due drops, then re-render the payloads of every launching drop."""
+        started, ended = DropLaunch.transition(now)
+        slugs = set(DropLaunch.launching(now)) | set(ended)
+        warmed = DropPayloads.warm(sorted(slugs))
+        if started:
+            DropLaunch.warm_stock(started)
+        return {'started': started, 'ended': ended, 'payloads': warmed}
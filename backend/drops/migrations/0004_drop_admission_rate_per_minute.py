@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drops', '0003_dropproduct_low_stock_threshold_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='drop',
+            name='admission_rate_per_minute',
+            field=models.PositiveIntegerField(blank=True, help_text='Checkout tokens issued per minute once the drop starts (waiting room); empty lets everyone check out', null=True),
+        ),
+    ]
@@ -34,6 +34,10 @@ class Drop(models.Model):
     end_datetime = models.DateTimeField()
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='upcoming')
     is_public = models.BooleanField(default=False) # Control visibility before launch
+    admission_rate_per_minute = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Checkout tokens issued per minute once the drop starts (waiting room); empty lets everyone check out"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -113,9 +117,10 @@ class DropProduct(models.Model):
         """Check if we can reserve the specified quantity"""
         return self.available_quantity >= quantity
 
-    def reserve_stock(self, quantity):
+    def reserve_stock(self, quantity, order_id=None):
         """Reserve stock for an order. Returns True if successful."""
         from django.db import transaction
+        from orders.inventory import InventoryLedger
         
         with transaction.atomic():
             # Reload from database to get latest stock levels
@@ -124,32 +129,46 @@ class DropProduct(models.Model):
             if drop_product.available_quantity >= quantity:
                 drop_product.reserved_quantity += quantity
                 drop_product.save(update_fields=['reserved_quantity'])
+                InventoryLedger.log(drop_product, InventoryLedger.RESERVE, reserved_delta=quantity, order_id=order_id)
                 # Update current instance
                 self.reserved_quantity = drop_product.reserved_quantity
                 return True
             return False
 
-    def release_reservation(self, quantity):
+    def release_reservation(self, quantity, order_id=None, reason=None):
         """Release reserved stock (e.g., when order is cancelled)"""
         from django.db import transaction
+        from orders.inventory import InventoryLedger
         
         with transaction.atomic():
             drop_product = DropProduct.objects.select_for_update().get(pk=self.pk)
+            reserved_before = drop_product.reserved_quantity
             drop_product.reserved_quantity = max(0, drop_product.reserved_quantity - quantity)
             drop_product.save(update_fields=['reserved_quantity'])
+            InventoryLedger.log(
+                drop_product, reason or InventoryLedger.RELEASE,
+                reserved_delta=drop_product.reserved_quantity - reserved_before, order_id=order_id
+            )
             # Update current instance
             self.reserved_quantity = drop_product.reserved_quantity
 
-    def fulfill_order(self, quantity):
+    def fulfill_order(self, quantity, order_id=None):
         """Fulfill an order by reducing both reserved and current stock"""
         from django.db import transaction
+        from orders.inventory import InventoryLedger
         
         with transaction.atomic():
             drop_product = DropProduct.objects.select_for_update().get(pk=self.pk)
+            stock_before, reserved_before = drop_product.current_stock_quantity, drop_product.reserved_quantity
             # Reduce both reserved and current stock
             drop_product.reserved_quantity = max(0, drop_product.reserved_quantity - quantity)
             drop_product.current_stock_quantity = max(0, drop_product.current_stock_quantity - quantity)
             drop_product.save(update_fields=['reserved_quantity', 'current_stock_quantity'])
+            InventoryLedger.log(
+                drop_product, InventoryLedger.FULFILL,
+                stock_delta=drop_product.current_stock_quantity - stock_before,
+                reserved_delta=drop_product.reserved_quantity - reserved_before, order_id=order_id
+            )
             # Update current instance
             self.reserved_quantity = drop_product.reserved_quantity
             self.current_stock_quantity = drop_product.current_stock_quantity
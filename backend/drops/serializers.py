@@ -34,7 +34,7 @@ class DropSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'slug', 'description', 'banner_image', # 'banner_image_url',
             'start_datetime', 'end_datetime', 'status', 'current_status_display', 'actual_current_status',
-            'is_public', 'drop_products',
+            'is_public', 'admission_rate_per_minute', 'drop_products',
             'created_at', 'updated_at'
         ]
         read_only_fields = ('slug', 'current_status_display', 'actual_current_status')
@@ -68,5 +68,5 @@ class DropCreateUpdateSerializer(serializers.ModelSerializer):
         model = Drop
         fields = [
             'name', 'description', 'banner_image',
-            'start_datetime', 'end_datetime', 'status', 'is_public'
+            'start_datetime', 'end_datetime', 'status', 'is_public', 'admission_rate_per_minute'
         ]
\ No newline at end of file
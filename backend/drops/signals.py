@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .launch import DropPayloads
+from .models import Drop, DropProduct
+
+# Saves that only move stock (reservations, fulfilment) keep the cached payloads;
+# their figures are served live by inventory/check-stock/
+STOCK_FIELDS = {'current_stock_quantity', 'reserved_quantity', 'updated_at'}
+
+
+@receiver(post_save, sender=Drop)
+@receiver(post_delete, sender=Drop)
+def drop_changed(sender, instance, **kwargs):
+    """Drop the cached payloads after commit, and schedule the launch for a drop that starts later"""
+    transaction.on_commit(lambda slug=instance.slug: DropPayloads.invalidate([slug]))
+    if kwargs.get('signal') is post_save and instance.status == 'upcoming' and instance.start_datetime > timezone.now():
+        start = instance.start_datetime
+        transaction.on_commit(lambda: schedule_launch(start))
+
+
+def schedule_launch(start):
+    """Queue drops.launch for `start` unless a save of this or another drop already did"""
+    from jobs.models import Job
+    from jobs.queue import JobQueue
+    if not Job.objects.filter(task='drops.launch', run_at=start, status='queued').exists():
+        JobQueue.enqueue('drops.launch', run_at=start)
+
+
+@receiver(post_save, sender=DropProduct)
+@receiver(post_delete, sender=DropProduct)
+def drop_product_changed(sender, instance, update_fields=None, **kwargs):
+    """Drop the cached payloads of the product's drop unless only stock moved"""
+    if update_fields and set(update_fields) <= STOCK_FIELDS:
+        return
+    slug = Drop.objects.filter(pk=instance.drop_id).values_list('slug', flat=True).first()
+    transaction.on_commit(lambda: DropPayloads.invalidate([slug] if slug else []))
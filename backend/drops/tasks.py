@@ -0,0 +1,15 @@
+# drops/tasks.py
+"""Drop launch scheduling as a job (see jobs/registry.py and drops/launch.py)."""
+from datetime import timedelta
+
+from jobs.registry import schedule, task
+from .launch import DropLaunch
+
+
+@task('drops.launch', concurrency=2, lease_seconds=60, max_attempts=5, retry_delay=5, priority=10)
+def launch():
+    """Start and end due drops and keep the payloads of launching drops warm."""
+    return DropLaunch.tick()
+
+
+schedule('drops.launch', every=timedelta(seconds=30))
@@ -1,3 +1,206 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from carts.models import Cart, CartItem
+from orders.models import Order, ShippingMethod
+from products.models import Product
+from users.models import Address
+from .launch import DropLaunch, DropPayloads
+from .models import Drop, DropProduct
+from .waiting_room import WaitingRoom, claim_checkout_tokens, release_checkout_tokens
+
+# Payloads are cached by drops/launch.py; the site-wide page cache would hide what it serves
+VIEW_MIDDLEWARE = [m for m in settings.MIDDLEWARE if not m.startswith('django.middleware.cache.')]
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, MIDDLEWARE=VIEW_MIDDLEWARE)
+class DropLaunchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.drop = Drop.objects.create(
+            name='Launch', status='upcoming', is_public=True,
+            start_datetime=now + timedelta(minutes=5), end_datetime=now + timedelta(days=1),
+        )
+        self.product = Product.objects.create(name='Tee', base_price=Decimal('20.00'))
+        self.drop_product = DropProduct.objects.create(
+            drop=self.drop, product=self.product, drop_price=Decimal('15.00'),
+            initial_stock_quantity=20, current_stock_quantity=20,
+        )
+
+    def slugs(self, url_name):
+        return [drop['slug'] for drop in self.client.get(reverse(url_name)).data]
+
+    def test_tick_flips_status_once_and_serves_warm_payloads(self):
+        self.assertEqual(DropLaunch.tick()['started'], [])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.slugs('drop-upcoming-drops'), ['launch'])
+
+        at_start = self.drop.start_datetime + timedelta(seconds=1)
+        self.assertEqual(DropLaunch.tick(at_start)['started'], ['launch'])
+        self.assertEqual(DropLaunch.tick(at_start)['started'], [])  # Another worker's tick changes nothing
+        self.drop.refresh_from_db()
+        self.assertEqual(self.drop.status, 'active')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.slugs('drop-active-drops'), ['launch'])
+            self.assertEqual(self.slugs('drop-upcoming-drops'), [])
+
+        result = DropLaunch.tick(self.drop.end_datetime)
+        self.assertEqual(result['ended'], ['launch'])
+        self.assertEqual(self.slugs('drop-active-drops'), [])
+
+    def test_saving_an_upcoming_drop_schedules_its_launch(self):
+        from jobs.models import Job
+        with self.captureOnCommitCallbacks(execute=True):
+            self.drop.save()
+        job = Job.objects.filter(task='drops.launch', schedule='').latest('id')
+        self.assertEqual(job.run_at, self.drop.start_datetime)
+
+        # Further saves for the same start don't queue it again
+        with self.captureOnCommitCallbacks(execute=True):
+            self.drop.save()
+        self.assertEqual(Job.objects.filter(task='drops.launch', schedule='').count(), 1)
+
+    def test_edits_invalidate_payloads_but_stock_moves_do_not(self):
+        detail = reverse('drop-detail', kwargs={'slug': 'launch'})
+        self.assertEqual(self.client.get(detail).data['drop_products'][0]['drop_price'], '15.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.drop_product.reserve_stock(2)
+        self.assertIsNotNone(cache.get(DropPayloads.detail_key('launch')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.drop_product.drop_price = Decimal('12.00')
+            self.drop_product.save()
+        self.assertEqual(self.client.get(detail).data['drop_products'][0]['drop_price'], '12.00')
+        self.assertEqual(self.client.get(reverse('drop-detail', kwargs={'slug': 'missing'})).status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, DROP_ADMISSION_BURST=2)
+class WaitingRoomTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.drop = Drop.objects.create(
+            name='Gated', status='upcoming', is_public=True, admission_rate_per_minute=60,
+            start_datetime=now + timedelta(minutes=1), end_datetime=now + timedelta(days=1),
+        )
+        self.start = self.drop.start_datetime.timestamp()
+
+    def test_places_are_admitted_at_the_configured_rate(self):
+        room = WaitingRoom(self.drop)
+        tickets = [room.join() for _ in range(5)]
+
+        self.assertEqual(room.status(tickets[0], now=self.start - 10)['position'], 1)  # Nobody before the start
+        self.assertTrue(room.status(tickets[1], now=self.start)['admitted'])  # The burst goes at once
+        state = room.status(tickets[4], now=self.start)
+        self.assertEqual((state['admitted'], state['position'], state['estimated_wait_seconds']), (False, 3, 3))
+        self.assertFalse(room.status(tickets[3], now=self.start + 1.5)['admitted'])  # One place per second
+        self.assertTrue(room.status(tickets[3], now=self.start + 2)['admitted'])
+        self.assertIsNone(room.status('forged', now=self.start))
+
+    def test_idle_capacity_is_capped_at_the_burst(self):
+        room = WaitingRoom(self.drop)
+        room.join()
+        self.assertEqual(room.admitted_through(now=self.start + 3600), 1 + 2)
+        late = [room.join() for _ in range(4)]
+        self.assertEqual([room.status(t, now=self.start + 3600)['admitted'] for t in late], [True, True, False, False])
+
+    def test_checkout_requires_an_admitted_token(self):
+        user = get_user_model().objects.create_user(username='buyer', email='buyer@example.com', password='pass1234')
+        address = Address.objects.create(
+            user=user, address_type='shipping', recipient_name='Buyer', street_address='1 Main St',
+            city='Minsk', state_province='Minsk', postal_code='220000', country_code='BY',
+        )
+        shipping = ShippingMethod.objects.create(name='Courier', cost=Decimal('5.00'))
+        product = Product.objects.create(name='Hoodie', base_price=Decimal('50.00'))
+        drop_product = DropProduct.objects.create(
+            drop=self.drop, product=product, drop_price=Decimal('40.00'),
+            initial_stock_quantity=10, current_stock_quantity=10,
+        )
+        Drop.objects.filter(pk=self.drop.pk).update(
+            status='active', start_datetime=timezone.now() - timedelta(seconds=1)
+        )
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, drop_product=drop_product, quantity=1)
+        self.client.force_authenticate(user)
+        payload = {'cart_id': str(cart.cart_id), 'shipping_address_id': address.id, 'shipping_method_id': shipping.id}
+
+        response = self.client.post(reverse('create-order'), payload, format='json')
+        self.assertEqual((response.status_code, response.data['drops']), (429, ['gated']))
+
+        room_url = reverse('drop-waiting-room', kwargs={'slug': 'gated'})
+        joined = self.client.post(room_url)
+        self.assertEqual(joined['Cache-Control'], 'max-age=0, no-cache, no-store, must-revalidate, private')
+        self.assertTrue(joined.data['admitted'])
+        self.assertEqual(self.client.post(room_url, {'ticket': joined.data['ticket']}).data['ticket'], joined.data['ticket'])
+
+        response = self.client.post(
+            reverse('create-order'), payload, format='json', HTTP_X_CHECKOUT_TOKEN=joined.data['checkout_token']
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Order.objects.count(), 1)
+
+        # The token admitted one order
+        CartItem.objects.create(cart=cart, drop_product=drop_product, quantity=1)
+        response = self.client.post(
+            reverse('create-order'), payload, format='json', HTTP_X_CHECKOUT_TOKEN=joined.data['checkout_token']
+        )
+        self.assertEqual(response.status_code, 429)
+
+    def test_checkout_token_is_bound_to_its_cart(self):
+        Drop.objects.filter(pk=self.drop.pk).update(status='active', start_datetime=timezone.now() - timedelta(seconds=1))
+        product = Product.objects.create(name='Cap', base_price=Decimal('15.00'))
+        drop_product = DropProduct.objects.create(
+            drop=self.drop, product=product, drop_price=Decimal('12.00'),
+            initial_stock_quantity=10, current_stock_quantity=10,
+        )
+        mine, theirs = Cart.objects.create(), Cart.objects.create()
+        for cart in (mine, theirs):
+            CartItem.objects.create(cart=cart, drop_product=drop_product, quantity=1)
+        room_url = reverse('drop-waiting-room', kwargs={'slug': 'gated'})
+
+        self.assertEqual(self.client.post(room_url).status_code, 400)  # A guest must say which cart
+        token = self.client.post(room_url, {'cart_id': str(mine.cart_id)}).data['checkout_token']
+
+        def claim(cart):
+            request = APIRequestFactory().post('/', HTTP_X_CHECKOUT_TOKEN=token)
+            request.user = AnonymousUser()
+            return claim_checkout_tokens(request, [Drop.objects.get(pk=self.drop.pk)], cart.cart_id)
+
+        self.assertEqual([drop.slug for drop in claim(theirs)[0]], ['gated'])
+        refused, claims = claim(mine)
+        self.assertEqual((refused, len(claims)), ([], 1))
+        # A second checkout racing with the same token loses until the first gives it back
+        self.assertEqual([drop.slug for drop in claim(mine)[0]], ['gated'])
+        release_checkout_tokens(claims)
+        self.assertEqual(claim(mine)[0], [])
+
+    def test_guest_direct_orders_from_a_gated_drop_must_sign_in(self):
+        Drop.objects.filter(pk=self.drop.pk).update(status='active', start_datetime=timezone.now() - timedelta(seconds=1))
+        product = Product.objects.create(name='Cap', base_price=Decimal('15.00'))
+        DropProduct.objects.create(
+            drop=self.drop, product=product, drop_price=Decimal('12.00'),
+            initial_stock_quantity=10, current_stock_quantity=10,
+        )
+        address = Address.objects.create(
+            address_type='shipping', recipient_name='Guest', street_address='1 Main St',
+            city='Minsk', state_province='Minsk', postal_code='220000', country_code='BY',
+        )
+        shipping = ShippingMethod.objects.create(name='Courier', cost=Decimal('5.00'))
+
+        response = self.client.post(reverse('create-direct-order'), {
+            'product_id': product.id, 'shipping_address_id': address.id, 'shipping_method_id': shipping.id,
+            'email_for_guest': 'guest@example.com',
+        }, format='json')
+        self.assertEqual((response.status_code, response.data['code']), (403, 'waiting_room_sign_in'))
+        self.assertEqual(Order.objects.count(), 0)
@@ -2,9 +2,14 @@
 from rest_framework import viewsets, permissions, generics, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.conf import settings
+from django.utils.cache import add_never_cache_headers, patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
+from .launch import DropPayloads
 from .models import Drop, DropProduct
+from .waiting_room import WaitingRoom, checkout_subjects
 from .serializers import (
     DropSerializer, DropProductSerializer,
     DropCreateUpdateSerializer, DropProductCreateSerializer
@@ -25,30 +30,65 @@ class DropViewSet(viewsets.ReadOnlyModelViewSet): # Public read-only view
         'end_datetime': ['gte', 'lte', 'exact'],
     }
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.action == 'waiting_room':
+            add_never_cache_headers(response)  # Positions change between polls
+        elif self.action in ('retrieve', 'active_drops', 'upcoming_drops'):
+            # Short page-cache lifetime, so a drop shows as started within seconds of its flip
+            patch_cache_control(response, max_age=getattr(settings, 'DROP_PAGE_CACHE_SECONDS', 5))
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        # Pre-rendered payload (drops/launch.py); drop pages are the launch hot path
+        payload = DropPayloads.get_detail(kwargs[self.lookup_field])
+        if payload is None:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(payload)
+
     @action(detail=False, methods=['get'], url_path='active-drops')
     def active_drops(self, request):
-        now = timezone.now()
-        active = Drop.objects.filter(
-            is_public=True,
-            status='active', # Rely on the status field
-            # Or use dynamic calculation:
-            # start_datetime__lte=now,
-            # end_datetime__gte=now
-        ).prefetch_related('drop_products__product', 'drop_products__variant')
-        serializer = self.get_serializer(active, many=True)
-        return Response(serializer.data)
+        # Status is kept current by the drops.launch job, which also re-renders this payload
+        return Response(DropPayloads.get_list(DropPayloads.ACTIVE))
 
     @action(detail=False, methods=['get'], url_path='upcoming-drops')
     def upcoming_drops(self, request):
-        # Similar to active_drops but for 'upcoming'
-        now = timezone.now()
-        upcoming = Drop.objects.filter(
-            is_public=True,
-            status='upcoming',
-            # Or: start_datetime__gt=now
-        ).prefetch_related('drop_products__product', 'drop_products__variant')
-        serializer = self.get_serializer(upcoming, many=True)
-        return Response(serializer.data)
+        return Response(DropPayloads.get_list(DropPayloads.UPCOMING))
+
+    @action(detail=True, methods=['get', 'post'], url_path='waiting-room')
+    def waiting_room(self, request, slug=None):
+        """
+        POST joins the drop's waiting room and returns a ticket; GET ?ticket= reports
+        the ticket's position and, once admitted, the checkout token to send as
+        X-Checkout-Token. The token is issued to the cart_id sent along, or to the
+        signed-in user without one, and admits a single order. Poll no faster than
+        retry_after seconds.
+        """
+        drop = get_object_or_404(
+            Drop.objects.only('pk', 'slug', 'status', 'start_datetime', 'end_datetime', 'admission_rate_per_minute'),
+            slug=slug, is_public=True
+        )
+        room = WaitingRoom(drop)
+        if not room.enabled:
+            return Response({'waiting_room': False, 'admitted': True, 'position': 0, 'checkout_token': None})
+        if drop.status in ('ended', 'cancelled'):
+            return Response({'error': 'This drop is over'}, status=status.HTTP_410_GONE)
+
+        params = request.query_params if request.method == 'GET' else request.data
+        subjects = checkout_subjects(request, params.get('cart_id'))
+        if not subjects:
+            return Response({'error': 'cart_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        ticket = params.get('ticket')
+        if request.method == 'POST' and room.place_of(ticket or '') is None:
+            ticket = room.join()  # Rejoining with a valid ticket keeps its place
+        if not ticket:
+            return Response({'error': 'ticket is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        state = room.status(ticket, subject=subjects[0])
+        if state is None:
+            return Response({'error': 'Invalid ticket for this drop'}, status=status.HTTP_400_BAD_REQUEST)
+        retry_after = 0 if state['admitted'] else min(30, max(2, state['estimated_wait_seconds'] // 4))
+        return Response({'waiting_room': True, 'ticket': ticket, 'retry_after': retry_after, **state})
 
 
 # For Admin to manage Drops and their products
@@ -0,0 +1,215 @@
+# drops/waiting_room.py
+"""
+Admission control ("waiting room") for drops with admission_rate_per_minute set.
+
+Shoppers join the drop's queue and get a signed ticket carrying their place in
+line. Places are admitted by a token bucket kept in the shared cache: from the
+drop's start time it refills at admission_rate_per_minute, holds at most
+DROP_ADMISSION_BURST unused tokens, and each token admits the next place. An
+admitted ticket is exchanged for a checkout token, which the checkout views
+require (X-Checkout-Token header) for carts or products of a gated drop. Checkout
+load is therefore bounded by the admission rate instead of by the crowd.
+
+A checkout token is issued to one subject, the cart being checked out or else the
+signed-in user (checkout_subjects), and admits one order: the checkout claims its
+place before the order is created (claim_checkout_tokens) and releases it if the
+order fails. Guests buying without a cart have no subject, so they must sign in.
+
+All state is two cache keys per drop (the last place handed out, and the bucket),
+plus one per used place, so it needs a cache shared by every worker (Redis) in
+production. The bucket is refilled by whichever request holds a short cache lock;
+the others read it.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from backend.metrics import record_waiting_room
+
+TICKET_SALT = 'drops.waiting_room.ticket'
+CHECKOUT_SALT = 'drops.waiting_room.checkout'
+STATE_TTL = 60 * 60 * 48  # Outlives any drop's launch traffic
+LOCK_SECONDS = 2
+
+
+class WaitingRoom:
+    """Token-bucket admission for one drop (see module docstring)."""
+
+    def __init__(self, drop):
+        self.drop = drop
+        self.rate = (drop.admission_rate_per_minute or 0) / 60  # Places per second
+        self.burst = getattr(settings, 'DROP_ADMISSION_BURST', 20)
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def key(self, name):
+        return f'waiting_room:{self.drop.pk}:{name}'
+
+    def join(self):
+        """Hand out the next place in line and return its ticket."""
+        cache.add(self.key('tail'), 0, STATE_TTL)
+        place = cache.incr(self.key('tail'))
+        record_waiting_room('joined')
+        return signing.dumps({'d': self.drop.pk, 'p': place}, salt=TICKET_SALT)
+
+    def place_of(self, ticket):
+        """The place a ticket holds in this drop's line, or None if it isn't a valid ticket for it."""
+        try:
+            data = signing.loads(ticket, salt=TICKET_SALT)
+        except signing.BadSignature:
+            return None
+        if data.get('d') != self.drop.pk:
+            return None
+        return data.get('p')
+
+    def admitted_through(self, now=None):
+        """The highest place admitted so far (0 before the drop starts)."""
+        now = time.time() if now is None else now
+        start = self.drop.start_datetime.timestamp()
+        if now < start:
+            return 0
+        if not cache.get(self.key('bucket')):
+            cache.add(self.key('bucket'), {'head': self.burst, 'at': start}, STATE_TTL)
+        bucket = cache.get(self.key('bucket')) or {'head': self.burst, 'at': start}
+        if int((now - bucket['at']) * self.rate) < 1 or not cache.add(self.key('lock'), 1, LOCK_SECONDS):
+            return bucket['head']
+        try:
+            bucket = cache.get(self.key('bucket')) or bucket
+            tokens = int((now - bucket['at']) * self.rate)
+            if tokens < 1:
+                return bucket['head']
+            # Unused tokens are kept only up to the burst size
+            ceiling = (cache.get(self.key('tail')) or 0) + self.burst
+            head = bucket['head'] + tokens
+            if head >= ceiling:
+                bucket = {'head': max(bucket['head'], ceiling), 'at': now}
+            else:
+                bucket = {'head': head, 'at': bucket['at'] + tokens / self.rate}
+            cache.set(self.key('bucket'), bucket, STATE_TTL)
+            return bucket['head']
+        finally:
+            cache.delete(self.key('lock'))
+
+    def status(self, ticket, subject=None, now=None):
+        """
+        Where a ticket stands: its position (0 once admitted), the estimated wait,
+        and, once admitted, a checkout token issued to `subject` (see
+        checkout_subjects). None for an invalid ticket.
+        """
+        place = self.place_of(ticket)
+        if place is None:
+            return None
+        head = self.admitted_through(now)
+        if place <= head:
+            record_waiting_room('admitted')
+            return {
+                'admitted': True, 'position': 0, 'estimated_wait_seconds': 0,
+                'checkout_token': signing.dumps({'d': self.drop.pk, 'p': place, 's': subject}, salt=CHECKOUT_SALT),
+            }
+        position = place - head
+        now = time.time() if now is None else now
+        wait = max(0, self.drop.start_datetime.timestamp() - now) + position / self.rate
+        return {
+            'admitted': False, 'position': position, 'estimated_wait_seconds': math.ceil(wait),
+            'checkout_token': None,
+        }
+
+    def admitted_place(self, checkout_token, subjects):
+        """
+        The place a checkout token admits to checkout, or None if it is invalid,
+        expired, issued to a subject other than `subjects`, or already used.
+        """
+        try:
+            data = signing.loads(
+                checkout_token, salt=CHECKOUT_SALT, max_age=getattr(settings, 'DROP_CHECKOUT_TOKEN_SECONDS', 900)
+            )
+        except signing.BadSignature:
+            return None
+        if data.get('d') != self.drop.pk or data.get('s') is None or data.get('s') not in subjects:
+            return None
+        if cache.get(self.key(f"used:{data['p']}")):
+            return None
+        return data['p']
+
+    def claim(self, checkout_token, subjects):
+        """
+        Claim the place a checkout token admits, so the token admits no other order.
+        Returns the place, or None if the token doesn't admit or another checkout
+        claimed it first.
+        """
+        place = self.admitted_place(checkout_token, subjects)
+        if place is None or not cache.add(self.key(f'used:{place}'), 1, STATE_TTL):
+            return None
+        return place
+
+    def release(self, place):
+        """Give a claimed place back, for a checkout that didn't create its order."""
+        cache.delete(self.key(f'used:{place}'))
+
+
+def checkout_tokens(request):
+    """Checkout tokens sent with a request: X-Checkout-Token, comma-separated for several drops."""
+    header = request.META.get('HTTP_X_CHECKOUT_TOKEN', '')
+    return [token.strip() for token in header.split(',') if token.strip()]
+
+
+def checkout_subjects(request, cart_id=None):
+    """Who the request checks out as: the cart it checks out and the signed-in user, if any."""
+    subjects = []
+    if cart_id:
+        subjects.append(f'cart:{cart_id}')
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        subjects.append(f'user:{user.pk}')
+    return subjects
+
+
+def claim_checkout_tokens(request, drops, cart_id=None):
+    """
+    Claim a place in the waiting room of each active, gated drop among `drops` with
+    the request's checkout tokens for this cart or user. Returns the drops none of
+    them admits and the claimed (room, place) pairs; when a drop is refused nothing
+    stays claimed.
+    """
+    tokens = checkout_tokens(request)
+    subjects = checkout_subjects(request, cart_id)
+    refused, claims = [], []
+    for drop in drops:
+        room = WaitingRoom(drop)
+        if drop.status != 'active' or not room.enabled:
+            continue
+        for token in tokens:
+            place = room.claim(token, subjects)
+            if place is not None:
+                claims.append((room, place))
+                break
+        else:
+            refused.append(drop)
+    if refused:
+        record_waiting_room('refused')
+        release_checkout_tokens(claims)
+        claims = []
+    return refused, claims
+
+
+def release_checkout_tokens(claims):
+    """Release the places of claim_checkout_tokens, for a checkout whose order wasn't created."""
+    for room, place in claims:
+        room.release(place)
+
+
+def gated_drops(cart_id=None, product_id=None, variant_id=None):
+    """Active drops with a waiting room that a checkout of the cart, or of the product, buys from."""
+    from .models import Drop
+
+    drops = Drop.objects.filter(status='active', admission_rate_per_minute__isnull=False)
+    if cart_id is not None:
+        drops = drops.filter(drop_products__cart_items__cart__cart_id=cart_id)
+    else:
+        drops = drops.filter(drop_products__product_id=product_id, drop_products__variant_id=variant_id)
+    return list(drops.only('pk', 'slug', 'status', 'start_datetime', 'admission_rate_per_minute').distinct())
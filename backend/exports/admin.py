@@ -0,0 +1,14 @@
+from django.contrib import admin
+from .models import ExportJob
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("job_id", "report", "status", "rows_written", "requested_by", "created_at", "expires_at")
+    list_filter = ("status", "report", "created_at")
+    search_fields = ("job_id", "requested_by__email")
+    list_select_related = ("requested_by",)
+    readonly_fields = (
+        "job_id", "rows_written", "total_rows_estimate", "file", "file_size", "error",
+        "created_at", "updated_at", "started_at", "finished_at", "expires_at",
+    )
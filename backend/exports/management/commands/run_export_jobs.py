@@ -0,0 +1,74 @@
+"""
+Django Management Command: Run Export Jobs
+
+Worker for admin report exports (exports/runner.py). Builds every pending export
+job into a gzip-compressed CSV in media storage, then deletes artifacts that have
+passed their expiry. Run it from cron, or keep it running with --loop.
+
+Usage:
+    python manage.py run_export_jobs
+    python manage.py run_export_jobs --dry-run
+    python manage.py run_export_jobs --loop --sleep 10
+    python manage.py run_export_jobs --max-jobs 1
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from exports.models import ExportJob
+from exports.runner import ExportRunner
+
+class Command(BaseCommand):
+    help = 'Build pending report export jobs and delete expired export artifacts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show pending jobs and expired artifacts without processing them',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for new jobs instead of exiting when the queue is empty',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5.0,
+            help='Seconds between polls with --loop (default: 5)',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=None,
+            help='Stop after building this many jobs per pass',
+        )
+
+    def handle(self, *args, **options):
+        """Drain the export queue, then expire old artifacts."""
+        if options['dry_run']:
+            pending = ExportJob.objects.filter(status='pending').count()
+            expired = ExportRunner.expired_jobs().count()
+            self.stdout.write(
+                self.style.WARNING(f'DRY RUN: {pending} pending export jobs, {expired} artifacts to expire')
+            )
+            return
+
+        while True:
+            self.run_once(options['max_jobs'])
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+    def run_once(self, max_jobs):
+        for job in ExportRunner.run_pending(max_jobs=max_jobs):
+            if job.status == 'completed':
+                self.stdout.write(
+                    self.style.SUCCESS(f'{job.report} export {job.pk}: {job.rows_written} rows, {job.file_size} bytes')
+                )
+            else:
+                self.stdout.write(self.style.ERROR(f'{job.report} export {job.pk} failed: {job.error}'))
+
+        expired = ExportRunner.expire_artifacts()
+        if expired:
+            self.stdout.write(self.style.SUCCESS(f'Deleted {expired} expired export artifacts'))
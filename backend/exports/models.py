@@ -0,0 +1,69 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+def export_upload_to(job, filename):
+    """exports/<yyyy>/<mm>/<dd>/<report>-<job uuid>.csv.gz; the uuid keeps artifact paths unguessable."""
+    return f"exports/{job.created_at:%Y/%m/%d}/{job.report}-{job.job_id}.csv.gz"
+
+
+class ExportJob(models.Model):
+    """
+    A report requested by an admin and built in the background (exports/runner.py).
+    The finished artifact is a gzip-compressed CSV in DEFAULT_FILE_STORAGE that is
+    deleted once expires_at has passed.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('expired', 'Expired'),  # Artifact deleted after EXPORT_ARTIFACT_TTL
+    ]
+
+    job_id = models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True)
+    report = models.CharField(max_length=50)  # Key in exports.reports.REPORTS
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+        null=True, blank=True, related_name='export_jobs'
+    )
+
+    rows_written = models.PositiveIntegerField(default=0)
+    total_rows_estimate = models.PositiveIntegerField(null=True, blank=True)  # Planner estimate, for progress only
+    file = models.FileField(upload_to=export_upload_to, max_length=255, blank=True)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)  # Compressed bytes
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Doubles as the worker heartbeat while running
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),  # Worker queue: oldest pending first
+            models.Index(fields=['expires_at'], condition=models.Q(status='completed'), name='exports_job_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.report} export {self.job_id} ({self.get_status_display()})"
+
+    @property
+    def progress(self):
+        """Percent complete, or None while the size of the report is unknown."""
+        if self.status in ('completed', 'expired'):
+            return 100
+        if not self.total_rows_estimate:
+            return None
+        # The estimate can undershoot; never report 100 before the file is saved
+        return min(99, int(self.rows_written * 100 / self.total_rows_estimate))
+
+    @property
+    def download_filename(self):
+        return f"{self.report}_export_{self.created_at:%Y%m%d_%H%M%S}.csv.gz"
@@ -0,0 +1,137 @@
+# exports/reports.py
+"""
+Registry of the reports an admin can export in the background.
+
+A Report pairs a CSV header with a row generator from the owning app's exports
+module (products/exports.py, users/exports.py, ...), the same generators the
+streamed export actions use, plus the queryset the rows are read from so the
+runner can estimate the report size for progress reporting.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from analytics.exports import EVENT_EXPORT_HEADER, event_export_rows
+from analytics.models import WebsiteEvent
+from orders.exports import INVENTORY_EXPORT_HEADER, ORDER_EXPORT_HEADER, inventory_export_rows, order_export_rows
+from orders.models import OrderItem
+from products.exports import PRODUCT_EXPORT_HEADER, LOW_STOCK_EXPORT_HEADER, product_export_rows, low_stock_export_rows
+from products.models import Product
+from users.exports import USER_EXPORT_HEADER, user_export_rows
+from users.models import User
+
+DATE_PARAMS = ('date_from', 'date_to')
+# Parameters validated as YYYY-MM-DD dates
+DATE_VALUED_PARAMS = DATE_PARAMS + ('as_of',)
+
+
+class Report:
+    """
+    `queryset(params)` returns the rows to export (None for reports that are not a
+    single queryset) and `rows(queryset)` turns it into CSV rows; reports without a
+    queryset get the params as keyword arguments instead. `params` lists the filter
+    keys the report accepts; values are strings, dates as YYYY-MM-DD.
+    """
+
+    def __init__(self, name, description, header, rows, queryset=None, params=()):
+        self.name = name
+        self.description = description
+        self.header = header
+        self._rows = rows
+        self._queryset = queryset
+        self.params = params
+
+    def queryset(self, params):
+        return self._queryset(params) if self._queryset else None
+
+    def rows(self, params):
+        queryset = self.queryset(params)
+        return self._rows(queryset) if queryset is not None else self._rows(**params)
+
+    def clean_params(self, params):
+        """Validated copy of `params`; raises ValueError naming the offending key."""
+        cleaned = {}
+        for key, value in (params or {}).items():
+            if key not in self.params:
+                raise ValueError(f"Unknown parameter '{key}' for report '{self.name}'")
+            value = str(value).strip()
+            if not value:
+                continue
+            if key in DATE_VALUED_PARAMS and parse_date(value) is None:
+                raise ValueError(f"'{key}' must be a date in YYYY-MM-DD format")
+            cleaned[key] = value
+        return cleaned
+
+
+def _created_between(queryset, params, field='created_at'):
+    """Filter on whole days [date_from, date_to] as datetime bounds, so the column index is usable."""
+    tz = timezone.get_current_timezone()
+    if params.get('date_from'):
+        start = datetime.combine(parse_date(params['date_from']), time.min)
+        queryset = queryset.filter(**{f'{field}__gte': timezone.make_aware(start, tz)})
+    if params.get('date_to'):
+        end = datetime.combine(parse_date(params['date_to']) + timedelta(days=1), time.min)
+        queryset = queryset.filter(**{f'{field}__lt': timezone.make_aware(end, tz)})
+    return queryset
+
+
+def _products(params):
+    queryset = Product.objects.all()
+    if params.get('include_archived') not in ('1', 'true', 'True'):
+        queryset = queryset.filter(is_archived=False)
+    return queryset.order_by('id')
+
+
+def _users(params):
+    queryset = _created_between(User.objects.all(), params, field='date_joined')
+    if params.get('is_active') in ('1', 'true', 'True', '0', 'false', 'False'):
+        queryset = queryset.filter(is_active=params['is_active'] in ('1', 'true', 'True'))
+    return queryset.order_by('id')
+
+
+def _order_items(params):
+    queryset = _created_between(OrderItem.objects.all(), params, field='order__created_at')
+    if params.get('order_status'):
+        queryset = queryset.filter(order__order_status=params['order_status'])
+    if params.get('payment_status'):
+        queryset = queryset.filter(order__payment_status=params['payment_status'])
+    return queryset
+
+
+def _events(params):
+    queryset = _created_between(WebsiteEvent.objects.all(), params)
+    if params.get('event_type'):
+        queryset = queryset.filter(event_type=params['event_type'])
+    return queryset
+
+
+REPORTS = {report.name: report for report in [
+    Report(
+        'products', 'Products with category, price and variant count',
+        PRODUCT_EXPORT_HEADER, product_export_rows, _products, params=('include_archived',),
+    ),
+    Report(
+        'low_stock', 'Variants and drop products at or below their low stock threshold',
+        LOW_STOCK_EXPORT_HEADER, low_stock_export_rows,
+    ),
+    Report(
+        'inventory', 'Stock, reserved and available quantity of every variant and drop product, optionally as of a date',
+        INVENTORY_EXPORT_HEADER, inventory_export_rows, params=('as_of',),
+    ),
+    Report(
+        'users', 'User accounts',
+        USER_EXPORT_HEADER, user_export_rows, _users, params=DATE_PARAMS + ('is_active',),
+    ),
+    Report(
+        'orders', 'Order lines with order totals and status',
+        ORDER_EXPORT_HEADER, order_export_rows, _order_items,
+        params=DATE_PARAMS + ('order_status', 'payment_status'),
+    ),
+    Report(
+        'analytics_events', 'Website events',
+        EVENT_EXPORT_HEADER, event_export_rows, _events, params=DATE_PARAMS + ('event_type',),
+    ),
+]}
+
+REPORT_CHOICES = [(name, report.description) for name, report in REPORTS.items()]
@@ -0,0 +1,170 @@
+# exports/runner.py
+"""
+Builds ExportJob artifacts outside the request cycle.
+
+The worker (`python manage.py run_export_jobs`) claims the oldest pending job with
+a conditional UPDATE, so several workers never build the same job, then streams the
+report's rows through gzip into a temporary file, recording rows_written after each
+chunk. The finished file is saved to DEFAULT_FILE_STORAGE (R2 in production, the
+local media directory otherwise) and kept for EXPORT_ARTIFACT_TTL seconds.
+
+Every write after the claim is conditional on the claim still holding (status
+'running' and the same started_at): a worker that stalled past
+EXPORT_JOB_STALE_SECONDS has had its job requeued, and possibly claimed again, so it
+discards its artifact instead of overwriting the newer run.
+"""
+import csv
+import gzip
+import io
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from backend.csv_export import EXPORT_CHUNK_SIZE
+from backend.pagination import estimate_count
+from .models import ExportJob
+from .reports import REPORTS
+
+logger = logging.getLogger(__name__)
+
+
+class ExportRunner:
+    """
+    Service class for claiming, building and expiring export jobs
+    """
+
+    @staticmethod
+    def artifact_ttl():
+        return timedelta(seconds=getattr(settings, 'EXPORT_ARTIFACT_TTL', 60 * 60 * 24))
+
+    @staticmethod
+    def claim_next():
+        """Mark the oldest pending job as running and return it, or None if the queue is empty."""
+        candidates = ExportJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)
+        for job_id in candidates[:10]:
+            now = timezone.now()
+            claimed = ExportJob.objects.filter(pk=job_id, status='pending').update(
+                status='running', started_at=now, updated_at=now, rows_written=0, error=''
+            )
+            if claimed:
+                return ExportJob.objects.get(pk=job_id)
+        return None
+
+    @staticmethod
+    def claimed(job):
+        """The job's row, as long as this worker's claim on it still holds."""
+        return ExportJob.objects.filter(pk=job.pk, status='running', started_at=job.started_at)
+
+    @staticmethod
+    def requeue_stale(now=None):
+        """
+        Put running jobs whose worker stopped reporting progress back in the queue.
+        A job refreshes updated_at after every chunk, so a quiet job is an abandoned one.
+        """
+        cutoff = (now or timezone.now()) - timedelta(seconds=getattr(settings, 'EXPORT_JOB_STALE_SECONDS', 15 * 60))
+        requeued = ExportJob.objects.filter(status='running', updated_at__lt=cutoff).update(
+            status='pending', rows_written=0, updated_at=timezone.now()
+        )
+        if requeued:
+            logger.warning(f"Requeued {requeued} stalled export jobs")
+        return requeued
+
+    @staticmethod
+    def run(job):
+        """Build the artifact for a claimed (running) job. Failures are recorded on the job."""
+        report = REPORTS.get(job.report)
+        try:
+            if report is None:
+                raise ValueError(f"Unknown report '{job.report}'")
+            params = report.clean_params(job.params)
+            queryset = report.queryset(params)
+            if queryset is not None:
+                total = estimate_count(queryset)
+                ExportRunner.claimed(job).update(total_rows_estimate=total, updated_at=timezone.now())
+                job.total_rows_estimate = total
+
+            with tempfile.TemporaryFile() as artifact:
+                job.rows_written = ExportRunner.write_csv(job, report.header, report.rows(params), artifact)
+                job.file_size = artifact.tell()
+                artifact.seek(0)
+                # Storage picks the final name (see export_upload_to) and uploads from the temp file
+                job.file.save('export.csv.gz', File(artifact), save=False)
+        except Exception as e:
+            logger.exception(f"Export job {job.pk} ({job.report}) failed")
+            finished, error = timezone.now(), str(e)[:2000]
+            if ExportRunner.claimed(job).update(status='failed', error=error, finished_at=finished, updated_at=finished):
+                job.status, job.error, job.finished_at = 'failed', error, finished
+            else:
+                job.refresh_from_db()
+            return job
+
+        finished = timezone.now()
+        expires = finished + ExportRunner.artifact_ttl()
+        completed = ExportRunner.claimed(job).update(
+            status='completed', rows_written=job.rows_written, file=job.file.name, file_size=job.file_size,
+            finished_at=finished, expires_at=expires, updated_at=finished,
+        )
+        if not completed:
+            logger.warning(f"Export job {job.pk} ({job.report}) was requeued while running; discarding its artifact")
+            job.file.delete(save=False)
+            job.refresh_from_db()
+            return job
+        job.status, job.finished_at, job.expires_at = 'completed', finished, expires
+        logger.info(f"Export job {job.pk} ({job.report}) wrote {job.rows_written} rows, {job.file_size} bytes")
+        return job
+
+    @staticmethod
+    def write_csv(job, header, rows, artifact):
+        """
+        Write header and rows as gzip-compressed CSV into the binary file `artifact`,
+        saving progress every EXPORT_CHUNK_SIZE rows. Returns the number of rows written.
+        """
+        written = 0
+        with gzip.GzipFile(fileobj=artifact, mode='wb') as compressed:
+            text = io.TextIOWrapper(compressed, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            writer.writerow(header)
+            for row in rows:
+                writer.writerow(row)
+                written += 1
+                if written % EXPORT_CHUNK_SIZE == 0:
+                    text.flush()
+                    ExportRunner.claimed(job).update(rows_written=written, updated_at=timezone.now())
+            text.flush()
+            text.detach()  # Leave closing the gzip stream to the with block
+        return written
+
+    @staticmethod
+    def run_pending(max_jobs=None):
+        """Build pending jobs until the queue is empty or max_jobs have run. Returns the jobs run."""
+        ExportRunner.requeue_stale()
+        jobs = []
+        while max_jobs is None or len(jobs) < max_jobs:
+            job = ExportRunner.claim_next()
+            if job is None:
+                break
+            jobs.append(ExportRunner.run(job))
+        return jobs
+
+    @staticmethod
+    def expired_jobs(now=None):
+        return ExportJob.objects.filter(status='completed', expires_at__lte=now or timezone.now())
+
+    @staticmethod
+    def expire_artifacts(now=None):
+        """Delete artifacts past their expiry from storage and mark their jobs expired."""
+        expired = 0
+        for job in ExportRunner.expired_jobs(now).iterator():
+            if job.file:
+                try:
+                    job.file.delete(save=False)
+                except Exception as e:
+                    logger.error(f"Could not delete export artifact {job.file.name}: {e}")
+                    continue
+            ExportJob.objects.filter(pk=job.pk).update(status='expired', file='', updated_at=timezone.now())
+            expired += 1
+        return expired
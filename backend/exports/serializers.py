@@ -0,0 +1,39 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from .models import ExportJob
+from .reports import REPORTS, REPORT_CHOICES
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    report = serializers.ChoiceField(choices=REPORT_CHOICES)
+    params = serializers.DictField(required=False, default=dict)
+    requested_by = serializers.StringRelatedField(read_only=True)
+    progress = serializers.IntegerField(read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'job_id', 'report', 'params', 'status', 'progress', 'rows_written', 'total_rows_estimate',
+            'file_size', 'error', 'requested_by', 'created_at', 'started_at', 'finished_at', 'expires_at',
+            'download_url',
+        ]
+        read_only_fields = [
+            'job_id', 'status', 'rows_written', 'total_rows_estimate', 'file_size', 'error',
+            'created_at', 'started_at', 'finished_at', 'expires_at',
+        ]
+
+    def get_download_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        request = self.context.get('request')
+        path = reverse('admin-export-download', args=[obj.job_id])
+        return request.build_absolute_uri(path) if request else path
+
+    def validate(self, attrs):
+        try:
+            attrs['params'] = REPORTS[attrs['report']].clean_params(attrs.get('params'))
+        except ValueError as e:
+            raise serializers.ValidationError({'params': str(e)})
+        return attrs
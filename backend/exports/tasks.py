@@ -0,0 +1,15 @@
+# exports/tasks.py
+"""Report export building as a job (see jobs/registry.py)."""
+from datetime import timedelta
+
+from jobs.registry import schedule, task
+from .runner import ExportRunner
+
+
+@task('exports.run_export_jobs', concurrency=2, lease_seconds=900, max_attempts=1)
+def run_export_jobs(max_jobs=5):
+    jobs = ExportRunner.run_pending(max_jobs=max_jobs)
+    return {'built': len(jobs), 'expired': ExportRunner.expire_artifacts()}
+
+
+schedule('exports.run_export_jobs', every=timedelta(seconds=30))
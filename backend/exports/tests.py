@@ -0,0 +1,133 @@
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from drops.models import Drop, DropProduct
+from orders.inventory import InventoryLedger
+from orders.models import Order, OrderItem
+from products.models import Product, ProductVariant
+from .models import ExportJob
+from .reports import REPORTS
+from .runner import ExportRunner
+
+
+def stored_files(root):
+    return [os.path.join(path, name) for path, _, names in os.walk(root) for name in names]
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ExportJobTests(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='pass1234')
+        order = Order.objects.create(
+            user=self.admin, subtotal_amount=Decimal('30.00'), total_amount=Decimal('35.00'),
+            shipping_cost=Decimal('5.00'), payment_status='paid', order_status='processing',
+        )
+        for name in ('Tee', 'Hoodie'):
+            OrderItem.objects.create(
+                order=order, product_name_snapshot=name, sku_snapshot=f'{name.upper()}-M',
+                quantity=1, price_per_unit=Decimal('15.00'), subtotal=Decimal('15.00'),
+            )
+        self.client.force_authenticate(self.admin)
+
+    def test_job_is_built_by_worker_and_downloadable(self):
+        response = self.client.post(reverse('admin-export-list'), {
+            'report': 'orders', 'params': {'payment_status': 'paid', 'date_from': str(timezone.localdate())},
+        }, format='json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['job_id']
+        self.assertEqual(response.data['status'], 'pending')
+
+        download_url = reverse('admin-export-download', args=[job_id])
+        self.assertEqual(self.client.get(download_url).status_code, 409)
+
+        jobs = ExportRunner.run_pending()
+        self.assertEqual([job.status for job in jobs], ['completed'])
+
+        detail = self.client.get(reverse('admin-export-detail', args=[job_id]))
+        self.assertEqual((detail.data['status'], detail.data['progress'], detail.data['rows_written']), ('completed', 100, 2))
+        self.assertIn('no-cache', detail['Cache-Control'])
+
+        download = self.client.get(download_url)
+        self.assertEqual(download.status_code, 200)
+        lines = gzip.decompress(b''.join(download.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('order_number,created_at'))
+        self.assertIn('admin@example.com', lines[1])
+
+    def test_invalid_params_rejected_and_artifacts_expire(self):
+        response = self.client.post(reverse('admin-export-list'), {
+            'report': 'users', 'params': {'date_from': 'yesterday'},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        job = ExportJob.objects.create(report='users', requested_by=self.admin)
+        ExportRunner.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_written), ('completed', 1))
+        storage = job.file.storage
+        name = job.file.name
+        self.assertTrue(storage.exists(name))
+
+        self.assertEqual(ExportRunner.expire_artifacts(now=job.expires_at - timedelta(seconds=1)), 0)
+        self.assertEqual(ExportRunner.expire_artifacts(now=job.expires_at), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'expired')
+        self.assertFalse(storage.exists(name))
+        self.assertEqual(self.client.get(reverse('admin-export-download', args=[job.pk])).status_code, 410)
+
+    def test_requeued_job_discards_its_artifact(self):
+        job = ExportJob.objects.create(report='users', requested_by=self.admin)
+        claimed = ExportRunner.claim_next()
+        # The worker stalled: the job was requeued and claimed again by another worker
+        ExportJob.objects.filter(pk=job.pk).update(status='running', started_at=timezone.now() + timedelta(seconds=1))
+
+        result = ExportRunner.run(claimed)
+
+        self.assertEqual(result.status, 'running')
+        self.assertFalse(result.file)
+        self.assertEqual(ExportJob.objects.get(pk=job.pk).rows_written, 0)
+        self.assertEqual(stored_files(self.media_root), [])
+
+    def test_inventory_report_covers_variants_and_drop_products(self):
+        product = Product.objects.create(name='Tee', base_price=Decimal('20.00'), sku_prefix='TEE')
+        variant = ProductVariant.objects.create(product=product, sku_suffix='-M', stock_quantity=10)
+        now = timezone.now()
+        drop = Drop.objects.create(name='Launch', start_datetime=now, end_datetime=now + timedelta(days=1))
+        drop_product = DropProduct.objects.create(
+            drop=drop, product=product, variant=variant, drop_price=Decimal('15.00'),
+            initial_stock_quantity=5, current_stock_quantity=5,
+        )
+        InventoryLedger.take_snapshot(now=now - timedelta(days=2))
+        variant.reserve_stock(3)
+        report = REPORTS['inventory']
+
+        rows = list(report.rows(report.clean_params({})))
+        self.assertEqual(rows, [
+            ['variant', variant.id, product.id, 'Tee', '', 'TEE-M', 10, 3, 7, '', 'current'],
+            ['drop_product', drop_product.id, product.id, 'Tee', 'Launch', 'TEE-M', 5, 0, 5, '', 'current'],
+        ])
+
+        yesterday = str(timezone.localdate(now - timedelta(days=1)))
+        rows = list(report.rows(report.clean_params({'as_of': yesterday})))
+        self.assertEqual([row[6:9] + [row[10]] for row in rows], [[10, 0, 10, 'snapshot'], [5, 0, 5, 'snapshot']])
+
+        rows = list(report.rows(report.clean_params({'as_of': str(timezone.localdate(now - timedelta(days=3)))})))
+        self.assertEqual([row[6:] for row in rows], [['', '', '', '', '']] * 2)
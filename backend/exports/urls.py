@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import AdminExportJobViewSet
+
+admin_router = DefaultRouter()
+admin_router.register(r'exports', AdminExportJobViewSet, basename='admin-export')
+
+urlpatterns = [
+    path('admin/', include(admin_router.urls)),  # /api/v1/admin/exports/
+]
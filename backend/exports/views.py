@@ -0,0 +1,66 @@
+from django.http import FileResponse
+from django.utils.cache import add_never_cache_headers
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .models import ExportJob
+from .reports import REPORTS
+from .serializers import ExportJobSerializer
+
+
+class AdminExportJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                            mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Background report exports for admins.
+
+    POST admin/exports/ {"report": "orders", "params": {"date_from": "2026-01-01"}} queues
+    a job (202); poll GET admin/exports/<job_id>/ for status and progress, then fetch
+    GET admin/exports/<job_id>/download/ once it is completed. GET admin/exports/reports/
+    lists the available reports and their parameters.
+    """
+    queryset = ExportJob.objects.select_related('requested_by')
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for field in ('status', 'report'):
+            value = self.request.query_params.get(field)
+            if value:
+                queryset = queryset.filter(**{field: value})
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save(requested_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Job status changes between polls; keep it out of the page cache
+        add_never_cache_headers(response)
+        return response
+
+    @action(detail=False, methods=['get'])
+    def reports(self, request):
+        return Response([
+            {'report': report.name, 'description': report.description, 'params': list(report.params)}
+            for report in REPORTS.values()
+        ])
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Stream the gzip-compressed CSV from storage."""
+        job = self.get_object()
+        if job.status == 'expired':
+            return Response({'error': 'Export has expired', 'status': job.status}, status=status.HTTP_410_GONE)
+        if job.status != 'completed' or not job.file:
+            return Response({'error': 'Export is not ready', 'status': job.status}, status=status.HTTP_409_CONFLICT)
+        return FileResponse(
+            job.file.open('rb'), as_attachment=True,
+            filename=job.download_filename, content_type='application/gzip'
+        )
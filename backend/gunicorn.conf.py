@@ -0,0 +1,24 @@
+# gunicorn.conf.py
+"""
+gunicorn hooks, picked up from the working directory (backend/) on startup.
+
+With PROMETHEUS_MULTIPROC_DIR set, every worker writes its metric samples to files
+in that directory (see backend/metrics.py). Start from an empty directory and drop
+the files of workers that exit, so /metrics doesn't report dead workers' gauges.
+"""
+import glob
+import os
+
+
+def on_starting(server):
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,49 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job, JobMetric, JobSchedule
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "task", "status", "attempts", "max_attempts", "run_at", "worker", "started_at", "finished_at")
+    list_filter = ("status", "task", "schedule")
+    search_fields = ("task", "worker", "last_error")
+    readonly_fields = (
+        "task", "args", "attempts", "slot", "worker", "lease_expires_at", "heartbeat_at", "result",
+        "last_error", "schedule", "created_at", "updated_at", "started_at", "finished_at",
+    )
+    actions = ["retry_now", "cancel"]
+
+    @admin.action(description="Retry selected jobs now")
+    def retry_now(self, request, queryset):
+        now = timezone.now()
+        updated = queryset.filter(status__in=['failed', 'cancelled']).update(
+            status='queued', attempts=0, run_at=now, finished_at=None, updated_at=now
+        )
+        self.message_user(request, f"{updated} jobs queued for retry.")
+
+    @admin.action(description="Cancel selected queued jobs")
+    def cancel(self, request, queryset):
+        now = timezone.now()
+        updated = queryset.filter(status='queued').update(status='cancelled', finished_at=now, updated_at=now)
+        self.message_user(request, f"{updated} jobs cancelled.")
+
+
+@admin.register(JobSchedule)
+class JobScheduleAdmin(admin.ModelAdmin):
+    list_display = ("name", "enabled", "next_run_at", "last_enqueued_at")
+    list_editable = ("enabled",)
+    readonly_fields = ("name", "last_enqueued_at")
+
+
+@admin.register(JobMetric)
+class JobMetricAdmin(admin.ModelAdmin):
+    list_display = ("task", "bucket", "runs", "succeeded", "retried", "failed", "average_ms", "max_ms")
+    list_filter = ("task",)
+    date_hierarchy = "bucket"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
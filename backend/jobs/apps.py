@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+    verbose_name = 'Background Jobs'
+
+    def ready(self):
+        # Each app registers its tasks and schedules in <app>/tasks.py
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('tasks')
@@ -0,0 +1,108 @@
+"""
+Django Management Command: Run Jobs
+
+Worker for the background job runner (jobs/). Enqueues due schedules, claims
+queued jobs with SKIP LOCKED and runs them under a heartbeat-renewed lease.
+Start one or more per node (e.g. one systemd unit per worker); they coordinate
+through the database only, so no lock files or PID files are involved.
+
+Usage:
+    python manage.py run_jobs
+    python manage.py run_jobs --dry-run
+    python manage.py run_jobs --burst
+    python manage.py run_jobs --enqueue orders.expire_reservations
+    python manage.py run_jobs --name web1-worker2 --sleep 0.5
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+from jobs.models import Job, JobSchedule
+from jobs.queue import JobQueue
+from jobs.registry import SCHEDULES, TASKS
+from jobs.worker import Worker
+
+class Command(BaseCommand):
+    help = 'Run background jobs and periodic schedules'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List tasks, schedules and queue counts without running anything',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once no job is due instead of waiting for more',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=None,
+            help='Exit after running this many jobs',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when the queue is empty (default: 1)',
+        )
+        parser.add_argument(
+            '--name',
+            default=None,
+            help='Worker name recorded on claimed jobs (default: host:pid)',
+        )
+        parser.add_argument(
+            '--enqueue',
+            metavar='TASK',
+            default=None,
+            help='Queue one run of TASK and exit',
+        )
+        parser.add_argument(
+            '--args',
+            default='{}',
+            help='JSON object of keyword arguments for --enqueue',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.show_state()
+            return
+
+        if options['enqueue']:
+            try:
+                job = JobQueue.enqueue(options['enqueue'], json.loads(options['args']))
+            except (ValueError, TypeError) as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f'Queued job {job.pk} ({job.task})'))
+            return
+
+        worker = Worker(name=options['name'], sleep=options['sleep'])
+        worker.install_signal_handlers()
+        self.stdout.write(self.style.SUCCESS(
+            f'Worker {worker.name} started with {len(TASKS)} tasks and {len(SCHEDULES)} schedules'
+        ))
+        processed = worker.run(burst=options['burst'], max_jobs=options['max_jobs'])
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker.name} stopped after {processed} jobs'))
+
+    def show_state(self):
+        counts = {
+            (task, status): n
+            for task, status, n in Job.objects.values_list('task', 'status').annotate(n=Count('id')).order_by()
+        }
+        next_runs = dict(JobSchedule.objects.values_list('name', 'next_run_at'))
+        self.stdout.write(self.style.WARNING('DRY RUN: registered tasks'))
+        for name, task in sorted(TASKS.items()):
+            self.stdout.write(
+                f'  {name}: concurrency {task.concurrency}, {task.max_attempts} attempts, lease {task.lease_seconds}s; '
+                f"queued {counts.get((name, 'queued'), 0)}, running {counts.get((name, 'running'), 0)}, "
+                f"failed {counts.get((name, 'failed'), 0)}"
+            )
+        self.stdout.write(self.style.WARNING('Schedules'))
+        now = timezone.now()
+        for name, entry in sorted(SCHEDULES.items()):
+            next_run = next_runs.get(name)
+            when = 'due now' if next_run is None or next_run <= now else f'next at {next_run:%Y-%m-%d %H:%M:%S}'
+            self.stdout.write(f'  {name}: {entry.task} every {entry.every}, {when}')
@@ -0,0 +1,107 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    One execution of a registered task (jobs/registry.py). Workers claim queued jobs
+    with SELECT ... FOR UPDATE SKIP LOCKED and hold a lease on them that they renew
+    with heartbeats; a job whose lease runs out (its worker died) is queued again or
+    failed by the next worker that notices.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),        # Out of attempts, or an unknown task
+        ('cancelled', 'Cancelled'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    task = models.CharField(max_length=100, db_index=True)
+    args = models.JSONField(default=dict, blank=True)  # Keyword arguments for the task
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    priority = models.SmallIntegerField(default=0)  # Higher runs first
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+
+    # Concurrency slot (0 .. task concurrency - 1) held while running
+    slot = models.PositiveSmallIntegerField(null=True, blank=True)
+    worker = models.CharField(max_length=255, blank=True)  # host:pid of the worker holding the lease
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    schedule = models.CharField(max_length=100, blank=True)  # Set when enqueued by a schedule
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Claim order for workers
+            models.Index(fields=['-priority', 'run_at', 'id'], condition=models.Q(status='queued'), name='jobs_job_queue_idx'),
+            # Lease reaper
+            models.Index(fields=['lease_expires_at'], condition=models.Q(status='running'), name='jobs_job_lease_idx'),
+            models.Index(fields=['status', 'finished_at']),
+        ]
+        constraints = [
+            # A task never runs on more slots than its concurrency limit, across all workers
+            models.UniqueConstraint(fields=['task', 'slot'], condition=models.Q(status='running'), name='jobs_job_running_slot_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def duration(self):
+        if self.started_at and self.finished_at:
+            return self.finished_at - self.started_at
+        return None
+
+
+class JobSchedule(models.Model):
+    """
+    Run state of a periodic schedule declared in code. Workers on every node race to
+    advance next_run_at with a conditional UPDATE; only the winner enqueues the job.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    next_run_at = models.DateTimeField(default=timezone.now)
+    last_enqueued_at = models.DateTimeField(null=True, blank=True)
+    enabled = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.name
+
+
+class JobMetric(models.Model):
+    """Hourly run counts and durations per task, updated in place by workers."""
+    task = models.CharField(max_length=100)
+    bucket = models.DateTimeField()  # Start of the hour
+    runs = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)  # Failed for good
+    retried = models.PositiveIntegerField(default=0)  # Failed and queued again
+    total_ms = models.BigIntegerField(default=0)
+    max_ms = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-bucket', 'task']
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'bucket'], name='jobs_metric_task_bucket_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket']),
+        ]
+
+    def __str__(self):
+        return f"{self.task} @ {self.bucket:%Y-%m-%d %H:00}"
+
+    @property
+    def average_ms(self):
+        return self.total_ms // self.runs if self.runs else 0
@@ -0,0 +1,205 @@
+# jobs/queue.py
+"""
+Database-backed job queue.
+
+Jobs are rows in jobs_job. Any number of worker processes, on any number of
+nodes, share the table:
+
+- claim: SELECT ... FOR UPDATE SKIP LOCKED over due queued jobs, so workers never
+  wait on each other, then take a free concurrency slot for the job's task. A
+  partial unique index on (task, slot) among running jobs makes the per-task
+  limit hold across workers without any other locking.
+- lease: a claimed job carries lease_expires_at, which the worker's heartbeat keeps
+  pushing forward. Jobs whose lease ran out belong to a dead worker and are queued
+  again (or failed when out of attempts) by reap_expired().
+- retries: a failing job is queued again after the task's exponential backoff
+  until it has used max_attempts.
+- schedules: due JobSchedule rows are advanced with a conditional UPDATE, so each
+  occurrence is enqueued by exactly one worker.
+- metrics: every finished attempt is added to the task's hourly JobMetric row.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from backend.metrics import record_job
+from .models import Job, JobMetric, JobSchedule
+from .registry import SCHEDULES, get_task
+
+logger = logging.getLogger(__name__)
+
+CLAIM_CANDIDATES = 20
+
+
+class JobQueue:
+    """
+    Service class for enqueueing, claiming and settling jobs
+    """
+
+    @staticmethod
+    def enqueue(task_name, args=None, run_at=None, priority=None, schedule=''):
+        """Queue a run of `task_name`. Safe to call inside a transaction: the job exists once it commits."""
+        task = get_task(task_name)
+        if task is None:
+            raise ValueError(f"Unknown task '{task_name}'")
+        return Job.objects.create(
+            task=task_name,
+            args=args or {},
+            run_at=run_at or timezone.now(),
+            priority=task.priority if priority is None else priority,
+            max_attempts=task.max_attempts,
+            schedule=schedule,
+        )
+
+    @staticmethod
+    def claim(worker, now=None):
+        """Take the next due job this worker may run, mark it running and return it, or None."""
+        now = now or timezone.now()
+        with transaction.atomic():
+            candidates = list(
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(status='queued', run_at__lte=now)
+                .order_by('-priority', 'run_at', 'id')[:CLAIM_CANDIDATES]
+            )
+            full = set()
+            for job in candidates:
+                task = get_task(job.task)
+                if task is None:
+                    Job.objects.filter(pk=job.pk).update(
+                        status='failed', last_error=f"Unknown task '{job.task}'", finished_at=now, updated_at=now
+                    )
+                    continue
+                if job.task in full:
+                    continue
+                if JobQueue.take_slot(job, task, worker, now):
+                    return job
+                full.add(job.task)
+        return None
+
+    @staticmethod
+    def take_slot(job, task, worker, now):
+        """Mark `job` running in a free slot of its task. False when every slot is taken."""
+        used = set(Job.objects.filter(task=job.task, status='running').values_list('slot', flat=True))
+        for slot in range(task.concurrency):
+            if slot in used:
+                continue
+            try:
+                with transaction.atomic():
+                    Job.objects.filter(pk=job.pk).update(
+                        status='running', slot=slot, worker=worker, attempts=F('attempts') + 1,
+                        lease_expires_at=now + timedelta(seconds=task.lease_seconds), heartbeat_at=now,
+                        started_at=now, finished_at=None, updated_at=now,
+                    )
+            except IntegrityError:
+                continue  # Another worker took this slot a moment ago
+            job.refresh_from_db()
+            return True
+        return False
+
+    @staticmethod
+    def heartbeat(job, worker, lease_seconds):
+        """Extend the lease on a running job. False if this worker no longer holds it."""
+        now = timezone.now()
+        return bool(Job.objects.filter(pk=job.pk, status='running', worker=worker).update(
+            heartbeat_at=now, lease_expires_at=now + timedelta(seconds=lease_seconds), updated_at=now
+        ))
+
+    @staticmethod
+    def succeed(job, worker, result=None):
+        now = timezone.now()
+        try:
+            json.dumps(result)
+        except (TypeError, ValueError):
+            result = str(result)
+        settled = Job.objects.filter(pk=job.pk, status='running', worker=worker).update(
+            status='succeeded', result=result, slot=None, lease_expires_at=None, finished_at=now, updated_at=now
+        )
+        if not settled:
+            logger.warning(f"Job {job.pk} ({job.task}) finished after its lease was lost")
+        JobQueue.record_metric(job.task, job.started_at, now, 'succeeded')
+        return settled
+
+    @staticmethod
+    def fail(job, worker, error):
+        """Queue the job again after the task's backoff, or fail it when out of attempts."""
+        now = timezone.now()
+        task = get_task(job.task)
+        retry = task is not None and job.attempts < job.max_attempts
+        changes = {'last_error': error[:4000], 'slot': None, 'lease_expires_at': None, 'updated_at': now}
+        if retry:
+            changes.update(status='queued', run_at=now + task.backoff(job.attempts))
+        else:
+            changes.update(status='failed', finished_at=now)
+        settled = Job.objects.filter(pk=job.pk, status='running', worker=worker).update(**changes)
+        if not settled:
+            logger.warning(f"Job {job.pk} ({job.task}) failed after its lease was lost")
+        JobQueue.record_metric(job.task, job.started_at, now, 'retried' if retry else 'failed')
+        return settled
+
+    @staticmethod
+    def reap_expired(now=None):
+        """Queue again (or fail, when out of attempts) running jobs whose worker stopped heartbeating."""
+        now = now or timezone.now()
+        expired = Job.objects.filter(status='running', lease_expires_at__lt=now)
+        error = 'Lease expired: the worker stopped sending heartbeats'
+        failed = expired.filter(attempts__gte=F('max_attempts')).update(
+            status='failed', slot=None, lease_expires_at=None, last_error=error, finished_at=now, updated_at=now
+        )
+        # run_at is left alone, so the job keeps its place at the front of the queue
+        requeued = expired.update(status='queued', slot=None, lease_expires_at=None, last_error=error, updated_at=now)
+        if failed or requeued:
+            logger.warning(f"Reaped jobs with expired leases: {requeued} requeued, {failed} failed")
+        return requeued + failed
+
+    @staticmethod
+    def enqueue_due_schedules(now=None):
+        """Enqueue every schedule that is due, once across all workers. Returns the jobs created."""
+        now = now or timezone.now()
+        existing = set(JobSchedule.objects.filter(name__in=SCHEDULES).values_list('name', flat=True))
+        for name in set(SCHEDULES) - existing:
+            JobSchedule.objects.get_or_create(name=name, defaults={'next_run_at': now})
+
+        jobs = []
+        due = JobSchedule.objects.filter(name__in=SCHEDULES, enabled=True, next_run_at__lte=now)
+        for state in due:
+            entry = SCHEDULES[state.name]
+            advanced = JobSchedule.objects.filter(name=state.name, next_run_at=state.next_run_at).update(
+                next_run_at=now + entry.every, last_enqueued_at=now
+            )
+            if not advanced:
+                continue  # Another worker enqueued this occurrence
+            if Job.objects.filter(schedule=state.name, status='queued').exists():
+                continue  # The previous occurrence has not even started; don't pile up
+            try:
+                jobs.append(JobQueue.enqueue(entry.task, entry.args, priority=entry.priority, schedule=state.name))
+            except ValueError as e:
+                logger.error(f"Schedule '{state.name}': {e}")
+        return jobs
+
+    @staticmethod
+    def record_metric(task_name, started_at, finished_at, outcome):
+        """Add one finished attempt to the task's JobMetric row for the current hour."""
+        duration_ms = int((finished_at - started_at).total_seconds() * 1000) if started_at else 0
+        record_job(task_name, outcome, duration_ms / 1000)
+        bucket = finished_at.replace(minute=0, second=0, microsecond=0)
+        changes = {
+            'runs': F('runs') + 1,
+            outcome: F(outcome) + 1,
+            'total_ms': F('total_ms') + duration_ms,
+            'max_ms': Greatest(F('max_ms'), duration_ms),
+        }
+        if JobMetric.objects.filter(task=task_name, bucket=bucket).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                JobMetric.objects.create(
+                    task=task_name, bucket=bucket, runs=1, total_ms=duration_ms, max_ms=duration_ms, **{outcome: 1}
+                )
+        except IntegrityError:
+            # Another worker created this hour's row first
+            JobMetric.objects.filter(task=task_name, bucket=bucket).update(**changes)
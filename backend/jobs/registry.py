@@ -0,0 +1,83 @@
+# jobs/registry.py
+"""
+Task and schedule registry for the job runner.
+
+Apps declare their background work in <app>/tasks.py, which JobsConfig.ready()
+imports on startup:
+
+    from jobs.registry import task, schedule
+
+    @task('orders.expire_reservations', concurrency=1, lease_seconds=300)
+    def expire_reservations(max_age_minutes=15):
+        ...
+
+    schedule('orders.expire_reservations', every=timedelta(minutes=5))
+
+A task is called with the job's args as keyword arguments; its return value is
+stored on the job when it is JSON serializable. `concurrency` caps how many jobs of
+the task run at once across all workers, `max_attempts` how often a failing job
+is tried, and `lease_seconds` how long a worker may go without a heartbeat before
+the job is considered abandoned.
+"""
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+
+TASKS = {}
+SCHEDULES = {}
+
+
+class Task:
+    def __init__(self, name, func, concurrency=1, max_attempts=3, lease_seconds=120, retry_delay=60, priority=0):
+        self.name = name
+        self.func = func
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay  # Seconds before the first retry, doubling per attempt
+        self.priority = priority
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def backoff(self, attempts):
+        return timedelta(seconds=min(60 * 60, self.retry_delay * 2 ** max(0, attempts - 1)))
+
+
+class Schedule:
+    def __init__(self, name, task, every, args=None, priority=None):
+        self.name = name
+        self.task = task
+        self.every = every
+        self.args = args or {}
+        self.priority = priority
+
+
+def task(name, **options):
+    """Register the decorated function as task `name`. See Task for the options."""
+    def decorator(func):
+        TASKS[name] = Task(name, func, **options)
+        return func
+    return decorator
+
+
+def schedule(task_name, every, args=None, name=None, priority=None):
+    """Enqueue `task_name` with `args` every `every` (a timedelta). `name` defaults to the task name."""
+    name = name or task_name
+    SCHEDULES[name] = Schedule(name, task_name, every, args, priority)
+    return SCHEDULES[name]
+
+
+def get_task(name):
+    return TASKS.get(name)
+
+
+def run_command(name, **options):
+    """
+    Run a management command as (part of) a task and return the tail of its output,
+    for the existing maintenance commands whose logic lives in the command itself.
+    """
+    out = io.StringIO()
+    call_command(name, stdout=out, stderr=out, **options)
+    return out.getvalue()[-2000:]
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Job, JobMetric
+from .queue import JobQueue
+from .registry import SCHEDULES, TASKS, Schedule, Task
+from .worker import Worker
+
+
+def add(a, b):
+    return a + b
+
+
+def boom():
+    raise RuntimeError('boom')
+
+
+class JobRunnerTests(TestCase):
+    def setUp(self):
+        tasks = mock.patch.dict(TASKS, {
+            'tests.add': Task('tests.add', add),
+            'tests.boom': Task('tests.boom', boom, max_attempts=2),
+            'tests.single': Task('tests.single', add, concurrency=1),
+        })
+        tasks.start()
+        self.addCleanup(tasks.stop)
+        # Keep the project's real schedules out of the worker loop
+        schedules = mock.patch.dict(SCHEDULES, {}, clear=True)
+        schedules.start()
+        self.addCleanup(schedules.stop)
+
+    def test_worker_runs_job_and_records_metric(self):
+        job = JobQueue.enqueue('tests.add', {'a': 1, 'b': 2})
+
+        self.assertEqual(Worker(name='w1').run(burst=True), 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.attempts, job.slot), ('succeeded', 3, 1, None))
+        metric = JobMetric.objects.get(task='tests.add')
+        self.assertEqual((metric.runs, metric.succeeded, metric.failed), (1, 1, 0))
+
+    def test_failing_job_is_retried_with_backoff_then_failed(self):
+        job = JobQueue.enqueue('tests.boom')
+
+        Worker(name='w1').run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        Worker(name='w1').run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        metric = JobMetric.objects.get(task='tests.boom')
+        self.assertEqual((metric.runs, metric.retried, metric.failed), (2, 1, 1))
+
+    def test_concurrency_limit_and_expired_lease(self):
+        first = JobQueue.enqueue('tests.single', {'a': 1, 'b': 1})
+        JobQueue.enqueue('tests.single', {'a': 2, 'b': 2})
+
+        claimed = JobQueue.claim('w1')
+        self.assertEqual((claimed.pk, claimed.status, claimed.slot), (first.pk, 'running', 0))
+        self.assertIsNone(JobQueue.claim('w2'))  # The only slot is taken
+        self.assertFalse(JobQueue.heartbeat(claimed, 'w2', 60))
+        self.assertTrue(JobQueue.heartbeat(claimed, 'w1', 60))
+
+        # w1 dies: once its lease runs out the job goes back to the queue
+        Job.objects.filter(pk=first.pk).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(JobQueue.reap_expired(), 1)
+        reclaimed = JobQueue.claim('w2')
+        self.assertEqual((reclaimed.pk, reclaimed.worker, reclaimed.attempts), (first.pk, 'w2', 2))
+        self.assertFalse(JobQueue.succeed(claimed, 'w1', 2))  # w1's late result is discarded
+
+    def test_schedule_enqueues_each_occurrence_once(self):
+        SCHEDULES['tests.hourly'] = Schedule('tests.hourly', 'tests.add', timedelta(hours=1), {'a': 1, 'b': 1})
+        now = timezone.now()
+
+        self.assertEqual(len(JobQueue.enqueue_due_schedules(now)), 1)
+        self.assertEqual(JobQueue.enqueue_due_schedules(now), [])
+        self.assertEqual(JobQueue.enqueue_due_schedules(now + timedelta(minutes=30)), [])
+
+        Worker(name='w1').run(burst=True)
+        jobs = JobQueue.enqueue_due_schedules(now + timedelta(hours=1))
+        self.assertEqual([job.schedule for job in jobs], ['tests.hourly'])
+        self.assertEqual(Job.objects.filter(schedule='tests.hourly').count(), 2)
@@ -0,0 +1,119 @@
+# jobs/worker.py
+"""
+Worker process for the job runner (`python manage.py run_jobs`).
+
+A worker loops: enqueue due schedules, reap jobs with expired leases, claim the
+next job and run it, sleeping briefly when the queue is empty. While a job runs,
+a heartbeat thread renews its lease every third of lease_seconds. Run as many
+workers as needed on as many nodes as needed; they coordinate only through the
+database. SIGTERM / SIGINT stop the worker after the current job.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+
+from django.db import close_old_connections, connection
+
+from .queue import JobQueue
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+
+class Heartbeat(threading.Thread):
+    """Renews the lease on `job` until stopped. Sets `lost` if the lease was taken away."""
+
+    def __init__(self, job, worker, lease_seconds):
+        super().__init__(name=f'heartbeat-{job.pk}', daemon=True)
+        self.job = job
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.lease_seconds / 3):
+                try:
+                    if not JobQueue.heartbeat(self.job, self.worker, self.lease_seconds):
+                        logger.error(f"Lost the lease on job {self.job.pk} ({self.job.task})")
+                        self.lost = True
+                        return
+                except Exception as e:
+                    logger.error(f"Heartbeat for job {self.job.pk} failed: {e}")
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Worker:
+    """
+    Runs jobs one at a time. `name` identifies the lease holder (host:pid by default).
+    """
+
+    def __init__(self, name=None, sleep=1.0):
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.sleep = sleep
+        self.stopping = False
+        self.processed = 0
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+
+    def request_stop(self, signum=None, frame=None):
+        logger.info(f"Worker {self.name} stopping after the current job")
+        self.stopping = True
+
+    def tick(self):
+        """Housekeeping then at most one job. Returns the job run, or None if nothing was due."""
+        close_old_connections()
+        JobQueue.enqueue_due_schedules()
+        JobQueue.reap_expired()
+        job = JobQueue.claim(self.name)
+        if job is not None:
+            self.execute(job)
+            self.processed += 1
+        return job
+
+    def execute(self, job):
+        """Run a claimed job under a heartbeat and settle it."""
+        task = get_task(job.task)
+        heartbeat = Heartbeat(job, self.name, task.lease_seconds)
+        heartbeat.start()
+        logger.info(f"Running job {job.pk} ({job.task}), attempt {job.attempts}/{job.max_attempts}")
+        try:
+            result = task(**job.args)
+        except Exception as e:
+            heartbeat.stop()
+            logger.exception(f"Job {job.pk} ({job.task}) failed")
+            JobQueue.fail(job, self.name, f"{e}\n{traceback.format_exc()}")
+            return
+        heartbeat.stop()
+        JobQueue.succeed(job, self.name, result)
+
+    def run(self, burst=False, max_jobs=None):
+        """
+        Work until stopped. With burst, exit once nothing is due; with max_jobs, after
+        that many jobs. Returns the number of jobs run.
+        """
+        while not self.stopping:
+            if max_jobs is not None and self.processed >= max_jobs:
+                break
+            try:
+                job = self.tick()
+            except Exception as e:
+                logger.exception(f"Worker {self.name} loop error: {e}")
+                job = None
+            if job is None:
+                if burst:
+                    break
+                time.sleep(self.sleep)
+        return self.processed
@@ -3,10 +3,31 @@ from django.contrib import admin
 from django.utils import timezone
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import ShippingMethod, Order, OrderItem, Payment, InventoryReservation
+from backend.pagination import ApproximateCountPaginator
+from .models import ShippingMethod, Order, OrderItem, Payment, InventoryReservation, InventoryMovement
 from .inventory import InventoryManager
 
 
+@admin.register(InventoryMovement)
+class InventoryMovementAdmin(admin.ModelAdmin):
+    """Read-only view of the inventory ledger; entries are only written by InventoryLedger."""
+    list_display = ['created_at', 'item_type', 'item_id', 'reason', 'stock_delta', 'reserved_delta', 'stock_after', 'reserved_after', 'order_id']
+    list_filter = ['item_type', 'reason', 'created_at']
+    search_fields = ['=item_id', '=order_id']
+    # The ledger grows without bound; avoid COUNT(*) on every changelist page
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(InventoryReservation)
 class InventoryReservationAdmin(admin.ModelAdmin):
     list_display = [
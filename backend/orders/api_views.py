@@ -1,14 +1,19 @@
 """
 API views for inventory management and frontend integration
 """
-from rest_framework import viewsets, permissions, status
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import viewsets, permissions, serializers, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
-from products.models import ProductVariant
-from drops.models import DropProduct
-from .inventory import InventoryManager
-from .models import InventoryReservation
+from .inventory import InventoryManager, InventoryLedger, InventoryStats, StockSnapshotCache
+from .models import InventoryMovement
+
+# Upper bound on items per check-stock request
+MAX_STOCK_CHECK_ITEMS = 500
+# Upper bound on rows per bulk stock update (warehouse syncs)
+MAX_BULK_STOCK_UPDATES = 10000
 
 
 @api_view(['POST'])
@@ -32,19 +37,44 @@ def check_stock_availability(request):
             }
         ]
     }
+
+    Up to MAX_STOCK_CHECK_ITEMS items per call. Figures come from StockSnapshotCache,
+    so they may lag a save by at most a few seconds; checkout re-checks stock.
     """
     items = request.data.get('items', [])
     if not items:
         return Response({'error': 'No items provided'}, status=status.HTTP_400_BAD_REQUEST)
-    
+    if not isinstance(items, list):
+        return Response({'error': 'items must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > MAX_STOCK_CHECK_ITEMS:
+        return Response(
+            {'error': f'At most {MAX_STOCK_CHECK_ITEMS} items can be checked per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Resolve every referenced item up front: one cache round trip per type, and one
+    # id__in query per type for whatever isn't cached
+    requested_ids = {StockSnapshotCache.VARIANT: set(), StockSnapshotCache.DROP_PRODUCT: set()}
+    for item in items:
+        if isinstance(item, dict) and item.get('type') in requested_ids:
+            try:
+                requested_ids[item['type']].add(int(item.get('id')))
+            except (TypeError, ValueError):
+                pass
+    snapshots = {
+        item_type: StockSnapshotCache.get_many(item_type, ids)
+        for item_type, ids in requested_ids.items()
+    }
+
     results = []
     all_available = True
-    
+
     for item in items:
+        if not isinstance(item, dict):
+            item = {'value': item}
         item_type = item.get('type')
         item_id = item.get('id')
-        quantity = item.get('quantity', 1)
-        
+
         if not item_type or not item_id:
             results.append({
                 'item': item,
@@ -53,59 +83,60 @@ def check_stock_availability(request):
             })
             all_available = False
             continue
-        
+
+        if item_type not in snapshots:
+            results.append({
+                'item': item,
+                'available': False,
+                'error': f'Unknown item type: {item_type}'
+            })
+            all_available = False
+            continue
+
         try:
-            if item_type == 'variant':
-                variant = get_object_or_404(ProductVariant, id=item_id)
-                available = variant.available_quantity >= quantity
-                results.append({
-                    'type': 'variant',
-                    'id': item_id,
-                    'quantity_requested': quantity,
-                    'available_quantity': variant.available_quantity,
-                    'stock_quantity': variant.stock_quantity,
-                    'reserved_quantity': variant.reserved_quantity,
-                    'available': available,
-                    'product_name': variant.product.name,
-                    'variant_name': str(variant),
-                    'is_low_stock': variant.is_low_stock
-                })
-                if not available:
-                    all_available = False
-                    
-            elif item_type == 'drop_product':
-                drop_product = get_object_or_404(DropProduct, id=item_id)
-                available = drop_product.available_quantity >= quantity
-                results.append({
-                    'type': 'drop_product',
-                    'id': item_id,
-                    'quantity_requested': quantity,
-                    'available_quantity': drop_product.available_quantity,
-                    'stock_quantity': drop_product.stock_quantity,
-                    'reserved_quantity': drop_product.reserved_quantity,
-                    'available': available,
-                    'product_name': drop_product.product.name,
-                    'drop_price': drop_product.drop_price,
-                    'is_low_stock': drop_product.is_low_stock
-                })
-                if not available:
-                    all_available = False
-            else:
-                results.append({
-                    'item': item,
-                    'available': False,
-                    'error': f'Unknown item type: {item_type}'
-                })
-                all_available = False
-                
-        except Exception as e:
+            item_id = int(item_id)
+            quantity = int(item.get('quantity', 1))
+        except (TypeError, ValueError):
             results.append({
                 'item': item,
                 'available': False,
-                'error': str(e)
+                'error': 'Invalid id or quantity'
             })
             all_available = False
-    
+            continue
+
+        snapshot = snapshots[item_type].get(item_id)
+        if snapshot is None:
+            model_name = 'ProductVariant' if item_type == StockSnapshotCache.VARIANT else 'DropProduct'
+            results.append({
+                'item': item,
+                'available': False,
+                'error': f'No {model_name} matches the given query.'
+            })
+            all_available = False
+            continue
+
+        available_quantity = snapshot['stock_quantity'] - snapshot['reserved_quantity']
+        available = available_quantity >= quantity
+        result = {
+            'type': item_type,
+            'id': item_id,
+            'quantity_requested': quantity,
+            'available_quantity': available_quantity,
+            'stock_quantity': snapshot['stock_quantity'],
+            'reserved_quantity': snapshot['reserved_quantity'],
+            'available': available,
+            'product_name': snapshot['product_name'],
+        }
+        if item_type == StockSnapshotCache.VARIANT:
+            result['variant_name'] = snapshot['variant_name']
+        else:
+            result['drop_price'] = snapshot['drop_price']
+        result['is_low_stock'] = available_quantity <= snapshot['low_stock_threshold']
+        results.append(result)
+        if not available:
+            all_available = False
+
     return Response({
         'all_available': all_available,
         'items': results,
@@ -170,78 +201,36 @@ def bulk_stock_update(request):
                 "type": "drop_product", 
                 "id": 456,
                 "stock_quantity": 25,
-                "low_stock_threshold": 3
+                "low_stock_threshold": 3,
+                "expected_updated_at": "2025-06-01T12:00:00Z"  # optional precondition
             }
-        ]
+        ],
+        "all_or_nothing": false  # optional: apply nothing if any row fails
     }
+
+    Only the stock and threshold columns are written, so concurrent reservations are
+    preserved. A row whose updated_at no longer matches expected_updated_at fails with
+    code "conflict"; expected_updated_at must carry a timezone offset. Each successful row returns its new updated_at for the next sync.
     """
     updates = request.data.get('updates', [])
     if not updates:
         return Response({'error': 'No updates provided'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    results = []
-    successful_updates = 0
-    
-    for update in updates:
-        update_type = update.get('type')
-        item_id = update.get('id')
-        stock_quantity = update.get('stock_quantity')
-        low_stock_threshold = update.get('low_stock_threshold')
-        
-        try:
-            if update_type == 'variant':
-                variant = get_object_or_404(ProductVariant, id=item_id)
-                if stock_quantity is not None:
-                    variant.stock_quantity = stock_quantity
-                if low_stock_threshold is not None:
-                    variant.low_stock_threshold = low_stock_threshold
-                variant.save()
-                
-                results.append({
-                    'type': 'variant',
-                    'id': item_id,
-                    'success': True,
-                    'item_name': str(variant),
-                    'new_stock_quantity': variant.stock_quantity,
-                    'new_available_quantity': variant.available_quantity,
-                    'new_low_stock_threshold': variant.low_stock_threshold
-                })
-                successful_updates += 1
-                
-            elif update_type == 'drop_product':
-                drop_product = get_object_or_404(DropProduct, id=item_id)
-                if stock_quantity is not None:
-                    drop_product.stock_quantity = stock_quantity
-                if low_stock_threshold is not None:
-                    drop_product.low_stock_threshold = low_stock_threshold
-                drop_product.save()
-                
-                results.append({
-                    'type': 'drop_product',
-                    'id': item_id,
-                    'success': True,
-                    'item_name': str(drop_product),
-                    'new_stock_quantity': drop_product.stock_quantity,
-                    'new_available_quantity': drop_product.available_quantity,
-                    'new_low_stock_threshold': drop_product.low_stock_threshold
-                })
-                successful_updates += 1
-            else:
-                results.append({
-                    'type': update_type,
-                    'id': item_id,
-                    'success': False,
-                    'error': f'Unknown update type: {update_type}'
-                })
-                
-        except Exception as e:
-            results.append({
-                'type': update_type,
-                'id': item_id,
-                'success': False,
-                'error': str(e)
-            })
-    
+    if not isinstance(updates, list):
+        return Response({'error': 'updates must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(updates) > MAX_BULK_STOCK_UPDATES:
+        return Response(
+            {'error': f'At most {MAX_BULK_STOCK_UPDATES} updates can be applied per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        all_or_nothing = serializers.BooleanField().to_internal_value(request.data.get('all_or_nothing', False))
+    except serializers.ValidationError:
+        return Response({'error': 'all_or_nothing must be a boolean'}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = InventoryManager.bulk_update_stock(updates, all_or_nothing=all_or_nothing)
+    successful_updates = sum(1 for result in results if result['success'])
+
     return Response({
         'results': results,
         'total_updates': len(updates),
@@ -254,70 +243,106 @@ def bulk_stock_update(request):
 @permission_classes([permissions.IsAdminUser])
 def inventory_dashboard_data(request):
     """
-    Get comprehensive inventory data for admin dashboard.
+    Get comprehensive inventory data for admin dashboard (cached, see InventoryStats).
     """
-    low_stock_data = InventoryManager.get_low_stock_items()
-    
-    # Get recent reservations (last 24 hours)
-    from django.utils import timezone
-    from datetime import timedelta
-    
-    recent_reservations = InventoryReservation.objects.filter(
-        created_at__gte=timezone.now() - timedelta(hours=24),
-        is_active=True
-    ).select_related('order', 'product_variant', 'drop_product')
-    
-    # Calculate inventory stats
-    total_variants = ProductVariant.objects.filter(is_active=True).count()
-    total_drop_products = DropProduct.objects.count()
-    low_stock_count = low_stock_data['variants'].count() + low_stock_data['drop_products'].count()
-    out_of_stock_variants = ProductVariant.objects.filter(
-        is_active=True, 
-        stock_quantity__lte=0
-    ).count()
-    
-    # Calculate total reserved quantities
-    total_reserved_variants = sum(
-        variant.reserved_quantity for variant in ProductVariant.objects.filter(is_active=True)
-    )
-    total_reserved_drops = sum(
-        drop.reserved_quantity for drop in DropProduct.objects.all()
+    return Response(InventoryStats.get())
+
+
+# Longest range, in days, for the daily movement report
+MAX_MOVEMENT_REPORT_DAYS = 366
+
+
+def _item_reference(request):
+    """(item_type, item_id) from ?type=&id=, or a 400 Response."""
+    item_type = request.query_params.get('type')
+    if item_type not in (StockSnapshotCache.VARIANT, StockSnapshotCache.DROP_PRODUCT):
+        return None, Response({'error': 'type must be "variant" or "drop_product"'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        return (item_type, int(request.query_params.get('id'))), None
+    except (TypeError, ValueError):
+        return None, Response({'error': 'Missing or invalid id'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def inventory_history(request):
+    """
+    Stock of one item at a point in time, from the inventory ledger and snapshots.
+
+    GET ?type=variant&id=123&at=2026-05-01T12:00:00Z&limit=50
+    `at` defaults to now; `movements` lists the latest `limit` ledger entries up to `at`.
+    """
+    reference, error = _item_reference(request)
+    if error:
+        return error
+    item_type, item_id = reference
+
+    at = timezone.now()
+    if request.query_params.get('at'):
+        at = parse_datetime(request.query_params['at'])
+        if at is None:
+            return Response({'error': 'at must be an ISO 8601 datetime'}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 50)), 0), 500)
+    except ValueError:
+        limit = 50
+
+    state = InventoryLedger.stock_at(item_type, item_id, at)
+    if state:
+        state['available_quantity'] = state['stock_quantity'] - state['reserved_quantity']
+    movements = (
+        InventoryMovement.objects
+        .filter(item_type=item_type, item_id=item_id, created_at__lte=at)
+        .order_by('-created_at', '-id')
+        .values('created_at', 'reason', 'stock_delta', 'reserved_delta', 'stock_after', 'reserved_after', 'order_id')
+        [:limit]
     )
-    
     return Response({
-        'summary': {
-            'total_active_variants': total_variants,
-            'total_drop_products': total_drop_products,
-            'low_stock_items': low_stock_count,
-            'out_of_stock_variants': out_of_stock_variants,
-            'total_reserved_items': total_reserved_variants + total_reserved_drops,
-            'active_reservations_24h': recent_reservations.count()
-        },
-        'low_stock_variants': [
-            {
-                'id': v.id,
-                'name': str(v),
-                'available_quantity': v.available_quantity,
-                'low_stock_threshold': v.low_stock_threshold,
-                'product_name': v.product.name
-            } for v in low_stock_data['variants'][:10]  # Limit to 10 for dashboard
-        ],
-        'low_stock_drop_products': [
-            {
-                'id': d.id,
-                'name': str(d),
-                'available_quantity': d.available_quantity,
-                'low_stock_threshold': d.low_stock_threshold,
-                'product_name': d.product.name
-            } for d in low_stock_data['drop_products'][:10]  # Limit to 10 for dashboard
-        ],
-        'recent_reservations': [
-            {
-                'id': r.id,
-                'quantity': r.quantity,
-                'expires_at': r.expires_at,
-                'item_name': str(r),
-                'order_number': r.order.order_number if r.order else None
-            } for r in recent_reservations[:20]  # Limit to 20 for dashboard
-        ]
+        'type': item_type,
+        'id': item_id,
+        'at': at,
+        'state': state,
+        'movements': list(movements),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def inventory_movement_report(request):
+    """
+    Daily stock movement totals per item type and reason.
+
+    GET ?date_from=2026-05-01&date_to=2026-05-07[&type=variant[&id=123]]
+    Dates are inclusive and default to the last 7 days.
+    """
+    today = timezone.localdate()
+    date_from = parse_date(request.query_params.get('date_from', '')) or today - timedelta(days=6)
+    date_to = parse_date(request.query_params.get('date_to', '')) or today
+    if date_to < date_from:
+        return Response({'error': 'date_to is before date_from'}, status=status.HTTP_400_BAD_REQUEST)
+    if (date_to - date_from).days >= MAX_MOVEMENT_REPORT_DAYS:
+        return Response(
+            {'error': f'The report covers at most {MAX_MOVEMENT_REPORT_DAYS} days'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    item_type = item_id = None
+    if request.query_params.get('type'):
+        if request.query_params.get('id'):
+            reference, error = _item_reference(request)
+            if error:
+                return error
+            item_type, item_id = reference
+        else:
+            item_type = request.query_params['type']
+
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    rows = InventoryLedger.daily_movements(start, end, item_type=item_type, item_id=item_id)
+    return Response({
+        'date_from': date_from,
+        'date_to': date_to,
+        'days': list(rows),
     })
@@ -0,0 +1,298 @@
+# orders/async_views.py
+"""
+Async variants of the I/O-bound payment and currency endpoints.
+
+Creating a checkout, checking a payment and fetching an exchange rate mostly wait
+on PayPro or a rate API. As sync views each of those waits holds a whole worker;
+these views await the call on the pooled client of backend/http_client.py
+instead, so under an ASGI server one process keeps hundreds of them in flight.
+
+orders/urls.py mounts them in place of the DRF views when ASYNC_VIEWS is on
+(backend/asgi.py sets it), at the same paths and with the same responses. DRF
+has no async handlers, so these are plain Django views that do what APIView did
+for these AllowAny endpoints: skip CSRF, parse JSON or form bodies, and apply
+the anonymous rate limit. Single reads use the async ORM; writes go through the
+same helpers as the sync views (orders/views.py) in one sync_to_async call each.
+"""
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.views import View
+from rest_framework import status
+from rest_framework.throttling import AnonRateThrottle
+
+from .currency_service import currency_converter
+from .models import Order, Payment
+from .paypro_service import PayProService
+from .views import (
+    apply_payment_status, failed_initiation, frontend_url, initiated_payment_body, payment_initiation_error,
+    payment_return_url, payment_status_body, paypro_order_data, paypro_status_fields, record_initiated_payment
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ClientAddressThrottle(AnonRateThrottle):
+    """The anonymous DRF rate limit, keyed on the client address (there's no DRF request.user here)"""
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class AsyncAPIView(View):
+    """
+    Base of the async views: CSRF-exempt and rate limited like the DRF views
+    they stand in for.
+    """
+    throttle_class = ClientAddressThrottle
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True  # Clients authenticate with JWTs, not the session
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        throttle = self.throttle_class()
+        if not await sync_to_async(throttle.allow_request)(request, self):
+            wait = throttle.wait()
+            response = JsonResponse(
+                {'detail': f'Request was throttled. Expected available in {int(wait or 0)} seconds.'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            if wait is not None:
+                response['Retry-After'] = str(int(wait))
+            return response
+        return await super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def request_data(request):
+        """The JSON or form body, as DRF's request.data; None when it can't be parsed"""
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return None
+            return data if isinstance(data, dict) else None
+        return request.POST
+
+
+class AsyncInitiatePaymentView(AsyncAPIView):
+    """Async InitiatePaymentView"""
+
+    async def post(self, request):
+        try:
+            data = self.request_data(request)
+            if data is None:
+                return JsonResponse({'detail': 'JSON parse error'}, status=status.HTTP_400_BAD_REQUEST)
+
+            order_id = data.get('order_id')
+            if not order_id:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Missing required field: order_id'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                order = await Order.objects.select_related('user').aget(order_id=order_id)
+            except Order.DoesNotExist:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Order not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+
+            error = payment_initiation_error(order)
+            if error:
+                return JsonResponse(error[0], status=error[1])
+
+            currency_info = await currency_converter.aget_display_amounts(Decimal(str(order.total_amount)))
+            order_data = paypro_order_data(order, data.get('language', 'en'))
+
+            success, response_data = await PayProService().acreate_payment_token(order_data)
+
+            if success:
+                await sync_to_async(record_initiated_payment)(order, response_data, currency_info)
+                logger.info(f"Payment token created for order {order_id}, redirecting to PayPro hosted checkout")
+                return JsonResponse(initiated_payment_body(order, response_data, currency_info))
+            body, status_code = failed_initiation(order_id, response_data)
+            return JsonResponse(body, status=status_code)
+
+        except Exception as e:
+            logger.error(f"Unexpected error in payment initiation: {e}")
+            return JsonResponse({
+                'success': False,
+                'error': 'Internal server error',
+                'detail': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncCheckPaymentStatusView(AsyncAPIView):
+    """Async CheckPaymentStatusView"""
+
+    async def get(self, request):
+        try:
+            token = request.GET.get('token')
+            order_id = request.GET.get('order_id')
+
+            if not token and not order_id:
+                return JsonResponse({
+                    'error': 'Either token or order_id parameter is required'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            # Try to find order by order_id first, then by token
+            order = None
+            payment = None
+            if order_id:
+                try:
+                    order = await Order.objects.aget(order_id=order_id)
+                    payment = await Payment.objects.filter(
+                        order=order,
+                        payment_method_type__in=['paypro_hosted', 'paypro_card']
+                    ).afirst()
+                    if payment and payment.gateway_transaction_id:
+                        token = payment.gateway_transaction_id
+                except Order.DoesNotExist:
+                    pass
+            elif token:
+                payment = await Payment.objects.select_related('order').filter(gateway_transaction_id=token).afirst()
+                if payment:
+                    order = payment.order
+
+            if not token:
+                return JsonResponse({
+                    'error': 'Payment token not found for this order'
+                }, status=status.HTTP_404_NOT_FOUND)
+
+            success, response_data = await PayProService().aget_payment_status(token)
+
+            if success:
+                payment_status, tracking_id, transaction_id = paypro_status_fields(response_data)
+                updated = await sync_to_async(apply_payment_status)(order, payment, payment_status, response_data)
+                return JsonResponse(payment_status_body(order, payment_status, transaction_id, tracking_id, updated))
+            return JsonResponse({
+                'success': False,
+                'error_code': response_data.get('error_code', 'UNKNOWN_ERROR'),
+                'error_message': response_data.get('error_message', 'Status check failed')
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            logger.error(f"Error checking payment status: {e}")
+            return JsonResponse({
+                'success': False,
+                'error': 'Internal server error',
+                'detail': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncPaymentSuccessView(AsyncAPIView):
+    """Async PaymentSuccessView"""
+
+    async def get(self, request):
+        try:
+            token = request.GET.get('token')
+            order_id = request.GET.get('order_id')
+
+            logger.info(f"Payment success callback received - token: {token}, order_id: {order_id}")
+
+            if not token:
+                logger.error("No token provided in success callback")
+                return redirect(frontend_url("/payment/error?error=missing_token"))
+
+            success, status_data = await PayProService().aget_payment_status(token)
+
+            if not success:
+                logger.error(f"Failed to check payment status: {status_data.get('error_message')}")
+                return redirect(frontend_url("/payment/error?error=status_check_failed"))
+
+            payment_status, tracking_id, transaction_id = paypro_status_fields(status_data)
+            tracking_id = tracking_id or order_id
+            transaction_id = transaction_id or token
+
+            logger.info(f"Payment status check - status: {payment_status}, tracking_id: {tracking_id}")
+
+            if not tracking_id:
+                logger.error("No tracking_id found in payment status response")
+                return redirect(frontend_url("/payment/error?error=invalid_response"))
+
+            try:
+                order = await Order.objects.aget(order_id=tracking_id)
+            except Order.DoesNotExist:
+                logger.error(f"Order not found for tracking_id: {tracking_id}")
+                return redirect(frontend_url("/payment/error?error=order_not_found"))
+
+            return redirect(await sync_to_async(payment_return_url)(
+                order, token, transaction_id, payment_status, status_data
+            ))
+
+        except Exception as e:
+            logger.error(f"Error in payment success callback: {e}")
+            return redirect(frontend_url("/payment/error?error=processing_error"))
+
+
+def rate_source(rate):
+    return 'fallback' if rate == currency_converter.fallback_rate else 'api'
+
+
+class AsyncExchangeRateView(AsyncAPIView):
+    """Async get_exchange_rate"""
+
+    async def get(self, request):
+        try:
+            rate = await currency_converter.aget_eur_to_byn_rate()
+            return JsonResponse({
+                'rate': float(rate),
+                'source': rate_source(rate),
+            })
+        except Exception as e:
+            return JsonResponse({
+                'rate': float(currency_converter.fallback_rate),
+                'source': 'fallback',
+                'error': str(e)
+            })  # Still return 200 with fallback
+
+
+class AsyncConvertEurToBynView(AsyncAPIView):
+    """Async convert_eur_to_byn; the rate is read once for the amount and the response"""
+
+    async def post(self, request):
+        data = self.request_data(request)
+        if data is None:
+            return JsonResponse({'detail': 'JSON parse error'}, status=status.HTTP_400_BAD_REQUEST)
+
+        eur_amount = data.get('eur_amount')
+        if eur_amount is None:
+            return JsonResponse({
+                'error': 'eur_amount is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            eur_amount = Decimal(str(eur_amount))
+        except (ValueError, TypeError, InvalidOperation):
+            return JsonResponse({
+                'error': 'Invalid eur_amount format'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if eur_amount < 0:
+            return JsonResponse({
+                'error': 'eur_amount must be non-negative'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            exchange_rate = await currency_converter.aget_eur_to_byn_rate()
+            error = None
+        except Exception as e:
+            exchange_rate, error = currency_converter.fallback_rate, str(e)
+
+        body = {
+            'eur_amount': float(eur_amount),
+            'byn_amount': float(currency_converter.eur_to_byn_at(eur_amount, exchange_rate)),
+            'exchange_rate': float(exchange_rate),
+            'source': 'fallback' if error else rate_source(exchange_rate),
+        }
+        if error:
+            body['error'] = error
+        return JsonResponse(body)
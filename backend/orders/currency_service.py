@@ -1,10 +1,12 @@
 # orders/currency_service.py
 import requests
 import logging
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from django.conf import settings
 from django.core.cache import cache
 from decimal import Decimal, ROUND_HALF_UP
+from backend.http_client import async_client
+from backend.metrics import record_cache
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +33,7 @@ class CurrencyConverter:
         """
         # Check cache first
         cached_rate = cache.get('eur_to_byn_rate')
+        record_cache('currency_rate', hits=int(bool(cached_rate)), misses=int(not cached_rate))
         if cached_rate:
             logger.info(f"Using cached EUR to BYN rate: {cached_rate}")
             return Decimal(str(cached_rate))
@@ -48,114 +51,121 @@ class CurrencyConverter:
             logger.warning(f"Using fallback EUR to BYN rate: {self.fallback_rate}")
             return self.fallback_rate
     
-    def _fetch_exchange_rate(self) -> Optional[Decimal]:
-        """
-        Fetch exchange rate from external APIs
+    async def aget_eur_to_byn_rate(self) -> Decimal:
+        """Async get_eur_to_byn_rate: the rate APIs are called over the pooled async client"""
+        cached_rate = await cache.aget('eur_to_byn_rate')
+        record_cache('currency_rate', hits=int(bool(cached_rate)), misses=int(not cached_rate))
+        if cached_rate:
+            logger.info(f"Using cached EUR to BYN rate: {cached_rate}")
+            return Decimal(str(cached_rate))
         
-        Returns:
-            Optional[Decimal]: Exchange rate or None if failed
+        rate = await self._afetch_exchange_rate()
+        
+        if rate:
+            await cache.aset('eur_to_byn_rate', float(rate), self.cache_timeout)
+            logger.info(f"Fetched and cached EUR to BYN rate: {rate}")
+            return rate
+        else:
+            logger.warning(f"Using fallback EUR to BYN rate: {self.fallback_rate}")
+            return self.fallback_rate
+    
+    def _rate_sources(self) -> List[Tuple[str, str, Optional[Dict], Callable[[Dict], Optional[Decimal]]]]:
+        """
+        The exchange rate APIs in the order they are tried, as
+        (name, url, query params, parser of the JSON response)
         """
+        sources = []
+        
         # Try exchangerate-api.com (free tier available)
         if self.exchange_api_key:
-            rate = self._fetch_from_exchangerate_api()
-            if rate:
-                return rate
+            url = f"https://v6.exchangerate-api.com/v6/{self.exchange_api_key}/pair/EUR/BYN"
+            sources.append(('exchangerate-api.com', url, None, self._parse_exchangerate_api))
         
         # Try fixer.io as backup
-        rate = self._fetch_from_fixer_api()
-        if rate:
-            return rate
+        fixer_params = {
+            'base': 'EUR',
+            'symbols': 'BYN'
+        }
+        if hasattr(settings, 'FIXER_API_KEY'):
+            fixer_params['access_key'] = settings.FIXER_API_KEY
+        sources.append(('fixer.io', "https://api.fixer.io/latest", fixer_params, self._parse_fixer_api))
         
         # Try exchangerate.host (free, no API key required)
-        rate = self._fetch_from_exchangerate_host()
-        if rate:
-            return rate
+        host_params = {
+            'from': 'EUR',
+            'to': 'BYN',
+            'amount': 1
+        }
+        sources.append(('exchangerate.host', "https://api.exchangerate.host/convert", host_params, self._parse_exchangerate_host))
         
-        return None
+        return sources
     
-    def _fetch_from_exchangerate_api(self) -> Optional[Decimal]:
-        """Fetch from exchangerate-api.com"""
-        try:
-            url = f"https://v6.exchangerate-api.com/v6/{self.exchange_api_key}/pair/EUR/BYN"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('result') == 'success':
-                    rate = data.get('conversion_rate')
+    def _fetch_exchange_rate(self) -> Optional[Decimal]:
+        """
+        Fetch exchange rate from external APIs
+        
+        Returns:
+            Optional[Decimal]: Exchange rate or None if failed
+        """
+        for name, url, params, parse in self._rate_sources():
+            try:
+                response = requests.get(url, params=params, timeout=10)
+                if response.status_code == 200:
+                    rate = parse(response.json())
                     if rate:
-                        return Decimal(str(rate))
-            
-        except Exception as e:
-            logger.error(f"Error fetching rate from exchangerate-api.com: {e}")
+                        return rate
+            except Exception as e:
+                logger.error(f"Error fetching rate from {name}: {e}")
         
         return None
     
-    def _fetch_from_fixer_api(self) -> Optional[Decimal]:
-        """Fetch from fixer.io"""
-        try:
-            url = "https://api.fixer.io/latest"
-            params = {
-                'base': 'EUR',
-                'symbols': 'BYN'
-            }
-            
-            if hasattr(settings, 'FIXER_API_KEY'):
-                params['access_key'] = settings.FIXER_API_KEY
-            
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    rates = data.get('rates', {})
-                    byn_rate = rates.get('BYN')
-                    if byn_rate:
-                        return Decimal(str(byn_rate))
-            
-        except Exception as e:
-            logger.error(f"Error fetching rate from fixer.io: {e}")
+    async def _afetch_exchange_rate(self) -> Optional[Decimal]:
+        """Async _fetch_exchange_rate, over the pooled client of backend/http_client.py"""
+        for name, url, params, parse in self._rate_sources():
+            try:
+                response = await async_client().get(url, params=params, timeout=10)
+                if response.status_code == 200:
+                    rate = parse(response.json())
+                    if rate:
+                        return rate
+            except Exception as e:
+                logger.error(f"Error fetching rate from {name}: {e}")
         
         return None
     
-    def _fetch_from_exchangerate_host(self) -> Optional[Decimal]:
-        """Fetch from exchangerate.host (free, no API key required)"""
-        try:
-            url = "https://api.exchangerate.host/convert"
-            params = {
-                'from': 'EUR',
-                'to': 'BYN',
-                'amount': 1
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success'):
-                    rate = data.get('result')
-                    if rate:
-                        return Decimal(str(rate))
-            
-        except Exception as e:
-            logger.error(f"Error fetching rate from exchangerate.host: {e}")
-        
+    @staticmethod
+    def _parse_exchangerate_api(data: Dict) -> Optional[Decimal]:
+        """Parse a response from exchangerate-api.com"""
+        if data.get('result') == 'success':
+            rate = data.get('conversion_rate')
+            if rate:
+                return Decimal(str(rate))
         return None
     
-    def convert_eur_to_byn(self, eur_amount: Decimal) -> Decimal:
-        """
-        Convert EUR amount to BYN
-        
-        Args:
-            eur_amount: Amount in EUR
-            
-        Returns:
-            Decimal: Amount in BYN
-        """
+    @staticmethod
+    def _parse_fixer_api(data: Dict) -> Optional[Decimal]:
+        """Parse a response from fixer.io"""
+        if data.get('success'):
+            rates = data.get('rates', {})
+            byn_rate = rates.get('BYN')
+            if byn_rate:
+                return Decimal(str(byn_rate))
+        return None
+    
+    @staticmethod
+    def _parse_exchangerate_host(data: Dict) -> Optional[Decimal]:
+        """Parse a response from exchangerate.host"""
+        if data.get('success'):
+            rate = data.get('result')
+            if rate:
+                return Decimal(str(rate))
+        return None
+    
+    def eur_to_byn_at(self, eur_amount: Decimal, rate: Decimal) -> Decimal:
+        """Convert EUR amount to BYN at the given rate"""
         if not isinstance(eur_amount, Decimal):
             eur_amount = Decimal(str(eur_amount))
         
-        rate = self.get_eur_to_byn_rate()
         byn_amount = eur_amount * rate
         
         # Round to 2 decimal places
@@ -164,6 +174,18 @@ class CurrencyConverter:
         logger.info(f"Converted {eur_amount} EUR to {byn_amount} BYN (rate: {rate})")
         return byn_amount
     
+    def convert_eur_to_byn(self, eur_amount: Decimal) -> Decimal:
+        """
+        Convert EUR amount to BYN
+        
+        Args:
+            eur_amount: Amount in EUR
+            
+        Returns:
+            Decimal: Amount in BYN
+        """
+        return self.eur_to_byn_at(eur_amount, self.get_eur_to_byn_rate())
+    
     def convert_byn_to_eur(self, byn_amount: Decimal) -> Decimal:
         """
         Convert BYN amount to EUR (for display purposes)
@@ -204,6 +226,15 @@ class CurrencyConverter:
             'byn': byn_amount,
             'rate': rate
         }
+    
+    async def aget_display_amounts(self, eur_amount: Decimal) -> Dict[str, Decimal]:
+        """Async get_display_amounts, reading the rate once"""
+        rate = await self.aget_eur_to_byn_rate()
+        return {
+            'eur': eur_amount,
+            'byn': self.eur_to_byn_at(eur_amount, rate),
+            'rate': rate
+        }
 
 # Global instance
 currency_converter = CurrencyConverter()
@@ -0,0 +1,105 @@
+# orders/exports.py
+"""
+CSV rows for the order report (one row per order line, with the order's totals
+and status repeated on each of its lines) and the inventory report. Used by the
+background report jobs in exports/reports.py.
+"""
+from datetime import datetime, time
+
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Concat
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from backend.csv_export import EXPORT_CHUNK_SIZE
+from .inventory import InventoryLedger, StockSnapshotCache
+
+ORDER_EXPORT_HEADER = [
+    'order_number', 'created_at', 'order_status', 'payment_status', 'customer_email',
+    'shipping_method', 'order_subtotal', 'shipping_cost', 'discount_amount', 'tax_amount', 'order_total',
+    'item_id', 'product_id', 'product_variant_id', 'drop_product_id', 'product_name', 'variant_name',
+    'sku', 'color', 'size', 'quantity', 'price_per_unit', 'item_subtotal',
+]
+
+
+def order_export_rows(items):
+    """
+    One row per OrderItem in `items`, oldest order first. Everything comes from a
+    single joined query fetched in chunks; no per-order lookups.
+    """
+    rows = (
+        items
+        .annotate(customer_email=Coalesce('order__user__email', 'order__email_for_guest'))
+        .order_by('order__created_at', 'order_id', 'id')
+        .values_list(
+            'order__order_number', 'order__created_at', 'order__order_status', 'order__payment_status',
+            'customer_email', 'order__shipping_method_name_snapshot', 'order__subtotal_amount',
+            'order__shipping_cost', 'order__discount_amount', 'order__tax_amount', 'order__total_amount',
+            'id', 'product_id', 'product_variant_id', 'drop_product_id', 'product_name_snapshot',
+            'variant_name_snapshot', 'sku_snapshot', 'color', 'size', 'quantity', 'price_per_unit', 'subtotal',
+        )
+    )
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = ['' if value is None else value for value in row]
+        row[1] = row[1].isoformat()
+        yield row
+
+
+INVENTORY_EXPORT_HEADER = [
+    'type', 'item_id', 'product_id', 'product_name', 'drop', 'sku',
+    'stock_quantity', 'reserved_quantity', 'available_quantity', 'as_of', 'source',
+]
+
+
+# Point-in-time columns annotated by InventoryLedger.annotate_stock_at
+HISTORY_FIELDS = tuple(f'{source}_{figure}' for source in ('movement', 'snapshot') for figure in ('stock', 'reserved', 'at'))
+
+
+def _stock_figures(row, at):
+    """(stock, reserved, as_of, source) of an inventory row; empty when history doesn't cover `at`."""
+    if at is None:
+        return row['stock'], row['reserved_quantity'], '', 'current'
+    candidates = [
+        (row[f'{source}_at'], row[f'{source}_stock'], row[f'{source}_reserved'], source)
+        for source in ('movement', 'snapshot') if row[f'{source}_at'] is not None
+    ]
+    if not candidates:
+        return '', '', '', ''
+    as_of, stock, reserved, source = max(candidates, key=lambda candidate: candidate[0])
+    return stock, reserved, as_of.isoformat(), source
+
+
+def inventory_export_rows(as_of=None):
+    """
+    Every variant, then every drop product, with stock, reserved and available
+    quantities: the current figures, or with `as_of` (YYYY-MM-DD) the figures at the
+    end of that day from the ledger and inventory snapshots. Each item type is one
+    query (the history lookups are correlated subqueries), fetched in chunks.
+    """
+    from drops.models import DropProduct
+    from products.models import ProductVariant
+
+    at = timezone.make_aware(datetime.combine(parse_date(as_of), time.max)) if as_of else None
+    sources = (
+        (StockSnapshotCache.VARIANT, ProductVariant.objects.all(), Value(''), 'sku_suffix'),
+        (StockSnapshotCache.DROP_PRODUCT, DropProduct.objects.all(), F('drop__name'), 'variant__sku_suffix'),
+    )
+    for item_type, queryset, drop_name, sku_suffix in sources:
+        queryset = queryset.order_by('id')
+        history = ()
+        if at is not None:
+            queryset = InventoryLedger.annotate_stock_at(queryset, item_type, at)
+            history = HISTORY_FIELDS
+        rows = queryset.values(
+            'id', 'product_id', 'reserved_quantity', *history,
+            product_name=F('product__name'),
+            drop_name=drop_name,
+            sku=Concat(Coalesce('product__sku_prefix', Value('')), Coalesce(sku_suffix, Value(''))),
+            stock=F(InventoryLedger.stock_field(item_type)),
+        )
+        for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            stock, reserved, row_as_of, source = _stock_figures(row, at)
+            yield [
+                item_type, row['id'], row['product_id'], row['product_name'], row['drop_name'] or '', row['sku'],
+                stock, reserved, stock - reserved if stock != '' else '', row_as_of, source,
+            ]
@@ -2,10 +2,15 @@
 """
 Inventory management utilities for orders
 """
+import threading
+import time
+from contextlib import contextmanager
 from django.db import models, transaction
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
+from backend.metrics import record_cache, record_reservation
 
 
 class InventoryManager:
@@ -19,17 +24,24 @@ class InventoryManager:
         Reserve inventory for all items in an order.
         Returns (success: bool, failed_items: list)
         """
+        started = time.perf_counter()
+        success, failed_items = InventoryManager._reserve_order_items(order)
+        record_reservation(success, time.perf_counter() - started)
+        return success, failed_items
+
+    @staticmethod
+    def _reserve_order_items(order):
         from .models import InventoryReservation
         
         failed_items = []
         reservations_created = []
         
         try:
-            with transaction.atomic():
+            with transaction.atomic(), InventoryLedger.batch():
                 for order_item in order.items.all():
                     if order_item.drop_product:
                         # Reserve drop product stock
-                        success = order_item.drop_product.reserve_stock(order_item.quantity)
+                        success = order_item.drop_product.reserve_stock(order_item.quantity, order_id=order.pk)
                         if success:
                             reservation = InventoryReservation.objects.create(
                                 order=order,
@@ -50,7 +62,7 @@ class InventoryManager:
                         from products.models import ProductVariant
                         try:
                             variant = ProductVariant.objects.get(id=order_item.product_variant_id)
-                            success = variant.reserve_stock(order_item.quantity)
+                            success = variant.reserve_stock(order_item.quantity, order_id=order.pk)
                             if success:
                                 reservation = InventoryReservation.objects.create(
                                     order=order,
@@ -90,7 +102,7 @@ class InventoryManager:
         """
         Fulfill an order by converting reservations to actual stock reduction
         """
-        with transaction.atomic():
+        with transaction.atomic(), InventoryLedger.batch():
             for reservation in order.reservations.filter(is_active=True):
                 reservation.fulfill()
     
@@ -99,7 +111,7 @@ class InventoryManager:
         """
         Cancel all active reservations for an order
         """
-        with transaction.atomic():
+        with transaction.atomic(), InventoryLedger.batch():
             for reservation in order.reservations.filter(is_active=True):
                 reservation.cancel()
     
@@ -119,11 +131,37 @@ class InventoryManager:
         
         count = 0
         for reservation in expired_reservations:
-            reservation.cancel()
+            reservation.cancel(reason=InventoryLedger.EXPIRE)
             count += 1
         
         return count
     
+    @staticmethod
+    def restock_order_items(order):
+        """
+        Return the drop product quantities of a failed or cancelled order to stock,
+        with one UPDATE per drop product and the ledger entries in the same transaction.
+        """
+        from drops.models import DropProduct
+
+        quantities = {}
+        for item in order.items.all():
+            if item.drop_product_id:
+                quantities[item.drop_product_id] = quantities.get(item.drop_product_id, 0) + item.quantity
+        if not quantities:
+            return
+        with transaction.atomic():
+            for drop_product_id, quantity in quantities.items():
+                DropProduct.objects.filter(id=drop_product_id).update(
+                    current_stock_quantity=models.F('current_stock_quantity') + quantity
+                )
+            InventoryLedger.log_updates(
+                StockSnapshotCache.DROP_PRODUCT,
+                {drop_product_id: (quantity, 0) for drop_product_id, quantity in quantities.items()},
+                InventoryLedger.RESTOCK, order_id=order.pk
+            )
+        transaction.on_commit(lambda ids=list(quantities): StockSnapshotCache.invalidate(StockSnapshotCache.DROP_PRODUCT, ids))
+
     @staticmethod
     def get_low_stock_items():
         """
@@ -145,3 +183,623 @@ class InventoryManager:
             'variants': low_stock_variants,
             'drop_products': low_stock_drops
         }
+
+    @staticmethod
+    def bulk_update_stock(updates, all_or_nothing=False):
+        """
+        Apply stock/threshold updates for many variants and drop products at once.
+
+        Each update is {'type': 'variant'|'drop_product', 'id', 'stock_quantity'?,
+        'low_stock_threshold'?, 'expected_updated_at'?}. For drop products stock_quantity
+        sets current_stock_quantity. Rows are validated up front, then locked with one
+        SELECT ... FOR UPDATE per type, checked against their expected_updated_at
+        precondition and current reservations, and written with bulk_update touching only
+        the stock, threshold and updated_at columns, so concurrent reservations are never
+        overwritten. With all_or_nothing, any failed row aborts the whole batch.
+        Returns a list of per-row result dicts in input order.
+        """
+        from django.utils.dateparse import parse_datetime
+        from products.models import ProductVariant
+        from drops.models import DropProduct
+
+        models_by_type = {
+            StockSnapshotCache.VARIANT: (ProductVariant, 'stock_quantity'),
+            StockSnapshotCache.DROP_PRODUCT: (DropProduct, 'current_stock_quantity'),
+        }
+        results = [None] * len(updates)
+        pending = {item_type: {} for item_type in models_by_type}  # type -> id -> (index, changes, expected)
+
+        def fail(index, update, error, code):
+            results[index] = {
+                'type': update.get('type') if isinstance(update, dict) else None,
+                'id': update.get('id') if isinstance(update, dict) else None,
+                'success': False, 'error': error, 'code': code,
+            }
+
+        # 1. Validate every row without touching the database
+        for index, update in enumerate(updates):
+            if not isinstance(update, dict):
+                fail(index, {}, 'Update must be an object', 'invalid')
+                continue
+            update_type = update.get('type')
+            if update_type not in models_by_type:
+                fail(index, update, f'Unknown update type: {update_type}', 'unknown_type')
+                continue
+            try:
+                item_id = int(update.get('id'))
+            except (TypeError, ValueError):
+                fail(index, update, 'Missing or invalid id', 'invalid')
+                continue
+
+            changes, invalid_field = {}, None
+            for field in ('stock_quantity', 'low_stock_threshold'):
+                value = update.get(field)
+                if value is None:
+                    continue
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    value = -1
+                if value < 0:
+                    invalid_field = field
+                    break
+                changes[field] = value
+            if invalid_field:
+                fail(index, update, f'{invalid_field} must be a non-negative integer', 'invalid')
+                continue
+            if not changes:
+                fail(index, update, 'Nothing to update', 'invalid')
+                continue
+
+            expected = update.get('expected_updated_at')
+            if expected is not None:
+                expected = parse_datetime(str(expected))
+                if expected is None:
+                    fail(index, update, 'Invalid expected_updated_at', 'invalid')
+                    continue
+                if timezone.is_naive(expected):
+                    # Would never equal the aware updated_at, i.e. a permanent false conflict
+                    fail(index, update, 'expected_updated_at must include a timezone offset', 'invalid')
+                    continue
+            if item_id in pending[update_type]:
+                fail(index, update, 'Duplicate update for this item', 'duplicate')
+                continue
+            pending[update_type][item_id] = (index, changes, expected)
+
+        if all_or_nothing and any(results):
+            return InventoryManager._abort_batch(updates, results)
+
+        # 2. Lock, check and write, one query pair per type
+        now = timezone.now()
+        with transaction.atomic():
+            written = {item_type: [] for item_type in models_by_type}
+            movements = []
+            for item_type, rows in pending.items():
+                if not rows:
+                    continue
+                model, stock_field = models_by_type[item_type]
+                locked = model.objects.select_for_update().filter(id__in=rows).order_by('id').in_bulk()
+                for item_id, (index, changes, expected) in rows.items():
+                    update = updates[index]
+                    obj = locked.get(item_id)
+                    if obj is None:
+                        fail(index, update, f'No {model.__name__} matches the given query.', 'not_found')
+                        continue
+                    if expected is not None and obj.updated_at != expected:
+                        fail(index, update, 'Item was modified since expected_updated_at', 'conflict')
+                        results[index]['current_updated_at'] = obj.updated_at
+                        continue
+                    stock = changes.get('stock_quantity', getattr(obj, stock_field))
+                    if stock < obj.reserved_quantity:
+                        fail(index, update, f'Stock {stock} is below the {obj.reserved_quantity} units reserved', 'below_reserved')
+                        continue
+                    if item_type == StockSnapshotCache.DROP_PRODUCT and stock > obj.initial_stock_quantity:
+                        fail(index, update, f'Stock {stock} exceeds the initial stock of {obj.initial_stock_quantity}', 'exceeds_initial_stock')
+                        continue
+                    stock_delta = stock - getattr(obj, stock_field)
+                    setattr(obj, stock_field, stock)
+                    obj.low_stock_threshold = changes.get('low_stock_threshold', obj.low_stock_threshold)
+                    obj.updated_at = now
+                    written[item_type].append((index, obj))
+                    if stock_delta:
+                        movements.append(InventoryLedger.movement(
+                            item_type, obj.id, InventoryLedger.ADJUST, stock, obj.reserved_quantity,
+                            stock_delta=stock_delta, at=now
+                        ))
+
+            if all_or_nothing and any(results):
+                transaction.set_rollback(True)
+                return InventoryManager._abort_batch(updates, results)
+
+            for item_type, rows in written.items():
+                if not rows:
+                    continue
+                model, stock_field = models_by_type[item_type]
+                model.objects.bulk_update(
+                    [obj for _, obj in rows], [stock_field, 'low_stock_threshold', 'updated_at'], batch_size=1000
+                )
+                for index, obj in rows:
+                    results[index] = {
+                        'type': item_type,
+                        'id': obj.id,
+                        'success': True,
+                        'new_stock_quantity': getattr(obj, stock_field),
+                        'new_available_quantity': obj.available_quantity,
+                        'new_low_stock_threshold': obj.low_stock_threshold,
+                        'updated_at': obj.updated_at,
+                    }
+                # bulk_update bypasses post_save, which normally invalidates snapshots
+                transaction.on_commit(lambda t=item_type, ids=[obj.id for _, obj in rows]: StockSnapshotCache.invalidate(t, ids))
+            InventoryLedger.record(movements)
+        return results
+
+    @staticmethod
+    def _abort_batch(updates, results):
+        """Results for an all_or_nothing batch that failed: valid rows are reported as skipped."""
+        for index, update in enumerate(updates):
+            if results[index] is None or results[index]['success']:
+                update = update if isinstance(update, dict) else {}
+                results[index] = {
+                    'type': update.get('type'), 'id': update.get('id'),
+                    'success': False, 'error': 'Batch aborted: another row failed', 'code': 'aborted',
+                }
+        return results
+
+
+class StockSnapshotCache:
+    """
+    Short-lived cache of per-item stock figures for read-only availability checks
+    (the frontend polls check-stock on product pages during drops).
+
+    Snapshots are fetched with one cache.get_many per item type; misses are loaded with
+    a single id__in query and written back with set_many. Saves of ProductVariant and
+    DropProduct invalidate their snapshot once the transaction commits (orders.signals;
+    earlier, a concurrent check could re-cache the old row), and the short timeout bounds
+    staleness for writes that bypass save(). Reservation and checkout always re-read
+    the database under a row lock, so a stale snapshot can never oversell.
+    """
+    KEY_PREFIX = 'stock_snapshot'
+    VARIANT = 'variant'
+    DROP_PRODUCT = 'drop_product'
+
+    @staticmethod
+    def key(item_type, item_id):
+        return f'{StockSnapshotCache.KEY_PREFIX}:{item_type}:{item_id}'
+
+    @staticmethod
+    def timeout():
+        return getattr(settings, 'INVENTORY_SNAPSHOT_CACHE_SECONDS', 5)
+
+    @staticmethod
+    def snapshot(item_type, obj):
+        if item_type == StockSnapshotCache.VARIANT:
+            return {
+                'stock_quantity': obj.stock_quantity,
+                'reserved_quantity': obj.reserved_quantity,
+                'low_stock_threshold': obj.low_stock_threshold,
+                'product_name': obj.product.name,
+                'variant_name': str(obj),
+            }
+        return {
+            'stock_quantity': obj.current_stock_quantity,
+            'reserved_quantity': obj.reserved_quantity,
+            'low_stock_threshold': obj.low_stock_threshold,
+            'product_name': obj.product.name,
+            'drop_price': obj.drop_price,
+        }
+
+    @staticmethod
+    def get_many(item_type, ids):
+        """Snapshots for `ids` as {id: snapshot}; ids that don't exist are absent."""
+        from django.core.cache import cache
+        from products.models import ProductVariant
+        from drops.models import DropProduct
+
+        ids = set(ids)
+        if not ids:
+            return {}
+        keys = {StockSnapshotCache.key(item_type, item_id): item_id for item_id in ids}
+        snapshots = {keys[key]: value for key, value in cache.get_many(list(keys)).items()}
+
+        missing = ids - snapshots.keys()
+        record_cache('stock_snapshot', hits=len(snapshots), misses=len(missing))
+        if missing:
+            if item_type == StockSnapshotCache.VARIANT:
+                queryset = ProductVariant.objects.select_related('product', 'size', 'color')
+            else:
+                queryset = DropProduct.objects.select_related('product')
+            loaded = {
+                obj.id: StockSnapshotCache.snapshot(item_type, obj)
+                for obj in queryset.filter(id__in=missing)
+            }
+            if loaded:
+                cache.set_many(
+                    {StockSnapshotCache.key(item_type, item_id): value for item_id, value in loaded.items()},
+                    timeout=StockSnapshotCache.timeout()
+                )
+            snapshots.update(loaded)
+        return snapshots
+
+    @staticmethod
+    def invalidate(item_type, ids):
+        """Drop the snapshots of `ids`, and the dashboard stats, which every stock change affects."""
+        from django.core.cache import cache
+        cache.delete_many([StockSnapshotCache.key(item_type, item_id) for item_id in ids] + [InventoryStats.KEY])
+
+
+class InventoryStats:
+    """
+    Figures for the inventory dashboards (the inventory/dashboard/ API, the admin
+    inventory_dashboard view and scripts/monitoring-dashboard.py).
+
+    Summary figures come from one conditional aggregate per table (variants, drop
+    products, reservations, orders); the short lists are loaded with select_related
+    so rendering them runs no further queries. The result is cached for
+    INVENTORY_STATS_CACHE_SECONDS and dropped on every stock change, together with
+    the stock snapshots (StockSnapshotCache.invalidate), so dashboards polled during
+    a drop cost a cache read.
+    """
+    KEY = 'inventory_stats'
+    LIST_LIMIT = 10
+    RECENT_RESERVATIONS_LIMIT = 20
+    EXPIRED_RESERVATIONS_LIMIT = 5
+
+    @staticmethod
+    def timeout():
+        return getattr(settings, 'INVENTORY_STATS_CACHE_SECONDS', 30)
+
+    @staticmethod
+    def get():
+        from django.core.cache import cache
+        stats = cache.get(InventoryStats.KEY)
+        record_cache('inventory_stats', hits=int(stats is not None), misses=int(stats is None))
+        if stats is None:
+            stats = InventoryStats.compute()
+            cache.set(InventoryStats.KEY, stats, InventoryStats.timeout())
+        return stats
+
+    @staticmethod
+    def invalidate():
+        from django.core.cache import cache
+        cache.delete(InventoryStats.KEY)
+
+    @staticmethod
+    def compute(now=None):
+        from django.db.models import Count, F, Q, Sum
+        from products.models import ProductVariant
+        from drops.models import DropProduct
+        from .models import InventoryReservation, Order
+
+        now = now or timezone.now()
+        day_ago = now - timedelta(hours=24)
+        active = Q(is_active=True)
+
+        variants = ProductVariant.objects.aggregate(
+            active=Count('pk', filter=active),
+            out_of_stock=Count('pk', filter=active & Q(stock_quantity__lte=0)),
+            low_stock=Count('pk', filter=active & Q(stock_quantity__lte=F('low_stock_threshold'))),
+            high_reservation=Count('pk', filter=Q(stock_quantity__gt=0, reserved_quantity__gt=F('stock_quantity') * 0.8)),
+            stock=Sum('stock_quantity'),
+            reserved=Sum('reserved_quantity'),
+        )
+        drops = DropProduct.objects.aggregate(
+            total=Count('pk'),
+            low_stock=Count('pk', filter=Q(current_stock_quantity__lte=F('low_stock_threshold'))),
+            reserved=Sum('reserved_quantity'),
+        )
+        unexpired = active & Q(expires_at__gte=now)
+        expired = active & Q(expires_at__lt=now)
+        reservations = InventoryReservation.objects.aggregate(
+            active=Count('pk', filter=unexpired),
+            active_units=Sum('quantity', filter=unexpired),
+            active_variant_units=Sum('quantity', filter=unexpired & Q(product_variant__isnull=False)),
+            expired=Count('pk', filter=expired),
+            expired_units=Sum('quantity', filter=expired),
+            created_24h=Count('pk', filter=active & Q(created_at__gte=day_ago)),
+        )
+        orders = Order.objects.aggregate(
+            pending=Count('pk', filter=Q(order_status='pending_payment', payment_status='pending')),
+            created_24h=Count('pk', filter=Q(created_at__gte=day_ago)),
+        )
+        variant_stock = variants['stock'] or 0
+        variant_reserved = variants['reserved'] or 0
+
+        low_stock_variants = (
+            ProductVariant.objects.filter(is_active=True, stock_quantity__lte=F('low_stock_threshold'))
+            .select_related('product', 'size', 'color').order_by('stock_quantity', 'id')[:InventoryStats.LIST_LIMIT]
+        )
+        low_stock_drops = (
+            DropProduct.objects.filter(current_stock_quantity__lte=F('low_stock_threshold'))
+            .select_related('product', 'variant', 'drop').order_by('current_stock_quantity', 'id')[:InventoryStats.LIST_LIMIT]
+        )
+        reservation_items = (
+            'order', 'product_variant__product', 'product_variant__size', 'product_variant__color',
+            'drop_product__product', 'drop_product__variant', 'drop_product__drop',
+        )
+        recent_reservations = (
+            InventoryReservation.objects.filter(is_active=True, created_at__gte=day_ago)
+            .select_related(*reservation_items).order_by('-created_at')[:InventoryStats.RECENT_RESERVATIONS_LIMIT]
+        )
+        oldest_expired = (
+            InventoryReservation.objects.filter(is_active=True, expires_at__lt=now)
+            .select_related(*reservation_items).order_by('expires_at')[:InventoryStats.EXPIRED_RESERVATIONS_LIMIT]
+        )
+
+        return {
+            'generated_at': now,
+            'summary': {
+                'total_active_variants': variants['active'],
+                'total_drop_products': drops['total'],
+                'low_stock_items': variants['low_stock'] + drops['low_stock'],
+                'out_of_stock_variants': variants['out_of_stock'],
+                'total_reserved_items': variant_reserved + (drops['reserved'] or 0),
+                'active_reservations_24h': reservations['created_24h'],
+                'total_variant_stock': variant_stock,
+                'reserved_variant_units': variant_reserved,
+                'reservation_ratio': round(variant_reserved / variant_stock * 100, 1) if variant_stock > 0 else 0,
+                'high_reservation_variants': variants['high_reservation'],
+                'active_reservations': reservations['active'],
+                'active_reservation_units': reservations['active_units'] or 0,
+                'active_variant_reservation_units': reservations['active_variant_units'] or 0,
+                'expired_reservations': reservations['expired'],
+                'expired_reservation_units': reservations['expired_units'] or 0,
+                'pending_orders': orders['pending'],
+                'orders_24h': orders['created_24h'],
+            },
+            'low_stock_variants': [
+                {
+                    'id': v.id,
+                    'name': str(v),
+                    'available_quantity': v.available_quantity,
+                    'low_stock_threshold': v.low_stock_threshold,
+                    'product_name': v.product.name,
+                } for v in low_stock_variants
+            ],
+            'low_stock_drop_products': [
+                {
+                    'id': d.id,
+                    'name': str(d),
+                    'available_quantity': d.available_quantity,
+                    'low_stock_threshold': d.low_stock_threshold,
+                    'product_name': d.product.name,
+                } for d in low_stock_drops
+            ],
+            'recent_reservations': [
+                InventoryStats.reservation_row(r) for r in recent_reservations
+            ],
+            'oldest_expired_reservations': [
+                InventoryStats.reservation_row(r) for r in oldest_expired
+            ],
+        }
+
+    @staticmethod
+    def reservation_row(reservation):
+        return {
+            'id': str(reservation.pk),
+            'quantity': reservation.quantity,
+            'expires_at': reservation.expires_at,
+            'item_name': str(reservation),
+            'order_number': reservation.order.order_number if reservation.order else None,
+        }
+
+
+class InventoryLedger:
+    """
+    Writes the append-only InventoryMovement ledger and answers history questions
+    from it.
+
+    Every stock change goes through log()/log_updates()/record() inside the
+    transaction that makes the change, so the ledger commits or rolls back with it.
+    Inside a batch() block movements are buffered and written with one bulk INSERT
+    when the block exits, which keeps multi-item operations (reserving a whole order,
+    expiring a batch of reservations) at one ledger statement.
+
+    Point-in-time stock comes from the latest movement or InventorySnapshot at or
+    before the requested time: two indexed single-row reads instead of replaying
+    the ledger.
+    """
+    RESERVE = 'reserve'
+    RELEASE = 'release'
+    EXPIRE = 'expire'
+    FULFILL = 'fulfill'
+    RESTOCK = 'restock'
+    ADJUST = 'adjust'
+
+    _local = threading.local()
+
+    @staticmethod
+    def item_type_of(obj):
+        if obj._meta.label == 'drops.DropProduct':
+            return StockSnapshotCache.DROP_PRODUCT
+        return StockSnapshotCache.VARIANT
+
+    @staticmethod
+    def stock_field(item_type):
+        return 'current_stock_quantity' if item_type == StockSnapshotCache.DROP_PRODUCT else 'stock_quantity'
+
+    @staticmethod
+    def movement(item_type, item_id, reason, stock_after, reserved_after,
+                 stock_delta=0, reserved_delta=0, order_id=None, at=None):
+        """An unsaved InventoryMovement."""
+        from .models import InventoryMovement
+        return InventoryMovement(
+            item_type=item_type, item_id=item_id, reason=reason,
+            stock_delta=stock_delta, reserved_delta=reserved_delta,
+            stock_after=stock_after, reserved_after=reserved_after,
+            order_id=order_id, created_at=at or timezone.now(),
+        )
+
+    @staticmethod
+    def record(movements):
+        """Write movements now, or add them to the open batch."""
+        from .models import InventoryMovement
+        movements = [movement for movement in movements if movement.stock_delta or movement.reserved_delta]
+        if not movements:
+            return
+        buffer = getattr(InventoryLedger._local, 'buffer', None)
+        if buffer is not None:
+            buffer.extend(movements)
+        else:
+            InventoryMovement.objects.bulk_create(movements, batch_size=1000)
+
+    @staticmethod
+    def log(obj, reason, stock_delta=0, reserved_delta=0, order_id=None):
+        """Record a change already applied to `obj` (a locked, saved ProductVariant or DropProduct)."""
+        item_type = InventoryLedger.item_type_of(obj)
+        InventoryLedger.record([InventoryLedger.movement(
+            item_type, obj.pk, reason,
+            getattr(obj, InventoryLedger.stock_field(item_type)), obj.reserved_quantity,
+            stock_delta=stock_delta, reserved_delta=reserved_delta, order_id=order_id,
+        )])
+
+    @staticmethod
+    def log_updates(item_type, deltas, reason, order_id=None):
+        """
+        Record changes made with UPDATE statements (F() expressions, raw SQL), where the
+        new figures are not in memory. `deltas` maps item id -> (stock_delta, reserved_delta);
+        the figures after the change are read back in one query. Call it in the
+        transaction that ran the UPDATEs, which still holds their row locks.
+        """
+        from products.models import ProductVariant
+        from drops.models import DropProduct
+
+        if not deltas:
+            return
+        model = DropProduct if item_type == StockSnapshotCache.DROP_PRODUCT else ProductVariant
+        stock_field = InventoryLedger.stock_field(item_type)
+        current = {
+            item_id: (stock, reserved)
+            for item_id, stock, reserved in model.objects.filter(id__in=deltas).values_list('id', stock_field, 'reserved_quantity')
+        }
+        now = timezone.now()
+        InventoryLedger.record([
+            InventoryLedger.movement(
+                item_type, item_id, reason, *current[item_id],
+                stock_delta=stock_delta, reserved_delta=reserved_delta, order_id=order_id, at=now
+            )
+            for item_id, (stock_delta, reserved_delta) in deltas.items() if item_id in current
+        ])
+
+    @staticmethod
+    @contextmanager
+    def batch():
+        """Buffer movements recorded inside the block and insert them together on exit."""
+        from .models import InventoryMovement
+        if getattr(InventoryLedger._local, 'buffer', None) is not None:
+            yield  # Already batching; the outermost block writes
+            return
+        InventoryLedger._local.buffer = []
+        try:
+            yield
+            movements = InventoryLedger._local.buffer
+        finally:
+            InventoryLedger._local.buffer = None
+        if movements:
+            InventoryMovement.objects.bulk_create(movements, batch_size=1000)
+
+    @staticmethod
+    def take_snapshot(now=None, batch_size=2000):
+        """Copy every variant's and drop product's stock figures into InventorySnapshot. Returns the row count."""
+        from products.models import ProductVariant
+        from drops.models import DropProduct
+        from .models import InventorySnapshot
+
+        now = now or timezone.now()
+        count = 0
+        for item_type, model in ((StockSnapshotCache.VARIANT, ProductVariant), (StockSnapshotCache.DROP_PRODUCT, DropProduct)):
+            rows = model.objects.order_by('id').values_list('id', InventoryLedger.stock_field(item_type), 'reserved_quantity')
+            snapshots = []
+            for item_id, stock, reserved in rows.iterator(chunk_size=batch_size):
+                snapshots.append(InventorySnapshot(
+                    item_type=item_type, item_id=item_id,
+                    stock_quantity=stock, reserved_quantity=reserved, taken_at=now,
+                ))
+                if len(snapshots) >= batch_size:
+                    InventorySnapshot.objects.bulk_create(snapshots)
+                    count += len(snapshots)
+                    snapshots = []
+            InventorySnapshot.objects.bulk_create(snapshots)
+            count += len(snapshots)
+        return count
+
+    @staticmethod
+    def stock_at(item_type, item_id, at):
+        """
+        {'stock_quantity', 'reserved_quantity', 'as_of', 'source'} for the item at time `at`,
+        or None if neither the ledger nor a snapshot covers that time.
+        """
+        from .models import InventoryMovement, InventorySnapshot
+
+        movement = (
+            InventoryMovement.objects
+            .filter(item_type=item_type, item_id=item_id, created_at__lte=at)
+            .order_by('-created_at', '-id')
+            .values_list('stock_after', 'reserved_after', 'created_at')
+            .first()
+        )
+        snapshot = (
+            InventorySnapshot.objects
+            .filter(item_type=item_type, item_id=item_id, taken_at__lte=at)
+            .order_by('-taken_at')
+            .values_list('stock_quantity', 'reserved_quantity', 'taken_at')
+            .first()
+        )
+        candidates = [(row, source) for row, source in ((movement, 'movement'), (snapshot, 'snapshot')) if row]
+        if not candidates:
+            return None
+        (stock, reserved, as_of), source = max(candidates, key=lambda candidate: candidate[0][2])
+        return {'stock_quantity': stock, 'reserved_quantity': reserved, 'as_of': as_of, 'source': source}
+
+    @staticmethod
+    def annotate_stock_at(queryset, item_type, at):
+        """
+        stock_at() for every item of `queryset` (variants or drop products) in one
+        query: annotates the figures and time of the latest movement (movement_stock,
+        movement_reserved, movement_at) and snapshot (snapshot_stock, snapshot_reserved,
+        snapshot_at) at or before `at`, each None when there is none. Use the later one.
+        """
+        from .models import InventoryMovement, InventorySnapshot
+
+        movements = (
+            InventoryMovement.objects
+            .filter(item_type=item_type, item_id=models.OuterRef('pk'), created_at__lte=at)
+            .order_by('-created_at', '-id')
+        )
+        snapshots = (
+            InventorySnapshot.objects
+            .filter(item_type=item_type, item_id=models.OuterRef('pk'), taken_at__lte=at)
+            .order_by('-taken_at')
+        )
+        return queryset.annotate(
+            movement_stock=models.Subquery(movements.values('stock_after')[:1]),
+            movement_reserved=models.Subquery(movements.values('reserved_after')[:1]),
+            movement_at=models.Subquery(movements.values('created_at')[:1]),
+            snapshot_stock=models.Subquery(snapshots.values('stock_quantity')[:1]),
+            snapshot_reserved=models.Subquery(snapshots.values('reserved_quantity')[:1]),
+            snapshot_at=models.Subquery(snapshots.values('taken_at')[:1]),
+        )
+
+    @staticmethod
+    def daily_movements(start, end, item_type=None, item_id=None):
+        """
+        Movement totals per day, item type and reason for created_at in [start, end),
+        aggregated in the database over the created_at index.
+        """
+        from .models import InventoryMovement
+
+        queryset = InventoryMovement.objects.filter(created_at__gte=start, created_at__lt=end)
+        if item_type:
+            queryset = queryset.filter(item_type=item_type)
+            if item_id is not None:
+                queryset = queryset.filter(item_id=item_id)
+        return (
+            queryset
+            .annotate(day=TruncDate('created_at'))
+            .values('day', 'item_type', 'reason')
+            .annotate(
+                movements=models.Count('id'),
+                stock_delta=models.Sum('stock_delta'),
+                reserved_delta=models.Sum('reserved_delta'),
+            )
+            .order_by('day', 'item_type', 'reason')
+        )
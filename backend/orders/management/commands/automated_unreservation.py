@@ -10,6 +10,7 @@ from django.db import transaction, connection
 from django.utils import timezone
 from datetime import timedelta
 from orders.models import Order, InventoryReservation
+from orders.inventory import InventoryLedger, StockSnapshotCache
 from products.models import ProductVariant
 from drops.models import DropProduct
 
@@ -271,6 +272,19 @@ class Command(BaseCommand):
             """, [reservation_ids])
             drop_products_updated = cursor.rowcount
 
+        # Ledger entries for the released quantities, in this batch's transaction
+        released = {StockSnapshotCache.VARIANT: {}, StockSnapshotCache.DROP_PRODUCT: {}}
+        for reservation in batch:
+            if reservation['product_variant_id']:
+                item_type, item_id = StockSnapshotCache.VARIANT, reservation['product_variant_id']
+            else:
+                item_type, item_id = StockSnapshotCache.DROP_PRODUCT, reservation['drop_product_id']
+            _, reserved_delta = released[item_type].get(item_id, (0, 0))
+            released[item_type][item_id] = (0, reserved_delta - reservation['quantity'])
+        with InventoryLedger.batch():
+            for item_type, deltas in released.items():
+                InventoryLedger.log_updates(item_type, deltas, InventoryLedger.EXPIRE)
+
         # Step 3: Deactivate reservations
         with connection.cursor() as cursor:
             cursor.execute("""
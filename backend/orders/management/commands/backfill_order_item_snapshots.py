@@ -0,0 +1,64 @@
+"""
+Django Management Command: Backfill Order Item Snapshots
+
+Drop items created before order items stored their own product snapshot have no
+product_id, slug, image URL, color or size; OrderItemSerializer only reads those
+columns, so such items show up without them. This copies the figures from each
+item's drop product, in batches, with one bulk UPDATE per batch.
+
+Usage:
+    python manage.py backfill_order_item_snapshots
+    python manage.py backfill_order_item_snapshots --batch-size 1000
+    python manage.py backfill_order_item_snapshots --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+
+from orders.models import OrderItem
+
+SNAPSHOT_FIELDS = ['product_id', 'product_variant_id', 'product_slug', 'product_image_url', 'color', 'size']
+
+
+class Command(BaseCommand):
+    help = 'Store product snapshots on drop order items that were created without them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Order items updated per statement (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many order items need a snapshot without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        pending = OrderItem.objects.filter(drop_product__isnull=False, product_id__isnull=True)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'DRY RUN: {pending.count()} order items need a snapshot'))
+            return
+
+        batch_size = max(1, options['batch_size'])
+        queryset = pending.select_related(
+            'drop_product__product', 'drop_product__variant__size', 'drop_product__variant__color',
+        ).prefetch_related('drop_product__product__images').order_by('id')
+
+        updated = 0
+        last_id = 0
+        while True:
+            items = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not items:
+                break
+            last_id = items[-1].id
+            for item in items:
+                for field, value in OrderItem.snapshot_fields(item.drop_product.product, item.drop_product.variant).items():
+                    setattr(item, field, value)
+            OrderItem.objects.bulk_update(items, SNAPSHOT_FIELDS)
+            updated += len(items)
+            self.stdout.write(f'Updated {updated} order items...')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled snapshots on {updated} order items'))
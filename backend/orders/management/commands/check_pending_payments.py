@@ -129,9 +129,7 @@ class Command(BaseCommand):
                     if not dry_run:
                         # Release the reservation
                         with transaction.atomic():
-                            variant = item.product_variant
-                            variant.reserved_quantity = max(0, variant.reserved_quantity - item.reserved_quantity)
-                            variant.save(update_fields=['reserved_quantity'])
+                            item.product_variant.release_reservation(item.reserved_quantity)
                             
                             item.reserved_quantity = 0
                             item.reserved_until = None
@@ -7,7 +7,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 from django.db import transaction
-from orders.inventory import InventoryManager
+from orders.inventory import InventoryManager, InventoryLedger
 from orders.models import Order, InventoryReservation
 
 logger = logging.getLogger(__name__)
@@ -156,7 +156,7 @@ class Command(BaseCommand):
             
             if not dry_run:
                 with transaction.atomic():
-                    success = reservation.cancel()
+                    success = reservation.cancel(reason=InventoryLedger.EXPIRE)
                     if success:
                         cancelled_reservations += 1
                         logger.info(f"Cancelled expired reservation {reservation.reservation_id} for order {order.order_number}")
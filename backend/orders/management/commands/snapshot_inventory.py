@@ -0,0 +1,44 @@
+"""
+Django Management Command: Snapshot Inventory
+
+Copies every product variant's and drop product's stock and reserved quantities
+into InventorySnapshot. Together with the InventoryMovement ledger this answers
+"what was the stock of this item at time T" with indexed reads
+(InventoryLedger.stock_at), including after old ledger rows have been purged.
+Should be run daily via cron job in production.
+
+Usage:
+    python manage.py snapshot_inventory
+    python manage.py snapshot_inventory --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+from drops.models import DropProduct
+from orders.inventory import InventoryLedger
+from products.models import ProductVariant
+
+class Command(BaseCommand):
+    help = 'Record a snapshot of current stock levels for inventory history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many items would be snapshotted without writing anything',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows inserted per statement (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        """Write one snapshot row per variant and drop product."""
+        if options['dry_run']:
+            count = ProductVariant.objects.count() + DropProduct.objects.count()
+            self.stdout.write(self.style.WARNING(f'DRY RUN: Would snapshot {count} items'))
+            return
+
+        count = InventoryLedger.take_snapshot(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'Snapshotted {count} items'))
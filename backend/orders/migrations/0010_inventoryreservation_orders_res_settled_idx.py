@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_order_orders_orde_created_91b231_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventoryreservation',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['created_at'], name='orders_res_settled_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:47
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_inventoryreservation_orders_res_settled_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('item_type', models.CharField(choices=[('variant', 'Product Variant'), ('drop_product', 'Drop Product')], max_length=12)),
+                ('item_id', models.PositiveIntegerField()),
+                ('stock_quantity', models.PositiveIntegerField()),
+                ('reserved_quantity', models.PositiveIntegerField()),
+                ('taken_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+                'indexes': [models.Index(fields=['item_type', 'item_id', 'taken_at'], name='orders_snap_item_time_idx'), models.Index(fields=['taken_at'], name='orders_snap_time_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('item_type', models.CharField(choices=[('variant', 'Product Variant'), ('drop_product', 'Drop Product')], max_length=12)),
+                ('item_id', models.PositiveIntegerField()),
+                ('reason', models.CharField(choices=[('reserve', 'Reserved for order'), ('release', 'Reservation released'), ('expire', 'Reservation expired'), ('fulfill', 'Order fulfilled'), ('restock', 'Returned to stock'), ('adjust', 'Stock adjustment')], max_length=10)),
+                ('stock_delta', models.IntegerField(default=0)),
+                ('reserved_delta', models.IntegerField(default=0)),
+                ('stock_after', models.PositiveIntegerField()),
+                ('reserved_after', models.PositiveIntegerField()),
+                ('order_id', models.UUIDField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['item_type', 'item_id', 'created_at'], name='orders_mov_item_time_idx'), models.Index(fields=['created_at'], name='orders_mov_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Trigram indexes for admin order search (orders/filters.py), PostgreSQL only.
+#
+# icontains compiles to UPPER(col::text) LIKE UPPER('%term%'), so the indexes are
+# built on that same expression with gin_trgm_ops. Built CONCURRENTLY to keep the
+# tables writable; needs permission to CREATE EXTENSION pg_trgm (or the extension
+# already installed). Other databases skip this migration.
+
+from django.conf import settings
+from django.db import migrations
+
+# (index name, model, column)
+TRIGRAM_INDEXES = [
+    ('orders_order_number_trgm', 'orders.Order', 'order_number'),
+    ('orders_guest_email_trgm', 'orders.Order', 'email_for_guest'),
+    ('orders_payment_txn_trgm', 'orders.Payment', 'gateway_transaction_id'),
+    ('users_user_email_trgm', settings.AUTH_USER_MODEL, 'email'),
+    ('users_user_username_trgm', settings.AUTH_USER_MODEL, 'username'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    quote = schema_editor.quote_name
+    for name, model, column in TRIGRAM_INDEXES:
+        table = apps.get_model(model)._meta.db_table
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {quote(name)} '
+            f'ON {quote(table)} USING gin ((UPPER({quote(column)}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, *_ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('orders', '0012_order_status_payment_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_order_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inventorymovement',
+            name='item_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='inventorysnapshot',
+            name='item_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+    ]
@@ -100,6 +100,12 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'order_id']),  # Keyset pagination for order listings
+            # Admin status filters, newest first (orders/filters.py)
+            models.Index(fields=['order_status', '-created_at'], name='orders_status_created_idx'),
+            models.Index(fields=['payment_status', '-created_at'], name='orders_payment_created_idx'),
+        ]
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -109,7 +115,8 @@ class OrderItem(models.Model):
         null=True, blank=True  # Make optional to support direct product orders
     )
     
-    # Direct order fields (for orders not using drop_product)
+    # Product snapshot: filled for every item at order creation (drop items too, see
+    # snapshot_fields), so order history is serialized without touching products
     product_id = models.IntegerField(null=True, blank=True)  # Store product ID directly
     product_variant_id = models.IntegerField(null=True, blank=True)  # Store variant ID directly  
     product_slug = models.CharField(max_length=255, null=True, blank=True)  # Store product slug
@@ -131,6 +138,30 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.quantity} x {self.product_name_snapshot} for Order {self.order.order_number}"
 
+    @staticmethod
+    def image_url_for(product, variant=None):
+        """
+        The variant's own image, else the product's primary image, else its first one.
+        One query for the product images, none when they are prefetched.
+        """
+        if variant is not None and variant.image:
+            return variant.image.url
+        images = [image for image in product.images.all() if image.image]
+        chosen = next((image for image in images if image.is_primary), images[0] if images else None)
+        return chosen.image.url if chosen else None
+
+    @staticmethod
+    def snapshot_fields(product, variant=None):
+        """Product fields stored on the item: ids, slug, image URL and the variant's color and size names."""
+        return {
+            'product_id': product.id,
+            'product_variant_id': variant.id if variant else None,
+            'product_slug': product.slug,
+            'product_image_url': OrderItem.image_url_for(product, variant),
+            'color': variant.color.name if variant and variant.color else None,
+            'size': variant.size.name if variant and variant.size else None,
+        }
+
     class Meta:
         # unique_together = ('order', 'drop_product') # Usually an item isn't in an order twice
         ordering = ['created_at']
@@ -203,6 +234,8 @@ class InventoryReservation(models.Model):
             models.Index(fields=['order', 'is_active']),
             models.Index(fields=['product_variant', 'is_active']),
             models.Index(fields=['drop_product', 'is_active']),
+            # Retention purge of settled reservations (backend/retention.py)
+            models.Index(fields=['created_at'], condition=models.Q(is_active=False), name='orders_res_settled_idx'),
         ]
         constraints = [
             models.CheckConstraint(
@@ -253,26 +286,26 @@ class InventoryReservation(models.Model):
         from django.db import transaction
         with transaction.atomic():
             if self.product_variant:
-                self.product_variant.fulfill_order(self.quantity)
+                self.product_variant.fulfill_order(self.quantity, order_id=self.order_id)
             elif self.drop_product:
-                self.drop_product.fulfill_order(self.quantity)
+                self.drop_product.fulfill_order(self.quantity, order_id=self.order_id)
             
             self.is_active = False
             self.fulfilled_at = timezone.now()
             self.save(update_fields=['is_active', 'fulfilled_at'])
             return True
     
-    def cancel(self):
-        """Cancel reservation and release stock"""
+    def cancel(self, reason=None):
+        """Cancel reservation and release stock (reason: ledger reason, 'release' by default)"""
         if not self.is_active or self.cancelled_at:
             return False
         
         from django.db import transaction
         with transaction.atomic():
             if self.product_variant:
-                self.product_variant.release_reservation(self.quantity)
+                self.product_variant.release_reservation(self.quantity, order_id=self.order_id, reason=reason)
             elif self.drop_product:
-                self.drop_product.release_reservation(self.quantity)
+                self.drop_product.release_reservation(self.quantity, order_id=self.order_id, reason=reason)
             
             self.is_active = False
             self.cancelled_at = timezone.now()
@@ -287,3 +320,70 @@ class InventoryReservation(models.Model):
             product_name = str(self.drop_product)
         
         return f"Reservation {str(self.reservation_id)[:8]} - {self.quantity}x {product_name}"
+
+
+class InventoryMovement(models.Model):
+    """
+    Append-only ledger of stock changes, written in the same transaction as the change
+    (see orders.inventory.InventoryLedger). Each row carries the item's stock and
+    reserved figures after the change, so the latest row at or before a point in time
+    is the item's state at that time. Items are referenced by type and id rather than
+    foreign keys: the ledger outlives deleted items and inserts stay cheap.
+    """
+    ITEM_TYPE_CHOICES = [
+        ('variant', 'Product Variant'),
+        ('drop_product', 'Drop Product'),
+    ]
+    REASON_CHOICES = [
+        ('reserve', 'Reserved for order'),
+        ('release', 'Reservation released'),
+        ('expire', 'Reservation expired'),
+        ('fulfill', 'Order fulfilled'),
+        ('restock', 'Returned to stock'),
+        ('adjust', 'Stock adjustment'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    item_type = models.CharField(max_length=12, choices=ITEM_TYPE_CHOICES)
+    item_id = models.PositiveBigIntegerField()  # Variant/drop product ids are BigAutoField
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    stock_delta = models.IntegerField(default=0)
+    reserved_delta = models.IntegerField(default=0)
+    stock_after = models.PositiveIntegerField()
+    reserved_after = models.PositiveIntegerField()
+    order_id = models.UUIDField(null=True, blank=True)  # Not a foreign key; orders may be purged
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['item_type', 'item_id', 'created_at'], name='orders_mov_item_time_idx'),  # Point-in-time lookups
+            models.Index(fields=['created_at'], name='orders_mov_time_idx'),  # Daily reports, retention
+        ]
+
+    def __str__(self):
+        return f"{self.item_type} {self.item_id} {self.reason} ({self.stock_delta:+d}/{self.reserved_delta:+d})"
+
+
+class InventorySnapshot(models.Model):
+    """
+    Periodic copy of every item's stock figures (`manage.py snapshot_inventory`).
+    Point-in-time lookups start from the latest snapshot, so history stays answerable
+    after old ledger rows are purged, and items that never moved still have a state.
+    """
+    id = models.BigAutoField(primary_key=True)
+    item_type = models.CharField(max_length=12, choices=InventoryMovement.ITEM_TYPE_CHOICES)
+    item_id = models.PositiveBigIntegerField()
+    stock_quantity = models.PositiveIntegerField()
+    reserved_quantity = models.PositiveIntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-taken_at']
+        indexes = [
+            models.Index(fields=['item_type', 'item_id', 'taken_at'], name='orders_snap_item_time_idx'),
+            models.Index(fields=['taken_at'], name='orders_snap_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_type} {self.item_id} @ {self.taken_at}: {self.stock_quantity}/{self.reserved_quantity}"
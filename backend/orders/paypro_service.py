@@ -1,3 +1,4 @@
+import httpx
 import requests
 import base64
 import json
@@ -5,6 +6,8 @@ import logging
 from typing import Dict, Any, Tuple, Optional
 from django.conf import settings
 from decimal import Decimal
+from backend.http_client import async_client
+from backend.metrics import observe_external
 from .currency_service import currency_converter
 
 logger = logging.getLogger(__name__)
@@ -48,6 +51,20 @@ class PayProService:
             'Authorization': self._get_auth_header()
         }
     
+    def _request(self, method: str, operation: str, url: str, **kwargs) -> requests.Response:
+        """Call the PayPro API, recording latency and errors for /metrics"""
+        with observe_external('paypro', operation) as call:
+            response = requests.request(method, url, timeout=30, verify=True, **kwargs)
+            call.status(response.status_code)
+        return response
+    
+    async def _arequest(self, method: str, operation: str, url: str, **kwargs) -> httpx.Response:
+        """_request over the pooled async client; the event loop is free while PayPro responds"""
+        with observe_external('paypro', operation) as call:
+            response = await async_client().request(method, url, timeout=30, **kwargs)
+            call.status(response.status_code)
+        return response
+    
     def _get_return_urls(self) -> Dict[str, str]:
         """Get return URLs for PayPro redirect flow"""
         frontend_url = getattr(settings, 'FRONTEND_URL', 'https://malikli1992.com')
@@ -86,298 +103,348 @@ class PayProService:
         if '@' not in email or '.' not in email:
             raise ValueError("Invalid email format")
     
-    def create_payment_token(self, order_data: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+    def _build_checkout(self, order_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
         """
-        Create a payment token using PayPro BPC API v2
+        Validate order data and build the checkout request.
         
-        Args:
-            order_data: Dictionary containing order information:
-                - order_id: Unique order identifier
-                - amount: Payment amount (will be converted to minimal currency units)
-                - currency: 3-letter ISO-4217 currency code
-                - customer_email: Customer's email address
-                - customer_first_name: Customer's first name (optional)
-                - customer_last_name: Customer's last name (optional)
-                - description: Order description (optional)
-                
         Returns:
-            Tuple[bool, Dict]: (success, response_data)
-            If successful, response_data contains:
-                - token: Payment token
-                - redirect_url: URL to redirect customer for payment
-                - checkout_data: Full checkout response from PayPro
+            Tuple[str, Dict, Dict]: (url, payload, amounts), amounts holding the
+            original and payment amount and currency
         """
-        try:
-            # Validate input data
-            self._validate_order_data(order_data)
-            
-            # PayPro BPC API endpoint for creating payment tokens
-            url = f"{self.checkout_url}/ctp/api/checkouts"
-            
-            # Get return URLs
-            return_urls = self._get_return_urls()
-            
-            # Handle currency conversion
-            original_amount = Decimal(str(order_data['amount']))
-            original_currency = order_data['currency'].upper()
-            
-            # # Convert to BYN if needed (PayPro BPC only accepts BYN)
-            # if original_currency == 'EUR':
-            #     byn_amount = currency_converter.convert_eur_to_byn(original_amount)
-            #     payment_currency = 'BYN'
-            #     logger.info(f"Converting {original_amount} EUR to {byn_amount} BYN for PayPro payment")
-            # elif original_currency == 'BYN':
-            #     byn_amount = original_amount
-            #     payment_currency = 'BYN'
-            #     logger.info(f"Using BYN amount directly: {byn_amount} BYN")
-            # else:
-            #     # For other currencies, convert via EUR first (if needed)
-            #     logger.warning(f"Unsupported currency {original_currency}, treating as EUR for conversion")
-            #     byn_amount = currency_converter.convert_eur_to_byn(original_amount)
-            #     payment_currency = 'BYN'
-            
-            # Use original currency and amount without conversion
-            payment_amount = original_amount
-            payment_currency = original_currency
-            logger.info(f"Using original amount and currency: {payment_amount} {payment_currency}")
-            
-            # Convert amount to minimal currency units (cents for EUR, kopecks for BYN, etc.)
-            if payment_currency in ['EUR', 'USD', 'BYN']:
-                amount_minimal_units = int(payment_amount * Decimal('100'))
-            else:
-                # For other currencies, assume 100 subunits = 1 main unit
-                amount_minimal_units = int(payment_amount * Decimal('100'))
-            
-            # Build PayPro BPC API v2 payload according to official documentation
-            payload = {
-                "checkout": {
-                    "test": False,
-                    "transaction_type": "payment",
-                    "attempts": 3,  # Allow up to 3 payment attempts
-                    "order": {
-                        "amount": amount_minimal_units,
-                        "currency": payment_currency,
-                        "description": order_data.get('description', f"Payment for Order #{order_data['order_id']}"),
-                        "tracking_id": str(order_data['order_id'])
-                    },
-                    "customer": {
-                        "email": order_data['customer_email'],
-                        "first_name": order_data.get('customer_first_name', ''),
-                        "last_name": order_data.get('customer_last_name', '')
-                    },
-                    "settings": {
-                        "success_url": return_urls['success_url'],
-                        "decline_url": return_urls['decline_url'],
-                        "fail_url": return_urls['fail_url'],
-                        "cancel_url": return_urls['cancel_url'],
-                        "notification_url": return_urls['notification_url'],
-                        "language": order_data.get('language', 'en'),
-                        "auto_return": 3,  # Show result page for 3 seconds then redirect
-                        "customer_fields": {
-                            "visible": ["first_name", "last_name"],
-                            "read_only": ["email"]
-                        }
-                    },
-                    "payment_method": {
-                        "types": ["credit_card"]
+        # Validate input data
+        self._validate_order_data(order_data)
+        
+        # PayPro BPC API endpoint for creating payment tokens
+        url = f"{self.checkout_url}/ctp/api/checkouts"
+        
+        # Get return URLs
+        return_urls = self._get_return_urls()
+        
+        # Handle currency conversion
+        original_amount = Decimal(str(order_data['amount']))
+        original_currency = order_data['currency'].upper()
+        
+        # # Convert to BYN if needed (PayPro BPC only accepts BYN)
+        # if original_currency == 'EUR':
+        #     byn_amount = currency_converter.convert_eur_to_byn(original_amount)
+        #     payment_currency = 'BYN'
+        #     logger.info(f"Converting {original_amount} EUR to {byn_amount} BYN for PayPro payment")
+        # elif original_currency == 'BYN':
+        #     byn_amount = original_amount
+        #     payment_currency = 'BYN'
+        #     logger.info(f"Using BYN amount directly: {byn_amount} BYN")
+        # else:
+        #     # For other currencies, convert via EUR first (if needed)
+        #     logger.warning(f"Unsupported currency {original_currency}, treating as EUR for conversion")
+        #     byn_amount = currency_converter.convert_eur_to_byn(original_amount)
+        #     payment_currency = 'BYN'
+        
+        # Use original currency and amount without conversion
+        payment_amount = original_amount
+        payment_currency = original_currency
+        logger.info(f"Using original amount and currency: {payment_amount} {payment_currency}")
+        
+        # Convert amount to minimal currency units (cents for EUR, kopecks for BYN, etc.)
+        if payment_currency in ['EUR', 'USD', 'BYN']:
+            amount_minimal_units = int(payment_amount * Decimal('100'))
+        else:
+            # For other currencies, assume 100 subunits = 1 main unit
+            amount_minimal_units = int(payment_amount * Decimal('100'))
+        
+        # Build PayPro BPC API v2 payload according to official documentation
+        payload = {
+            "checkout": {
+                "test": False,
+                "transaction_type": "payment",
+                "attempts": 3,  # Allow up to 3 payment attempts
+                "order": {
+                    "amount": amount_minimal_units,
+                    "currency": payment_currency,
+                    "description": order_data.get('description', f"Payment for Order #{order_data['order_id']}"),
+                    "tracking_id": str(order_data['order_id'])
+                },
+                "customer": {
+                    "email": order_data['customer_email'],
+                    "first_name": order_data.get('customer_first_name', ''),
+                    "last_name": order_data.get('customer_last_name', '')
+                },
+                "settings": {
+                    "success_url": return_urls['success_url'],
+                    "decline_url": return_urls['decline_url'],
+                    "fail_url": return_urls['fail_url'],
+                    "cancel_url": return_urls['cancel_url'],
+                    "notification_url": return_urls['notification_url'],
+                    "language": order_data.get('language', 'en'),
+                    "auto_return": 3,  # Show result page for 3 seconds then redirect
+                    "customer_fields": {
+                        "visible": ["first_name", "last_name"],
+                        "read_only": ["email"]
                     }
+                },
+                "payment_method": {
+                    "types": ["credit_card"]
                 }
             }
+        }
+        
+        # Add optional fields if provided
+        if order_data.get('receipt_text'):
+            payload["checkout"]["order"]["additional_data"] = {
+                "receipt_text": order_data['receipt_text']
+            }
+        
+        logger.info(f"Creating PayPro payment token for order {order_data['order_id']}")
+        logger.debug(f"PayPro API URL: {url}")
+        logger.debug(f"PayPro payload: {json.dumps(payload, indent=2)}")
+        
+        amounts = {
+            'original_amount': original_amount,
+            'original_currency': original_currency,
+            'payment_amount': payment_amount,
+            'payment_currency': payment_currency,
+        }
+        return url, payload, amounts
+    
+    def _checkout_result(self, response, order_data: Dict[str, Any], amounts: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+        """Parse the checkout response (requests or httpx) into create_payment_token's result"""
+        logger.info(f"PayPro response status: {response.status_code}")
+        logger.debug(f"PayPro response headers: {dict(response.headers)}")
+        
+        if response.status_code in [200, 201]:
+            response_data = response.json()
+            logger.info(f"PayPro payment token created successfully")
+            logger.debug(f"PayPro response: {json.dumps(response_data, indent=2)}")
             
-            # Add optional fields if provided
-            if order_data.get('receipt_text'):
-                payload["checkout"]["order"]["additional_data"] = {
-                    "receipt_text": order_data['receipt_text']
-                }
-            
-            headers = self._get_api_headers()
-            
-            logger.info(f"Creating PayPro payment token for order {order_data['order_id']}")
-            logger.debug(f"PayPro API URL: {url}")
-            logger.debug(f"PayPro payload: {json.dumps(payload, indent=2)}")
-            
-            response = requests.post(url, json=payload, headers=headers, timeout=30, verify=True)
-            
-            logger.info(f"PayPro response status: {response.status_code}")
-            logger.debug(f"PayPro response headers: {dict(response.headers)}")
-            
-            if response.status_code in [200, 201]:
-                response_data = response.json()
-                logger.info(f"PayPro payment token created successfully")
-                logger.debug(f"PayPro response: {json.dumps(response_data, indent=2)}")
+            if 'checkout' in response_data:
+                checkout_data = response_data['checkout']
                 
-                if 'checkout' in response_data:
-                    checkout_data = response_data['checkout']
-                    
-                    # Validate required response fields
-                    if not checkout_data.get('token'):
-                        logger.error("PayPro response missing required 'token' field")
-                        return False, {
-                            'error_code': 'INVALID_RESPONSE',
-                            'error_message': 'PayPro API response missing token'
-                        }
-                    
-                    if not checkout_data.get('redirect_url'):
-                        logger.error("PayPro response missing required 'redirect_url' field")
-                        return False, {
-                            'error_code': 'INVALID_RESPONSE', 
-                            'error_message': 'PayPro API response missing redirect_url'
-                        }
-                    
-                    session_data = {
-                        'token': checkout_data['token'],
-                        'session_id': checkout_data['token'],  # For backward compatibility
-                        'payment_url': checkout_data['redirect_url'],
-                        'redirect_url': checkout_data['redirect_url'],
-                        'amount': str(original_amount),  # Original amount
-                        'amount_payment': str(payment_amount),  # Payment amount in payment currency
-                        'currency': original_currency,  # Original currency
-                        'payment_currency': payment_currency,  # Payment currency
-                        'exchange_rate': None,  # No conversion rate since we use original currency
-                        'order_id': order_data['order_id'],
-                        'status': 'created',
-                        'checkout_data': checkout_data
-                    }
-                    
-                    return True, session_data
-                else:
-                    logger.error("PayPro response missing 'checkout' section")
+                # Validate required response fields
+                if not checkout_data.get('token'):
+                    logger.error("PayPro response missing required 'token' field")
                     return False, {
                         'error_code': 'INVALID_RESPONSE',
-                        'error_message': 'PayPro API response format invalid'
+                        'error_message': 'PayPro API response missing token'
                     }
-                    
+                
+                if not checkout_data.get('redirect_url'):
+                    logger.error("PayPro response missing required 'redirect_url' field")
+                    return False, {
+                        'error_code': 'INVALID_RESPONSE', 
+                        'error_message': 'PayPro API response missing redirect_url'
+                    }
+                
+                session_data = {
+                    'token': checkout_data['token'],
+                    'session_id': checkout_data['token'],  # For backward compatibility
+                    'payment_url': checkout_data['redirect_url'],
+                    'redirect_url': checkout_data['redirect_url'],
+                    'amount': str(amounts['original_amount']),  # Original amount
+                    'amount_payment': str(amounts['payment_amount']),  # Payment amount in payment currency
+                    'currency': amounts['original_currency'],  # Original currency
+                    'payment_currency': amounts['payment_currency'],  # Payment currency
+                    'exchange_rate': None,  # No conversion rate since we use original currency
+                    'order_id': order_data['order_id'],
+                    'status': 'created',
+                    'checkout_data': checkout_data
+                }
+                
+                return True, session_data
             else:
-                # Handle error responses
-                try:
-                    error_data = response.json()
-                    logger.error(f"PayPro API error: {error_data}")
+                logger.error("PayPro response missing 'checkout' section")
+                return False, {
+                    'error_code': 'INVALID_RESPONSE',
+                    'error_message': 'PayPro API response format invalid'
+                }
+                
+        else:
+            # Handle error responses
+            try:
+                error_data = response.json()
+                logger.error(f"PayPro API error: {error_data}")
+                
+                # Parse PayPro error format
+                if 'errors' in error_data:
+                    error_details = []
+                    for field, messages in error_data['errors'].items():
+                        if isinstance(messages, list):
+                            error_details.extend([f"{field}: {msg}" for msg in messages])
+                        else:
+                            error_details.append(f"{field}: {messages}")
                     
-                    # Parse PayPro error format
-                    if 'errors' in error_data:
-                        error_details = []
-                        for field, messages in error_data['errors'].items():
-                            if isinstance(messages, list):
-                                error_details.extend([f"{field}: {msg}" for msg in messages])
-                            else:
-                                error_details.append(f"{field}: {messages}")
-                        
-                        return False, {
-                            'error_code': 'VALIDATION_ERROR',
-                            'error_message': error_data.get('message', 'Validation failed'),
-                            'error_details': error_details
-                        }
-                    else:
-                        return False, {
-                            'error_code': f'HTTP_{response.status_code}',
-                            'error_message': error_data.get('message', f'PayPro API returned status {response.status_code}'),
-                            'response_data': error_data
-                        }
-                        
-                except json.JSONDecodeError:
-                    logger.error(f"PayPro API error (status {response.status_code}): {response.text}")
+                    return False, {
+                        'error_code': 'VALIDATION_ERROR',
+                        'error_message': error_data.get('message', 'Validation failed'),
+                        'error_details': error_details
+                    }
+                else:
                     return False, {
                         'error_code': f'HTTP_{response.status_code}',
-                        'error_message': f'PayPro API returned status {response.status_code}',
-                        'response_text': response.text
+                        'error_message': error_data.get('message', f'PayPro API returned status {response.status_code}'),
+                        'response_data': error_data
                     }
                     
-        except ValueError as e:
-            logger.error(f"PayPro validation error: {e}")
+            except json.JSONDecodeError:
+                logger.error(f"PayPro API error (status {response.status_code}): {response.text}")
+                return False, {
+                    'error_code': f'HTTP_{response.status_code}',
+                    'error_message': f'PayPro API returned status {response.status_code}',
+                    'response_text': response.text
+                }
+    
+    def _checkout_failure(self, error: Exception) -> Tuple[bool, Dict[str, Any]]:
+        """The create_payment_token result for an exception raised while creating the checkout"""
+        if isinstance(error, ValueError):
+            logger.error(f"PayPro validation error: {error}")
             return False, {
                 'error_code': 'VALIDATION_ERROR',
-                'error_message': str(e)
+                'error_message': str(error)
             }
-        except requests.exceptions.Timeout:
+        if isinstance(error, (requests.exceptions.Timeout, httpx.TimeoutException)):
             logger.error("PayPro API request timeout")
             return False, {
                 'error_code': 'TIMEOUT',
                 'error_message': 'PayPro API request timeout'
             }
-        except requests.exceptions.ConnectionError as e:
-            logger.error(f"PayPro API connection error: {e}")
+        if isinstance(error, (requests.exceptions.ConnectionError, httpx.TransportError)):
+            logger.error(f"PayPro API connection error: {error}")
             return False, {
                 'error_code': 'CONNECTION_ERROR',
                 'error_message': 'Unable to connect to PayPro API'
             }
+        logger.error(f"Unexpected error in PayPro payment token creation: {error}")
+        return False, {
+            'error_code': 'UNEXPECTED_ERROR',
+            'error_message': str(error)
+        }
+    
+    def create_payment_token(self, order_data: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Create a payment token using PayPro BPC API v2
+        
+        Args:
+            order_data: Dictionary containing order information:
+                - order_id: Unique order identifier
+                - amount: Payment amount (will be converted to minimal currency units)
+                - currency: 3-letter ISO-4217 currency code
+                - customer_email: Customer's email address
+                - customer_first_name: Customer's first name (optional)
+                - customer_last_name: Customer's last name (optional)
+                - description: Order description (optional)
+                
+        Returns:
+            Tuple[bool, Dict]: (success, response_data)
+            If successful, response_data contains:
+                - token: Payment token
+                - redirect_url: URL to redirect customer for payment
+                - checkout_data: Full checkout response from PayPro
+        """
+        try:
+            url, payload, amounts = self._build_checkout(order_data)
+            response = self._request('POST', 'create_checkout', url, json=payload, headers=self._get_api_headers())
+            return self._checkout_result(response, order_data, amounts)
         except Exception as e:
-            logger.error(f"Unexpected error in PayPro payment token creation: {e}")
-            return False, {
-                'error_code': 'UNEXPECTED_ERROR',
-                'error_message': str(e)
-            }
+            return self._checkout_failure(e)
+    
+    async def acreate_payment_token(self, order_data: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+        """Async create_payment_token, over the pooled client of backend/http_client.py"""
+        try:
+            url, payload, amounts = self._build_checkout(order_data)
+            response = await self._arequest('POST', 'create_checkout', url, json=payload, headers=self._get_api_headers())
+            return self._checkout_result(response, order_data, amounts)
+        except Exception as e:
+            return self._checkout_failure(e)
     
     # Alias for backward compatibility
     def create_payment_session(self, order_data: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
         """Backward compatibility alias for create_payment_token"""
         return self.create_payment_token(order_data)
 
+    def _status_headers(self) -> Dict[str, str]:
+        return {
+            'Accept': 'application/json',
+            'X-API-Version': '2',
+            'Authorization': self._get_auth_header()
+        }
     
-    def get_payment_status(self, token: str) -> Tuple[bool, Dict[str, Any]]:
-        """
-        Get payment status using token
+    def _status_result(self, response) -> Tuple[bool, Dict[str, Any]]:
+        """Parse the status response (requests or httpx) into get_payment_status's result"""
+        logger.info(f"PayPro status response: {response.status_code}")
         
-        Args:
-            token: Payment token from create_payment_token
-            
-        Returns:
-            Tuple[bool, Dict]: (success, status_data)
-        """
-        try:
-            if not token:
+        if response.status_code == 200:
+            response_data = response.json()
+            logger.info(f"PayPro payment status retrieved successfully")
+            logger.debug(f"PayPro status response: {json.dumps(response_data, indent=2)}")
+            return True, response_data
+        else:
+            try:
+                error_data = response.json()
+                logger.error(f"PayPro status check error: {error_data}")
+                return False, error_data
+            except json.JSONDecodeError:
+                logger.error(f"PayPro status check error (status {response.status_code}): {response.text}")
                 return False, {
-                    'error_code': 'INVALID_TOKEN',
-                    'error_message': 'Token is required'
+                    'error_code': f'HTTP_{response.status_code}',
+                    'error_message': f'PayPro API returned status {response.status_code}',
+                    'response_text': response.text
                 }
-            
-            url = f"{self.checkout_url}/ctp/api/checkouts/{token}"
-            headers = {
-                'Accept': 'application/json',
-                'X-API-Version': '2',
-                'Authorization': self._get_auth_header()
-            }
-            
-            logger.info(f"Checking PayPro payment status for token {token}")
-            response = requests.get(url, headers=headers, timeout=30, verify=True)
-            
-            logger.info(f"PayPro status response: {response.status_code}")
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                logger.info(f"PayPro payment status retrieved successfully")
-                logger.debug(f"PayPro status response: {json.dumps(response_data, indent=2)}")
-                return True, response_data
-            else:
-                try:
-                    error_data = response.json()
-                    logger.error(f"PayPro status check error: {error_data}")
-                    return False, error_data
-                except json.JSONDecodeError:
-                    logger.error(f"PayPro status check error (status {response.status_code}): {response.text}")
-                    return False, {
-                        'error_code': f'HTTP_{response.status_code}',
-                        'error_message': f'PayPro API returned status {response.status_code}',
-                        'response_text': response.text
-                    }
-                    
-        except requests.exceptions.Timeout:
+    
+    def _status_failure(self, error: Exception) -> Tuple[bool, Dict[str, Any]]:
+        """The get_payment_status result for an exception raised during the status check"""
+        if isinstance(error, (requests.exceptions.Timeout, httpx.TimeoutException)):
             logger.error("PayPro status check timeout")
             return False, {
                 'error_code': 'TIMEOUT',
                 'error_message': 'PayPro status check timeout'
             }
-        except requests.exceptions.ConnectionError as e:
-            logger.error(f"PayPro status check connection error: {e}")
+        if isinstance(error, (requests.exceptions.ConnectionError, httpx.TransportError)):
+            logger.error(f"PayPro status check connection error: {error}")
             return False, {
                 'error_code': 'CONNECTION_ERROR',
                 'error_message': 'Unable to connect to PayPro API'
             }
+        logger.error(f"Unexpected error in PayPro status check: {error}")
+        return False, {
+            'error_code': 'UNEXPECTED_ERROR',
+            'error_message': str(error)
+        }
+    
+    def get_payment_status(self, token: str) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Get payment status using token
+        
+        Args:
+            token: Payment token from create_payment_token
+            
+        Returns:
+            Tuple[bool, Dict]: (success, status_data)
+        """
+        if not token:
+            return False, {
+                'error_code': 'INVALID_TOKEN',
+                'error_message': 'Token is required'
+            }
+        try:
+            logger.info(f"Checking PayPro payment status for token {token}")
+            url = f"{self.checkout_url}/ctp/api/checkouts/{token}"
+            response = self._request('GET', 'payment_status', url, headers=self._status_headers())
+            return self._status_result(response)
         except Exception as e:
-            logger.error(f"Unexpected error in PayPro status check: {e}")
+            return self._status_failure(e)
+    
+    async def aget_payment_status(self, token: str) -> Tuple[bool, Dict[str, Any]]:
+        """Async get_payment_status, over the pooled client of backend/http_client.py"""
+        if not token:
             return False, {
-                'error_code': 'UNEXPECTED_ERROR',
-                'error_message': str(e)
+                'error_code': 'INVALID_TOKEN',
+                'error_message': 'Token is required'
             }
+        try:
+            logger.info(f"Checking PayPro payment status for token {token}")
+            url = f"{self.checkout_url}/ctp/api/checkouts/{token}"
+            response = await self._arequest('GET', 'payment_status', url, headers=self._status_headers())
+            return self._status_result(response)
+        except Exception as e:
+            return self._status_failure(e)
 
     
     def process_payment(self, payment_data: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
@@ -607,7 +674,7 @@ class PayProService:
             headers = self._get_api_headers()
             
             logger.info(f"Creating PayPro one-click payment token for order {order_data['order_id']}")
-            response = requests.post(url, json=payload, headers=headers, timeout=30, verify=True)
+            response = self._request('POST', 'create_oneclick_checkout', url, json=payload, headers=headers)
             
             if response.status_code in [200, 201]:
                 response_data = response.json()
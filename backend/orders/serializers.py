@@ -5,6 +5,7 @@ from .models import ShippingMethod, Order, OrderItem, Payment
 from users.models import Address
 from users.serializers import AddressSerializer  # For address details
 from carts.models import Cart  # To create order from cart
+from carts.guest_store import GuestCartStore
 from drops.models import DropProduct  # For stock update
 from products.models import Product, ProductVariant  # For direct order creation
 
@@ -14,15 +15,14 @@ class ShippingMethodSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    # Add detailed product information
-    product_id = serializers.SerializerMethodField()
+    """
+    Reads only the item's own snapshot columns (OrderItem.snapshot_fields), so
+    listing orders touches no product, variant or image rows.
+    """
     product_name = serializers.CharField(source='product_name_snapshot', read_only=True)
-    product_image = serializers.SerializerMethodField()
-    product_slug = serializers.SerializerMethodField()
-    variant_id = serializers.SerializerMethodField()
+    product_image = serializers.CharField(source='product_image_url', read_only=True)
+    variant_id = serializers.IntegerField(source='product_variant_id', read_only=True)
     variant_name = serializers.CharField(source='variant_name_snapshot', read_only=True)
-    color = serializers.SerializerMethodField()
-    size = serializers.SerializerMethodField()
     price = serializers.DecimalField(source='price_per_unit', max_digits=10, decimal_places=2, read_only=True)
     
     class Meta:
@@ -33,114 +33,6 @@ class OrderItemSerializer(serializers.ModelSerializer):
             'price', 'subtotal', 'sku_snapshot'
         ]
 
-    def get_product_id(self, obj):
-        """Get product ID from drop_product or direct fields"""
-        try:
-            if obj.drop_product and obj.drop_product.product:
-                return obj.drop_product.product.id
-            # For direct orders, return the stored product_id
-            return obj.product_id
-        except:
-            return None
-
-    def get_product_slug(self, obj):
-        """Get product slug from drop_product or direct fields"""
-        try:
-            if obj.drop_product and obj.drop_product.product:
-                return obj.drop_product.product.slug
-            # For direct orders, return the stored product_slug
-            return obj.product_slug
-        except:
-            return None
-
-    def get_variant_id(self, obj):
-        """Get variant ID from drop_product or direct fields"""
-        try:
-            if obj.drop_product and obj.drop_product.variant:
-                return obj.drop_product.variant.id
-            # For direct orders, return the stored product_variant_id
-            return obj.product_variant_id
-        except:
-            return None
-
-    def get_product_image(self, obj):
-        """Get the primary product image or variant-specific image"""
-        try:
-            # If we have drop_product, use it
-            if obj.drop_product:
-                # First try to get variant-specific image if it exists
-                if obj.drop_product.variant and hasattr(obj.drop_product.variant, 'image') and obj.drop_product.variant.image:
-                    return obj.drop_product.variant.image.url
-                
-                # Fallback to product's primary image
-                if obj.drop_product.product and obj.drop_product.product.images.exists():
-                    primary_image = obj.drop_product.product.images.filter(is_primary=True).first()
-                    if primary_image:
-                        return primary_image.image.url
-                    # If no primary image, get the first available image
-                    first_image = obj.drop_product.product.images.first()
-                    if first_image:
-                        return first_image.image.url
-            
-            # For direct orders, return the stored product_image_url
-            if obj.product_image_url:
-                return obj.product_image_url
-                
-            # If no image available, return None (will show placeholder)            return None
-        except:
-            return None
-
-    def get_color(self, obj):
-        """Extract color from variant or direct fields"""
-        try:
-            if obj.drop_product and obj.drop_product.variant:
-                # Assuming variant has color information
-                if hasattr(obj.drop_product.variant, 'color'):
-                    return obj.drop_product.variant.color
-                # If color is stored as part of variant name
-                variant_name = obj.variant_name_snapshot or ''
-                # Try to extract color from variant name (customize based on your naming convention)
-                # Example: "Red - L" or "Color: Red, Size: L"
-                if 'Color:' in variant_name:
-                    parts = variant_name.split('Color:')[1].split(',')[0].strip()
-                    return parts
-                elif ' - ' in variant_name:
-                    # Assuming format like "Red - L"
-                    return variant_name.split(' - ')[0].strip()
-            
-            # For direct orders, return the stored color
-            if obj.color:
-                return obj.color
-                
-            return None
-        except:
-            return None
-
-    def get_size(self, obj):
-        """Extract size from variant or direct fields"""
-        try:
-            if obj.drop_product and obj.drop_product.variant:
-                # Assuming variant has size information
-                if hasattr(obj.drop_product.variant, 'size'):
-                    return obj.drop_product.variant.size
-                # If size is stored as part of variant name
-                variant_name = obj.variant_name_snapshot or ''
-                # Try to extract size from variant name
-                if 'Size:' in variant_name:
-                    parts = variant_name.split('Size:')[1].split(',')[0].strip()
-                    return parts
-                elif ' - ' in variant_name and len(variant_name.split(' - ')) > 1:
-                    # Assuming format like "Red - L"
-                    return variant_name.split(' - ')[1].strip()
-            
-            # For direct orders, return the stored size
-            if obj.size:
-                return obj.size
-                
-            return None
-        except:
-            return None
-
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
@@ -185,6 +77,46 @@ class OrderSerializer(serializers.ModelSerializer):
             'shipping_method_details', 'order_status_display', 'payment_status_display'
         )
 
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """
+    List projection of an order: status, totals, item count and the first item's
+    thumbnail. Item figures are annotations (see with_summary), so a page of orders
+    is one query however long the history; OrderSerializer is for detail views.
+    """
+    item_count = serializers.IntegerField(read_only=True)
+    total_quantity = serializers.IntegerField(read_only=True)
+    first_item_image = serializers.CharField(read_only=True, allow_null=True)
+    user_email = serializers.CharField(read_only=True, allow_null=True)
+    order_status_display = serializers.CharField(source='get_order_status_display', read_only=True)
+    payment_status_display = serializers.CharField(source='get_payment_status_display', read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'order_id', 'order_number', 'user', 'user_email', 'email_for_guest',
+            'subtotal_amount', 'discount_amount', 'shipping_cost', 'total_amount',
+            'order_status', 'order_status_display',
+            'payment_status', 'payment_status_display',
+            'tracking_number', 'item_count', 'total_quantity', 'first_item_image',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+    @staticmethod
+    def with_summary(queryset):
+        """Annotate the item count and quantity (one GROUP BY) and the first item's image (one subquery)."""
+        first_image = (
+            OrderItem.objects.filter(order=models.OuterRef('pk'))
+            .exclude(product_image_url__isnull=True).exclude(product_image_url='')
+            .order_by('created_at', 'id').values('product_image_url')[:1]
+        )
+        return queryset.annotate(
+            item_count=models.Count('items'),
+            total_quantity=models.Sum('items__quantity'),
+            first_item_image=models.Subquery(first_image),
+            user_email=models.F('user__email'),
+        )
+
 # Serializer for creating an order
 class OrderCreateSerializer(serializers.Serializer):
     cart_id = serializers.UUIDField(write_only=True)
@@ -202,8 +134,16 @@ class OrderCreateSerializer(serializers.Serializer):
 
     def validate_cart_id(self, value):
         try:
-            cart = Cart.objects.get(cart_id=value)
-            if not cart.items.exists():
+            cart = Cart.objects.filter(cart_id=value).first()
+            if cart is not None:
+                is_empty = not cart.items.exists()
+            else:
+                # Cache-resident guest carts are only read here; create() writes them to the database
+                cart = GuestCartStore.load(value) if GuestCartStore.enabled() else None
+                if cart is None:
+                    raise Cart.DoesNotExist
+                is_empty = not cart.lines
+            if is_empty:
                 raise serializers.ValidationError("Cannot create an order from an empty cart.")
             # Check if user owns the cart or if it's a guest cart being claimed
             request = self.context.get('request')
@@ -276,7 +216,6 @@ class OrderCreateSerializer(serializers.Serializer):
     def create(self, validated_data):
         from .inventory import InventoryManager
         
-        cart = Cart.objects.get(cart_id=validated_data['cart_id'])
         shipping_address = Address.objects.get(id=validated_data['shipping_address_id'])
         billing_address = Address.objects.get(id=validated_data['billing_address_id']) if validated_data.get('billing_address_id') else shipping_address
         
@@ -295,8 +234,16 @@ class OrderCreateSerializer(serializers.Serializer):
 
         # Use a database transaction to ensure atomicity for order creation and stock reservation
         with transaction.atomic():
+            cart = Cart.objects.filter(cart_id=validated_data['cart_id']).first()
+            if cart is None:
+                # A cached guest cart is persisted with the order, so a failed checkout rolls it back
+                cart = GuestCartStore.persist(validated_data['cart_id'])
+            if cart is None:
+                raise serializers.ValidationError({'cart_id': "Cart not found."})
+
             # 1. Calculate totals
             from decimal import Decimal
+            cart.refresh_totals() # Charge against current prices, not the stored snapshot
             subtotal_amount = cart.subtotal
             discount_amount = Decimal('0.00')
             tax_amount = Decimal('0.00')
@@ -319,7 +266,11 @@ class OrderCreateSerializer(serializers.Serializer):
             )
 
             # 3. Create OrderItems (without reducing stock yet)
-            for cart_item in cart.items.all():
+            cart_items = cart.items.select_related(
+                'drop_product__product', 'drop_product__variant__size', 'drop_product__variant__color',
+                'product_variant__product', 'product_variant__size', 'product_variant__color',
+            ).prefetch_related('drop_product__product__images', 'product_variant__product__images')
+            for cart_item in cart_items:
                 if cart_item.drop_product:
                     # Check availability first
                     if not cart_item.drop_product.can_reserve(cart_item.quantity):
@@ -331,6 +282,7 @@ class OrderCreateSerializer(serializers.Serializer):
                     OrderItem.objects.create(
                         order=order,
                         drop_product=cart_item.drop_product,
+                        **OrderItem.snapshot_fields(cart_item.drop_product.product, cart_item.drop_product.variant),
                         product_name_snapshot=cart_item.drop_product.product.name,
                         variant_name_snapshot=str(cart_item.drop_product.variant) if cart_item.drop_product.variant else None,
                         sku_snapshot=f"{cart_item.drop_product.product.sku_prefix or ''}{cart_item.drop_product.variant.sku_suffix if cart_item.drop_product.variant else ''}",
@@ -347,25 +299,12 @@ class OrderCreateSerializer(serializers.Serializer):
                             f"Available: {cart_item.product_variant.available_quantity}, Requested: {cart_item.quantity}"
                         )
                     
-                    # Get product image URL from database
-                    product_image_url = None
-                    if cart_item.product_variant and hasattr(cart_item.product_variant, 'image') and cart_item.product_variant.image:
-                        product_image_url = cart_item.product_variant.image.url
-                    elif cart_item.product_variant.product.images.exists():
-                        primary_image = cart_item.product_variant.product.images.filter(is_primary=True).first()
-                        if primary_image:
-                            product_image_url = primary_image.image.url
-                        else:
-                            first_image = cart_item.product_variant.product.images.first()
-                            if first_image:
-                                product_image_url = first_image.image.url
-                    
                     OrderItem.objects.create(
                         order=order,
                         product_id=cart_item.product_variant.product.id,
                         product_variant_id=cart_item.product_variant.id,
                         product_slug=cart_item.product_variant.product.slug,
-                        product_image_url=product_image_url,
+                        product_image_url=OrderItem.image_url_for(cart_item.product_variant.product, cart_item.product_variant),
                         color=cart_item.color,
                         size=cart_item.size,
                         product_name_snapshot=cart_item.product_variant.product.name,
@@ -399,6 +338,7 @@ class OrderCreateSerializer(serializers.Serializer):
 
             # 5. Clear the cart
             cart.items.all().delete()
+            cart.refresh_totals()
 
         return order
 
@@ -569,6 +509,7 @@ class DirectOrderCreateSerializer(serializers.Serializer):
                 OrderItem.objects.create(
                     order=order,
                     drop_product=drop_product,
+                    **OrderItem.snapshot_fields(product, variant),
                     product_name_snapshot=product.name,
                     variant_name_snapshot=str(variant) if variant else None,
                     sku_snapshot=f"{product.sku_prefix or ''}{variant.sku_suffix if variant else ''}",
@@ -589,16 +530,7 @@ class DirectOrderCreateSerializer(serializers.Serializer):
                 # Get product image URL
                 product_image_url = validated_data.get('product_image')
                 if not product_image_url:
-                    if variant and hasattr(variant, 'image') and variant.image:
-                        product_image_url = variant.image.url
-                    elif product.images.exists():
-                        primary_image = product.images.filter(is_primary=True).first()
-                        if primary_image:
-                            product_image_url = primary_image.image.url
-                        else:
-                            first_image = product.images.first()
-                            if first_image:
-                                product_image_url = first_image.image.url
+                    product_image_url = OrderItem.image_url_for(product, variant)
 
                 OrderItem.objects.create(
                     order=order,
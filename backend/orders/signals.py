@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from drops.models import DropProduct
+from products.models import ProductVariant
+from .inventory import StockSnapshotCache
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def variant_stock_changed(sender, instance, **kwargs):
+    """Drop the cached stock snapshot (after commit, so no reader re-caches the old row)"""
+    transaction.on_commit(lambda pk=instance.pk: StockSnapshotCache.invalidate(StockSnapshotCache.VARIANT, [pk]))
+
+@receiver(post_save, sender=DropProduct)
+@receiver(post_delete, sender=DropProduct)
+def drop_product_stock_changed(sender, instance, **kwargs):
+    """Drop the cached stock snapshot (after commit, so no reader re-caches the old row)"""
+    transaction.on_commit(lambda pk=instance.pk: StockSnapshotCache.invalidate(StockSnapshotCache.DROP_PRODUCT, [pk]))
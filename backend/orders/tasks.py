@@ -0,0 +1,31 @@
+# orders/tasks.py
+"""Background jobs for reservations, payments and inventory history (see jobs/registry.py)."""
+from datetime import timedelta
+
+from jobs.registry import run_command, schedule, task
+from .inventory import InventoryLedger
+
+
+@task('orders.expire_reservations', concurrency=1, lease_seconds=300)
+def expire_reservations(max_age_minutes=15):
+    """Release stock held by unpaid orders past the reservation timeout, checking payments first."""
+    return run_command('automated_unreservation', max_age_minutes=max_age_minutes, check_payments=True, quiet=True)
+
+
+@task('orders.reconcile_payments', concurrency=1, lease_seconds=600, retry_delay=120)
+def reconcile_payments(max_age_hours=24, auto_timeout_hours=2):
+    """Poll PayPro for pending payments, time out abandoned orders and clean up reservations."""
+    return run_command(
+        'check_pending_payments', cleanup_reservations=True,
+        max_age_hours=max_age_hours, auto_timeout_hours=auto_timeout_hours,
+    )
+
+
+@task('orders.snapshot_inventory', concurrency=1, lease_seconds=600)
+def snapshot_inventory():
+    return {'items': InventoryLedger.take_snapshot()}
+
+
+schedule('orders.expire_reservations', every=timedelta(minutes=5))
+schedule('orders.reconcile_payments', every=timedelta(minutes=15))
+schedule('orders.snapshot_inventory', every=timedelta(days=1))
@@ -1,3 +1,494 @@
-from django.test import TestCase
+import asyncio
+import time
+from datetime import timedelta
+from io import StringIO
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+import httpx
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.urls import path, reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from drops.models import Drop, DropProduct
+from products.models import Color, Product, ProductVariant, Size
+from . import async_views
+from .api_views import MAX_STOCK_CHECK_ITEMS
+from .inventory import InventoryLedger, InventoryStats, StockSnapshotCache
+from .filters import order_search_q
+from .models import InventoryMovement, Order, OrderItem, Payment
+from .paypro_service import PayProService
+from .views import apply_payment_status
+from .serializers import OrderItemSerializer
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BulkStockUpdateTests(APITestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='pass1234')
+        product = Product.objects.create(name='Tee', base_price=Decimal('20.00'))
+        self.variant = ProductVariant.objects.create(product=product, sku_suffix='-a', stock_quantity=10, reserved_quantity=4)
+        now = timezone.now()
+        drop = Drop.objects.create(
+            name='Launch', status='active', is_public=True,
+            start_datetime=now - timedelta(days=1), end_datetime=now + timedelta(days=1),
+        )
+        self.drop_product = DropProduct.objects.create(
+            drop=drop, product=product, variant=self.variant, drop_price=Decimal('15.00'),
+            initial_stock_quantity=20, current_stock_quantity=20,
+        )
+        self.client.force_authenticate(self.admin)
+
+    def test_updates_stock_columns_and_reports_row_errors(self):
+        response = self.client.post(reverse('bulk-stock-update'), {'updates': [
+            {'type': 'variant', 'id': self.variant.id, 'stock_quantity': 30, 'low_stock_threshold': 2},
+            {'type': 'drop_product', 'id': self.drop_product.id, 'stock_quantity': 12},
+            {'type': 'variant', 'id': self.variant.id, 'stock_quantity': 1},
+            {'type': 'drop_product', 'id': self.drop_product.id + 100, 'stock_quantity': 1},
+            {'type': 'drop_product', 'id': self.drop_product.id, 'stock_quantity': -1},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [r.get('code') for r in response.data['results']],
+            [None, None, 'duplicate', 'not_found', 'invalid']
+        )
+        self.variant.refresh_from_db()
+        self.drop_product.refresh_from_db()
+        self.assertEqual((self.variant.stock_quantity, self.variant.reserved_quantity, self.variant.low_stock_threshold), (30, 4, 2))
+        self.assertEqual(self.drop_product.current_stock_quantity, 12)
+
+    def test_precondition_conflict_and_below_reserved_abort_all_or_nothing_batch(self):
+        stale = self.variant.updated_at - timedelta(minutes=1)
+        response = self.client.post(reverse('bulk-stock-update'), {'all_or_nothing': True, 'updates': [
+            {'type': 'drop_product', 'id': self.drop_product.id, 'stock_quantity': 5},
+            {'type': 'variant', 'id': self.variant.id, 'stock_quantity': 50, 'expected_updated_at': stale.isoformat()},
+        ]}, format='json')
+
+        self.assertEqual(
+            [r['code'] for r in response.data['results']],
+            ['aborted', 'conflict']
+        )
+        self.drop_product.refresh_from_db()
+        self.assertEqual(self.drop_product.current_stock_quantity, 20)
+
+        response = self.client.post(reverse('bulk-stock-update'), {'updates': [
+            {'type': 'variant', 'id': self.variant.id, 'stock_quantity': 3,
+             'expected_updated_at': self.variant.updated_at.isoformat()},
+        ]}, format='json')
+        self.assertEqual(response.data['results'][0]['code'], 'below_reserved')
+
+    def test_naive_expected_updated_at_is_invalid(self):
+        naive = timezone.make_naive(self.variant.updated_at)
+        response = self.client.post(reverse('bulk-stock-update'), {'updates': [
+            {'type': 'variant', 'id': self.variant.id, 'stock_quantity': 30, 'expected_updated_at': naive.isoformat()},
+        ]}, format='json')
+
+        self.assertEqual(response.data['results'][0]['code'], 'invalid')
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock_quantity, 10)
+
+
+    def test_all_or_nothing_is_parsed_as_a_boolean(self):
+        updates = [
+            {'type': 'drop_product', 'id': self.drop_product.id, 'stock_quantity': 5},
+            {'type': 'drop_product', 'id': self.drop_product.id + 100, 'stock_quantity': 1},
+        ]
+        response = self.client.post(reverse('bulk-stock-update'), {'all_or_nothing': 'false', 'updates': updates}, format='json')
+        self.assertEqual([r.get('code') for r in response.data['results']], [None, 'not_found'])
+
+        response = self.client.post(reverse('bulk-stock-update'), {'all_or_nothing': 'maybe', 'updates': updates}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class InventoryLedgerTests(APITestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='pass1234')
+        product = Product.objects.create(name='Tee', base_price=Decimal('20.00'))
+        self.variant = ProductVariant.objects.create(product=product, sku_suffix='-a', stock_quantity=10)
+        self.client.force_authenticate(self.admin)
+
+    def test_stock_changes_are_ledgered_and_answer_point_in_time_queries(self):
+        InventoryLedger.take_snapshot()
+        before_changes = timezone.now()
+        with InventoryLedger.batch():
+            self.assertTrue(self.variant.reserve_stock(4))
+            self.variant.release_reservation(1)
+            self.assertEqual(InventoryMovement.objects.count(), 0)  # Buffered until the batch exits
+        self.variant.fulfill_order(3)
+        self.client.post(reverse('bulk-stock-update'), {'updates': [
+            {'type': 'variant', 'id': self.variant.id, 'stock_quantity': 12},
+        ]}, format='json')
+
+        self.assertEqual(
+            list(InventoryMovement.objects.order_by('id').values_list('reason', 'stock_delta', 'reserved_delta', 'stock_after', 'reserved_after')),
+            [('reserve', 0, 4, 10, 4), ('release', 0, -1, 10, 3), ('fulfill', -3, -3, 7, 0), ('adjust', 5, 0, 12, 0)]
+        )
+
+        state = InventoryLedger.stock_at('variant', self.variant.id, before_changes)
+        self.assertEqual((state['stock_quantity'], state['reserved_quantity'], state['source']), (10, 0, 'snapshot'))
+
+        response = self.client.get(reverse('inventory-history'), {'type': 'variant', 'id': self.variant.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['state']['stock_quantity'], response.data['state']['source']), (12, 'movement'))
+        self.assertEqual(len(response.data['movements']), 4)
+
+        report = self.client.get(reverse('inventory-movement-report'), {'type': 'variant'})
+        totals = {row['reason']: (row['stock_delta'], row['reserved_delta']) for row in report.data['days']}
+        self.assertEqual(totals, {'reserve': (0, 4), 'release': (0, -1), 'fulfill': (-3, -3), 'adjust': (5, 0)})
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class InventoryStatsTests(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.admin = get_user_model().objects.create_superuser(username='admin', email='admin@example.com', password='pass1234')
+        product = Product.objects.create(name='Tee', base_price=Decimal('20.00'))
+        self.low = ProductVariant.objects.create(product=product, sku_suffix='-a', stock_quantity=3, low_stock_threshold=5)
+        ProductVariant.objects.create(product=product, sku_suffix='-b', stock_quantity=0)
+        ProductVariant.objects.create(product=product, sku_suffix='-c', stock_quantity=40, reserved_quantity=10)
+        self.client.force_authenticate(self.admin)
+
+    def test_dashboard_figures_are_cached_until_stock_changes(self):
+        response = self.client.get(reverse('inventory-dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        summary = response.data['summary']
+        self.assertEqual(
+            (summary['total_active_variants'], summary['out_of_stock_variants'], summary['low_stock_items'],
+             summary['total_reserved_items'], summary['total_variant_stock']),
+            (3, 1, 2, 10, 43)
+        )
+        self.assertEqual(response.data['low_stock_variants'][0]['product_name'], 'Tee')
+
+        with self.assertNumQueries(0):
+            InventoryStats.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.low.reserve_stock(2))
+        self.assertEqual(InventoryStats.get()['summary']['total_reserved_items'], 12)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StockSnapshotCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        product = Product.objects.create(name='Tee', base_price=Decimal('20.00'))
+        self.variants = [
+            ProductVariant.objects.create(product=product, sku_suffix=f'-{n}', stock_quantity=10 + n)
+            for n in range(3)
+        ]
+        self.ids = [variant.id for variant in self.variants]
+
+    def test_misses_are_loaded_in_one_query_and_then_hit(self):
+        with self.assertNumQueries(1):
+            snapshots = StockSnapshotCache.get_many(StockSnapshotCache.VARIANT, self.ids + [self.ids[-1] + 100])
+        self.assertEqual({pk: s['stock_quantity'] for pk, s in snapshots.items()}, dict(zip(self.ids, [10, 11, 12])))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(StockSnapshotCache.get_many(StockSnapshotCache.VARIANT, self.ids[:2]).keys(), set(self.ids[:2]))
+
+        cache.delete(StockSnapshotCache.key(StockSnapshotCache.VARIANT, self.ids[0]))
+        with self.assertNumQueries(1):
+            StockSnapshotCache.get_many(StockSnapshotCache.VARIANT, self.ids)
+
+    def test_saves_invalidate_the_snapshot_once_committed(self):
+        StockSnapshotCache.get_many(StockSnapshotCache.VARIANT, self.ids)
+        key = StockSnapshotCache.key(StockSnapshotCache.VARIANT, self.ids[0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variants[0].stock_quantity = 3
+            self.variants[0].save()
+            self.assertIsNotNone(cache.get(key))  # Still cached until the transaction commits
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(StockSnapshotCache.get_many(StockSnapshotCache.VARIANT, self.ids[:1])[self.ids[0]]['stock_quantity'], 3)
+
+    def test_check_stock_is_capped_per_request(self):
+        url = reverse('check-stock-availability')
+        items = [{'type': 'variant', 'id': self.ids[n % 3], 'quantity': 1} for n in range(MAX_STOCK_CHECK_ITEMS)]
+
+        response = self.client.post(url, {'items': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_items_checked'], MAX_STOCK_CHECK_ITEMS)
+
+        response = self.client.post(url, {'items': items + items[:1]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderItemSnapshotTests(APITestCase):
+    def test_backfilled_drop_items_serialize_without_queries(self):
+        product = Product.objects.create(name='Tee', slug='tee', base_price=Decimal('20.00'))
+        variant = ProductVariant.objects.create(
+            product=product, sku_suffix='-m', size=Size.objects.create(name='M'), color=Color.objects.create(name='Black'),
+        )
+        now = timezone.now()
+        drop = Drop.objects.create(
+            name='Launch', status='active', is_public=True,
+            start_datetime=now - timedelta(days=1), end_datetime=now + timedelta(days=1),
+        )
+        drop_product = DropProduct.objects.create(
+            drop=drop, product=product, variant=variant, drop_price=Decimal('15.00'),
+            initial_stock_quantity=5, current_stock_quantity=5,
+        )
+        order = Order.objects.create(subtotal_amount=Decimal('15.00'), total_amount=Decimal('15.00'))
+        # Created before drop items stored their own snapshot
+        OrderItem.objects.create(
+            order=order, drop_product=drop_product, product_name_snapshot='Tee', sku_snapshot='TEE-m',
+            quantity=1, price_per_unit=Decimal('15.00'), subtotal=Decimal('15.00'),
+        )
+
+        call_command('backfill_order_item_snapshots', stdout=StringIO())
+
+        items = list(OrderItem.objects.filter(order=order))
+        with self.assertNumQueries(0):
+            data = OrderItemSerializer(items, many=True).data
+        self.assertEqual(
+            (data[0]['product_id'], data[0]['variant_id'], data[0]['product_slug'], data[0]['color'], data[0]['size']),
+            (product.id, variant.id, 'tee', 'Black', 'M')
+        )
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class OrderListSummaryTests(APITestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.customer = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass1234')
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass1234')
+        self.order = Order.objects.create(user=self.customer, subtotal_amount=Decimal('50.00'), total_amount=Decimal('50.00'))
+        for n, image in enumerate([None, 'https://cdn.example.com/a.webp', 'https://cdn.example.com/b.webp']):
+            OrderItem.objects.create(
+                order=self.order, product_name_snapshot=f'Item {n}', sku_snapshot=f'SKU{n}', product_image_url=image,
+                quantity=n + 1, price_per_unit=Decimal('10.00'), subtotal=Decimal('10.00') * (n + 1),
+            )
+        Order.objects.create(user=self.admin, subtotal_amount=Decimal('5.00'), total_amount=Decimal('5.00'))
+
+    def test_list_is_a_summary_and_detail_is_nested(self):
+        self.client.force_authenticate(self.customer)
+        response = self.client.get(reverse('order-list'))
+
+        rows = response.data['results']
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(
+            (rows[0]['item_count'], rows[0]['total_quantity'], rows[0]['first_item_image']),
+            (3, 6, 'https://cdn.example.com/a.webp')
+        )
+        self.assertNotIn('items', rows[0])
+
+        detail = self.client.get(reverse('order-detail', kwargs={'order_id': self.order.order_id}))
+        self.assertEqual(len(detail.data['items']), 3)
+
+    def test_admin_grid_searches_summaries(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse('admin-order-list'), {'search': 'buyer@'})
+
+        rows = response.data['results']
+        self.assertEqual([(row['user_email'], row['item_count']) for row in rows], [('buyer@example.com', 3)])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AdminOrderSearchTests(APITestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass1234')
+        buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass1234')
+        self.paid = Order.objects.create(
+            user=buyer, order_status='processing', payment_status='paid',
+            subtotal_amount=Decimal('20.00'), total_amount=Decimal('20.00'),
+        )
+        for txn in ('pi_ABC123', 'pi_XYZ789'):
+            Payment.objects.create(
+                order=self.paid, payment_method_type='card', gateway_transaction_id=txn,
+                amount=Decimal('10.00'), status='succeeded',
+            )
+        OrderItem.objects.create(
+            order=self.paid, product_name_snapshot='Tee', sku_snapshot='TEE', quantity=2,
+            price_per_unit=Decimal('10.00'), subtotal=Decimal('20.00'),
+        )
+        self.guest = Order.objects.create(
+            email_for_guest='Guest@Example.org', subtotal_amount=Decimal('5.00'), total_amount=Decimal('5.00'),
+        )
+        self.client.force_authenticate(self.admin)
+
+    def list_ids(self, **params):
+        response = self.client.get(reverse('admin-order-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [row['order_id'] for row in response.data['results']]
+
+    def test_search_matches_each_field_without_duplicating_rows(self):
+        paid, guest = str(self.paid.order_id), str(self.guest.order_id)
+        self.assertEqual(self.list_ids(search='pi_'), [paid])  # Two payments, still one row
+        self.assertEqual(self.list_ids(search='xyz7'), [paid])
+        self.assertEqual(self.list_ids(search='guest@example'), [guest])
+        self.assertEqual(self.list_ids(search='BUYER'), [paid])
+        self.assertEqual(self.list_ids(search=self.guest.order_number[-6:].lower()), [guest])
+        self.assertEqual(self.list_ids(search='pi_ABC buyer'), [paid])
+        self.assertEqual(self.list_ids(search='pi_ABC guest'), [])
+
+        response = self.client.get(reverse('admin-order-list'), {'search': 'pi_'})
+        self.assertEqual(response.data['results'][0]['item_count'], 1)
+
+    def test_status_date_and_field_filters(self):
+        paid, guest = str(self.paid.order_id), str(self.guest.order_id)
+        now = timezone.now()
+        self.assertEqual(self.list_ids(order_status='processing'), [paid])
+        self.assertEqual(self.list_ids(payment_status__in='pending,failed'), [guest])
+        self.assertEqual(self.list_ids(created_after=(now - timedelta(hours=1)).isoformat()), [guest, paid])
+        self.assertEqual(self.list_ids(order_status='processing', created_before=(now - timedelta(hours=1)).isoformat()), [])
+        self.assertEqual(self.list_ids(email='example.org'), [guest])
+        self.assertEqual(self.list_ids(transaction_id='abc1'), [paid])
+
+    def test_status_filter_plan_uses_composite_index(self):
+        queryset = Order.objects.filter(
+            order_status='processing', created_at__gte=timezone.now() - timedelta(days=7)
+        ).order_by('-created_at')
+        self.assertIn('orders_status_created_idx', queryset.explain())
+        queryset = Order.objects.filter(payment_status='pending').order_by('-created_at')
+        self.assertIn('orders_payment_created_idx', queryset.explain())
+
+    def test_search_plan_uses_trigram_indexes(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('Trigram indexes are PostgreSQL only')
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')  # Tiny test tables would otherwise be scanned
+        try:
+            plan = Order.objects.filter(order_search_q('example')).explain()
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+        for index in ('orders_order_number_trgm', 'orders_guest_email_trgm', 'orders_payment_txn_trgm', 'users_user_email_trgm'):
+            self.assertIn(index, plan)
+
+
+class AsyncViewsURLConf:
+    """The async endpoints as orders/urls.py mounts them with ASYNC_VIEWS on"""
+    urlpatterns = [
+        path('api/v1/currency/rate/', async_views.AsyncExchangeRateView.as_view(), name='get-exchange-rate'),
+        path('api/v1/currency/convert/', async_views.AsyncConvertEurToBynView.as_view(), name='convert-eur-to-byn'),
+        path('api/v1/payments/initiate/', async_views.AsyncInitiatePaymentView.as_view(), name='initiate-payment'),
+        path('api/v1/payments/status/', async_views.AsyncCheckPaymentStatusView.as_view(), name='check-payment-status'),
+        path('api/v1/payment/success/', async_views.AsyncPaymentSuccessView.as_view(), name='payment-success'),
+    ]
+
+
+def mock_client(handler):
+    """Patch the pooled client of the PayPro and currency services with one answered by `handler`"""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return patch.multiple(
+        'orders.paypro_service', async_client=lambda: client
+    ), patch.multiple('orders.currency_service', async_client=lambda: client)
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False, ROOT_URLCONF=AsyncViewsURLConf, FRONTEND_URL='https://shop.example.com',
+    PAYPRO_BPC_SHOP_ID='shop', PAYPRO_BPC_SECRET_KEY='secret', EUR_TO_BYN_FALLBACK_RATE='3.8',
+)
+class AsyncPaymentViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.buyer = get_user_model().objects.create_user(username='buyer', email='buyer@example.com', password='pass1234')
+        self.order = Order.objects.create(
+            user=self.buyer, subtotal_amount=Decimal('20.00'), total_amount=Decimal('20.00'),
+        )
+        self.calls = []
+
+    def paypro(self, status_code, body):
+        def handler(request):
+            self.calls.append(request)
+            return httpx.Response(status_code, json=body)
+        return mock_client(handler)
+
+    async def test_initiate_creates_the_checkout_over_the_pooled_client(self):
+        await cache.aset('eur_to_byn_rate', 3.5)
+        checkout = {'checkout': {'token': 'tok123', 'redirect_url': 'https://checkout.paypro.by/v2/checkout?token=tok123'}}
+        paypro, rates = self.paypro(201, checkout)
+        with paypro, rates:
+            response = await self.async_client.post(
+                reverse('initiate-payment'), {'order_id': str(self.order.order_id)}, content_type='application/json'
+            )
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()['token'], response.json()['amount_byn']), ('tok123', '70.00'))
+        request = self.calls[0]
+        self.assertEqual((request.method, request.url.path), ('POST', '/ctp/api/checkouts'))
+        self.assertTrue(request.headers['Authorization'].startswith('Basic '))
+        payment = await Payment.objects.aget(order=self.order)
+        self.assertEqual((payment.gateway_transaction_id, payment.amount, payment.status), ('tok123', Decimal('70.00'), 'pending'))
+
+        missing = await self.async_client.post(reverse('initiate-payment'), {}, content_type='application/json')
+        self.assertEqual(missing.status_code, 400)
+
+    async def test_status_check_and_return_update_the_order(self):
+        await Payment.objects.acreate(
+            order=self.order, payment_method_type='paypro_hosted', gateway_transaction_id='tok123',
+            amount=Decimal('20.00'), status='pending', payment_details={'token': 'tok123'},
+        )
+        paid = {'checkout': {'status': 'successful', 'order': {'tracking_id': str(self.order.order_id)}}}
+        paypro, rates = self.paypro(200, paid)
+        with paypro, rates:
+            response = await self.async_client.get(reverse('check-payment-status'), {'token': 'tok123'})
+            self.assertEqual((response.json()['payment_status'], response.json()['updated']), ('successful', True))
+            await self.order.arefresh_from_db()
+            self.assertEqual((self.order.payment_status, self.order.order_status), ('paid', 'processing'))
+
+            returned = await self.async_client.get(reverse('payment-success'), {'token': 'tok123'})
+        self.assertEqual(
+            returned['Location'], f'https://shop.example.com/payment/success?order_id={self.order.order_id}&status=already_paid'
+        )
+
+    async def test_currency_falls_back_when_rate_apis_fail(self):
+        apis, rates = self.paypro(500, {})
+        with apis, rates:
+            rate = await self.async_client.get(reverse('get-exchange-rate'))
+            converted = await self.async_client.post(
+                reverse('convert-eur-to-byn'), {'eur_amount': '10'}, content_type='application/json'
+            )
+            invalid = await self.async_client.post(
+                reverse('convert-eur-to-byn'), {'eur_amount': 'ten'}, content_type='application/json'
+            )
+        self.assertEqual(rate.json(), {'rate': 3.8, 'source': 'fallback'})
+        self.assertEqual(converted.json()['byn_amount'], 38.0)
+        self.assertEqual(invalid.status_code, 400)
+
+    async def test_status_checks_wait_concurrently(self):
+        async def slow(request):
+            await asyncio.sleep(0.2)
+            return httpx.Response(200, json={'checkout': {'status': 'pending'}})
+
+        paypro, rates = mock_client(slow)
+        service = PayProService()
+        started = time.perf_counter()
+        with paypro, rates:
+            results = await asyncio.gather(*(service.aget_payment_status(f'tok{n}') for n in range(100)))
+        self.assertTrue(all(success for success, _ in results))
+        self.assertLess(time.perf_counter() - started, 2)  # 100 calls of 0.2s each, waited on together
+
+
+    def test_a_status_is_applied_and_restocked_once(self):
+        product = Product.objects.create(name='Tee', base_price=Decimal('20.00'))
+        now = timezone.now()
+        drop = Drop.objects.create(
+            name='Launch', status='active', is_public=True,
+            start_datetime=now - timedelta(days=1), end_datetime=now + timedelta(days=1),
+        )
+        drop_product = DropProduct.objects.create(
+            drop=drop, product=product, drop_price=Decimal('20.00'), initial_stock_quantity=5, current_stock_quantity=4,
+        )
+        OrderItem.objects.create(
+            order=self.order, drop_product=drop_product, product_name_snapshot='Tee', sku_snapshot='TEE',
+            quantity=1, price_per_unit=Decimal('20.00'), subtotal=Decimal('20.00'),
+        )
+        # A status check and the return callback both read the order while it was pending
+        stale = Order.objects.get(pk=self.order.pk)
+        self.assertTrue(apply_payment_status(self.order, None, 'failed', {}))
+        self.assertFalse(apply_payment_status(stale, None, 'cancelled', {}))
+
+        self.assertEqual(stale.payment_status, 'failed')
+        drop_product.refresh_from_db()
+        self.assertEqual(drop_product.current_stock_quantity, 5)
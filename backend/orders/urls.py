@@ -1,4 +1,5 @@
 # orders/urls.py
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
@@ -14,9 +15,28 @@ from .currency_api_views import (
 )
 from .api_views import (
     check_stock_availability, get_user_reservations, 
-    bulk_stock_update, inventory_dashboard_data
+    bulk_stock_update, inventory_dashboard_data,
+    inventory_history, inventory_movement_report
 )
 
+if settings.ASYNC_VIEWS:
+    # Under an ASGI server the I/O-bound payment and currency endpoints run as async views
+    from .async_views import (
+        AsyncExchangeRateView, AsyncConvertEurToBynView,
+        AsyncInitiatePaymentView, AsyncCheckPaymentStatusView, AsyncPaymentSuccessView
+    )
+    exchange_rate_view = AsyncExchangeRateView.as_view()
+    convert_view = AsyncConvertEurToBynView.as_view()
+    initiate_payment_view = AsyncInitiatePaymentView.as_view()
+    payment_status_view = AsyncCheckPaymentStatusView.as_view()
+    payment_success_view = AsyncPaymentSuccessView.as_view()
+else:
+    exchange_rate_view = get_exchange_rate
+    convert_view = convert_eur_to_byn
+    initiate_payment_view = InitiatePaymentView.as_view()
+    payment_status_view = CheckPaymentStatusView.as_view()
+    payment_success_view = PaymentSuccessView.as_view()
+
 router = DefaultRouter()
 router.register(r'shipping-methods', ShippingMethodViewSet, basename='shipping-method')
 router.register(r'orders', OrderViewSet, basename='order') # For listing/retrieving user's orders
@@ -27,29 +47,31 @@ admin_router.register(r'orders', AdminOrderViewSet, basename='admin-order')
 
 urlpatterns = [
     # Currency API endpoints
-    path('currency/rate/', get_exchange_rate, name='get-exchange-rate'),
-    path('currency/convert/', convert_eur_to_byn, name='convert-eur-to-byn'),
+    path('currency/rate/', exchange_rate_view, name='get-exchange-rate'),
+    path('currency/convert/', convert_view, name='convert-eur-to-byn'),
     
     # Inventory API endpoints
     path('inventory/check-stock/', check_stock_availability, name='check-stock-availability'),
     path('inventory/reservations/', get_user_reservations, name='user-reservations'),
     path('inventory/bulk-update/', bulk_stock_update, name='bulk-stock-update'),
     path('inventory/dashboard/', inventory_dashboard_data, name='inventory-dashboard'),
+    path('inventory/history/', inventory_history, name='inventory-history'),
+    path('inventory/movements/daily/', inventory_movement_report, name='inventory-movement-report'),
     
     # Order creation endpoints
     path('orders/create/', CreateOrderView.as_view(), name='create-order'),
     path('orders/create-direct/', CreateDirectOrderView.as_view(), name='create-direct-order'),
     
     # Payment initiation endpoints
-    path('payments/initiate/', InitiatePaymentView.as_view(), name='initiate-payment'),
+    path('payments/initiate/', initiate_payment_view, name='initiate-payment'),
     path('payments/session/', CreatePaymentSessionView.as_view(), name='create-payment-session'),
     path('payments/process/', ProcessPaymentView.as_view(), name='process-payment'),
-    path('payments/status/', CheckPaymentStatusView.as_view(), name='check-payment-status'),
+    path('payments/status/', payment_status_view, name='check-payment-status'),
     path('payments/recurring/', CreateRecurringPaymentView.as_view(), name='create-recurring-payment'),
     path('payments/oneclick/', CreateOneClickPaymentView.as_view(), name='create-oneclick-payment'),
     
     # Payment return/callback endpoints (called by PayPro after hosted checkout)
-    path('payment/success/', PaymentSuccessView.as_view(), name='payment-success'),
+    path('payment/success/', payment_success_view, name='payment-success'),
     path('payment/cancelled/', PaymentCancelView.as_view(), name='payment-cancelled'),
     path('payment/failed/', PaymentFailedView.as_view(), name='payment-failed'),
     path('payment/declined/', PaymentFailedView.as_view(), name='payment-declined'),  # Alias for failed
@@ -1,8 +1,8 @@
 # orders/views.py
 import uuid
 import logging
-from django.db import models
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
@@ -11,16 +11,49 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.filters import OrderingFilter
+from django_filters.rest_framework import DjangoFilterBackend
+from .filters import AdminOrderFilter, OrderSearchFilter
 from .models import ShippingMethod, Order, Payment
 from .serializers import (
-    ShippingMethodSerializer, OrderSerializer, OrderCreateSerializer,
+    ShippingMethodSerializer, OrderSerializer, OrderSummarySerializer, OrderCreateSerializer,
     PaymentSerializer, DirectOrderCreateSerializer
 )
-from drops.models import DropProduct
 from rest_framework.views import APIView
 from .paypro_service import PayProService
+from .inventory import InventoryManager
 from .currency_service import currency_converter
 from decimal import Decimal
+from backend.pagination import KeysetPagination
+from drops.waiting_room import checkout_subjects, claim_checkout_tokens, gated_drops, release_checkout_tokens
+
+
+def claim_waiting_room(request, drops, cart_id=None):
+    """
+    Claim the checkout tokens admitting the request to the gated drops among `drops`.
+    Returns a refusal response (403 for a guest without a cart, who can't hold a
+    token, 429 otherwise) or None, and the claims to release if no order is created.
+    """
+    refused, claims = claim_checkout_tokens(request, drops, cart_id)
+    if not refused:
+        return None, claims
+    if not checkout_subjects(request, cart_id):
+        return Response(
+            {
+                'error': 'Sign in or check out from a cart to buy from this drop',
+                'code': 'waiting_room_sign_in',
+                'drops': [drop.slug for drop in refused],
+            },
+            status=status.HTTP_403_FORBIDDEN
+        ), []
+    return Response(
+        {
+            'error': 'Checkout for this drop opens through its waiting room',
+            'code': 'waiting_room',
+            'drops': [drop.slug for drop in refused],
+        },
+        status=status.HTTP_429_TOO_MANY_REQUESTS
+    ), []
 
 class ShippingMethodViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ShippingMethod.objects.filter(is_active=True)
@@ -38,16 +71,19 @@ class OrderViewSet(mixins.ListModelMixin,
     def get_queryset(self):
         # Users can only see their own orders. Admins can see all (if IsAdminUser perm added).
         user = self.request.user
-        if user.is_staff: # Or use IsAdminUser permission class
-            return Order.objects.all().prefetch_related(
-                'items__drop_product__product__images', 'items__drop_product__variant',
-                'payments', 'shipping_address', 'billing_address', 'shipping_method'
-            )
-        return Order.objects.filter(user=user).prefetch_related(
-            'items__drop_product__product__images', 'items__drop_product__variant',
-            'payments', 'shipping_address', 'billing_address', 'shipping_method'
+        queryset = Order.objects.all() if user.is_staff else Order.objects.filter(user=user)
+        if self.action == 'list':
+            # Order history: summary rows only, whatever the number of orders and items
+            return OrderSummarySerializer.with_summary(queryset).order_by('-created_at')
+        return queryset.prefetch_related(
+            'items', 'payments', 'shipping_address', 'billing_address', 'shipping_method'
         )
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return OrderSummarySerializer
+        return OrderSerializer
+
     @action(detail=True, methods=['post'])
     def cancel(self, request, order_id=None):
         """Cancel an order if it's in a cancellable state"""
@@ -154,10 +190,19 @@ class CreateOrderView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
-        order = serializer.save() # This calls OrderCreateSerializer.create()
-        
-        # Send order confirmation email
-        self._send_order_confirmation_email(order, request)
+        cart_id = serializer.validated_data['cart_id']
+        refusal, claims = claim_waiting_room(request, gated_drops(cart_id=cart_id), cart_id)
+        if refusal:
+            return refusal
+        try:
+            with transaction.atomic():
+                order = serializer.save() # This calls OrderCreateSerializer.create()
+                
+                # Queue order confirmation email; it is only sent if the order commits
+                self._send_order_confirmation_email(order, request)
+        except Exception:
+            release_checkout_tokens(claims)  # The checkout token admits one order, and this wasn't it
+            raise
         
         # Now serialize the created order for the response using OrderSerializer
         response_serializer = OrderSerializer(order, context={'request': request})
@@ -179,11 +224,11 @@ class CreateOrderView(generics.CreateAPIView):
             if success:
                 import logging
                 logger = logging.getLogger(__name__)
-                logger.info(f"Order confirmation email sent for order {order.order_number}")
+                logger.info(f"Order confirmation email queued for order {order.order_number}")
             else:
                 import logging
                 logger = logging.getLogger(__name__)
-                logger.warning(f"Failed to send order confirmation email for order {order.order_number}")
+                logger.warning(f"Failed to queue order confirmation email for order {order.order_number}")
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
@@ -217,20 +262,29 @@ class CreateDirectOrderView(generics.CreateAPIView):
             return Response(
                 {'error': 'Validation failed', 'details': serializer.errors}, 
                 status=status.HTTP_400_BAD_REQUEST            )
+
+        refusal, claims = claim_waiting_room(request, gated_drops(
+            product_id=serializer.validated_data['product_id'],
+            variant_id=serializer.validated_data.get('product_variant_id'),
+        ))
+        if refusal:
+            return refusal
         
         try:
-            order = serializer.save() # This calls DirectOrderCreateSerializer.create()
-            logger.info(f"=== ORDER CREATED SUCCESSFULLY ===")
-            logger.info(f"Order ID: {order.order_id}")
-            
-            # Send order confirmation email
-            self._send_order_confirmation_email(order, request)
+            with transaction.atomic():
+                order = serializer.save() # This calls DirectOrderCreateSerializer.create()
+                logger.info(f"=== ORDER CREATED SUCCESSFULLY ===")
+                logger.info(f"Order ID: {order.order_id}")
+                
+                # Queue order confirmation email; it is only sent if the order commits
+                self._send_order_confirmation_email(order, request)
             
             # Serialize the created order for the response using OrderSerializer
             response_serializer = OrderSerializer(order, context={'request': request})
             headers = self.get_success_headers(response_serializer.data)
             return Response(response_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
         except Exception as e:
+            release_checkout_tokens(claims)
             logger.error(f"=== ORDER CREATION ERROR ===")
             logger.error(f"Exception: {str(e)}")
             logger.error(f"Exception type: {type(e)}")
@@ -256,11 +310,11 @@ class CreateDirectOrderView(generics.CreateAPIView):
             if success:
                 import logging
                 logger = logging.getLogger(__name__)
-                logger.info(f"Order confirmation email sent for order {order.order_number}")
+                logger.info(f"Order confirmation email queued for order {order.order_number}")
             else:
                 import logging
                 logger = logging.getLogger(__name__)
-                logger.warning(f"Failed to send order confirmation email for order {order.order_number}")
+                logger.warning(f"Failed to queue order confirmation email for order {order.order_number}")
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
@@ -369,14 +423,25 @@ class AdminOrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
     lookup_field = 'order_id'  # Use UUID for lookup
-    filterset_fields = ['order_status', 'payment_status', 'created_at']
-    search_fields = ['order_number', 'user__email', 'user__username']
+    filter_backends = [DjangoFilterBackend, OrderSearchFilter, OrderingFilter]
+    filterset_class = AdminOrderFilter
+    # Matched by OrderSearchFilter with per-table subqueries (see orders/filters.py)
+    search_fields = ['order_number', 'user__email', 'user__username', 'email_for_guest', 'payments__gateway_transaction_id']
     ordering_fields = ['created_at', 'total_amount', 'order_status']
     ordering = ['-created_at']
+    pagination_class = KeysetPagination  # ?cursor= for keyset paging, ?page= still supported
+    keyset_ordering = ('-created_at', '-pk')
     
     def get_queryset(self):
         """Return all orders for admin users"""
-        return Order.objects.all().select_related('user', 'shipping_method').prefetch_related('items__drop_product')
+        if self.action == 'list':
+            return OrderSummarySerializer.with_summary(Order.objects.all())
+        return Order.objects.all().select_related('user', 'shipping_method').prefetch_related('items', 'payments')
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return OrderSummarySerializer
+        return OrderSerializer
     
     @action(detail=True, methods=['patch'])
     def update_status(self, request, order_id=None):
@@ -618,6 +683,301 @@ class ProcessPaymentView(APIView):
                 'detail': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+# Payment helpers shared by the payment views below and their async variants
+# (orders/async_views.py). Those that touch the database are synchronous; the
+# async views call them through sync_to_async.
+
+PAYPRO_PAID_STATUSES = ['completed', 'succeeded', 'success', 'paid', 'successful']
+
+
+def frontend_url(path):
+    return f"{getattr(settings, 'FRONTEND_URL', 'https://malikli1992.com')}{path}"
+
+
+def payment_initiation_error(order):
+    """Why an order can't be sent to PayPro, as (body, status); None when it can"""
+    if order.payment_status != 'pending':
+        return {
+            'success': False,
+            'error': 'Order payment already processed or not in pending state',
+            'current_status': order.payment_status
+        }, status.HTTP_400_BAD_REQUEST
+    if not (order.user.email if order.user else order.email_for_guest):
+        return {
+            'success': False,
+            'error': 'Customer email not found'
+        }, status.HTTP_400_BAD_REQUEST
+    return None
+
+
+def paypro_order_data(order, language):
+    """The order data PayPro's hosted checkout is created from (order.user must be loaded)"""
+    return {
+        'order_id': str(order.order_id),
+        'amount': str(Decimal(str(order.total_amount))),  # Keep original EUR amount
+        'currency': 'EUR',  # Original currency
+        'customer_email': order.user.email if order.user else order.email_for_guest,
+        'customer_first_name': order.user.first_name if order.user else 'Name',
+        'customer_last_name': order.user.last_name if order.user else 'Surname',
+        'description': f"Payment for Order #{order.order_number}",
+        'language': language
+    }
+
+
+def record_initiated_payment(order, response_data, currency_info):
+    """Create (or refresh) the pending payment record for a new PayPro token"""
+    payment, created = Payment.objects.get_or_create(
+        order=order,
+        gateway_transaction_id=response_data.get('token'),
+        defaults={
+            'payment_method_type': 'paypro_hosted',
+            'amount': currency_info['byn'],  # Store BYN amount (actual payment amount)
+            'currency_code': 'BYN',  # PayPro payment currency
+            'status': 'pending',
+            'payment_details': {
+                'token': response_data.get('token'),
+                'payment_url': response_data.get('payment_url'),
+                'original_amount_eur': str(currency_info['eur']),
+                'amount_byn': str(currency_info['byn']),
+                'exchange_rate': str(currency_info['rate']),
+                'original_currency': 'EUR',
+                'payment_currency': 'BYN',
+                'created_at': timezone.now().isoformat()
+            }
+        }
+    )
+    
+    if not created:
+        # Update existing payment record
+        payment.payment_details.update({
+            'token': response_data.get('token'),
+            'payment_url': response_data.get('payment_url'),
+            'original_amount_eur': str(currency_info['eur']),
+            'amount_byn': str(currency_info['byn']),
+            'exchange_rate': str(currency_info['rate']),
+            'updated_at': timezone.now().isoformat()
+        })
+        payment.save()
+    return payment
+
+
+def initiated_payment_body(order, response_data, currency_info):
+    return {
+        'success': True,
+        'payment_url': response_data.get('payment_url'),
+        'redirect_url': response_data.get('redirect_url'),
+        'token': response_data.get('token'),
+        'order_id': str(order.order_id),
+        'amount': str(currency_info['eur']),  # Original EUR amount
+        'amount_byn': str(currency_info['byn']),  # BYN amount for payment
+        'currency': 'EUR',  # Original currency
+        'payment_currency': 'BYN',  # PayPro payment currency
+        'exchange_rate': str(currency_info['rate']),
+        'message': 'Redirect user to payment_url for hosted checkout'
+    }
+
+
+def failed_initiation(order_id, response_data):
+    """(body, status) for a PayPro token creation that failed"""
+    error_code = response_data.get('error_code', 'UNKNOWN_ERROR')
+    error_message = response_data.get('error_message', 'Payment token creation failed')
+    
+    logging.getLogger(__name__).error(f"PayPro token creation failed for order {order_id}: {error_code} - {error_message}")
+    
+    return {
+        'success': False,
+        'error_code': error_code,
+        'error_message': error_message,
+        'error_details': response_data.get('error_details', [])
+    }, status.HTTP_400_BAD_REQUEST if error_code == 'VALIDATION_ERROR' else status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+def paypro_status_fields(status_data):
+    """(payment status, tracking id, transaction id) of a PayPro checkout status response"""
+    checkout_data = status_data.get('checkout', {})
+    transaction_data = status_data.get('transaction', {})
+    
+    payment_status = (transaction_data.get('status') or 
+                    checkout_data.get('status') or 
+                    'unknown')
+    
+    tracking_id = (checkout_data.get('order', {}).get('tracking_id') or 
+                  transaction_data.get('tracking_id'))
+    
+    transaction_id = (transaction_data.get('id') or 
+                    checkout_data.get('token'))
+    return payment_status, tracking_id, transaction_id
+
+
+def apply_payment_status(order, payment, payment_status, response_data):
+    """
+    Move a pending order (and its payment record) to the status PayPro reports.
+    Returns whether anything changed.
+
+    The order row is locked and re-read first, so concurrent status checks and
+    callbacks apply a status (and restock) at most once. `order` gets the
+    statuses it ends up with.
+    """
+    logger = logging.getLogger(__name__)
+    if not order:
+        return False
+    with transaction.atomic():
+        locked = Order.objects.select_for_update().get(pk=order.pk)
+        updated = _apply_payment_status(locked, payment, payment_status, response_data, logger)
+    order.payment_status, order.order_status = locked.payment_status, locked.order_status
+    return updated
+
+
+def _apply_payment_status(order, payment, payment_status, response_data, logger):
+    if order.payment_status != 'pending':
+        return False
+    if payment_status in PAYPRO_PAID_STATUSES:
+        # Update payment record
+        if payment:
+            payment.status = 'succeeded'
+            payment.payment_details.update({
+                'completion_status': payment_status,
+                'completed_at': timezone.now().isoformat(),
+                'real_time_check_at': timezone.now().isoformat(),
+                'paypro_response': response_data
+            })
+            payment.save()
+        
+        # Update order status
+        order.payment_status = 'paid'
+        order.order_status = 'processing'
+        order.save()
+        
+        logger.info(f"Real-time update: Order {order.order_id} marked as paid")
+        return True
+        
+    elif payment_status in ['failed', 'declined', 'error']:
+        # Update payment record
+        if payment:
+            payment.status = 'failed'
+            payment.payment_details.update({
+                'failure_status': payment_status,
+                'failed_at': timezone.now().isoformat(),
+                'real_time_check_at': timezone.now().isoformat(),
+                'paypro_response': response_data
+            })
+            payment.save()
+        
+        # Update order status
+        order.payment_status = 'failed'
+        order.order_status = 'failed'
+        order.save()
+        
+        # Restore stock quantities
+        InventoryManager.restock_order_items(order)
+        
+        logger.warning(f"Real-time update: Order {order.order_id} marked as failed")
+        return True
+        
+    elif payment_status in ['cancelled', 'canceled']:
+        # Update order status
+        order.payment_status = 'cancelled'
+        order.order_status = 'cancelled'
+        order.save()
+        
+        # Restore stock quantities
+        InventoryManager.restock_order_items(order)
+        
+        logger.info(f"Real-time update: Order {order.order_id} marked as cancelled")
+        return True
+    return False
+
+
+def payment_status_body(order, payment_status, transaction_id, tracking_id, updated):
+    # Get order information if available
+    order_info = None
+    if order:
+        order_info = {
+            'order_id': str(order.order_id),
+            'order_number': order.order_number,
+            'total_amount': str(order.total_amount),
+            'order_status': order.order_status,
+            'payment_status': order.payment_status,
+            'updated': updated
+        }
+    
+    return {
+        'success': True,
+        'payment_status': payment_status,
+        'transaction_id': transaction_id,
+        'tracking_id': tracking_id,
+        'order': order_info,
+        'updated': updated,
+        'timestamp': timezone.now().isoformat()
+    }
+
+
+def payment_return_url(order, token, transaction_id, payment_status, status_data):
+    """
+    Record the outcome of a hosted checkout the shopper returned from, and the
+    frontend page to send them to
+    """
+    logger = logging.getLogger(__name__)
+    if payment_status not in PAYPRO_PAID_STATUSES:
+        logger.warning(f"Payment not completed - status: {payment_status}")
+        return frontend_url(f"/payment/pending?order_id={order.order_id}&status={payment_status}")
+    
+    if order.payment_status != 'pending':
+        logger.warning(f"Order {order.order_id} payment already processed (status: {order.payment_status})")
+        
+        # Redirect based on current status
+        if order.payment_status == 'paid':
+            return frontend_url(f"/payment/success?order_id={order.order_id}&status=already_paid")
+        elif order.payment_status == 'failed':
+            return frontend_url(f"/payment/failed?order_id={order.order_id}&status=already_failed")
+        else:
+            return frontend_url(f"/payment/pending?order_id={order.order_id}&status={order.payment_status}")
+    
+    # Update payment record
+    payment = Payment.objects.filter(
+        order=order,
+        gateway_transaction_id=token
+    ).first()
+    
+    if payment:
+        payment.status = 'succeeded'
+        payment.gateway_transaction_id = transaction_id
+        payment.payment_details.update({
+            'completion_status': payment_status,
+            'completed_at': timezone.now().isoformat(),
+            'success_callback_at': timezone.now().isoformat(),
+            'paypro_response': status_data
+        })
+        payment.save()
+    else:
+        # Create new payment record if not exists
+        Payment.objects.create(
+            order=order,
+            payment_method_type='paypro_hosted',
+            gateway_transaction_id=transaction_id,
+            amount=order.total_amount,
+            currency_code=getattr(settings, 'PAYMENT_CURRENCY', 'EUR'),
+            status='succeeded',
+            payment_details={
+                'token': token,
+                'completion_status': payment_status,
+                'completed_at': timezone.now().isoformat(),
+                'success_callback_at': timezone.now().isoformat(),
+                'paypro_response': status_data
+            }
+        )
+    
+    # Update order status
+    order.payment_status = 'paid'
+    order.order_status = 'processing'
+    order.save()
+    
+    logger.info(f"Order {order.order_id} payment completed successfully via success callback")
+    
+    # Redirect to frontend success page
+    return frontend_url(f"/payment/success?order_id={order.order_id}&status=success")
+
 class InitiatePaymentView(APIView):
     """
     Initiate payment by creating a PayPro token and returning redirect URL
@@ -636,108 +996,32 @@ class InitiatePaymentView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             try:
-                order = Order.objects.get(order_id=order_id)
+                order = Order.objects.select_related('user').get(order_id=order_id)
             except Order.DoesNotExist:
                 return Response({
                     'success': False,
                     'error': 'Order not found'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            if order.payment_status != 'pending':
-                return Response({
-                    'success': False,
-                    'error': 'Order payment already processed or not in pending state',
-                    'current_status': order.payment_status
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            customer_email = order.user.email if order.user else order.email_for_guest
-            if not customer_email:
-                return Response({
-                    'success': False,
-                    'error': 'Customer email not found'
-                }, status=status.HTTP_400_BAD_REQUEST)
+            error = payment_initiation_error(order)
+            if error:
+                return Response(error[0], status=error[1])
             
             # Prepare order data for PayPro hosted checkout with currency conversion
-            original_amount = Decimal(str(order.total_amount))
-            currency_info = currency_converter.get_display_amounts(original_amount)
-            
-            order_data = {
-                'order_id': str(order.order_id),
-                'amount': str(original_amount),  # Keep original EUR amount
-                'currency': 'EUR',  # Original currency
-                'customer_email': customer_email,
-                'customer_first_name': order.user.first_name if order.user else 'Name',
-                'customer_last_name': order.user.last_name if order.user else 'Surname',
-                'description': f"Payment for Order #{order.order_number}",
-                'language': request.data.get('language', 'en')
-            }
+            currency_info = currency_converter.get_display_amounts(Decimal(str(order.total_amount)))
+            order_data = paypro_order_data(order, request.data.get('language', 'en'))
             
             # Create PayPro payment token
             paypro_service = PayProService()
             success, response_data = paypro_service.create_payment_token(order_data)
             
             if success:
-                # Create initial payment record with pending status
-                payment, created = Payment.objects.get_or_create(
-                    order=order,
-                    gateway_transaction_id=response_data.get('token'),
-                    defaults={
-                        'payment_method_type': 'paypro_hosted',
-                        'amount': currency_info['byn'],  # Store BYN amount (actual payment amount)
-                        'currency_code': 'BYN',  # PayPro payment currency
-                        'status': 'pending',
-                        'payment_details': {
-                            'token': response_data.get('token'),
-                            'payment_url': response_data.get('payment_url'),
-                            'original_amount_eur': str(currency_info['eur']),
-                            'amount_byn': str(currency_info['byn']),
-                            'exchange_rate': str(currency_info['rate']),
-                            'original_currency': 'EUR',
-                            'payment_currency': 'BYN',
-                            'created_at': timezone.now().isoformat()
-                        }
-                    }
-                )
-                
-                if not created:
-                    # Update existing payment record
-                    payment.payment_details.update({
-                        'token': response_data.get('token'),
-                        'payment_url': response_data.get('payment_url'),
-                        'original_amount_eur': str(currency_info['eur']),
-                        'amount_byn': str(currency_info['byn']),
-                        'exchange_rate': str(currency_info['rate']),
-                        'updated_at': timezone.now().isoformat()
-                    })
-                    payment.save()
-                
+                record_initiated_payment(order, response_data, currency_info)
                 logger.info(f"Payment token created for order {order_id}, redirecting to PayPro hosted checkout")
-                
-                return Response({
-                    'success': True,
-                    'payment_url': response_data.get('payment_url'),
-                    'redirect_url': response_data.get('redirect_url'),
-                    'token': response_data.get('token'),
-                    'order_id': str(order.order_id),
-                    'amount': str(currency_info['eur']),  # Original EUR amount
-                    'amount_byn': str(currency_info['byn']),  # BYN amount for payment
-                    'currency': 'EUR',  # Original currency
-                    'payment_currency': 'BYN',  # PayPro payment currency
-                    'exchange_rate': str(currency_info['rate']),
-                    'message': 'Redirect user to payment_url for hosted checkout'
-                }, status=status.HTTP_200_OK)
+                return Response(initiated_payment_body(order, response_data, currency_info), status=status.HTTP_200_OK)
             else:
-                error_code = response_data.get('error_code', 'UNKNOWN_ERROR')
-                error_message = response_data.get('error_message', 'Payment token creation failed')
-                
-                logger.error(f"PayPro token creation failed for order {order_id}: {error_code} - {error_message}")
-                
-                return Response({
-                    'success': False,
-                    'error_code': error_code,
-                    'error_message': error_message,
-                    'error_details': response_data.get('error_details', [])
-                }, status=status.HTTP_400_BAD_REQUEST if error_code == 'VALIDATION_ERROR' else status.HTTP_500_INTERNAL_SERVER_ERROR)
+                body, status_code = failed_initiation(order_id, response_data)
+                return Response(body, status=status_code)
                 
         except Exception as e:
             logger.error(f"Unexpected error in payment initiation: {e}")
@@ -850,10 +1134,7 @@ class PayProWebhookView(APIView):
                             order.save()
                             
                             # Restore stock quantities
-                            for item in order.items.all():
-                                DropProduct.objects.filter(id=item.drop_product.id).update(
-                                    current_stock_quantity=models.F('current_stock_quantity') + item.quantity
-                                )
+                            InventoryManager.restock_order_items(order)
                             
                             logger.warning(f"Order {tracking_id} payment failed via webhook")
                             
@@ -864,10 +1145,7 @@ class PayProWebhookView(APIView):
                             order.save()
                             
                             # Restore stock quantities
-                            for item in order.items.all():
-                                DropProduct.objects.filter(id=item.drop_product.id).update(
-                                    current_stock_quantity=models.F('current_stock_quantity') + item.quantity
-                                )
+                            InventoryManager.restock_order_items(order)
                             
                             logger.info(f"Order {tracking_id} payment cancelled via webhook")
                             
@@ -913,6 +1191,7 @@ class CheckPaymentStatusView(APIView):
             
             # Try to find order by order_id first, then by token
             order = None
+            payment = None
             if order_id:
                 try:
                     order = Order.objects.get(order_id=order_id)
@@ -927,7 +1206,7 @@ class CheckPaymentStatusView(APIView):
                     pass
             elif token:
                 # Find order by payment token
-                payment = Payment.objects.filter(gateway_transaction_id=token).first()
+                payment = Payment.objects.select_related('order').filter(gateway_transaction_id=token).first()
                 if payment:
                     order = payment.order
             
@@ -940,105 +1219,13 @@ class CheckPaymentStatusView(APIView):
             success, response_data = paypro_service.get_payment_status(token)
             
             if success:
-                # Parse payment status
-                checkout_data = response_data.get('checkout', {})
-                transaction_data = response_data.get('transaction', {})
-                
-                payment_status = (transaction_data.get('status') or 
-                                checkout_data.get('status') or 
-                                'unknown')
-                
-                tracking_id = (checkout_data.get('order', {}).get('tracking_id') or 
-                              transaction_data.get('tracking_id'))
-                
-                transaction_id = (transaction_data.get('id') or 
-                                checkout_data.get('token'))
-                
+                payment_status, tracking_id, transaction_id = paypro_status_fields(response_data)
                 # Update order status if needed and order exists
-                updated = False
-                if order and order.payment_status == 'pending':
-                    if payment_status in ['completed', 'succeeded', 'success', 'paid', 'successful']:
-                        # Update payment record
-                        if payment:
-                            payment.status = 'succeeded'
-                            payment.payment_details.update({
-                                'completion_status': payment_status,
-                                'completed_at': timezone.now().isoformat(),
-                                'real_time_check_at': timezone.now().isoformat(),
-                                'paypro_response': response_data
-                            })
-                            payment.save()
-                        
-                        # Update order status
-                        order.payment_status = 'paid'
-                        order.order_status = 'processing'
-                        order.save()
-                        updated = True
-                        
-                        logger.info(f"Real-time update: Order {order.order_id} marked as paid")
-                        
-                    elif payment_status in ['failed', 'declined', 'error']:
-                        # Update payment record
-                        if payment:
-                            payment.status = 'failed'
-                            payment.payment_details.update({
-                                'failure_status': payment_status,
-                                'failed_at': timezone.now().isoformat(),
-                                'real_time_check_at': timezone.now().isoformat(),
-                                'paypro_response': response_data
-                            })
-                            payment.save()
-                        
-                        # Update order status
-                        order.payment_status = 'failed'
-                        order.order_status = 'failed'
-                        order.save()
-                        
-                        # Restore stock quantities
-                        for item in order.items.all():
-                            DropProduct.objects.filter(id=item.drop_product.id).update(
-                                current_stock_quantity=models.F('current_stock_quantity') + item.quantity
-                            )
-                        
-                        updated = True
-                        logger.warning(f"Real-time update: Order {order.order_id} marked as failed")
-                        
-                    elif payment_status in ['cancelled', 'canceled']:
-                        # Update order status
-                        order.payment_status = 'cancelled'
-                        order.order_status = 'cancelled'
-                        order.save()
-                        
-                        # Restore stock quantities
-                        for item in order.items.all():
-                            DropProduct.objects.filter(id=item.drop_product.id).update(
-                                current_stock_quantity=models.F('current_stock_quantity') + item.quantity
-                            )
-                        
-                        updated = True
-                        logger.info(f"Real-time update: Order {order.order_id} marked as cancelled")
-                
-                # Get order information if available
-                order_info = None
-                if order:
-                    order_info = {
-                        'order_id': str(order.order_id),
-                        'order_number': order.order_number,
-                        'total_amount': str(order.total_amount),
-                        'order_status': order.order_status,
-                        'payment_status': order.payment_status,
-                        'updated': updated
-                    }
-                
-                return Response({
-                    'success': True,
-                    'payment_status': payment_status,
-                    'transaction_id': transaction_id,
-                    'tracking_id': tracking_id,
-                    'order': order_info,
-                    'updated': updated,
-                    'timestamp': timezone.now().isoformat()
-                }, status=status.HTTP_200_OK)
+                updated = apply_payment_status(order, payment, payment_status, response_data)
+                return Response(
+                    payment_status_body(order, payment_status, transaction_id, tracking_id, updated),
+                    status=status.HTTP_200_OK
+                )
             else:
                 error_code = response_data.get('error_code', 'UNKNOWN_ERROR')
                 error_message = response_data.get('error_message', 'Status check failed')
@@ -1208,135 +1395,40 @@ class PaymentSuccessView(APIView):
             
             logger.info(f"Payment success callback received - token: {token}, order_id: {order_id}")
             
-            if token:
-                # Check payment status with PayPro
-                paypro_service = PayProService()
-                success, status_data = paypro_service.get_payment_status(token)
-                
-                if success:
-                    # Parse PayPro response
-                    checkout_data = status_data.get('checkout', {})
-                    transaction_data = status_data.get('transaction', {})
-                    
-                    payment_status = (transaction_data.get('status') or 
-                                    checkout_data.get('status') or 
-                                    'unknown')
-                    
-                    tracking_id = (checkout_data.get('order', {}).get('tracking_id') or 
-                                  transaction_data.get('tracking_id') or 
-                                  order_id)
-                    
-                    transaction_id = (transaction_data.get('id') or 
-                                    checkout_data.get('token') or 
-                                    token)
-                    
-                    logger.info(f"Payment status check - status: {payment_status}, tracking_id: {tracking_id}")
-                    
-                    # Find and update order
-                    if tracking_id:
-                        try:
-                            order = Order.objects.get(order_id=tracking_id)
-                            
-                            if payment_status in ['completed', 'succeeded', 'success', 'paid', 'successful']:
-                                if order.payment_status == 'pending':
-                                    # Update payment record
-                                    payment = Payment.objects.filter(
-                                        order=order,
-                                        gateway_transaction_id=token
-                                    ).first()
-                                    
-                                    if payment:
-                                        payment.status = 'succeeded'
-                                        payment.gateway_transaction_id = transaction_id
-                                        payment.payment_details.update({
-                                            'completion_status': payment_status,
-                                            'completed_at': timezone.now().isoformat(),
-                                            'success_callback_at': timezone.now().isoformat(),
-                                            'paypro_response': status_data
-                                        })
-                                        payment.save()
-                                    else:
-                                        # Create new payment record if not exists
-                                        Payment.objects.create(
-                                            order=order,
-                                            payment_method_type='paypro_hosted',
-                                            gateway_transaction_id=transaction_id,
-                                            amount=order.total_amount,
-                                            currency_code=getattr(settings, 'PAYMENT_CURRENCY', 'EUR'),
-                                            status='succeeded',
-                                            payment_details={
-                                                'token': token,
-                                                'completion_status': payment_status,
-                                                'completed_at': timezone.now().isoformat(),
-                                                'success_callback_at': timezone.now().isoformat(),
-                                                'paypro_response': status_data
-                                            }
-                                        )
-                                    
-                                    # Update order status
-                                    order.payment_status = 'paid'
-                                    order.order_status = 'processing'
-                                    order.save()
-                                    
-                                    logger.info(f"Order {tracking_id} payment completed successfully via success callback")
-                                    
-                                    # Redirect to frontend success page
-                                    frontend_url = getattr(settings, 'FRONTEND_URL', 'https://malikli1992.com')
-                                    success_url = f"{frontend_url}/payment/success?order_id={order.order_id}&status=success"
-                                    
-                                    return redirect(success_url)
-                                else:
-                                    logger.warning(f"Order {tracking_id} payment already processed (status: {order.payment_status})")
-                                    frontend_url = getattr(settings, 'FRONTEND_URL', 'https://malikli1992.com')
-                                    
-                                    # Redirect based on current status
-                                    if order.payment_status == 'paid':
-                                        success_url = f"{frontend_url}/payment/success?order_id={order.order_id}&status=already_paid"
-                                        return redirect(success_url)
-                                    elif order.payment_status == 'failed':
-                                        failed_url = f"{frontend_url}/payment/failed?order_id={order.order_id}&status=already_failed"
-                                        return redirect(failed_url)
-                                    else:
-                                        pending_url = f"{frontend_url}/payment/pending?order_id={order.order_id}&status={order.payment_status}"
-                                        return redirect(pending_url)
-                            else:
-                                logger.warning(f"Payment not completed - status: {payment_status}")
-                                frontend_url = getattr(settings, 'FRONTEND_URL', 'https://malikli1992.com')
-                                pending_url = f"{frontend_url}/payment/pending?order_id={order.order_id}&status={payment_status}"
-                                
-                                return redirect(pending_url)
-                                
-                        except Order.DoesNotExist:
-                            logger.error(f"Order not found for tracking_id: {tracking_id}")
-                            frontend_url = getattr(settings, 'FRONTEND_URL', 'https://malikli1992.com')
-                            error_url = f"{frontend_url}/payment/error?error=order_not_found"
-                            
-                            return redirect(error_url)
-                    else:
-                        logger.error("No tracking_id found in payment status response")
-                        frontend_url = getattr(settings, 'FRONTEND_URL', 'https://malikli1992.com')
-                        error_url = f"{frontend_url}/payment/error?error=invalid_response"
-                        
-                        return redirect(error_url)
-                else:
-                    logger.error(f"Failed to check payment status: {status_data.get('error_message')}")
-                    frontend_url = getattr(settings, 'FRONTEND_URL', 'https://malikli1992.com')
-                    error_url = f"{frontend_url}/payment/error?error=status_check_failed"
-                    
-                    return redirect(error_url)
-            else:
+            if not token:
                 logger.error("No token provided in success callback")
-                frontend_url = getattr(settings, 'FRONTEND_URL', 'https://malikli1992.com')
-                error_url = f"{frontend_url}/payment/error?error=missing_token"
-                
-                return redirect(error_url)
+                return redirect(frontend_url("/payment/error?error=missing_token"))
+            
+            # Check payment status with PayPro
+            paypro_service = PayProService()
+            success, status_data = paypro_service.get_payment_status(token)
+            
+            if not success:
+                logger.error(f"Failed to check payment status: {status_data.get('error_message')}")
+                return redirect(frontend_url("/payment/error?error=status_check_failed"))
+            
+            payment_status, tracking_id, transaction_id = paypro_status_fields(status_data)
+            tracking_id = tracking_id or order_id
+            transaction_id = transaction_id or token
+            
+            logger.info(f"Payment status check - status: {payment_status}, tracking_id: {tracking_id}")
+            
+            if not tracking_id:
+                logger.error("No tracking_id found in payment status response")
+                return redirect(frontend_url("/payment/error?error=invalid_response"))
+            
+            # Find and update order
+            try:
+                order = Order.objects.get(order_id=tracking_id)
+            except Order.DoesNotExist:
+                logger.error(f"Order not found for tracking_id: {tracking_id}")
+                return redirect(frontend_url("/payment/error?error=order_not_found"))
+            
+            return redirect(payment_return_url(order, token, transaction_id, payment_status, status_data))
                 
         except Exception as e:
             logger.error(f"Error in payment success callback: {e}")
-            frontend_url = getattr(settings, 'FRONTEND_URL', 'https://malikli1992.com')
-            error_url = f"{frontend_url}/payment/error?error=processing_error"
-            
-            return redirect(error_url)
+            return redirect(frontend_url("/payment/error?error=processing_error"))
 
 class PaymentCancelView(APIView):
     """
@@ -1386,10 +1478,7 @@ class PaymentCancelView(APIView):
                 order.save()
                 
                 # Restore stock quantities
-                for item in order.items.all():
-                    DropProduct.objects.filter(id=item.drop_product.id).update(
-                        current_stock_quantity=models.F('current_stock_quantity') + item.quantity
-                    )
+                InventoryManager.restock_order_items(order)
                 
                 logger.info(f"Order {order.order_id} payment cancelled by user")
             
@@ -1460,10 +1549,7 @@ class PaymentFailedView(APIView):
                 order.save()
                 
                 # Restore stock quantities
-                for item in order.items.all():
-                    DropProduct.objects.filter(id=item.drop_product.id).update(
-                        current_stock_quantity=models.F('current_stock_quantity') + item.quantity
-                    )
+                InventoryManager.restock_order_items(order)
                 
                 logger.warning(f"Order {order.order_id} payment failed: {error_code}")
             
@@ -0,0 +1,25 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import OutboundEmail
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("id", "category", "recipients", "subject", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status", "category", "created_at")
+    search_fields = ("subject", "provider_message_id")
+    readonly_fields = (
+        "to", "from_email", "subject", "text_body", "html_body", "headers", "category",
+        "attempts", "last_error", "provider_message_id", "created_at", "updated_at", "sent_at",
+    )
+    actions = ["retry_now"]
+
+    def recipients(self, obj):
+        return ", ".join(obj.to)
+
+    @admin.action(description="Retry selected emails now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now(), updated_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} emails queued for retry.")
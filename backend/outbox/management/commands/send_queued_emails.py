@@ -0,0 +1,77 @@
+"""
+Django Management Command: Send Queued Emails
+
+Worker for the transactional email outbox (outbox/service.py). Sends due emails in
+batches through the configured provider (Resend batch API by default) and schedules
+retries with exponential backoff for transient failures. Run it from cron every
+minute, or keep it running with --loop.
+
+Usage:
+    python manage.py send_queued_emails
+    python manage.py send_queued_emails --dry-run
+    python manage.py send_queued_emails --loop --sleep 2
+    python manage.py send_queued_emails --batch-size 50 --max-batches 10
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+from outbox.models import OutboundEmail
+from outbox.service import EmailOutbox
+
+class Command(BaseCommand):
+    help = 'Send queued outbound emails in batches, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show the queue without sending anything',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for new emails instead of exiting when none are due',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Seconds between polls with --loop (default: 2)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Emails per provider call (default: EMAIL_OUTBOX_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop each pass after this many batches',
+        )
+
+    def handle(self, *args, **options):
+        """Drain the due part of the outbox."""
+        if options['dry_run']:
+            counts = dict(OutboundEmail.objects.values_list('status').annotate(n=Count('id')).order_by())
+            due = OutboundEmail.objects.filter(status='pending', next_attempt_at__lte=timezone.now()).count()
+            self.stdout.write(self.style.WARNING(
+                f"DRY RUN: {due} emails due now; "
+                + ', '.join(f'{status}: {counts.get(status, 0)}' for status, _ in OutboundEmail.STATUS_CHOICES)
+            ))
+            return
+
+        while True:
+            totals = EmailOutbox.send_pending(batch_size=options['batch_size'], max_batches=options['max_batches'])
+            if totals['batches']:
+                style = self.style.SUCCESS if not totals['failed'] else self.style.WARNING
+                self.stdout.write(style(
+                    f"Sent {totals['sent']} emails in {totals['batches']} batches; "
+                    f"{totals['retrying']} will be retried, {totals['failed']} failed permanently"
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
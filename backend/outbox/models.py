@@ -0,0 +1,47 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboundEmail(models.Model):
+    """
+    A rendered email waiting to be sent. Rows are written in the same transaction as
+    the change that triggers them (a new order, a password reset token), so an email
+    goes out if and only if that change committed. The worker in outbox/service.py
+    sends them in batches and retries transient failures with exponential backoff.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),  # Claimed by a worker
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),    # Permanent error or out of attempts
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    category = models.CharField(max_length=50, blank=True, db_index=True)  # Template name, e.g. 'verify_email'
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField()  # List of recipient addresses
+    subject = models.CharField(max_length=998)
+    text_body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    provider_message_id = models.CharField(max_length=255, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Worker queue: due pending emails, oldest first
+            models.Index(fields=['next_attempt_at'], condition=models.Q(status='pending'), name='outbox_email_due_idx'),
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.category or 'email'} to {', '.join(self.to)} ({self.get_status_display()})"
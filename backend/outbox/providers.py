@@ -0,0 +1,172 @@
+# outbox/providers.py
+"""
+Delivery providers for the email outbox.
+
+A provider sends a list of OutboundEmail rows and returns one DeliveryResult per
+row, in order. Raising instead means the whole call failed (network error, rate
+limit, outage) and every row is retried later.
+
+    ResendProvider       Resend batch API, up to 100 emails per request
+    DjangoMailProvider   Django's EMAIL_BACKEND over one connection (SMTP, console, ...)
+    FakeProvider         In-memory, for tests and local development
+
+EMAIL_OUTBOX_PROVIDER selects one by dotted path. By default Resend is used when
+RESEND_API_KEY is set and Django's EMAIL_BACKEND otherwise.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils.module_loading import import_string
+
+from backend.metrics import observe_external
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryResult:
+    """Outcome for one email: a provider message id, or an error that may be permanent."""
+
+    def __init__(self, message_id='', error='', permanent=False):
+        self.message_id = message_id or ''
+        self.error = error
+        self.permanent = permanent
+
+    @property
+    def ok(self):
+        return not self.error
+
+
+class EmailProvider:
+    # Largest list the worker passes to send() in one call
+    max_batch_size = 100
+
+    def send(self, emails):
+        raise NotImplementedError
+
+
+class ResendProvider(EmailProvider):
+    """
+    Sends through the Resend batch endpoint in permissive validation mode, so one
+    malformed address fails only its own email. SDK versions without resend.Batch
+    fall back to one Emails.send call per email.
+    """
+    max_batch_size = 100
+
+    def __init__(self):
+        import resend
+        self.resend = resend
+        self.resend.api_key = getattr(settings, 'RESEND_API_KEY', '')
+
+    @staticmethod
+    def params(email):
+        params = {
+            'from': email.from_email,
+            'to': email.to,
+            'subject': email.subject,
+        }
+        if email.html_body:
+            params['html'] = email.html_body
+        if email.text_body:
+            params['text'] = email.text_body
+        if email.headers:
+            params['headers'] = email.headers
+        return params
+
+    @staticmethod
+    def idempotency_key(emails):
+        # A retried batch made of the same rows is not delivered twice
+        digest = hashlib.sha256(','.join(str(email.pk) for email in emails).encode()).hexdigest()
+        return f'outbox-{digest[:32]}'
+
+    def send(self, emails):
+        if not self.resend.api_key:
+            raise ValueError('RESEND_API_KEY is not configured')
+        if not hasattr(self.resend, 'Batch'):
+            return [self.send_one(email) for email in emails]
+
+        with observe_external('resend', 'batch_send'):
+            response = self.resend.Batch.send(
+                [self.params(email) for email in emails],
+                {'idempotency_key': self.idempotency_key(emails), 'batch_validation': 'permissive'},
+            )
+        results = [DeliveryResult(message_id=item.get('id')) for item in response.get('data') or []]
+        if response.get('errors'):
+            # Permissive mode: data holds the accepted emails in order, errors the rejected indexes
+            rejected = {error['index']: error.get('message', 'Rejected by provider') for error in response['errors']}
+            accepted = iter(results)
+            results = [
+                DeliveryResult(error=rejected[index], permanent=True) if index in rejected else next(accepted)
+                for index in range(len(emails))
+            ]
+        if len(results) != len(emails):
+            raise ValueError(f'Resend returned {len(results)} results for {len(emails)} emails')
+        return results
+
+    def send_one(self, email):
+        with observe_external('resend', 'send'):
+            response = self.resend.Emails.send(self.params(email))
+        message_id = response.get('id') if isinstance(response, dict) else getattr(response, 'id', '')
+        return DeliveryResult(message_id=message_id)
+
+
+class DjangoMailProvider(EmailProvider):
+    """Sends each email through Django's EMAIL_BACKEND, reusing one open connection."""
+    max_batch_size = 50
+
+    def send(self, emails):
+        results = []
+        with get_connection() as connection:
+            for email in emails:
+                message = EmailMultiAlternatives(
+                    subject=email.subject, body=email.text_body, from_email=email.from_email,
+                    to=email.to, headers=email.headers or None, connection=connection,
+                )
+                if email.html_body:
+                    message.attach_alternative(email.html_body, 'text/html')
+                try:
+                    message.send()
+                except Exception as e:
+                    logger.error(f"Outbox email {email.pk} failed via {settings.EMAIL_BACKEND}: {e}")
+                    results.append(DeliveryResult(error=str(e)))
+                    continue
+                results.append(DeliveryResult(message_id=f'django-{email.pk}'))
+        return results
+
+
+class FakeProvider(EmailProvider):
+    """
+    Records emails instead of sending them. `FakeProvider.sent` lists every delivered
+    email; queue exceptions or DeliveryResults in `FakeProvider.failures` to make the
+    next send() calls (or emails) fail. Call reset() between tests.
+    """
+    sent = []
+    failures = []
+
+    @classmethod
+    def reset(cls):
+        cls.sent = []
+        cls.failures = []
+
+    def send(self, emails):
+        results = []
+        for email in emails:
+            failure = FakeProvider.failures.pop(0) if FakeProvider.failures else None
+            if isinstance(failure, Exception):
+                raise failure
+            if failure is not None:
+                results.append(failure)
+                continue
+            FakeProvider.sent.append(email)
+            results.append(DeliveryResult(message_id=f'fake-{email.pk}'))
+        return results
+
+
+def get_provider():
+    path = getattr(settings, 'EMAIL_OUTBOX_PROVIDER', '')
+    if path:
+        return import_string(path)()
+    if getattr(settings, 'RESEND_API_KEY', ''):
+        return ResendProvider()
+    return DjangoMailProvider()
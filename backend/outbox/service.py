@@ -0,0 +1,172 @@
+# outbox/service.py
+"""
+Transactional email outbox.
+
+Request code calls EmailOutbox.enqueue() (through users.email_utils) instead of
+talking to the mail provider: the email is rendered and inserted as an
+OutboundEmail row inside the caller's transaction, which costs one INSERT and
+nothing if the transaction rolls back. The worker (`python manage.py
+send_queued_emails`) claims due rows in batches, hands each batch to the provider
+(outbox/providers.py) and records the outcome per email. Transient failures are
+retried with exponential backoff up to EMAIL_OUTBOX_MAX_ATTEMPTS; permanent ones
+are marked failed straight away.
+"""
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+from .providers import DeliveryResult, get_provider
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutbox:
+    """
+    Service class for queueing and delivering outbound email
+    """
+
+    @staticmethod
+    def build(to, subject, text_body='', html_body='', from_email=None, category='', headers=None):
+        """Unsaved OutboundEmail for enqueue() and enqueue_many()."""
+        return OutboundEmail(
+            to=list(to),
+            subject=subject,
+            text_body=text_body,
+            html_body=html_body,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            category=category,
+            headers=headers or {},
+        )
+
+    @staticmethod
+    def enqueue(to, subject, text_body='', html_body='', from_email=None, category='', headers=None):
+        """Queue an email for the worker. Call inside the transaction that triggers it."""
+        email = EmailOutbox.build(to, subject, text_body, html_body, from_email, category, headers)
+        email.save()
+        return email
+
+    @staticmethod
+    def enqueue_many(messages):
+        """Queue many emails with one INSERT per 500; `messages` are dicts of enqueue() arguments."""
+        return OutboundEmail.objects.bulk_create(
+            [EmailOutbox.build(**message) for message in messages], batch_size=500
+        )
+
+    @staticmethod
+    def retry_delay(attempts):
+        """Exponential backoff with jitter: base * 2^(attempts - 1), capped, +-20%."""
+        base = getattr(settings, 'EMAIL_OUTBOX_RETRY_BASE_SECONDS', 30)
+        cap = getattr(settings, 'EMAIL_OUTBOX_RETRY_MAX_SECONDS', 60 * 60)
+        delay = min(cap, base * 2 ** max(0, attempts - 1))
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    @staticmethod
+    def claim_batch(limit):
+        """
+        Mark up to `limit` due pending emails as sending and return them. SKIP LOCKED
+        lets several workers claim disjoint batches without waiting on each other.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                OutboundEmail.objects
+                .select_for_update(skip_locked=True)
+                .filter(status='pending', next_attempt_at__lte=now)
+                .order_by('next_attempt_at')
+                .values_list('id', flat=True)[:limit]
+            )
+            if not ids:
+                return []
+            OutboundEmail.objects.filter(id__in=ids).update(status='sending', updated_at=now)
+        return list(OutboundEmail.objects.filter(id__in=ids).order_by('next_attempt_at', 'id'))
+
+    @staticmethod
+    def requeue_stale(now=None):
+        """Return emails claimed by a worker that died mid-batch to the queue."""
+        now = now or timezone.now()
+        cutoff = now - timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_STALE_SECONDS', 10 * 60))
+        requeued = OutboundEmail.objects.filter(status='sending', updated_at__lt=cutoff).update(
+            status='pending', next_attempt_at=now, updated_at=now
+        )
+        if requeued:
+            logger.warning(f"Requeued {requeued} outbox emails left in 'sending'")
+        return requeued
+
+    @staticmethod
+    def deliver(emails, provider):
+        """Send one claimed batch and record each email's outcome. Returns (sent, failed)."""
+        try:
+            results = provider.send(emails)
+            if len(results) != len(emails):
+                raise ValueError(f'Provider returned {len(results)} results for {len(emails)} emails')
+        except Exception as e:
+            logger.error(f"Outbox batch of {len(emails)} emails failed: {e}")
+            results = [DeliveryResult(error=str(e))] * len(emails)
+
+        now = timezone.now()
+        max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 8)
+        redact = set(getattr(settings, 'EMAIL_OUTBOX_REDACT_CATEGORIES', ()))
+        sent = failed = 0
+        for email, result in zip(emails, results):
+            email.attempts += 1
+            if result.ok:
+                email.status = 'sent'
+                email.sent_at = now
+                email.provider_message_id = result.message_id[:255]
+                email.last_error = ''
+                if email.category in redact:
+                    # Bodies carrying credentials are not kept once delivered
+                    email.text_body = email.html_body = ''
+                sent += 1
+            else:
+                email.last_error = result.error[:2000]
+                if result.permanent or email.attempts >= max_attempts:
+                    email.status = 'failed'
+                    failed += 1
+                else:
+                    email.status = 'pending'
+                    email.next_attempt_at = now + EmailOutbox.retry_delay(email.attempts)
+            email.updated_at = now
+        OutboundEmail.objects.bulk_update(
+            emails,
+            ['status', 'attempts', 'sent_at', 'provider_message_id', 'last_error', 'next_attempt_at', 'updated_at',
+             'text_body', 'html_body'],
+        )
+        return sent, failed
+
+    @staticmethod
+    def send_pending(batch_size=None, max_batches=None, provider=None):
+        """
+        Deliver due emails batch by batch until none are due (or max_batches ran),
+        making at most EMAIL_OUTBOX_RATE_LIMIT provider calls per second.
+        Returns {'sent', 'failed', 'retrying', 'batches'}.
+        """
+        provider = provider or get_provider()
+        batch_size = min(batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 100), provider.max_batch_size)
+        rate_limit = getattr(settings, 'EMAIL_OUTBOX_RATE_LIMIT', 0)
+        min_interval = 1.0 / rate_limit if rate_limit else 0
+        EmailOutbox.requeue_stale()
+
+        totals = {'sent': 0, 'failed': 0, 'retrying': 0, 'batches': 0}
+        last_call = None
+        while max_batches is None or totals['batches'] < max_batches:
+            emails = EmailOutbox.claim_batch(batch_size)
+            if not emails:
+                break
+            if last_call is not None and min_interval:
+                wait = min_interval - (time.monotonic() - last_call)
+                if wait > 0:
+                    time.sleep(wait)
+            last_call = time.monotonic()
+            sent, failed = EmailOutbox.deliver(emails, provider)
+            totals['sent'] += sent
+            totals['failed'] += failed
+            totals['retrying'] += len(emails) - sent - failed
+            totals['batches'] += 1
+        return totals
@@ -0,0 +1,14 @@
+# outbox/tasks.py
+"""Outbox delivery as a job (see jobs/registry.py), for nodes without a send_queued_emails worker."""
+from datetime import timedelta
+
+from jobs.registry import schedule, task
+from .service import EmailOutbox
+
+
+@task('outbox.send_queued_emails', concurrency=2, lease_seconds=300, max_attempts=1)
+def send_queued_emails(batch_size=None, max_batches=50):
+    return EmailOutbox.send_pending(batch_size=batch_size, max_batches=max_batches)
+
+
+schedule('outbox.send_queued_emails', every=timedelta(seconds=15))
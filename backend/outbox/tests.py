@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from .models import OutboundEmail
+from .providers import DeliveryResult, FakeProvider
+from .service import EmailOutbox
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, EMAIL_OUTBOX_PROVIDER='outbox.providers.FakeProvider')
+class EmailOutboxTests(APITestCase):
+    def setUp(self):
+        FakeProvider.reset()
+        self.addCleanup(FakeProvider.reset)
+        self.user = get_user_model().objects.create_user(username='buyer', email='buyer@example.com', password='pass1234')
+
+    def test_password_reset_is_queued_then_delivered_by_worker(self):
+        response = self.client.post(reverse('password_reset_request'), {'email': 'buyer@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.to, ['buyer@example.com'])
+        self.assertEqual(FakeProvider.sent, [])
+
+        totals = EmailOutbox.send_pending()
+        self.assertEqual(totals, {'sent': 1, 'failed': 0, 'retrying': 0, 'batches': 1})
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'sent')
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.provider_message_id, f'fake-{email.pk}')
+        self.assertEqual([sent.pk for sent in FakeProvider.sent], [email.pk])
+
+    def test_transient_failure_is_retried_and_permanent_failure_is_not(self):
+        retried = EmailOutbox.enqueue(['a@example.com'], 'Hi', text_body='One')
+        rejected = EmailOutbox.enqueue(['not-an-address'], 'Hi', text_body='Two')
+
+        FakeProvider.failures = [ConnectionError('provider unavailable')]
+        totals = EmailOutbox.send_pending(max_batches=1)
+        self.assertEqual(totals['retrying'], 2)
+        retried.refresh_from_db()
+        self.assertEqual(retried.status, 'pending')
+        self.assertEqual(retried.attempts, 1)
+        self.assertGreater(retried.next_attempt_at, timezone.now())
+        self.assertIn('provider unavailable', retried.last_error)
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        FakeProvider.failures = [None, DeliveryResult(error='Invalid `to` field', permanent=True)]
+        totals = EmailOutbox.send_pending()
+        self.assertEqual((totals['sent'], totals['failed']), (1, 1))
+        retried.refresh_from_db()
+        rejected.refresh_from_db()
+        self.assertEqual(retried.status, 'sent')
+        self.assertEqual(rejected.status, 'failed')
+        self.assertEqual(rejected.attempts, 2)
@@ -0,0 +1,121 @@
+# products/category_tree.py
+"""
+In-process cache of the full category tree.
+
+The tree is built from a single ordered query over Category (plus one prefetch for
+translations) and kept in module memory, so menus and subtree filters don't hit the
+database per request. A version token in the shared Django cache is bumped whenever a
+category or category translation changes; every worker compares it on read and
+rebuilds its local copy when it differs.
+"""
+import logging
+import threading
+import uuid
+
+from django.core.cache import cache
+
+from backend.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_TREE_VERSION_KEY = 'category_tree_version'
+
+_lock = threading.Lock()
+_state = {'version': None, 'roots': [], 'by_slug': {}, 'by_id': {}}
+
+
+def _current_version():
+    version = cache.get(CATEGORY_TREE_VERSION_KEY)
+    if version is None:
+        cache.add(CATEGORY_TREE_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CATEGORY_TREE_VERSION_KEY)
+    return version
+
+
+def invalidate_category_tree():
+    """Drop the local copy and tell other workers to rebuild theirs."""
+    cache.set(CATEGORY_TREE_VERSION_KEY, uuid.uuid4().hex, None)
+    with _lock:
+        _state['version'] = None
+
+
+def _build():
+    from .models import Category
+
+    by_id = {}
+    roots = []
+    categories = Category.objects.order_by('path').prefetch_related('translations')
+    for category in categories:
+        by_id[category.pk] = {
+            'id': category.pk,
+            'name': category.name,
+            'slug': category.slug,
+            'description': category.description,
+            'parent_category': category.parent_category_id,
+            'image': category.image.url if category.image else None,
+            'is_active': category.is_active,
+            'path': category.path,
+            'depth': category.depth,
+            'translations': [
+                {'language_code': t.language_code, 'name': t.name, 'description': t.description}
+                for t in category.translations.all()
+            ],
+            'subcategories': [],
+        }
+
+    # Ordered by path, so parents are always attached before their children
+    for node in by_id.values():
+        if not node['is_active']:
+            continue
+        parent = by_id.get(node['parent_category'])
+        if parent is None:
+            roots.append(node)
+        elif parent['is_active']:
+            parent['subcategories'].append(node)
+
+    by_slug = {node['slug']: node for node in by_id.values()}
+    return roots, by_slug, by_id
+
+
+def _ensure_fresh():
+    version = _current_version()
+    if _state['version'] == version and version is not None:
+        record_cache('category_tree', hits=1)
+        return _state
+    with _lock:
+        if _state['version'] != version or version is None:
+            record_cache('category_tree', misses=1)
+            roots, by_slug, by_id = _build()
+            _state.update(roots=roots, by_slug=by_slug, by_id=by_id, version=version)
+            logger.info(f"Category tree cache rebuilt ({len(by_id)} categories)")
+    return _state
+
+
+def get_category_tree():
+    """Active root categories with nested `subcategories`. Treat the result as read-only."""
+    return _ensure_fresh()['roots']
+
+
+def get_category_node(slug=None, pk=None):
+    """Look up a cached node (active or not) by slug or id."""
+    state = _ensure_fresh()
+    if slug is not None:
+        return state['by_slug'].get(slug)
+    return state['by_id'].get(pk)
+
+
+def localize_tree(nodes, language_code):
+    """Copy nodes adding translated_name/translated_description for one language."""
+    localized = []
+    for node in nodes:
+        translation = next(
+            (t for t in node['translations'] if t['language_code'] == language_code), None
+        )
+        item = {key: value for key, value in node.items() if key != 'subcategories'}
+        item['translated_name'] = translation['name'] if translation else node['name']
+        item['translated_description'] = (
+            (translation['description'] or node['description']) if translation else node['description']
+        )
+        item['subcategories'] = localize_tree(node['subcategories'], language_code)
+        localized.append(item)
+    return localized
@@ -0,0 +1,57 @@
+# products/exports.py
+"""
+CSV rows for the product and low-stock exports, shared by the streamed admin
+actions in products/views.py and the background report jobs in exports/reports.py.
+"""
+from django.db.models import Count
+
+from backend.csv_export import EXPORT_CHUNK_SIZE
+from orders.inventory import InventoryManager
+
+PRODUCT_EXPORT_HEADER = ['id', 'name', 'slug', 'category', 'base_price', 'is_archived', 'variant_count', 'created_at']
+
+LOW_STOCK_EXPORT_HEADER = [
+    'type', 'product_id', 'product_name', 'variant_or_drop_id', 'sku',
+    'available_quantity', 'low_stock_threshold', 'reserved_quantity', 'stock_quantity',
+]
+
+
+def product_export_rows(queryset):
+    """One row per product in `queryset`, fetched as tuples in chunks."""
+    products = (
+        queryset
+        .prefetch_related(None)
+        .annotate(variant_count=Count('variants', distinct=True))
+        .values_list('id', 'name', 'slug', 'category__name', 'base_price', 'is_archived', 'variant_count', 'created_at')
+    )
+    for product_id, name, slug, category_name, base_price, is_archived, variant_count, created_at in products.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [product_id, name, slug, category_name or '', base_price, is_archived, variant_count, created_at.isoformat()]
+
+
+def low_stock_export_rows():
+    """Low stock variants followed by low stock drop products."""
+    low_stock_data = InventoryManager.get_low_stock_items()
+    for variant in low_stock_data['variants'].iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            'variant',
+            variant.product.id,
+            variant.product.name,
+            variant.id,
+            f"{variant.product.sku_prefix}-{variant.sku_suffix}",
+            variant.available_quantity,
+            variant.low_stock_threshold,
+            variant.reserved_quantity,
+            variant.stock_quantity
+        ]
+    for drop in low_stock_data['drop_products'].iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            'drop_product',
+            drop.product.id,
+            drop.product.name,
+            drop.id,
+            '',
+            drop.available_quantity,
+            drop.low_stock_threshold,
+            drop.reserved_quantity,
+            drop.current_stock_quantity
+        ]
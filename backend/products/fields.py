@@ -0,0 +1,36 @@
+# products/fields.py
+import json
+
+from django.contrib.postgres.fields import ArrayField
+
+
+class TagArrayField(ArrayField):
+    """
+    PostgreSQL ArrayField that degrades to a JSON-encoded text column on other
+    databases, so the schema can be created on SQLite for local runs and benchmarks.
+    On PostgreSQL it behaves exactly like ArrayField (same column type and lookups).
+    """
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return super().db_type(connection)
+        return 'text'
+
+    def get_placeholder(self, value, compiler, connection):
+        if connection.vendor == 'postgresql':
+            return super().get_placeholder(value, compiler, connection)
+        return '%s'
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if connection.vendor != 'postgresql' and isinstance(value, (list, tuple)):
+            return json.dumps(list(value))
+        return value
+
+    def from_db_value(self, value, expression, connection):
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                return [value]
+        return value
@@ -1,11 +1,15 @@
 # products/filters.py
 from django_filters import rest_framework as filters
 from .models import Product
+from .category_tree import get_category_node
 
 class ProductFilter(filters.FilterSet):
     # Custom filter for tags: allows filtering by a single tag contained in the JSON array
     # Example URL: /api/v1/products/?tags=electronics
     tags = filters.CharFilter(method='filter_tags_contains')
+    # Category filter includes every subcategory of the given category
+    # Example URL: /api/v1/products/?category__slug=clothing  (also matches t-shirts, hoodies, ...)
+    category__slug = filters.CharFilter(method='filter_category_subtree')
 
     class Meta:
         model = Product
@@ -14,6 +18,18 @@ class ProductFilter(filters.FilterSet):
             # 'base_price': ['exact', 'lt', 'gt', 'lte', 'gte'], # Example for other fields
         }
 
+    def filter_category_subtree(self, queryset, name, value):
+        # Resolve the slug from the cached category tree, then match the whole subtree
+        # with one indexed prefix predicate on the materialized path.
+        if not value:
+            return queryset
+        node = get_category_node(slug=value)
+        if node is None:
+            return queryset.none()
+        if not node['path']:
+            return queryset.filter(category__slug=value)
+        return queryset.filter(category__path__startswith=node['path'])
+
     def filter_tags_contains(self, queryset, name, value):
         # This method assumes 'tags' is a JSONField storing a list of strings.
         # For PostgreSQL ArrayField, you might use different lookups like __contains=[value]
@@ -1,6 +1,6 @@
 # Generated by Django 5.2.1 on 2025-05-18 01:56
 
-import django.contrib.postgres.fields
+import products.fields
 import django.db.models.deletion
 from django.db import migrations, models
 
@@ -39,7 +39,7 @@ class Migration(migrations.Migration):
                 ('sku_prefix', models.CharField(blank=True, max_length=50, null=True, unique=True)),
                 ('description', models.TextField(blank=True, null=True)),
                 ('base_price', models.DecimalField(decimal_places=2, max_digits=10)),
-                ('tags', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=50), blank=True, default=list, size=None)),
+                ('tags', products.fields.TagArrayField(base_field=models.CharField(max_length=50), blank=True, default=list, size=None)),
                 ('is_archived', models.BooleanField(default=False)),
                 ('created_at', models.DateTimeField(auto_now_add=True)),
                 ('updated_at', models.DateTimeField(auto_now=True)),
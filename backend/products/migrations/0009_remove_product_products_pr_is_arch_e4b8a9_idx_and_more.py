@@ -1,6 +1,6 @@
 # Generated by Django 5.2.1 on 2025-06-15 09:35
 
-import django.contrib.postgres.fields
+import products.fields
 from django.db import migrations, models
 
 
@@ -79,6 +79,6 @@ class Migration(migrations.Migration):
         migrations.AlterField(
             model_name='product',
             name='tags',
-            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=50), blank=True, db_index=True, default=list, size=None),
+            field=products.fields.TagArrayField(base_field=models.CharField(max_length=50), blank=True, db_index=True, default=list, size=None),
         ),
     ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_productvariant_low_stock_threshold_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_archived', 'created_at', 'id'], name='products_pr_is_arch_93653e_idx'),
+        ),
+    ]
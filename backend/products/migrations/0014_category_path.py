@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+def populate_category_paths(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    parents = dict(Category.objects.values_list('pk', 'parent_category_id'))
+    paths = {}
+
+    def build(pk, seen=()):
+        if pk not in paths:
+            parent_id = parents.get(pk)
+            prefix = build(parent_id, seen + (pk,)) if parent_id in parents and parent_id not in seen else ''
+            paths[pk] = prefix + '{:06d}/'.format(pk)
+        return paths[pk]
+
+    categories = list(Category.objects.only('pk', 'path'))
+    for category in categories:
+        category.path = build(category.pk)
+    Category.objects.bulk_update(categories, ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_product_products_pr_is_arch_93653e_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_category_paths, migrations.RunPython.noop),
+    ]
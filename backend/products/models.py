@@ -1,6 +1,9 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
 from django.utils.text import slugify
-from django.contrib.postgres.fields import ArrayField  # PostgreSQL optimized field
+from .fields import TagArrayField  # PostgreSQL ArrayField (JSON text on SQLite)
 from .storage import CloudflareR2Storage
 from django.conf import settings
 from .image_utils import optimize_image_for_upload
@@ -58,8 +61,14 @@ class Category(models.Model):
         storage=get_storage()
     )
     is_active = models.BooleanField(default=True, db_index=True)  # Add index for filtering
+    # Materialized path of zero-padded ids from the root, e.g. "000001/000007/".
+    # A subtree is every category whose path starts with this one's (indexed prefix match).
+    path = models.CharField(max_length=255, blank=True, default='', editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # Add index for ordering
     updated_at = models.DateTimeField(auto_now=True)
+
+    PATH_SEGMENT_FORMAT = '{:06d}/'
+    CYCLE_MESSAGE = "A category cannot be moved under itself or one of its subcategories."
     
     def save(self, *args, **kwargs):
         # Convert image to WebP if needed
@@ -68,8 +77,87 @@ class Category(models.Model):
         
         if not self.slug:
             self.slug = slugify(self.name)
+
+        parent_path = ''
+        if self.parent_category_id:
+            parent_path = Category.objects.filter(pk=self.parent_category_id).values_list('path', flat=True).first() or ''
+            if self.path and parent_path.startswith(self.path):
+                # clean() and CategorySerializer reject this as a validation error first
+                raise ValueError(self.CYCLE_MESSAGE)
+
+        old_path = self.path
         super().save(*args, **kwargs)
 
+        new_path = parent_path + self.PATH_SEGMENT_FORMAT.format(self.pk)
+        if new_path != old_path:
+            Category.objects.filter(pk=self.pk).update(path=new_path)
+            if old_path:
+                # Re-root the whole subtree in one statement
+                Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(new_path), Substr('path', len(old_path) + 1))
+                )
+            self.path = new_path
+
+    def is_own_subtree(self, parent_id):
+        """Whether `parent_id` is this category or one of its subcategories."""
+        if not (self.pk and parent_id and self.path):
+            return False
+        parent_path = Category.objects.filter(pk=parent_id).values_list('path', flat=True).first() or ''
+        return parent_path.startswith(self.path)
+
+    def clean(self):
+        super().clean()
+        if self.is_own_subtree(self.parent_category_id):
+            raise ValidationError({'parent_category': self.CYCLE_MESSAGE})
+
+    @classmethod
+    def reroot_orphans(cls, path):
+        """
+        Re-root the subtrees of a deleted category whose path was `path`: its
+        children were detached with SET_NULL, so each becomes a root and its
+        subtree's paths are rewritten in one statement per child.
+        """
+        children = list(cls.objects.filter(path__startswith=path, parent_category__isnull=True).values_list('pk', 'path'))
+        for pk, old_path in children:
+            new_path = cls.PATH_SEGMENT_FORMAT.format(pk)
+            cls.objects.filter(path__startswith=old_path).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1))
+            )
+        return len(children)
+
+    @classmethod
+    def rebuild_paths(cls):
+        """Recompute every category path from parent_category (repairs paths written outside save())."""
+        rows = {pk: parent_id for pk, parent_id in cls.objects.values_list('pk', 'parent_category_id')}
+        paths = {}
+
+        def build(pk, seen=()):
+            if pk not in paths:
+                parent_id = rows.get(pk)
+                prefix = build(parent_id, seen + (pk,)) if parent_id in rows and parent_id not in seen else ''
+                paths[pk] = prefix + cls.PATH_SEGMENT_FORMAT.format(pk)
+            return paths[pk]
+
+        changed = []
+        for category in cls.objects.only('pk', 'path'):
+            path = build(category.pk)
+            if category.path != path:
+                category.path = path
+                changed.append(category)
+        cls.objects.bulk_update(changed, ['path'], batch_size=500)
+        return len(changed)
+
+    def get_descendants(self, include_self=True):
+        """All categories in this subtree, resolved with a single prefix predicate."""
+        queryset = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+
+    @property
+    def depth(self):
+        return self.path.count('/') - 1 if self.path else 0
+
     def __str__(self):
         return self.name
         
@@ -145,10 +233,15 @@ class Product(models.Model):
     base_price = models.DecimalField(max_digits=10, decimal_places=2, db_index=True)  # Add index for price sorting
     # Add buyNowLink field for external payment links
     buy_now_link = models.URLField(max_length=500, blank=True, null=True, help_text="External payment link for Buy Now functionality")
-    tags = ArrayField(models.CharField(max_length=50), blank=True, default=list, db_index=True)  # Add index for tag filtering
+    tags = TagArrayField(models.CharField(max_length=50), blank=True, default=list, db_index=True)  # Add index for tag filtering
     is_archived = models.BooleanField(default=False, db_index=True)  # Add index for filtering
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # Add index for ordering
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_archived', 'created_at', 'id']),  # Keyset pagination for catalog listing
+        ]
     
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -395,9 +488,10 @@ class ProductVariant(models.Model):
         """Check if we can reserve the specified quantity"""
         return self.available_quantity >= quantity
 
-    def reserve_stock(self, quantity):
+    def reserve_stock(self, quantity, order_id=None):
         """Reserve stock for an order. Returns True if successful."""
         from django.db import transaction
+        from orders.inventory import InventoryLedger
         
         with transaction.atomic():
             # Reload from database to get latest stock levels
@@ -406,32 +500,46 @@ class ProductVariant(models.Model):
             if variant.available_quantity >= quantity:
                 variant.reserved_quantity += quantity
                 variant.save(update_fields=['reserved_quantity'])
+                InventoryLedger.log(variant, InventoryLedger.RESERVE, reserved_delta=quantity, order_id=order_id)
                 # Update current instance
                 self.reserved_quantity = variant.reserved_quantity
                 return True
             return False
 
-    def release_reservation(self, quantity):
+    def release_reservation(self, quantity, order_id=None, reason=None):
         """Release reserved stock (e.g., when order is cancelled)"""
         from django.db import transaction
+        from orders.inventory import InventoryLedger
         
         with transaction.atomic():
             variant = ProductVariant.objects.select_for_update().get(pk=self.pk)
+            reserved_before = variant.reserved_quantity
             variant.reserved_quantity = max(0, variant.reserved_quantity - quantity)
             variant.save(update_fields=['reserved_quantity'])
+            InventoryLedger.log(
+                variant, reason or InventoryLedger.RELEASE,
+                reserved_delta=variant.reserved_quantity - reserved_before, order_id=order_id
+            )
             # Update current instance
             self.reserved_quantity = variant.reserved_quantity
 
-    def fulfill_order(self, quantity):
+    def fulfill_order(self, quantity, order_id=None):
         """Fulfill an order by reducing both reserved and total stock"""
         from django.db import transaction
+        from orders.inventory import InventoryLedger
         
         with transaction.atomic():
             variant = ProductVariant.objects.select_for_update().get(pk=self.pk)
+            stock_before, reserved_before = variant.stock_quantity, variant.reserved_quantity
             # Reduce both reserved and total stock
             variant.reserved_quantity = max(0, variant.reserved_quantity - quantity)
             variant.stock_quantity = max(0, variant.stock_quantity - quantity)
             variant.save(update_fields=['reserved_quantity', 'stock_quantity'])
+            InventoryLedger.log(
+                variant, InventoryLedger.FULFILL,
+                stock_delta=variant.stock_quantity - stock_before,
+                reserved_delta=variant.reserved_quantity - reserved_before, order_id=order_id
+            )
             # Update current instance
             self.reserved_quantity = variant.reserved_quantity
             self.stock_quantity = variant.stock_quantity
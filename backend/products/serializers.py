@@ -135,6 +135,11 @@ class CategorySerializer(serializers.ModelSerializer):
         current_language = translation.get_language()
         return obj.get_translated_description(current_language)
 
+    def validate_parent_category(self, value):
+        if value and self.instance and self.instance.is_own_subtree(value.pk):
+            raise serializers.ValidationError(Category.CYCLE_MESSAGE)
+        return value
+
     def get_subcategories(self, obj):
         # Recursive serialization for subcategories
         return CategorySerializer(obj.subcategories.filter(is_active=True), many=True, context=self.context).data
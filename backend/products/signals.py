@@ -0,0 +1,22 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Category, CategoryTranslation
+from .category_tree import invalidate_category_tree
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, **kwargs):
+    """Refresh the cached category tree when a category changes"""
+    invalidate_category_tree()
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    """Children were detached with SET_NULL, so their subtrees must be re-rooted"""
+    if instance.path:
+        Category.reroot_orphans(instance.path)
+    invalidate_category_tree()
+
+@receiver(post_save, sender=CategoryTranslation)
+@receiver(post_delete, sender=CategoryTranslation)
+def category_translation_changed(sender, instance, **kwargs):
+    """Translations are part of the cached tree"""
+    invalidate_category_tree()
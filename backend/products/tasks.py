@@ -0,0 +1,14 @@
+# products/tasks.py
+"""Image processing as a job (see jobs/registry.py)."""
+from datetime import timedelta
+
+from jobs.registry import run_command, schedule, task
+
+
+@task('products.convert_images_to_webp', concurrency=1, lease_seconds=1800, max_attempts=2)
+def convert_images_to_webp(model='all'):
+    """Convert stored images that are not WebP yet (uploads are converted on save)."""
+    return run_command('convert_images_to_webp', model=model)
+
+
+schedule('products.convert_images_to_webp', every=timedelta(days=1))
@@ -1,3 +1,80 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from .models import Category, Product
+from .serializers import CategorySerializer
+
+VIEW_MIDDLEWARE = [m for m in settings.MIDDLEWARE if not m.startswith('django.middleware.cache.')]
+
+
+def segment(category):
+    return Category.PATH_SEGMENT_FORMAT.format(category.pk)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, MIDDLEWARE=VIEW_MIDDLEWARE)
+class CategoryPathTests(APITestCase):
+    def setUp(self):
+        self.clothing = Category.objects.create(name='Clothing')
+        self.tops = Category.objects.create(name='Tops', parent_category=self.clothing)
+        self.tees = Category.objects.create(name='Tees', parent_category=self.tops)
+        self.shoes = Category.objects.create(name='Shoes')
+
+    def path(self, category):
+        return Category.objects.values_list('path', flat=True).get(pk=category.pk)
+
+    def test_paths_follow_the_parent_chain(self):
+        self.assertEqual(self.path(self.clothing), segment(self.clothing))
+        self.assertEqual(self.path(self.tees), segment(self.clothing) + segment(self.tops) + segment(self.tees))
+        self.assertEqual(set(self.clothing.get_descendants(include_self=False)), {self.tops, self.tees})
+
+    def test_moving_a_category_re_roots_its_subtree(self):
+        self.tops.parent_category = self.shoes
+        self.tops.save()
+        self.assertEqual(self.path(self.tops), segment(self.shoes) + segment(self.tops))
+        self.assertEqual(self.path(self.tees), segment(self.shoes) + segment(self.tops) + segment(self.tees))
+        self.assertEqual(self.path(self.clothing), segment(self.clothing))
+
+    def test_cycles_are_validation_errors(self):
+        self.clothing.parent_category = self.tees
+        with self.assertRaises(ValidationError) as raised:
+            self.clothing.full_clean()
+        self.assertIn('parent_category', raised.exception.message_dict)
+
+        serializer = CategorySerializer(self.clothing, data={'parent_category': self.tees.pk}, partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('parent_category', serializer.errors)
+
+        serializer = CategorySerializer(self.tees, data={'parent_category': self.shoes.pk}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_deleting_a_category_re_roots_only_its_subtree(self):
+        # A stale path outside the deleted subtree must be left alone
+        Category.objects.filter(pk=self.shoes.pk).update(path='stale/')
+        self.clothing.delete()
+        self.assertEqual(self.path(self.tops), segment(self.tops))
+        self.assertEqual(self.path(self.tees), segment(self.tops) + segment(self.tees))
+        self.assertEqual(self.path(self.shoes), 'stale/')
+
+    def test_category_slug_filter_matches_the_subtree(self):
+        tee = Product.objects.create(name='Tee', base_price=Decimal('10.00'), category=self.tees)
+        sweater = Product.objects.create(name='Sweater', base_price=Decimal('20.00'), category=self.clothing)
+        Product.objects.create(name='Boot', base_price=Decimal('30.00'), category=self.shoes)
+
+        def names(slug):
+            response = self.client.get(reverse('product-list'), {'category__slug': slug})
+            self.assertEqual(response.status_code, 200)
+            return {row['name'] for row in response.data['results']}
+
+        self.assertEqual(names('clothing'), {tee.name, sweater.name})
+        self.assertEqual(names('tops'), {tee.name})
+
+        # Moving a category is picked up by the cached tree
+        self.tops.parent_category = self.shoes
+        self.tops.save()
+        self.assertEqual(names('clothing'), {sweater.name})
+        self.assertEqual(names('shoes'), {tee.name, 'Boot'})
@@ -6,6 +6,7 @@ from django.utils import translation
 from django.conf import settings
 from .models import Category, Product, ProductVariant, ProductImage, Size, Color
 from .filters import ProductFilter # <--- IMPORT YOUR CUSTOM FILTERSET
+from .category_tree import get_category_tree, localize_tree
 from .serializers import (
     CategorySerializer, ProductSerializer,
     ProductVariantSerializer, ProductImageSerializer,
@@ -15,9 +16,11 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-import csv, io
 from orders.inventory import InventoryManager
 from rest_framework import parsers
+from backend.pagination import KeysetPagination
+from backend.csv_export import streaming_csv_response
+from .exports import PRODUCT_EXPORT_HEADER, LOW_STOCK_EXPORT_HEADER, product_export_rows, low_stock_export_rows
 
 class I18nMixin:
     """
@@ -73,6 +76,15 @@ class CategoryViewSet(I18nMixin, viewsets.ReadOnlyModelViewSet): # ReadOnly for
     permission_classes = [permissions.AllowAny] # Categories are public
     lookup_field = 'slug' # Allow lookup by slug
 
+    @action(detail=False, methods=['get'], url_path='tree')
+    def tree(self, request):
+        """
+        Full active category tree (all depths) in one response.
+        Served from the in-process category tree cache, so it costs no queries when warm.
+        """
+        language_code = self.get_serializer_context()['request_language']
+        return Response(localize_tree(get_category_tree(), language_code))
+
 class ProductViewSet(I18nMixin, viewsets.ReadOnlyModelViewSet): # ReadOnly for now
     queryset = Product.objects.filter(is_archived=False).select_related('category').prefetch_related(
         'variants__size', 
@@ -91,6 +103,8 @@ class ProductViewSet(I18nMixin, viewsets.ReadOnlyModelViewSet): # ReadOnly for n
     search_fields = ['name', 'description', 'category__name']
     ordering_fields = ['name', 'base_price', 'created_at']
     ordering = ['-created_at']  # Default ordering
+    pagination_class = KeysetPagination  # ?cursor= for keyset paging, ?page= still supported
+    keyset_ordering = ('-created_at', '-pk')
 
     @action(detail=True, methods=['get'], url_path='check-stock')
     def check_stock(self, request, slug=None):
@@ -162,7 +176,7 @@ class ProductViewSet(I18nMixin, viewsets.ReadOnlyModelViewSet): # ReadOnly for n
                 'available_quantity': drop.available_quantity,
                 'low_stock_threshold': drop.low_stock_threshold,
                 'reserved_quantity': drop.reserved_quantity,
-                'stock_quantity': drop.stock_quantity,
+                'stock_quantity': drop.current_stock_quantity,
             })
         
         return Response({
@@ -173,38 +187,8 @@ class ProductViewSet(I18nMixin, viewsets.ReadOnlyModelViewSet): # ReadOnly for n
 
     @action(detail=False, methods=['get'], url_path='low-stock-export', permission_classes=[permissions.IsAdminUser])
     def low_stock_export(self, request):
-        """Export low stock variants/drop products as CSV."""
-        low_stock_data = InventoryManager.get_low_stock_items()
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['type','product_id','product_name','variant_or_drop_id','sku','available_quantity','low_stock_threshold','reserved_quantity','stock_quantity'])
-        for variant in low_stock_data['variants']:
-            writer.writerow([
-                'variant',
-                variant.product.id,
-                variant.product.name,
-                variant.id,
-                f"{variant.product.sku_prefix}-{variant.sku_suffix}",
-                variant.available_quantity,
-                variant.low_stock_threshold,
-                variant.reserved_quantity,
-                variant.stock_quantity
-            ])
-        for drop in low_stock_data['drop_products']:
-            writer.writerow([
-                'drop_product',
-                drop.product.id,
-                drop.product.name,
-                drop.id,
-                '',
-                drop.available_quantity,
-                drop.low_stock_threshold,
-                drop.reserved_quantity,
-                drop.stock_quantity
-            ])
-        resp = Response(output.getvalue(), content_type='text/csv')
-        resp['Content-Disposition'] = 'attachment; filename="low_stock_export.csv"'
-        return resp
+        """Export low stock variants/drop products as CSV (streamed)."""
+        return streaming_csv_response('low_stock_export.csv', LOW_STOCK_EXPORT_HEADER, low_stock_export_rows())
 
     @action(detail=True, methods=['post'], url_path='create-variants', permission_classes=[permissions.IsAdminUser])
     def create_variants(self, request, slug=None):
@@ -305,25 +289,12 @@ class ProductViewSet(I18nMixin, viewsets.ReadOnlyModelViewSet): # ReadOnly for n
 
     @action(detail=False, methods=['get'], url_path='export-csv', permission_classes=[permissions.IsAdminUser])
     def export_csv(self, request):
-        """Export all (non-archived) products with basic info as CSV."""
-        products = self.filter_queryset(self.get_queryset())  # apply filters if provided
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['id','name','slug','category','base_price','is_archived','variant_count','created_at'])
-        for p in products:
-            writer.writerow([
-                p.id,
-                p.name,
-                p.slug,
-                p.category.name if p.category else '',
-                p.base_price,
-                p.is_archived,
-                p.variants.count(),
-                p.created_at.isoformat()
-            ])
-        resp = Response(output.getvalue(), content_type='text/csv')
-        resp['Content-Disposition'] = 'attachment; filename="products_export.csv"'
-        return resp
+        """Export all (non-archived) products with basic info as CSV (streamed)."""
+        return streaming_csv_response(
+            'products_export.csv',
+            PRODUCT_EXPORT_HEADER,
+            product_export_rows(self.filter_queryset(self.get_queryset()))  # apply filters if provided
+        )
 
 class AdminProductViewSet(viewsets.ModelViewSet):
     """Full CRUD for products for admin usage"""
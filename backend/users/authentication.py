@@ -1,16 +1,38 @@
 """
-Custom authentication serializers and views that require email verification.
+Custom authentication serializers and views that require email verification,
+and the token serializers that stamp auth claims (see users/token_claims.py).
 """
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import authenticate
 from .models import User
+from .token_claims import TokenClaims
 
 
-class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login serializer issuing tokens that carry the auth claims."""
+
+    @classmethod
+    def get_token(cls, user):
+        return TokenClaims.stamp(super().get_token(user), user)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh serializer that stamps the user's current claims onto the new tokens."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.payload.get(api_settings.USER_ID_CLAIM)).first()
+        if user is not None:
+            attrs = {**attrs, 'refresh': str(TokenClaims.stamp(refresh, user))}
+        return super().validate(attrs)
+
+
+class CustomTokenObtainPairSerializer(ClaimsTokenObtainPairSerializer):
     """
     Custom JWT token serializer that checks if user is verified before allowing login.
     """
@@ -7,6 +7,7 @@ from django.conf import settings
 from django.core.mail.backends.base import BaseEmailBackend
 from django.core.mail.message import EmailMessage, EmailMultiAlternatives
 import logging
+from backend.metrics import observe_external
 
 logger = logging.getLogger(__name__)
 
@@ -94,7 +95,8 @@ class ResendAPIBackend(BaseEmailBackend):
                     email_data["headers"] = headers
             
             # Send email via Resend API
-            response = resend.Emails.send(email_data)
+            with observe_external('resend', 'send'):
+                response = resend.Emails.send(email_data)
             
             if response and hasattr(response, 'id'):
                 logger.info(f"Email sent successfully via Resend. ID: {response.id}")
@@ -1,18 +1,40 @@
 """
-Email utilities for sending templated emails using Resend or SMTP.
+Email utilities for sending templated emails through the email outbox
+(delivered via Resend or SMTP by `manage.py send_queued_emails`).
 """
-from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.template import TemplateDoesNotExist
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils.html import strip_tags
+from outbox.service import EmailOutbox
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def render_templated_email(template_name, context):
+    """
+    Render emails/<template_name>.html and its .txt counterpart, falling back to
+    the stripped HTML when there is no text template.
+    
+    Returns:
+        tuple: (text_content, html_content)
+    """
+    html_content = render_to_string(f'emails/{template_name}.html', context)
+    try:
+        text_content = render_to_string(f'emails/{template_name}.txt', context)
+    except TemplateDoesNotExist:
+        text_content = strip_tags(html_content)
+    return text_content, html_content
+
+
 def send_templated_email(subject, template_name, context, to_emails, from_email=None):
     """
-    Send a templated email with both HTML and text versions.
+    Render a templated email with both HTML and text versions and queue it in the
+    email outbox. The outbox worker (`manage.py send_queued_emails`) delivers it, so
+    call this inside the transaction that makes the change the email is about: the
+    email is only sent if that transaction commits.
     
     Args:
         subject (str): Email subject line
@@ -22,43 +44,30 @@ def send_templated_email(subject, template_name, context, to_emails, from_email=
         from_email (str): Sender email (optional)
     
     Returns:
-        bool: True if email was sent successfully, False otherwise
+        bool: True if email was queued successfully, False otherwise
     """
     if from_email is None:
         from_email = settings.DEFAULT_FROM_EMAIL
     
     try:
-        # Render HTML template
-        html_template = f'emails/{template_name}.html'
-        html_content = render_to_string(html_template, context)
-        
-        # Render text template (fallback to stripped HTML if no text template)
-        text_template = f'emails/{template_name}.txt'
-        try:
-            text_content = render_to_string(text_template, context)
-        except:
-            # Fallback to stripped HTML
-            text_content = strip_tags(html_content)
-        
-        # Create email message
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=from_email,
-            to=to_emails
-        )
-        
-        # Attach HTML alternative
-        email.attach_alternative(html_content, "text/html")
+        text_content, html_content = render_templated_email(template_name, context)
         
-        # Send email
-        email.send()
+        # Savepoint: a failed insert must not break the caller's transaction
+        with transaction.atomic():
+            email = EmailOutbox.enqueue(
+                to=to_emails,
+                subject=subject,
+                text_body=text_content,
+                html_body=html_content,
+                from_email=from_email,
+                category=template_name,
+            )
         
-        logger.info(f"Email sent successfully to {to_emails}")
+        logger.info(f"Email {email.pk} queued for {to_emails}")
         return True
         
     except Exception as e:
-        logger.error(f"Failed to send email to {to_emails}: {e}")
+        logger.error(f"Failed to queue email to {to_emails}: {e}")
         return False
 
 
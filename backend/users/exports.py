@@ -0,0 +1,19 @@
+# users/exports.py
+"""
+CSV rows for the user export, shared by the streamed AdminUserViewSet.export action
+and the background report jobs in exports/reports.py.
+"""
+from backend.csv_export import EXPORT_CHUNK_SIZE
+
+USER_EXPORT_HEADER = [
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_verified', 'date_joined', 'last_login',
+]
+
+
+def user_export_rows(queryset):
+    """One row per user in `queryset`, fetched as tuples in chunks."""
+    users = queryset.values_list(*USER_EXPORT_HEADER)
+    for row in users.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        *fields, date_joined, last_login = row
+        yield fields + [date_joined.isoformat(), last_login.isoformat() if last_login else '']
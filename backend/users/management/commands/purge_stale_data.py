@@ -0,0 +1,119 @@
+"""
+Django Management Command: Purge Stale Data
+
+Applies the retention policies in backend/retention.py: abandoned guest carts,
+settled inventory reservations, old notifications, ledger history, delivered
+outbox emails, finished export and background jobs and job metrics. Rows are
+deleted in chunks ordered by their timestamp index, with a pause between chunks
+so long-running purges don't hold locks or build replication lag.
+Runs daily as the users.purge_stale_data job (`manage.py run_jobs`).
+
+Usage:
+    python manage.py purge_stale_data
+    python manage.py purge_stale_data --dry-run
+    python manage.py purge_stale_data --policy guest_carts --chunk-size 500 --pause 1
+    python manage.py purge_stale_data --list
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from backend.retention import get_policies, purge
+
+class Command(BaseCommand):
+    help = 'Delete rows that have outlived their retention policy, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many rows would be deleted without deleting them',
+        )
+        parser.add_argument(
+            '--policy',
+            action='append',
+            dest='policies',
+            help='Only run this policy (repeatable; default: all)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per transaction (default: 1000)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.5,
+            help='Seconds to sleep between chunks (default: 0.5)',
+        )
+        parser.add_argument(
+            '--max-chunks',
+            type=int,
+            default=None,
+            help='Stop each policy after this many chunks',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List the retention policies and exit',
+        )
+
+    def handle(self, *args, **options):
+        """Run the selected retention policies."""
+        try:
+            policies = get_policies(options['policies'])
+        except KeyError as e:
+            raise CommandError(f'Unknown retention policy: {e.args[0]}')
+
+        if options['list']:
+            for policy in policies:
+                self.stdout.write(f'{policy.name}: {policy.model_label}, older than {policy.days} days - {policy.description}')
+            return
+
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        total_rows = 0
+        total_bytes = 0
+        for policy in policies:
+            result = purge(
+                policy,
+                chunk_size=options['chunk_size'],
+                pause=options['pause'],
+                dry_run=options['dry_run'],
+                max_chunks=options['max_chunks'],
+            )
+            total_rows += result.total_rows
+            if total_bytes is not None and result.total_rows:
+                size = result.bytes_reclaimed
+                total_bytes = total_bytes + size if size is not None else None
+            self.report(result)
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        style = self.style.WARNING if options['dry_run'] else self.style.SUCCESS
+        prefix = 'DRY RUN: ' if options['dry_run'] else ''
+        size_text = f'~{self.format_bytes(total_bytes)}' if total_bytes is not None else 'size n/a'
+        self.stdout.write(style(f'{prefix}{verb} {total_rows} rows ({size_text} reclaimable after VACUUM)'))
+
+    def report(self, result):
+        policy = result.policy
+        size = result.bytes_reclaimed
+        size_text = f'~{self.format_bytes(size)}' if size is not None else 'size n/a'
+        if result.dry_run:
+            self.stdout.write(
+                self.style.WARNING(f'DRY RUN: {policy.name} would delete {result.total_rows} rows ({size_text})')
+            )
+            return
+        self.stdout.write(
+            f'{policy.name}: {result.total_rows} rows in {result.chunks} chunks, '
+            f'{size_text}, {result.elapsed:.1f}s'
+        )
+        for label, count in sorted(result.rows.items()):
+            self.stdout.write(f'  {label}: {count}')
+
+    @staticmethod
+    def format_bytes(size):
+        for unit in ('B', 'KB', 'MB', 'GB'):
+            if size < 1024:
+                return f'{size:.0f} {unit}'
+            size /= 1024
+        return f'{size:.1f} TB'
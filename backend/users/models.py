@@ -12,6 +12,8 @@ class User(AbstractUser):
     # created_at is handled by date_joined from AbstractUser
     updated_at = models.DateTimeField(_("updated at"), auto_now=True)
     # is_admin is handled by is_staff from AbstractUser
+    # Bumped whenever a field copied into JWT claims changes (users/token_claims.py)
+    auth_version = models.PositiveIntegerField(_("auth version"), default=0, editable=False)
 
     # Add email to REQUIRED_FIELDS if it's not already (AbstractUser usually has it)
     # REQUIRED_FIELDS = ['email', 'first_name', 'last_name'] # Customize as needed
@@ -19,6 +21,27 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['date_joined', 'id']),  # Keyset pagination for admin user listing
+        ]
+
+class ClaimsUser(User):
+    """
+    A user built from access token claims instead of a database row
+    (users.token_claims.ClaimsJWTAuthentication). Only the claim fields are
+    loaded; touching any other field loads the rest of the row in one query.
+    """
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+
 ADDRESS_TYPE_CHOICES = [
     ('shipping', 'Shipping'),
     ('billing', 'Billing'),
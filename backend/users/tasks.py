@@ -0,0 +1,29 @@
+# users/tasks.py
+"""Background jobs for waitlist conversion and data maintenance (see jobs/registry.py)."""
+from datetime import timedelta
+
+from jobs.registry import run_command, schedule, task
+from .waitlist import WaitlistPipeline
+
+
+@task('users.process_waitlist', concurrency=1, lease_seconds=600)
+def process_waitlist(batch_size=500, workers=1):
+    """Hashes in the job worker's thread by default; the per-minute batches are small."""
+    with WaitlistPipeline(batch_size=batch_size, workers=workers) as pipeline:
+        return pipeline.run()
+
+
+@task('users.cleanup_sessions', concurrency=1, lease_seconds=600)
+def cleanup_sessions():
+    return run_command('cleanup_sessions')
+
+
+@task('users.purge_stale_data', concurrency=1, lease_seconds=1800, max_attempts=1)
+def purge_stale_data():
+    """Retention purge (backend/retention.py); the next daily run picks up anything left."""
+    return run_command('purge_stale_data')
+
+
+schedule('users.process_waitlist', every=timedelta(minutes=1))
+schedule('users.cleanup_sessions', every=timedelta(days=1))
+schedule('users.purge_stale_data', every=timedelta(days=1))
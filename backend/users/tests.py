@@ -1,3 +1,121 @@
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from outbox.models import OutboundEmail
+from . import token_claims
+from .models import WaitlistSubscriber
+from .waitlist import WaitlistPipeline, resolve_usernames
+
+User = get_user_model()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class WaitlistPipelineTests(TestCase):
+    def test_resolve_usernames_skips_taken_and_repeated_names(self):
+        User.objects.create_user(username='anna', email='anna@old.example.com')
+        User.objects.create_user(username='anna1', email='anna1@old.example.com')
+        self.assertEqual(resolve_usernames(['anna', 'anna', 'boris']), ['anna2', 'anna3', 'boris'])
+
+    def test_batches_create_accounts_and_queue_welcome_emails(self):
+        User.objects.create_user(username='taken', email='existing@example.com', phone_number='+100')
+        WaitlistSubscriber.objects.create(email='existing@example.com')
+        WaitlistSubscriber.objects.create(email='anna@example.com', name='Anna Maria Lee', phone_number='+100')
+        WaitlistSubscriber.objects.create(email='anna@example.org', phone_number='+200')
+
+        with WaitlistPipeline(batch_size=2, workers=1) as pipeline:
+            totals = pipeline.run()
+
+        self.assertEqual(totals, {'created': 2, 'existing': 1, 'errors': 0, 'batches': 2})
+        self.assertFalse(WaitlistSubscriber.objects.filter(is_processed=False).exists())
+
+        first = User.objects.get(email='anna@example.com')
+        self.assertEqual((first.username, first.first_name, first.last_name), ('anna', 'Anna', 'Maria Lee'))
+        self.assertIsNone(first.phone_number)  # Already used by another account
+        self.assertFalse(first.is_verified)
+        second = User.objects.get(email='anna@example.org')
+        self.assertEqual((second.username, second.phone_number), ('anna1', '+200'))
+
+        emails = OutboundEmail.objects.filter(category='waitlist_welcome').order_by('id')
+        self.assertEqual([email.to for email in emails], [['anna@example.com'], ['anna@example.org']])
+        password = emails[0].text_body.split('Temporary Password: ')[1].split()[0]
+        self.assertTrue(first.check_password(password))
+
+        with WaitlistPipeline(workers=1) as pipeline:
+            self.assertEqual(pipeline.run()['batches'], 0)
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    # The page cache would answer repeated GETs before authentication runs
+    MIDDLEWARE=[m for m in settings.MIDDLEWARE if not m.startswith('django.middleware.cache.')],
+)
+class ClaimsJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        token_claims._local_versions.clear()
+        self.user = User.objects.create_user(username='buyer', email='buyer@example.com', password='pass1234', is_verified=True)
+        tokens = self.client.post(reverse('token_obtain_pair'), {'username': 'buyer', 'password': 'pass1234'}).data
+        self.access, self.refresh = tokens['access'], tokens['refresh']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in captured if 'FROM "users_user"' in q['sql']]
+
+    def test_identity_only_requests_skip_the_user_table(self):
+        claims = AccessToken(self.access)
+        self.assertEqual((claims['username'], claims['is_staff'], claims['is_verified'], claims['ver']), ('buyer', False, True, 0))
+
+        self.client.get(reverse('address-list'))  # Caches the auth version
+        response, queries = self.user_queries(reverse('address-list'))
+        self.assertEqual((response.status_code, queries), (200, []))
+
+        request_user = self.client.get(reverse('address-list')).wsgi_request.user
+        self.assertEqual((request_user.pk, request_user), (self.user.pk, self.user))
+
+        # Fields outside the claims load together, on first use
+        response, queries = self.user_queries(reverse('user_profile'))
+        self.assertEqual((response.data['email'], len(queries)), ('buyer@example.com', 1))
+
+    def test_changed_flags_fall_back_to_the_row_until_refresh(self):
+        self.assertEqual(self.client.get(reverse('admin-order-list')).status_code, 403)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = True
+            self.user.save()
+        self.assertEqual(self.client.get(reverse('admin-order-list')).status_code, 200)
+
+        access = self.client.post(reverse('token_refresh'), {'refresh': self.refresh}).data['access']
+        self.assertEqual((AccessToken(access)['is_staff'], AccessToken(access)['ver']), (True, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.last_login = None
+            self.user.save(update_fields=['last_login'])  # Not a claim: tokens stay current
+        self.assertEqual(User.objects.get(pk=self.user.pk).auth_version, 1)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(reverse('address-list'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get(reverse('address-list')).status_code, 401)
+
+    def test_bulk_deactivated_user_is_rejected(self):
+        self.client.get(reverse('address-list'))
+        admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='pass1234')
+        admin_access = self.client.post(reverse('token_obtain_pair'), {'username': 'admin', 'password': 'pass1234'}).data['access']
+        admin_client = APIClient()
+        admin_client.credentials(HTTP_AUTHORIZATION=f'Bearer {admin_access}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = admin_client.post(
+                reverse('admin-user-bulk-action'), {'action': 'deactivate', 'ids': [self.user.pk]}, format='json'
+            )
+        self.assertEqual(response.data, {'updated': 1})
+        self.assertEqual(self.client.get(reverse('address-list')).status_code, 401)
@@ -0,0 +1,152 @@
+# users/token_claims.py
+"""
+Auth claims carried in JWTs, so requests can be authenticated without reading
+the users table (ClaimsJWTAuthentication).
+
+Access and refresh tokens carry the user's auth flags (TokenClaims.FIELDS) and
+auth_version. The claims are trusted while the token's version matches the
+user's current one, and the user is built from them (models.ClaimsUser); fields
+outside the claims load on first access. The current version is looked up in a
+per-process map (JWT_CLAIMS_LOCAL_SECONDS) backed by the shared cache and, on a
+miss, the database.
+
+Saving a user with a changed claim field bumps auth_version (signals below), so
+tokens issued before the change stop taking the fast path within
+JWT_CLAIMS_LOCAL_SECONDS and are checked against the database row again, exactly
+like plain JWTAuthentication. Refreshing a token stamps the current claims
+(users.authentication.ClaimsTokenRefreshSerializer).
+Bulk updates bypass save(): call AuthVersion.bump() after them.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import F
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from backend.metrics import record_cache
+from .models import ClaimsUser, User
+
+VERSION_CLAIM = 'ver'
+# Upper bound on users remembered by the per-process version map
+LOCAL_VERSIONS_MAX = 10000
+
+_local_versions = {}
+
+
+class AuthVersion:
+    """
+    Service class for the per-user auth version that JWT claims are checked against
+    """
+    KEY_PREFIX = 'auth_version'
+
+    @staticmethod
+    def key(user_id):
+        return f'{AuthVersion.KEY_PREFIX}:{user_id}'
+
+    @staticmethod
+    def current(user_id):
+        """The user's auth_version, or None for an unknown user."""
+        user_id = str(user_id)  # The token's user_id claim is a string
+        now = time.monotonic()
+        entry = _local_versions.get(user_id)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        version = cache.get(AuthVersion.key(user_id))
+        record_cache('auth_version', hits=int(version is not None), misses=int(version is None))
+        if version is None:
+            version = User.objects.filter(pk=user_id).values_list('auth_version', flat=True).first()
+            if version is None:
+                return None
+            # add, not set: a bump that committed meanwhile has already stored the newer value
+            cache.add(AuthVersion.key(user_id), version, getattr(settings, 'JWT_CLAIMS_CACHE_SECONDS', 60 * 60 * 24))
+
+        if len(_local_versions) >= LOCAL_VERSIONS_MAX:
+            _local_versions.clear()
+        _local_versions[user_id] = (version, now + getattr(settings, 'JWT_CLAIMS_LOCAL_SECONDS', 5))
+        return version
+
+    @staticmethod
+    def bump(user_ids):
+        """Invalidate the claims of every token issued so far to these users."""
+        user_ids = list(user_ids)
+        User.objects.filter(pk__in=user_ids).update(auth_version=F('auth_version') + 1)
+
+        def publish():
+            versions = dict(User.objects.filter(pk__in=user_ids).values_list('pk', 'auth_version'))
+            cache.set_many(
+                {AuthVersion.key(pk): version for pk, version in versions.items()},
+                getattr(settings, 'JWT_CLAIMS_CACHE_SECONDS', 60 * 60 * 24)
+            )
+            for pk in user_ids:
+                _local_versions.pop(str(pk), None)
+
+        transaction.on_commit(publish)
+
+
+class TokenClaims:
+    """The user fields copied into tokens; a change to any of them bumps auth_version."""
+    FIELDS = ('username', 'is_active', 'is_staff', 'is_superuser', 'is_verified')
+
+    @staticmethod
+    def stamp(token, user):
+        for field in TokenClaims.FIELDS:
+            token[field] = getattr(user, field)
+        token[VERSION_CLAIM] = user.auth_version
+        return token
+
+    @staticmethod
+    def user(token):
+        """A ClaimsUser holding the token's claims; other fields are deferred."""
+        field_names = ['id', *TokenClaims.FIELDS, 'auth_version']
+        user_id = User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])  # Claimed as a string
+        values = [user_id, *(token[field] for field in TokenClaims.FIELDS), token[VERSION_CLAIM]]
+        return ClaimsUser.from_db(router.db_for_read(User), field_names, values)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that takes the user from the token's claims while they are
+    current (see module docstring), and reads the users table otherwise.
+    """
+
+    def get_user(self, validated_token):
+        if not getattr(settings, 'JWT_CLAIMS_AUTH', True) or VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)  # Tokens issued before claims were added
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or AuthVersion.current(user_id) != validated_token[VERSION_CLAIM]:
+            return super().get_user(validated_token)
+        if not validated_token.get('is_active'):
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return TokenClaims.user(validated_token)
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=ClaimsUser)
+def note_claim_changes(sender, instance, update_fields=None, **kwargs):
+    """Flag saves that change a field copied into tokens"""
+    instance._claims_changed = False
+    if instance.pk is None:
+        return
+    fields = set(TokenClaims.FIELDS) - instance.get_deferred_fields()
+    if update_fields is not None:
+        fields &= set(update_fields)
+    if not fields:
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._claims_changed = stored is not None and any(stored[f] != getattr(instance, f) for f in fields)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ClaimsUser)
+def bump_auth_version(sender, instance, created=False, **kwargs):
+    if getattr(instance, '_claims_changed', False):
+        AuthVersion.bump([instance.pk])
+        instance.auth_version += 1
@@ -1,9 +1,9 @@
 # users/views.py
 from rest_framework import generics, viewsets, status
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
-from django.db.models import Q
-from django.http import HttpResponse
-import csv, io, secrets
+from django.db import transaction
+from django.db.models import Q, Count
+import secrets
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
@@ -17,6 +17,7 @@ import uuid
 import logging
 
 from .models import User, Address, WaitlistSubscriber
+from .token_claims import AuthVersion
 from .serializers import (
     UserSerializer, 
     RegisterSerializer, 
@@ -28,6 +29,9 @@ from .serializers import (
     AdminUserSerializer
 )
 from .email_utils import send_verification_email, send_password_reset_email
+from backend.pagination import KeysetPagination, estimate_count
+from backend.csv_export import streaming_csv_response
+from .exports import USER_EXPORT_HEADER, user_export_rows
 
 logger = logging.getLogger(__name__)
 
@@ -36,24 +40,25 @@ class RegisterView(generics.CreateAPIView):
     permission_classes = (AllowAny,)
     serializer_class = RegisterSerializer
 
+    @transaction.atomic
     def perform_create(self, serializer):
         user = serializer.save()
         
-        # Generate verification token and send email
+        # Generate verification token and queue the email in the same transaction
         token = str(uuid.uuid4())
         user.email_verification_token = token
         user.save()
         
-        # Send verification email using email utility
+        # Queue verification email using email utility
         try:
             success = send_verification_email(user)
             if success:
-                logger.info(f"Verification email sent to {user.email}")
+                logger.info(f"Verification email queued for {user.email}")
             else:
-                logger.error(f"Failed to send verification email to {user.email}")
+                logger.error(f"Failed to queue verification email for {user.email}")
         except Exception as e:
             # Log the error but don't fail registration
-            logger.error(f"Exception sending verification email to {user.email}: {e}")
+            logger.error(f"Exception queueing verification email for {user.email}: {e}")
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
     queryset = User.objects.all()
@@ -90,10 +95,13 @@ class GuestAddressViewSet(generics.CreateAPIView):
 class AdminUserViewSet(viewsets.ModelViewSet):
     """Admin management for users: list, retrieve, partial update.
     Supports filtering (?search=, ?is_active=, ?is_staff=) and ordering (?ordering=field or -field).
-    Extra actions: bulk (POST admin-users/bulk/), export (GET admin-users/export/)."""
+    Extra actions: bulk (POST admin-users/bulk/), export (GET admin-users/export/).
+    Pass ?cursor= for keyset pagination on deep pages."""
     queryset = User.objects.all().order_by('-date_joined')
     serializer_class = AdminUserSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date_joined', '-pk')
     # Include 'post' because we expose a custom bulk POST action
     http_method_names = ['get','patch','post','head','options']
 
@@ -123,17 +131,20 @@ class AdminUserViewSet(viewsets.ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
-        # Append counts summary
-        base_qs = self.filter_queryset(self.get_queryset())  # after filters
-        summary = {
-            'total': User.objects.count(),
-            'active': User.objects.filter(is_active=True).count(),
-            'inactive': User.objects.filter(is_active=False).count(),
-            'staff': User.objects.filter(is_staff=True).count(),
-            'verified': User.objects.filter(is_verified=True).count(),
-            'unverified': User.objects.filter(is_verified=False).count(),
-            'filtered_total': base_qs.count(),
-        }
+        # Append counts summary - one aggregate pass instead of a COUNT(*) per bucket
+        summary = User.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            inactive=Count('id', filter=Q(is_active=False)),
+            staff=Count('id', filter=Q(is_staff=True)),
+            verified=Count('id', filter=Q(is_verified=True)),
+            unverified=Count('id', filter=Q(is_verified=False)),
+        )
+        # Page-number mode already counted the filtered set; keyset mode only estimates it
+        filtered_total = getattr(self.paginator, 'count', None)
+        if filtered_total is None:
+            filtered_total = estimate_count(self.filter_queryset(self.get_queryset()))
+        summary['filtered_total'] = filtered_total
         response.data = { 'summary': summary, **response.data }
         return response
 
@@ -150,6 +161,13 @@ class AdminUserViewSet(viewsets.ModelViewSet):
     def _bulk_qs(ids):
         return User.objects.filter(id__in=ids)
 
+    @staticmethod
+    def _update_claims(qs, **fields):
+        # update() skips the save hooks, so the issued tokens are invalidated here
+        with transaction.atomic():
+            AuthVersion.bump(list(qs.values_list('pk', flat=True)))
+            return qs.update(**fields)
+
     @action(detail=False, methods=['post'], url_path='bulk')
     def bulk_action(self, request):
         action = request.data.get('action')
@@ -159,24 +177,26 @@ class AdminUserViewSet(viewsets.ModelViewSet):
         qs = self._bulk_qs(ids)
         updated = 0
         if action == 'activate':
-            updated = qs.update(is_active=True)
+            updated = self._update_claims(qs, is_active=True)
         elif action == 'deactivate':
             # don't deactivate current user
             qs = qs.exclude(id=request.user.id)
-            updated = qs.update(is_active=False)
+            updated = self._update_claims(qs, is_active=False)
         elif action == 'make_staff':
-            updated = qs.update(is_staff=True)
+            updated = self._update_claims(qs, is_staff=True)
         elif action == 'revoke_staff':
             qs = qs.exclude(id=request.user.id)
-            updated = qs.update(is_staff=False)
+            updated = self._update_claims(qs, is_staff=False)
         elif action == 'resend_verification':
             sent = 0
             for u in qs.filter(is_verified=False):
                 try:
-                    u.email_verification_token = str(uuid.uuid4())
-                    u.save()
-                    send_verification_email(u)
-                    sent += 1
+                    # Token and queued email commit together
+                    with transaction.atomic():
+                        u.email_verification_token = str(uuid.uuid4())
+                        u.save()
+                        if send_verification_email(u):
+                            sent += 1
                 except Exception:  # pragma: no cover
                     continue
             return Response({'sent': sent})
@@ -186,15 +206,8 @@ class AdminUserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='export')
     def export_csv(self, request):
-        qs = self.get_queryset()
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['id','username','email','first_name','last_name','is_active','is_staff','is_verified','date_joined','last_login'])
-        for u in qs[:5000]:  # safety cap
-            writer.writerow([u.id,u.username,u.email,u.first_name,u.last_name,u.is_active,u.is_staff,u.is_verified,u.date_joined.isoformat(),u.last_login.isoformat() if u.last_login else ''])
-        resp = HttpResponse(output.getvalue(), content_type='text/csv')
-        resp['Content-Disposition'] = 'attachment; filename="users_export.csv"'
-        return resp
+        # Streamed in chunks, so no row cap is needed
+        return streaming_csv_response('users_export.csv', USER_EXPORT_HEADER, user_export_rows(self.get_queryset()))
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsAdminUser])
@@ -235,17 +248,18 @@ def password_reset_request(request):
             token = str(uuid.uuid4())
             user.password_reset_token = token
             user.password_reset_expires = timezone.now() + timedelta(hours=1)
-            user.save()
             
-            # Send password reset email using email utility
+            # Save the token and queue the email in one transaction
             try:
-                success = send_password_reset_email(user)
+                with transaction.atomic():
+                    user.save()
+                    success = send_password_reset_email(user)
                 if success:
-                    logger.info(f"Password reset email sent to {user.email}")
+                    logger.info(f"Password reset email queued for {user.email}")
                 else:
-                    logger.error(f"Failed to send password reset email to {user.email}")
+                    logger.error(f"Failed to queue password reset email for {user.email}")
             except Exception as e:
-                logger.error(f"Exception sending password reset email: {e}")
+                logger.error(f"Exception queueing password reset email: {e}")
             
             return Response({'message': 'Письмо для сброса пароля отправлено'}, 
                           status=status.HTTP_200_OK)
@@ -321,13 +335,14 @@ def send_verification_email_view(request):
             # Generate verification token
             token = str(uuid.uuid4())
             user.email_verification_token = token
-            user.save()
             
-            # Send verification email using email utility
+            # Save the token and queue the email in one transaction
             try:
-                success = send_verification_email(user)
+                with transaction.atomic():
+                    user.save()
+                    success = send_verification_email(user)
                 if success:
-                    logger.info(f"Verification email sent to {user.email}")
+                    logger.info(f"Verification email queued for {user.email}")
                     return Response({'message': 'Письмо для подтверждения email отправлено'}, 
                                   status=status.HTTP_200_OK)
                 else:
@@ -0,0 +1,258 @@
+# users/waitlist.py
+"""
+Converts waitlist subscribers into user accounts.
+
+Shared by `manage.py process_waitlist_subscribers` and waitlist_processor_standalone.py.
+Each batch is handled set-wise instead of one subscriber at a time:
+
+  1. existing accounts, taken usernames and taken phone numbers are looked up
+     with one query each, and free usernames are picked in memory;
+  2. temporary passwords are hashed in a process pool, since PBKDF2 is CPU bound;
+  3. users are bulk_created, welcome emails are queued in the email outbox and
+     the subscribers are marked processed, all in one transaction.
+
+That transaction is the checkpoint: a run that stops part way resumes from the
+first unprocessed subscriber, and nothing is half-created. Welcome emails are
+delivered, batched and rate limited, by the outbox worker (`send_queued_emails`).
+"""
+import logging
+import multiprocessing
+import os
+import secrets
+import string
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from outbox.service import EmailOutbox
+from users.email_utils import render_templated_email
+from users.models import WaitlistSubscriber
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+WELCOME_SUBJECT = 'Welcome to Malikli1992 - Your Account is Ready!'
+
+
+def generate_secure_password(length=12):
+    """Random password with at least one lowercase, uppercase, digit and symbol."""
+    characters = string.ascii_letters + string.digits + "!@#$%^&*"
+    password = [
+        secrets.choice(string.ascii_lowercase),
+        secrets.choice(string.ascii_uppercase),
+        secrets.choice(string.digits),
+        secrets.choice("!@#$%^&*")
+    ]
+    password += [secrets.choice(characters) for _ in range(length - 4)]
+    secrets.SystemRandom().shuffle(password)
+    return ''.join(password)
+
+
+def split_name(subscriber):
+    """(first_name, last_name) from the subscriber's name fields."""
+    first_name = subscriber.first_name or ''
+    last_name = subscriber.last_name or ''
+    if subscriber.name and not first_name:
+        name_parts = subscriber.name.strip().split()
+        if name_parts:
+            first_name = name_parts[0]
+            last_name = ' '.join(name_parts[1:])
+    return first_name, last_name
+
+
+def resolve_usernames(base_names):
+    """
+    Pick a free username for each base name, in order: the base itself, else base1,
+    base2, ... Taken names are read with a single query and names handed out earlier
+    in the list count as taken, so duplicate bases get distinct usernames.
+    """
+    bases = set(base_names)
+    taken = set()
+    if bases:
+        query = Q()
+        for base in bases:
+            query |= Q(username__startswith=base)
+        taken = set(User.objects.filter(query).values_list('username', flat=True))
+
+    usernames = []
+    for base in base_names:
+        username, counter = base, 1
+        while username in taken:
+            username = f"{base}{counter}"
+            counter += 1
+        taken.add(username)
+        usernames.append(username)
+    return usernames
+
+
+class WaitlistPipeline:
+    """
+    Processes unprocessed waitlist subscribers in batches of `batch_size`, hashing
+    passwords on `workers` processes (1 hashes in this process). Use as a context
+    manager so the process pool is started once per run.
+    """
+
+    def __init__(self, batch_size=500, workers=None):
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        self.totals = {'created': 0, 'existing': 0, 'errors': 0, 'batches': 0}
+
+    def __enter__(self):
+        if self.workers != 1:
+            # Spawned, not forked: the caller may be a threaded job worker, and a forked
+            # child inherits its locks (logging, DB connections) in whatever state they're in
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.pool:
+            self.pool.shutdown()
+            self.pool = None
+
+    def hash_passwords(self, passwords):
+        if self.pool is None:
+            return [make_password(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self.pool.map(make_password, passwords, chunksize=chunksize))
+
+    def run(self, max_batches=None):
+        """
+        Process batches until no unprocessed subscribers are left (or max_batches ran).
+        Subscribers that fail are left unprocessed for the next run and skipped by
+        this one. Returns the running totals.
+        """
+        last_id = 0
+        while max_batches is None or self.totals['batches'] < max_batches:
+            subscribers = list(
+                WaitlistSubscriber.objects.filter(is_processed=False, id__gt=last_id).order_by('id')[:self.batch_size]
+            )
+            if not subscribers:
+                break
+            last_id = subscribers[-1].id
+            self.process_batch(subscribers)
+        return self.totals
+
+    def process_batch(self, subscribers):
+        """Create accounts for one batch of subscribers and record the outcome in self.totals."""
+        passwords = [generate_secure_password() for _ in subscribers]
+        # Hash outside the transaction so row locks are held for milliseconds, not seconds
+        hashes = self.hash_passwords(passwords)
+        now = timezone.now()
+
+        with transaction.atomic():
+            # Another worker may have taken (or finished) some of these in the meantime
+            claimed = set(
+                WaitlistSubscriber.objects.select_for_update(skip_locked=True)
+                .filter(id__in=[s.id for s in subscribers], is_processed=False)
+                .values_list('id', flat=True)
+            )
+            batch = [(s, p, h) for s, p, h in zip(subscribers, passwords, hashes) if s.id in claimed]
+            if not batch:
+                return
+
+            emails = {s.email for s, _, _ in batch} | {User.objects.normalize_email(s.email) for s, _, _ in batch}
+            existing_emails = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+            phones = {s.phone_number for s, _, _ in batch if s.phone_number}
+            taken_phones = set(User.objects.filter(phone_number__in=phones).values_list('phone_number', flat=True))
+
+            existing, new = [], []
+            for subscriber, password, password_hash in batch:
+                if subscriber.email in existing_emails or User.objects.normalize_email(subscriber.email) in existing_emails:
+                    existing.append(subscriber)
+                else:
+                    new.append((subscriber, password, password_hash))
+            if existing:
+                logger.info(f"{len(existing)} waitlist subscribers already have accounts")
+
+            usernames = resolve_usernames([User.normalize_username(s.email.split('@')[0]) for s, _, _ in new])
+            users = []
+            for (subscriber, _, password_hash), username in zip(new, usernames):
+                first_name, last_name = split_name(subscriber)
+                phone_number = subscriber.phone_number or None
+                if phone_number in taken_phones:
+                    logger.warning(f"Phone number of {subscriber.email} belongs to another account; not copied")
+                    phone_number = None
+                elif phone_number:
+                    taken_phones.add(phone_number)
+                users.append(User(
+                    username=username,
+                    email=User.objects.normalize_email(subscriber.email),
+                    password=password_hash,
+                    first_name=first_name,
+                    last_name=last_name,
+                    phone_number=phone_number,
+                    is_active=True,
+                    is_verified=False,  # They'll need to verify their email
+                ))
+
+            created = self.create_users(new, users)
+            EmailOutbox.enqueue_many(
+                self.welcome_email(subscriber, password) for subscriber, password, _ in created
+            )
+            done = existing + [subscriber for subscriber, _, _ in created]
+            WaitlistSubscriber.objects.filter(id__in=[s.id for s in done]).update(is_processed=True, processed_at=now)
+
+        errors = len(new) - len(created)
+        self.totals['created'] += len(created)
+        self.totals['existing'] += len(existing)
+        self.totals['errors'] += errors
+        self.totals['batches'] += 1
+        logger.info(
+            f"Waitlist batch: {len(created)} accounts created, {len(existing)} already existed, {errors} errors"
+        )
+
+    def create_users(self, new, users):
+        """
+        bulk_create `users`; if the batch hits a unique constraint (a concurrent signup
+        took a username or phone number), create them one by one and skip the failures.
+        Returns the (subscriber, password, hash) entries whose user was created.
+        """
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+            return new
+        except IntegrityError as e:
+            logger.warning(f"Bulk user creation failed ({e}); creating waitlist users one by one")
+
+        created = []
+        for entry, user in zip(new, users):
+            try:
+                with transaction.atomic():
+                    user.save()
+                created.append(entry)
+            except IntegrityError as e:
+                logger.error(f"Error creating user account for {entry[0].email}: {e}")
+        return created
+
+    @staticmethod
+    def welcome_email(subscriber, password):
+        """enqueue() arguments for a subscriber's welcome email with their temporary password."""
+        frontend_url = getattr(settings, 'FRONTEND_URL', 'https://app.malikli1992.com')
+        context = {
+            'user_name': subscriber.get_display_name(),
+            'email': subscriber.email,
+            'password': password,
+            'login_url': f"{frontend_url}/auth/login",
+            'site_name': 'Malikli1992',
+            'year': datetime.now().year,
+            'source': subscriber.get_source_display(),
+        }
+        text_body, html_body = render_templated_email('waitlist_welcome', context)
+        return {
+            'to': [subscriber.email],
+            'subject': WELCOME_SUBJECT,
+            'text_body': text_body,
+            'html_body': html_body,
+            'category': 'waitlist_welcome',
+        }
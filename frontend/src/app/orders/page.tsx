@@ -327,7 +327,27 @@ export default function OrdersPage() {
                 </div>
 
                 {/* Order Items */}
-                <div className={styles.orderItems}>                  {order.items.map((item) => (
+                <div className={styles.orderItems}>
+                  {order.items.length === 0 && !!order.item_count && (
+                    // Order list rows are summaries; the full items are on the order page
+                    <div className={styles.orderItem}>
+                      <div className={styles.itemImage}>
+                        <img 
+                          src={order.first_item_image || '/placeholder-product.png'} 
+                          alt={order.order_number}
+                          onError={(e) => {
+                            e.currentTarget.src = '/placeholder-product.png';
+                          }}
+                        />
+                      </div>
+                      <div className={styles.itemDetails}>
+                        <div className={styles.itemPrice}>
+                          <span className={styles.quantity}>{t('orders.item.quantity')}: {order.total_quantity ?? order.item_count}</span>
+                        </div>
+                      </div>
+                    </div>
+                  )}
+                  {order.items.map((item) => (
                     <div key={item.id} className={styles.orderItem}>
                       <div className={styles.itemImage}>
                         <img 
@@ -32,7 +32,10 @@ export interface Order {
   shipping_cost: string; // API returns as string
   discount_amount: string; // API returns as string
   subtotal_amount: string; // API returns as string
-  items: OrderItem[];
+  items: OrderItem[]; // Only in order detail; the order list returns the summary fields below
+  item_count?: number;
+  total_quantity?: number;
+  first_item_image?: string | null;
   shipping_address: {
     first_name?: string;
     last_name?: string;
@@ -407,7 +410,10 @@ function transformOrder(backendOrder: any): Order {
     shipping_cost: backendOrder.shipping_cost,
     discount_amount: backendOrder.discount_amount,
     subtotal_amount: backendOrder.subtotal_amount,
-    items: backendOrder.items?.map(transformOrderItem) || [],    shipping_address: {
+    items: backendOrder.items?.map(transformOrderItem) || [],
+    item_count: backendOrder.item_count ?? backendOrder.items?.length,
+    total_quantity: backendOrder.total_quantity,
+    first_item_image: backendOrder.first_item_image,    shipping_address: {
       first_name: shippingAddress.recipient_name?.split(' ')[0] || shippingAddress.first_name || '',
       last_name: shippingAddress.recipient_name?.split(' ').slice(1).join(' ') || shippingAddress.last_name || '',
       street_address: shippingAddress.street_address || shippingAddress.address_line_1 || '',
@@ -8,7 +8,16 @@ export interface BackendCartItem {
   quantity: number;
   color: string | null;
   color_code: string | null;
-  size: string | null;  drop_product_details?: {
+  size: string | null;
+  // Slim cart line projection (always present)
+  product_id?: number | null;
+  product_name?: string | null;
+  product_slug?: string | null;
+  image?: string | null;
+  available_quantity?: number;
+  is_available?: boolean;
+  // Full nested details, only returned with ?expand=details
+  drop_product_details?: {
     id: number;
     product: {
       id: number;
@@ -76,7 +85,12 @@ export interface BackendCart {
 export function convertBackendItemToFrontend(backendItem: BackendCartItem) {
   // Extract product details - for drop products it's direct, for variants it's nested in product_details
   let productInfo;
-  if (backendItem.drop_product_details) {
+  if (backendItem.product_name) {
+    productInfo = {
+      name: backendItem.product_name,
+      basePrice: backendItem.unit_price,
+    };
+  } else if (backendItem.drop_product_details) {
     productInfo = {
       name: backendItem.drop_product_details.product.name,
       basePrice: backendItem.drop_product_details.product.base_price,
@@ -90,7 +104,9 @@ export function convertBackendItemToFrontend(backendItem: BackendCartItem) {
   
   // Extract image from variant or product details
   let image: string | undefined;
-  if (backendItem.product_variant_details?.image) {
+  if (backendItem.image) {
+    image = backendItem.image;
+  } else if (backendItem.product_variant_details?.image) {
     image = backendItem.product_variant_details.image;
   } else if (backendItem.product_variant_details?.images && backendItem.product_variant_details.images.length > 0) {
     // Use the primary image or first image if available
@@ -132,7 +148,7 @@ export function convertBackendItemToFrontend(backendItem: BackendCartItem) {
   }
   
   const convertedItem = {
-    id: backendItem.drop_product || backendItem.product_variant_details?.product_details?.id || backendItem.id,
+    id: backendItem.drop_product || backendItem.product_id || backendItem.product_variant_details?.product_details?.id || backendItem.id,
     variantId: backendItem.product_variant || undefined,
     dropProductId: backendItem.drop_product || undefined,
     isDropProduct: !!backendItem.drop_product,
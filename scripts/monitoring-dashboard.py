@@ -17,10 +17,9 @@ sys.path.append(backend_dir)
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 
-from django.db.models import Sum, Count, Q
+from django.db.models import Count
+from orders.inventory import InventoryStats
 from orders.models import Order, Payment
-from carts.models import CartItem
-from products.models import ProductVariant
 
 
 def print_header(title):
@@ -51,48 +50,30 @@ def get_inventory_status():
     print_section("Inventory Reservations")
     
     now = timezone.now()
+    stats = InventoryStats.get()
+    summary = stats['summary']
     
-    # Total reserved quantity across all product variants
-    total_reserved = ProductVariant.objects.aggregate(
-        total=Sum('reserved_quantity')
-    )['total'] or 0
-    
-    # Active reservations from InventoryReservation model
-    from orders.models import InventoryReservation
-    active_reservations = InventoryReservation.objects.filter(
-        is_active=True,
-        expires_at__gte=now
-    ).select_related('product_variant', 'drop_product')
-    
-    expired_reservations = InventoryReservation.objects.filter(
-        is_active=True,
-        expires_at__lt=now
-    ).select_related('product_variant', 'drop_product')
-    
-    active_count = active_reservations.count()
-    expired_count = expired_reservations.count()
-    
-    active_quantity = sum(res.quantity for res in active_reservations)
-    expired_quantity = sum(res.quantity for res in expired_reservations)
+    total_reserved = summary['reserved_variant_units']
+    active_count = summary['active_reservations']
+    expired_count = summary['expired_reservations']
     
     print(f"📦 Total Reserved Quantity (ProductVariants): {total_reserved}")
-    print(f"✅ Active Reservations: {active_count} reservations ({active_quantity} units)")
-    print(f"⚠️  Expired Reservations: {expired_count} reservations ({expired_quantity} units)")
+    print(f"✅ Active Reservations: {active_count} reservations ({summary['active_reservation_units']} units)")
+    print(f"⚠️  Expired Reservations: {expired_count} reservations ({summary['expired_reservation_units']} units)")
     
     if expired_count > 0:
         print(f"\n🚨 ATTENTION: {expired_count} expired reservations need cleanup!")
         print("   Run: python manage.py cleanup_expired_reservations")
     
     # Show oldest expired reservations
-    if expired_reservations.exists():
+    if stats['oldest_expired_reservations']:
         print(f"\n🕐 Oldest Expired Reservations:")
-        for res in expired_reservations.order_by('expires_at')[:5]:
-            age = now - res.expires_at
-            product_name = str(res.product_variant) if res.product_variant else str(res.drop_product)
-            print(f"   • {product_name}: {res.quantity} units (expired {format_timedelta(age)} ago)")
+        for res in stats['oldest_expired_reservations']:
+            age = now - res['expires_at']
+            print(f"   • {res['item_name']}: {res['quantity']} units (expired {format_timedelta(age)} ago)")
     
     # Check for inconsistencies between reservation models
-    total_reservation_quantity = sum(res.quantity for res in active_reservations if res.product_variant)
+    total_reservation_quantity = summary['active_variant_reservation_units']
     if abs(total_reserved - total_reservation_quantity) > 0:
         print(f"\n⚠️  INCONSISTENCY DETECTED:")
         print(f"   ProductVariant reserved_quantity total: {total_reserved}")
@@ -223,23 +204,11 @@ def get_system_health():
     ).count()
     
     # Check for high reservation ratio
-    total_stock = ProductVariant.objects.aggregate(
-        total=Sum('stock_quantity')
-    )['total'] or 0
-    
-    total_reserved = ProductVariant.objects.aggregate(
-        total=Sum('reserved_quantity')
-    )['total'] or 0
-    
-    reservation_ratio = (total_reserved / total_stock * 100) if total_stock > 0 else 0
-    
-    # Check for products with high reservation ratio
-    high_reservation_products = ProductVariant.objects.filter(
-        stock_quantity__gt=0,
-        reserved_quantity__gt=0
-    ).extra(
-        where=["reserved_quantity::float / stock_quantity::float > 0.8"]
-    ).count()
+    summary = InventoryStats.get()['summary']
+    reservation_ratio = summary['reservation_ratio']
+    
+    # Check for products with high reservation ratio (more than 80% of stock reserved)
+    high_reservation_products = summary['high_reservation_variants']
     
     # Health indicators
     health_score = 100